@@ -19,7 +19,10 @@ config = context.config
 # Set the SQLAlchemy URL from our app's config
 config.set_main_option("sqlalchemy.url", get_database_url())
 
-if config.config_file_name is not None:
+# Von migrate_schema() mit bestehender Connection aufgerufen: Logging der App nicht überschreiben
+external_connection = config.attributes.get("connection")
+
+if config.config_file_name is not None and external_connection is None:
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
@@ -38,6 +41,14 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online() -> None:
+    if external_connection is not None:
+        context.configure(
+            connection=external_connection, target_metadata=target_metadata
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
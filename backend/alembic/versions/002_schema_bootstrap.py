@@ -0,0 +1,606 @@
+"""schema bootstrap
+
+Tables that were only ever created by create_all() at boot (reviews,
+daily_property_stats, analytics_events, ...) plus the column/index patches
+init_db() used to apply on every start. The DDL is frozen at the schema of
+this revision; later model changes belong in their own migrations.
+
+Revision ID: 002_schema_bootstrap
+Revises: 001_user_subscription
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002_schema_bootstrap'
+down_revision = '001_user_subscription'
+branch_labels = None
+depends_on = None
+
+# Spalten, die in älteren Production-Datenbanken fehlen
+MISSING_COLUMNS = [
+    # User Management & Subscription (v2.9.0+)
+    ("users", "phone", "VARCHAR(50)"),
+    ("users", "company_name", "VARCHAR(200)"),
+    ("users", "plan", "VARCHAR(20) DEFAULT 'free'"),
+    ("users", "trial_ends_at", "TIMESTAMP"),
+    ("users", "max_properties", "INTEGER DEFAULT 1"),
+    ("users", "stripe_customer_id", "VARCHAR(100)"),
+    ("users", "is_active", "BOOLEAN DEFAULT TRUE"),
+    ("users", "is_admin", "BOOLEAN DEFAULT FALSE"),
+    # Invoice Felder
+    ("users", "invoice_name", "VARCHAR(200)"),
+    ("users", "invoice_address", "VARCHAR(500)"),
+    ("users", "invoice_zip", "VARCHAR(20)"),
+    ("users", "invoice_city", "VARCHAR(100)"),
+    ("users", "invoice_country", "VARCHAR(100)"),
+    ("users", "invoice_vat_id", "VARCHAR(50)"),
+    # Branding Felder
+    ("users", "brand_color", "VARCHAR(20)"),
+    ("users", "logo_url", "VARCHAR(500)"),
+    # Keysafe Felder
+    ("users", "keysafe_location", "VARCHAR(500)"),
+    ("users", "keysafe_code", "VARCHAR(100)"),
+    ("users", "keysafe_instructions", "TEXT"),
+    # Email verification
+    ("users", "is_email_verified", "BOOLEAN DEFAULT FALSE"),
+    ("users", "email_verification_token", "VARCHAR(64)"),
+    ("users", "email_verification_token_expires", "TIMESTAMP"),
+]
+
+
+def _try_ddl(conn, statement: str, label: str) -> bool:
+    """DDL in eigenem Savepoint - ein Fehler bricht die übrigen Schritte nicht ab"""
+    try:
+        with conn.begin_nested():
+            conn.execute(sa.text(statement))
+        print(f"[DB] ✓ {label}")
+        return True
+    except Exception as e:
+        print(f"[DB] ⚠️  {label} fehlgeschlagen: {e}")
+        return False
+
+
+def upgrade() -> None:
+    # Idempotent - legt nur Fehlendes an (auch für per create_all() entstandene Datenbanken)
+    conn = op.get_bind()
+    insp = sa.inspect(conn)
+    if not insp.has_table('ab_tests'):
+        op.create_table('ab_tests',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('variant_a_name', sa.String(length=100), nullable=True),
+        sa.Column('variant_b_name', sa.String(length=100), nullable=True),
+        sa.Column('variant_a_url', sa.String(length=500), nullable=True),
+        sa.Column('variant_b_url', sa.String(length=500), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_ab_tests_property_id'), 'ab_tests', ['property_id'], unique=False)
+    if not insp.has_table('agreement_templates'):
+        op.create_table('agreement_templates',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('variables', sa.Text(), nullable=True),
+        sa.Column('is_default', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_agreement_templates_user_id'), 'agreement_templates', ['user_id'], unique=False)
+    if not insp.has_table('analytics_events'):
+        op.create_table('analytics_events',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=True),
+        sa.Column('event_data', sa.Text(), nullable=True),
+        sa.Column('guest_token', sa.String(length=100), nullable=True),
+        sa.Column('ip_address', sa.String(length=50), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_analytics_events_created_at'), 'analytics_events', ['created_at'], unique=False)
+        op.create_index(op.f('ix_analytics_events_event_type'), 'analytics_events', ['event_type'], unique=False)
+        op.create_index(op.f('ix_analytics_events_property_id'), 'analytics_events', ['property_id'], unique=False)
+    if not insp.has_table('api_keys'):
+        op.create_table('api_keys',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('permissions', sa.Text(), nullable=True),
+        sa.Column('rate_limit', sa.Integer(), nullable=True),
+        sa.Column('last_used', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_api_keys_key'), 'api_keys', ['key'], unique=True)
+        op.create_index(op.f('ix_api_keys_user_id'), 'api_keys', ['user_id'], unique=False)
+    if not insp.has_table('audit_logs'):
+        op.create_table('audit_logs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=True),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('resource', sa.String(length=100), nullable=True),
+        sa.Column('resource_id', sa.String(length=36), nullable=True),
+        sa.Column('ip_address', sa.String(length=50), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_audit_logs_created_at'), 'audit_logs', ['created_at'], unique=False)
+        op.create_index('ix_audit_logs_user_created_action', 'audit_logs', ['user_id', 'created_at', 'action'], unique=False)
+        op.create_index(op.f('ix_audit_logs_user_id'), 'audit_logs', ['user_id'], unique=False)
+    if not insp.has_table('bookings'):
+        op.create_table('bookings',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('guest_name', sa.String(length=200), nullable=True),
+        sa.Column('guest_email', sa.String(length=200), nullable=True),
+        sa.Column('guest_phone', sa.String(length=50), nullable=True),
+        sa.Column('check_in', sa.DateTime(), nullable=True),
+        sa.Column('check_out', sa.DateTime(), nullable=True),
+        sa.Column('guests', sa.Integer(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('total_price', sa.Float(), nullable=True),
+        sa.Column('tipping_percentage', sa.Integer(), nullable=True),
+        sa.Column('tipping_amount', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('invoice_generated', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_bookings_property_id'), 'bookings', ['property_id'], unique=False)
+        op.create_index(op.f('ix_bookings_user_id'), 'bookings', ['user_id'], unique=False)
+    if not insp.has_table('bundle_extras'):
+        op.create_table('bundle_extras',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('bundle_id', sa.String(length=36), nullable=False),
+        sa.Column('extra_id', sa.String(length=36), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_bundle_extras_bundle_id'), 'bundle_extras', ['bundle_id'], unique=False)
+        op.create_index(op.f('ix_bundle_extras_extra_id'), 'bundle_extras', ['extra_id'], unique=False)
+    if not insp.has_table('bundles'):
+        op.create_table('bundles',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_bundles_user_id'), 'bundles', ['user_id'], unique=False)
+    if not insp.has_table('cleaners'):
+        op.create_table('cleaners',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('phone', sa.String(length=50), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_cleaners_user_id'), 'cleaners', ['user_id'], unique=False)
+    if not insp.has_table('custom_questions'):
+        op.create_table('custom_questions',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('question', sa.String(length=500), nullable=False),
+        sa.Column('question_type', sa.String(length=20), nullable=True),
+        sa.Column('options', sa.Text(), nullable=True),
+        sa.Column('required', sa.Boolean(), nullable=True),
+        sa.Column('order', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_custom_questions_property_id'), 'custom_questions', ['property_id'], unique=False)
+    if not insp.has_table('daily_property_stats'):
+        op.create_table('daily_property_stats',
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('bookings', sa.Integer(), nullable=False),
+        sa.Column('confirmed', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('cancellations', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('nights', sa.Integer(), nullable=False),
+        sa.Column('guests', sa.Integer(), nullable=False),
+        sa.Column('rating_sum', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('property_id', 'day')
+        )
+    if not insp.has_table('extras'):
+        op.create_table('extras',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('stock', sa.Integer(), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_extras_user_id'), 'extras', ['user_id'], unique=False)
+    if not insp.has_table('feedback'):
+        op.create_table('feedback',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=True),
+        sa.Column('guest_name', sa.String(length=200), nullable=True),
+        sa.Column('guest_email', sa.String(length=200), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('pros', sa.Text(), nullable=True),
+        sa.Column('cons', sa.Text(), nullable=True),
+        sa.Column('would_recommend', sa.Boolean(), nullable=True),
+        sa.Column('photos', sa.Text(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('response_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_feedback_booking_id'), 'feedback', ['booking_id'], unique=False)
+        op.create_index(op.f('ix_feedback_property_id'), 'feedback', ['property_id'], unique=False)
+        op.create_index(op.f('ix_feedback_user_id'), 'feedback', ['user_id'], unique=False)
+    if not insp.has_table('guest_answers'):
+        op.create_table('guest_answers',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('question_id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=False),
+        sa.Column('guest_id', sa.String(length=36), nullable=True),
+        sa.Column('answer', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_guest_answers_booking_id'), 'guest_answers', ['booking_id'], unique=False)
+        op.create_index(op.f('ix_guest_answers_guest_id'), 'guest_answers', ['guest_id'], unique=False)
+        op.create_index(op.f('ix_guest_answers_question_id'), 'guest_answers', ['question_id'], unique=False)
+    if not insp.has_table('guest_verifications'):
+        op.create_table('guest_verifications',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('guest_name', sa.String(length=200), nullable=False),
+        sa.Column('guest_email', sa.String(length=255), nullable=False),
+        sa.Column('guest_phone', sa.String(length=50), nullable=True),
+        sa.Column('id_type', sa.String(length=50), nullable=True),
+        sa.Column('id_document_url', sa.String(length=500), nullable=True),
+        sa.Column('id_document_status', sa.String(length=20), nullable=True),
+        sa.Column('selfie_url', sa.String(length=500), nullable=True),
+        sa.Column('selfie_status', sa.String(length=20), nullable=True),
+        sa.Column('verification_score', sa.Float(), nullable=True),
+        sa.Column('verification_notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.Column('verified_by', sa.String(length=36), nullable=True),
+        sa.Column('retention_days', sa.Integer(), nullable=True),
+        sa.Column('delete_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_guest_verifications_booking_id'), 'guest_verifications', ['booking_id'], unique=False)
+        op.create_index(op.f('ix_guest_verifications_property_id'), 'guest_verifications', ['property_id'], unique=False)
+        op.create_index(op.f('ix_guest_verifications_user_id'), 'guest_verifications', ['user_id'], unique=False)
+    if not insp.has_table('guest_views'):
+        op.create_table('guest_views',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('token', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_guest_views_token'), 'guest_views', ['token'], unique=True)
+        op.create_index(op.f('ix_guest_views_user_id'), 'guest_views', ['user_id'], unique=False)
+    if not insp.has_table('mail_outbox'):
+        op.create_table('mail_outbox',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=500), nullable=False),
+        sa.Column('html_body', sa.Text(), nullable=False),
+        sa.Column('text_body', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_mail_outbox_next_attempt_at'), 'mail_outbox', ['next_attempt_at'], unique=False)
+        op.create_index(op.f('ix_mail_outbox_status'), 'mail_outbox', ['status'], unique=False)
+    if not insp.has_table('partners'):
+        op.create_table('partners',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('address', sa.String(length=500), nullable=True),
+        sa.Column('phone', sa.String(length=50), nullable=True),
+        sa.Column('email', sa.String(length=200), nullable=True),
+        sa.Column('website', sa.String(length=500), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_partners_user_id'), 'partners', ['user_id'], unique=False)
+    if not insp.has_table('properties'):
+        op.create_table('properties',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('address', sa.String(length=500), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('keysafe_location', sa.String(length=500), nullable=True),
+        sa.Column('keysafe_code', sa.String(length=50), nullable=True),
+        sa.Column('keysafe_instructions', sa.Text(), nullable=True),
+        sa.Column('checkin_time', sa.String(length=10), nullable=True),
+        sa.Column('checkout_time', sa.String(length=10), nullable=True),
+        sa.Column('brand_color', sa.String(length=7), nullable=True),
+        sa.Column('contact_phone', sa.String(length=50), nullable=True),
+        sa.Column('contact_email', sa.String(length=255), nullable=True),
+        sa.Column('house_rules', sa.Text(), nullable=True),
+        sa.Column('wifi_name', sa.String(length=100), nullable=True),
+        sa.Column('wifi_password', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_properties_user_id'), 'properties', ['user_id'], unique=False)
+    if not insp.has_table('property_cleaners'):
+        op.create_table('property_cleaners',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('cleaner_id', sa.String(length=36), nullable=False),
+        sa.Column('notify_hours_before', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_property_cleaners_cleaner_id'), 'property_cleaners', ['cleaner_id'], unique=False)
+        op.create_index(op.f('ix_property_cleaners_property_id'), 'property_cleaners', ['property_id'], unique=False)
+    if not insp.has_table('rental_agreements'):
+        op.create_table('rental_agreements',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=True),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('terms', sa.Text(), nullable=True),
+        sa.Column('house_rules', sa.Text(), nullable=True),
+        sa.Column('cancellation_policy', sa.Text(), nullable=True),
+        sa.Column('deposit_terms', sa.Text(), nullable=True),
+        sa.Column('host_signature_url', sa.String(length=500), nullable=True),
+        sa.Column('host_signed_at', sa.DateTime(), nullable=True),
+        sa.Column('guest_signature_url', sa.String(length=500), nullable=True),
+        sa.Column('guest_signed_at', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('ip_address_guest', sa.String(length=50), nullable=True),
+        sa.Column('user_agent_guest', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_rental_agreements_booking_id'), 'rental_agreements', ['booking_id'], unique=False)
+        op.create_index(op.f('ix_rental_agreements_property_id'), 'rental_agreements', ['property_id'], unique=False)
+        op.create_index(op.f('ix_rental_agreements_user_id'), 'rental_agreements', ['user_id'], unique=False)
+    if not insp.has_table('reviews'):
+        op.create_table('reviews',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=True),
+        sa.Column('guest_name', sa.String(length=200), nullable=False),
+        sa.Column('guest_email', sa.String(length=200), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('reply', sa.Text(), nullable=True),
+        sa.Column('reply_at', sa.DateTime(), nullable=True),
+        sa.Column('is_approved', sa.Boolean(), nullable=True),
+        sa.Column('is_visible', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_reviews_property_id'), 'reviews', ['property_id'], unique=False)
+    if not insp.has_table('scenes'):
+        op.create_table('scenes',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('order', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_scenes_property_id'), 'scenes', ['property_id'], unique=False)
+    if not insp.has_table('security_deposits'):
+        op.create_table('security_deposits',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('payment_id', sa.String(length=100), nullable=True),
+        sa.Column('payment_intent_id', sa.String(length=100), nullable=True),
+        sa.Column('claim_amount', sa.Float(), nullable=True),
+        sa.Column('claim_reason', sa.Text(), nullable=True),
+        sa.Column('claim_status', sa.String(length=20), nullable=True),
+        sa.Column('claim_evidence', sa.Text(), nullable=True),
+        sa.Column('collected_at', sa.DateTime(), nullable=True),
+        sa.Column('returned_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_security_deposits_booking_id'), 'security_deposits', ['booking_id'], unique=False)
+        op.create_index(op.f('ix_security_deposits_property_id'), 'security_deposits', ['property_id'], unique=False)
+        op.create_index(op.f('ix_security_deposits_user_id'), 'security_deposits', ['user_id'], unique=False)
+    if not insp.has_table('smart_rules'):
+        op.create_table('smart_rules',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('trigger_type', sa.String(length=50), nullable=True),
+        sa.Column('condition', sa.Text(), nullable=True),
+        sa.Column('action', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_smart_rules_user_id'), 'smart_rules', ['user_id'], unique=False)
+    if not insp.has_table('status_checks'):
+        op.create_table('status_checks',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('client_name', sa.String(length=255), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not insp.has_table('tasks'):
+        op.create_table('tasks',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.String(length=36), nullable=False),
+        sa.Column('cleaner_id', sa.String(length=36), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_tasks_cleaner_id'), 'tasks', ['cleaner_id'], unique=False)
+        op.create_index(op.f('ix_tasks_property_id'), 'tasks', ['property_id'], unique=False)
+    if not insp.has_table('users'):
+        op.create_table('users',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('phone', sa.String(length=50), nullable=True),
+        sa.Column('company_name', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_demo', sa.Boolean(), nullable=True),
+        sa.Column('is_email_verified', sa.Boolean(), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.Column('email_verification_token', sa.String(length=64), nullable=True),
+        sa.Column('email_verification_token_expires', sa.DateTime(), nullable=True),
+        sa.Column('plan', sa.String(length=20), nullable=True),
+        sa.Column('trial_ends_at', sa.DateTime(), nullable=True),
+        sa.Column('max_properties', sa.Integer(), nullable=True),
+        sa.Column('stripe_customer_id', sa.String(length=100), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('brand_color', sa.String(length=7), nullable=True),
+        sa.Column('logo_url', sa.String(length=500), nullable=True),
+        sa.Column('invoice_name', sa.String(length=200), nullable=True),
+        sa.Column('invoice_address', sa.String(length=500), nullable=True),
+        sa.Column('invoice_zip', sa.String(length=20), nullable=True),
+        sa.Column('invoice_city', sa.String(length=100), nullable=True),
+        sa.Column('invoice_country', sa.String(length=100), nullable=True),
+        sa.Column('invoice_vat_id', sa.String(length=50), nullable=True),
+        sa.Column('keysafe_location', sa.String(length=500), nullable=True),
+        sa.Column('keysafe_code', sa.String(length=50), nullable=True),
+        sa.Column('keysafe_instructions', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+        op.create_index(op.f('ix_users_email_verification_token'), 'users', ['email_verification_token'], unique=False)
+    if not insp.has_table('webhook_endpoints'):
+        op.create_table('webhook_endpoints',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('url', sa.String(length=1000), nullable=False),
+        sa.Column('events', sa.Text(), nullable=True),
+        sa.Column('secret', sa.String(length=100), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('last_triggered', sa.DateTime(), nullable=True),
+        sa.Column('success_count', sa.Integer(), nullable=True),
+        sa.Column('failure_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_webhook_endpoints_user_id'), 'webhook_endpoints', ['user_id'], unique=False)
+    if not insp.has_table('webhook_outbox'):
+        op.create_table('webhook_outbox',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('endpoint_id', sa.String(length=36), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_status_code', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_webhook_outbox_endpoint_id'), 'webhook_outbox', ['endpoint_id'], unique=False)
+        op.create_index(op.f('ix_webhook_outbox_next_attempt_at'), 'webhook_outbox', ['next_attempt_at'], unique=False)
+        op.create_index(op.f('ix_webhook_outbox_status'), 'webhook_outbox', ['status'], unique=False)
+
+    insp = sa.inspect(conn)
+
+    # Eine Spaltenabfrage pro Tabelle statt pro Spalte
+    existing_columns = {}
+    for table_name, column, col_type in MISSING_COLUMNS:
+        if table_name not in existing_columns:
+            existing_columns[table_name] = {col['name'] for col in insp.get_columns(table_name)}
+        if column not in existing_columns[table_name]:
+            _try_ddl(conn, f"ALTER TABLE {table_name} ADD COLUMN {column} {col_type}", f"{table_name}.{column} hinzugefügt")
+
+    # UNIQUE-Index auf email_verification_token durch normalen ersetzen (SQLite kann keine NULL-Werte)
+    index = next((ix for ix in insp.get_indexes("users") if ix["name"] == "ix_users_email_verification_token"), None)
+    if index is not None and index.get("unique"):
+        _try_ddl(conn, "DROP INDEX ix_users_email_verification_token", "Alter UNIQUE-Index entfernt")
+        index = None
+    if index is None:
+        _try_ddl(conn, "CREATE INDEX IF NOT EXISTS ix_users_email_verification_token ON users (email_verification_token)",
+                 "Index ix_users_email_verification_token erstellt (non-unique)")
+
+    # properties.user_id muss VARCHAR sein (UUIDs)
+    user_id_type = next((str(col['type']).upper() for col in insp.get_columns('properties') if col['name'] == 'user_id'), "")
+    if 'INT' in user_id_type and 'VARCHAR' not in user_id_type:
+        print(f"[DB] ⚠️  properties.user_id ist Integer, ändere zu VARCHAR(36)...")
+        _try_ddl(conn, "ALTER TABLE properties ALTER COLUMN user_id TYPE VARCHAR(36)", "user_id Spalte geändert zu VARCHAR(36)")
+
+
+def downgrade() -> None:
+    pass
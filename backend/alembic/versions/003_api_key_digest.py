@@ -0,0 +1,57 @@
+"""api key digest
+
+Replace the plaintext api_keys.key with an indexed HMAC-SHA256 digest
+(api_keys.key_digest) plus a non-secret display prefix.
+
+Revision ID: 003_api_key_digest
+Revises: 002_schema_bootstrap
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from api_keys import key_digest, key_prefix
+
+
+# revision identifiers, used by Alembic.
+revision = '003_api_key_digest'
+down_revision = '002_schema_bootstrap'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    columns = {col['name'] for col in insp.get_columns('api_keys')}
+    indexes = {ix['name'] for ix in insp.get_indexes('api_keys')}
+    # Per create_all() entstandene Datenbanken sind bereits im Zielzustand
+    if 'key' not in columns:
+        return
+
+    if 'key_digest' not in columns:
+        op.add_column('api_keys', sa.Column('key_digest', sa.String(length=64), nullable=True))
+    if 'key_prefix' not in columns:
+        op.add_column('api_keys', sa.Column('key_prefix', sa.String(length=20), nullable=True))
+
+    api_keys = sa.table('api_keys', sa.column('id'), sa.column('key'), sa.column('key_digest'), sa.column('key_prefix'))
+    rows = bind.execute(sa.select(api_keys.c.id, api_keys.c.key).where(api_keys.c.key.isnot(None))).all()
+    for key_id, plaintext in rows:
+        bind.execute(
+            api_keys.update().where(api_keys.c.id == key_id)
+            .values(key_digest=key_digest(plaintext), key_prefix=key_prefix(plaintext))
+        )
+
+    # Klartext entfernen; batch_alter_table baut die Tabelle auf SQLite neu
+    with op.batch_alter_table('api_keys') as batch:
+        batch.alter_column('key_digest', existing_type=sa.String(length=64), nullable=False)
+        batch.create_index('ix_api_keys_key_digest', ['key_digest'], unique=True)
+        if 'ix_api_keys_key' in indexes:
+            batch.drop_index('ix_api_keys_key')
+        batch.drop_column('key')
+
+
+def downgrade() -> None:
+    # Klartext-Keys lassen sich aus dem Digest nicht wiederherstellen
+    raise NotImplementedError("003_api_key_digest ist nicht umkehrbar")
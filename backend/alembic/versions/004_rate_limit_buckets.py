@@ -0,0 +1,33 @@
+"""rate limit buckets
+
+Revision ID: 004_rate_limit_buckets
+Revises: 003_api_key_digest
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_rate_limit_buckets'
+down_revision = '003_api_key_digest'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken haben die Tabelle bereits
+    if sa.inspect(op.get_bind()).has_table('rate_limit_buckets'):
+        return
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=200), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
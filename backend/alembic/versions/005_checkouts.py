@@ -0,0 +1,63 @@
+"""checkouts
+
+Revision ID: 005_checkouts
+Revises: 004_rate_limit_buckets
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_checkouts'
+down_revision = '004_rate_limit_buckets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken haben die Tabellen bereits
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('checkouts'):
+        op.create_table('checkouts',
+        sa.Column('id', sa.String(length=50), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('property_id', sa.Integer(), nullable=True),
+        sa.Column('guest_name', sa.String(length=200), nullable=True),
+        sa.Column('guest_email', sa.String(length=255), nullable=True),
+        sa.Column('payment_method', sa.String(length=20), nullable=True),
+        sa.Column('subtotal', sa.Float(), nullable=False),
+        sa.Column('tax', sa.Float(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('payment_id', sa.String(length=100), nullable=True),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('uq_checkouts_user_idempotency_key', 'checkouts', ['user_id', 'idempotency_key'], unique=True)
+        op.create_index('ix_checkouts_status_expires', 'checkouts', ['status', 'expires_at'], unique=False)
+    if not inspector.has_table('checkout_items'):
+        op.create_table('checkout_items',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('checkout_id', sa.String(length=50), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('extra_id', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_checkout_items_checkout_id', 'checkout_items', ['checkout_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_checkout_items_checkout_id', table_name='checkout_items')
+    op.drop_table('checkout_items')
+    op.drop_index('ix_checkouts_status_expires', table_name='checkouts')
+    op.drop_index('uq_checkouts_user_idempotency_key', table_name='checkouts')
+    op.drop_table('checkouts')
@@ -0,0 +1,58 @@
+"""extras catalog
+
+Extras and bundles per property, a per-property catalog version for the
+price index, and checkouts.property_id as string (property ids are UUIDs).
+
+Revision ID: 006_extras_catalog
+Revises: 005_checkouts
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_extras_catalog'
+down_revision = '005_checkouts'
+branch_labels = None
+depends_on = None
+
+
+def _columns(insp, table):
+    return {col['name']: col for col in insp.get_columns(table)}
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken sind bereits im Zielzustand
+    insp = sa.inspect(op.get_bind())
+
+    if 'extras_version' not in _columns(insp, 'properties'):
+        op.add_column('properties', sa.Column('extras_version', sa.Integer(), nullable=False, server_default='0'))
+
+    extras = _columns(insp, 'extras')
+    if 'property_id' not in extras:
+        op.add_column('extras', sa.Column('property_id', sa.String(length=36), nullable=True))
+        op.create_index('ix_extras_property_id', 'extras', ['property_id'], unique=False)
+    if 'category' not in extras:
+        op.add_column('extras', sa.Column('category', sa.String(length=50), nullable=True))
+
+    if 'property_id' not in _columns(insp, 'bundles'):
+        op.add_column('bundles', sa.Column('property_id', sa.String(length=36), nullable=True))
+        op.create_index('ix_bundles_property_id', 'bundles', ['property_id'], unique=False)
+
+    # 005 hat property_id als INTEGER angelegt
+    if 'INT' in str(_columns(insp, 'checkouts')['property_id']['type']).upper():
+        with op.batch_alter_table('checkouts') as batch:
+            batch.alter_column('property_id', existing_type=sa.Integer(), type_=sa.String(length=36))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('checkouts') as batch:
+        batch.alter_column('property_id', existing_type=sa.String(length=36), type_=sa.Integer())
+    op.drop_index('ix_bundles_property_id', table_name='bundles')
+    op.drop_column('bundles', 'property_id')
+    op.drop_column('extras', 'category')
+    op.drop_index('ix_extras_property_id', table_name='extras')
+    op.drop_column('extras', 'property_id')
+    op.drop_column('properties', 'extras_version')
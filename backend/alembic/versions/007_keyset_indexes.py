@@ -0,0 +1,38 @@
+"""keyset indexes
+
+Composite indexes matching the (created_at, id) keyset pagination of the
+bookings feed, feedback and reviews lists.
+
+Revision ID: 007_keyset_indexes
+Revises: 006_extras_catalog
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_keyset_indexes'
+down_revision = '006_extras_catalog'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_bookings_user_created_id', 'bookings', ['user_id', 'created_at', 'id']),
+    ('ix_feedback_user_created_id', 'feedback', ['user_id', 'created_at', 'id']),
+    ('ix_reviews_property_created_id', 'reviews', ['property_id', 'created_at', 'id']),
+)
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken haben die Indizes bereits
+    insp = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in insp.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,46 @@
+"""hot query indexes
+
+Composite indexes for the cron booking filters (status + check-in/check-out
+day), the cleaning/occupancy window (property_id, check_out, status) and
+approved reviews per property, plus a partial index for the public review
+list. tests/test_query_plans.py checks via EXPLAIN that they are used.
+
+Revision ID: 008_hot_query_indexes
+Revises: 007_keyset_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_hot_query_indexes'
+down_revision = '007_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_bookings_status_check_in', 'bookings', ['status', 'check_in'], {}),
+    ('ix_bookings_status_check_out', 'bookings', ['status', 'check_out'], {}),
+    ('ix_bookings_property_check_out_status', 'bookings', ['property_id', 'check_out', 'status'], {}),
+    ('ix_reviews_property_approved_visible_created', 'reviews',
+     ['property_id', 'is_approved', 'is_visible', 'created_at', 'id'], {}),
+    ('ix_reviews_public_created', 'reviews', ['created_at', 'id'], {
+        'sqlite_where': sa.text('is_approved = 1 AND is_visible = 1'),
+        'postgresql_where': sa.text('is_approved = true AND is_visible = true'),
+    }),
+)
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken haben die Indizes bereits
+    insp = sa.inspect(op.get_bind())
+    for name, table, columns, options in INDEXES:
+        if name not in {index['name'] for index in insp.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False, **options)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
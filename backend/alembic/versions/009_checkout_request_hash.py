@@ -0,0 +1,31 @@
+"""checkout request hash
+
+checkouts.request_hash: SHA-256 of the request body stored with the
+Idempotency-Key, so a reused key with a different payload is rejected.
+
+Revision ID: 009_checkout_request_hash
+Revises: 008_hot_query_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_checkout_request_hash'
+down_revision = '008_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per create_all() entstandene Datenbanken haben die Spalte bereits
+    if 'request_hash' in {col['name'] for col in sa.inspect(op.get_bind()).get_columns('checkouts')}:
+        return
+    op.add_column('checkouts', sa.Column('request_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('checkouts') as batch:
+        batch.drop_column('request_hash')
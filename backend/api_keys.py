@@ -0,0 +1,122 @@
+"""
+API-Keys: Digest-Lookup und gebündelte last_used-Updates
+Keys werden nicht im Klartext gespeichert, sondern als HMAC-SHA256 mit einem
+Server-Secret (API_KEY_SECRET, in Development sonst SECRET_KEY; Production
+verlangt API_KEY_SECRET, damit eine JWT-Rotation die Keys nicht ungültig macht).
+Anders als bcrypt ist der
+Digest deterministisch und damit über einen Index nachschlagbar - bei
+256 Bit Zufall im Key braucht es keinen langsamen Hash gegen Brute Force.
+last_used wird pro Key im Speicher gesammelt und periodisch in einem
+Batch-UPDATE geschrieben statt mit einem Commit pro Request.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEV_SECRET = 'welcome-link-dev-secret-key-change-in-production-12345'
+
+
+@lru_cache(maxsize=1)
+def _secret() -> bytes:
+    # Erst beim ersten Zugriff lesen - .env ist dann geladen (Server, Alembic)
+    secret = os.environ.get('API_KEY_SECRET') or os.environ.get('SECRET_KEY') or DEV_SECRET
+    return secret.encode()
+
+
+def key_digest(api_key: str) -> str:
+    """HMAC-SHA256 des Keys (hex) - Lookup-Wert in api_keys.key_digest"""
+    return hmac.new(_secret(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+def key_prefix(api_key: str) -> str:
+    """Nicht geheimer Anfang des Keys zur Anzeige (wl_1a2b3c4d)"""
+    return api_key[:11]
+
+
+class LastUsedTracker:
+    """Sammelt last_used je Key und schreibt sie gebündelt"""
+
+    def __init__(self, session_factory: Callable[[], Session], model, flush_interval_seconds: float = 30.0):
+        self.session_factory = session_factory
+        self.model = model
+        self.flush_interval = flush_interval_seconds
+        self.touched = 0
+        self.written = 0
+        self.flushes = 0
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def touch(self, key_id: str, when: datetime = None):
+        """Nutzung vermerken (ohne DB-Zugriff)"""
+        with self._lock:
+            self._pending[key_id] = when or datetime.now(timezone.utc)
+            self.touched += 1
+
+    def flush(self) -> int:
+        """Ausstehende Zeitstempel in einem executemany-UPDATE schreiben"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        db = self.session_factory()
+        try:
+            table = self.model.__table__
+            db.execute(
+                update(table).where(table.c.id == bindparam("key_id")).values(last_used=bindparam("used_at")),
+                [{"key_id": key_id, "used_at": used_at} for key_id, used_at in pending.items()],
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ last_used für {len(pending)} API-Keys nicht geschrieben: {e}")
+            with self._lock:
+                # Neuere Nutzungen seit dem Flush haben Vorrang
+                self._pending = {**pending, **self._pending}
+            return 0
+        finally:
+            db.close()
+        with self._lock:
+            self.written += len(pending)
+            self.flushes += 1
+        return len(pending)
+
+    def start(self):
+        """Starte periodisches Flushen (idempotent)"""
+        if self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="api-key-last-used", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(self.flush_interval)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "pending": len(self._pending),
+            "touched": self.touched,
+            "written": self.written,
+            "flushes": self.flushes,
+            "flush_interval_seconds": self.flush_interval,
+        }
@@ -0,0 +1,221 @@
+"""
+In-Process Caches
+Kleine, thread-sichere LRU-Caches mit TTL für heiße Lese-Pfade.
+Jeder Uvicorn-Worker hält seinen eigenen Cache - die TTL begrenzt,
+wie lange ein Worker nach einer Invalidierung in einem anderen Worker
+veraltete Daten ausliefern kann.
+ArtifactCache hält erzeugte Dateien (QR-PNGs, PDFs) content-adressiert.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Begrenzter LRU-Cache mit Ablaufzeit pro Eintrag und Hit/Miss-Zählern"""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Hole Wert oder default (zählt Hit/Miss)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Speichere Wert, verdränge bei Bedarf den ältesten Eintrag"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Entferne einen Eintrag"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Entferne alle Einträge, für die predicate(key, value) zutrifft"""
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Kennzahlen für Health-Check und Monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class ArtifactCache:
+    """
+    Content-adressierter Cache für erzeugte Dateien (PNG, PDF, ...).
+    Key ist ein SHA-256 über Art und Eingaben - gleiche Eingaben liefern
+    dieselben Bytes, daher gibt es keine TTL und keine Invalidierung.
+    Speicher-LRU mit Byte-Budget, optional zweite Stufe auf der Platte.
+    """
+
+    def __init__(self, name: str, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, **inputs) -> str:
+        raw = json.dumps([kind, inputs], sort_keys=True, default=str)
+        return f"{kind}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get_or_create(self, kind: str, builder: Callable[[], bytes], **inputs) -> bytes:
+        """Liefere gecachte Bytes oder erzeuge sie einmalig mit builder()"""
+        key = self.make_key(kind, **inputs)
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            data = builder()
+            with self._lock:
+                self.misses += 1
+            self._write_disk(key, data)
+        self._store(key, data)
+        return data
+
+    def get(self, kind: str, **inputs) -> Optional[bytes]:
+        """Nur nachschlagen (Speicher, dann Platte) - None bei Miss"""
+        key = self.make_key(kind, **inputs)
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._store(key, data)
+        return data
+
+    def put(self, kind: str, data: bytes, **inputs) -> None:
+        """Extern erzeugte Bytes ablegen (z.B. aus einem Worker-Prozess)"""
+        key = self.make_key(kind, **inputs)
+        self._write_disk(key, data)
+        self._store(key, data)
+
+    def _store(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                return
+            self._data[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, key[-2:], key)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Kennzahlen für Health-Check und Monitoring"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk_tier": bool(self.disk_dir),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
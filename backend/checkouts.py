@@ -0,0 +1,232 @@
+"""
+Checkouts in der Datenbank mit Write-Through-Cache
+Checkouts liegen in checkouts/checkout_items und sind damit in jedem
+Uvicorn-Worker sichtbar. Abgeschlossene und abgelaufene Checkouts ändern sich
+nicht mehr und werden pro Worker in einem begrenzten LRU-Cache gehalten;
+offene (pending) werden immer aus der DB gelesen, weil ein anderer Worker
+sie abschließen kann. Offene Checkouts verfallen nach pending_ttl_seconds
+(beim Lesen sofort, in der DB per expire_pending() aus dem Cron-Job).
+Request-Handler übergeben ihre Session (db=), damit ein Request nur eine
+Pool-Connection belegt; ohne db öffnet der Store eine eigene.
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("completed", "expired")
+
+
+class CheckoutExpired(Exception):
+    """Checkout ist abgelaufen und kann nicht mehr bezahlt werden"""
+
+
+class IdempotencyKeyReused(Exception):
+    """Idempotency-Key wurde schon für einen anderen Request-Inhalt verwendet"""
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite liefert naive Datumswerte (UTC)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class CheckoutStore:
+    """Anlegen, Lesen, Abschließen und Ablaufen von Checkouts"""
+
+    def __init__(self, session_factory: Callable[[], Session], checkout_model, item_model,
+                 cache: TTLCache, pending_ttl_seconds: float = 3600):
+        self.session_factory = session_factory
+        self.checkout_model = checkout_model
+        self.item_model = item_model
+        self.cache = cache
+        self.pending_ttl = pending_ttl_seconds
+        self.created = 0
+        self.idempotent_replays = 0
+        self.expired = 0
+
+    @contextmanager
+    def _session(self, db: Optional[Session]):
+        """Session des Aufrufers oder eine eigene (wird danach geschlossen)"""
+        if db is not None:
+            yield db
+            return
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _to_dict(self, row, items) -> dict:
+        status = row.status
+        if status == "pending" and row.expires_at and _aware(row.expires_at) <= datetime.now(timezone.utc):
+            status = "expired"
+        checkout = {
+            "id": row.id,
+            "property_id": row.property_id,
+            "items": [
+                {"extra_id": item.extra_id, "name": item.name, "price": item.price,
+                 "quantity": item.quantity, "total": item.total}
+                for item in items
+            ],
+            "guest_name": row.guest_name,
+            "guest_email": row.guest_email,
+            "payment_method": row.payment_method,
+            "subtotal": row.subtotal,
+            "tax": row.tax,
+            "total": row.total,
+            "status": status,
+            "created_at": _aware(row.created_at).isoformat(),
+        }
+        if row.payment_id:
+            checkout["payment_id"] = row.payment_id
+        if row.completed_at:
+            checkout["completed_at"] = _aware(row.completed_at).isoformat()
+        return checkout
+
+    def _load(self, db: Session, checkout_id: str) -> Optional[dict]:
+        row = db.get(self.checkout_model, checkout_id)
+        if row is None:
+            return None
+        items = db.query(self.item_model).filter(
+            self.item_model.checkout_id == checkout_id
+        ).order_by(self.item_model.position).all()
+        return self._to_dict(row, items)
+
+    def _remember(self, checkout: dict) -> dict:
+        if checkout["status"] in FINAL_STATUSES:
+            self.cache.set(checkout["id"], checkout)
+        return checkout
+
+    def _replay(self, db: Session, user_id: str, idempotency_key: str, request_hash: Optional[str]) -> Optional[dict]:
+        """Checkout zum Idempotency-Key (None: noch keiner angelegt)"""
+        existing = db.query(self.checkout_model.id, self.checkout_model.request_hash).filter(
+            self.checkout_model.user_id == user_id,
+            self.checkout_model.idempotency_key == idempotency_key,
+        ).first()
+        if not existing:
+            return None
+        # Ältere Checkouts ohne Hash werden nicht verglichen
+        if request_hash and existing.request_hash and existing.request_hash != request_hash:
+            raise IdempotencyKeyReused(idempotency_key)
+        self.idempotent_replays += 1
+        return self._remember(self._load(db, existing.id))
+
+    def create(self, user_id: str, checkout: dict, items: List[dict],
+               idempotency_key: Optional[str] = None,
+               before_commit: Optional[Callable[[Session], None]] = None,
+               db: Optional[Session] = None, request_hash: Optional[str] = None) -> Tuple[dict, bool]:
+        """Checkout mit Positionen in einer Transaktion anlegen -> (Checkout, neu angelegt)
+        before_commit(db) läuft in derselben Transaktion (z.B. Preisversion prüfen,
+        Bestand buchen); eine Exception dort rollt den Checkout zurück.
+        Gleicher Idempotency-Key mit anderem request_hash -> IdempotencyKeyReused."""
+        now = datetime.now(timezone.utc)
+        checkout_id = f"checkout-{uuid.uuid4().hex[:16]}"
+        completed = checkout.get("status") == "completed"
+        with self._session(db) as db:
+            if idempotency_key:
+                replayed = self._replay(db, user_id, idempotency_key, request_hash)
+                if replayed:
+                    return replayed, False
+            try:
+                db.add(self.checkout_model(
+                    id=checkout_id,
+                    user_id=user_id,
+                    idempotency_key=idempotency_key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    completed_at=now if completed else None,
+                    expires_at=None if completed else now + timedelta(seconds=self.pending_ttl),
+                    **checkout,
+                ))
+                db.add_all([self.item_model(checkout_id=checkout_id, position=position, **item)
+                            for position, item in enumerate(items)])
+                if before_commit:
+                    before_commit(db)
+                db.commit()
+            except IntegrityError:
+                # Paralleler Request mit gleichem Idempotency-Key war schneller
+                db.rollback()
+                replayed = idempotency_key and self._replay(db, user_id, idempotency_key, request_hash)
+                if not replayed:
+                    raise
+                return replayed, False
+            except Exception:
+                db.rollback()
+                raise
+            self.created += 1
+            return self._remember(self._load(db, checkout_id)), True
+
+    def get(self, checkout_id: str, db: Optional[Session] = None) -> Optional[dict]:
+        cached = self.cache.get(checkout_id)
+        if cached is not None:
+            return cached
+        with self._session(db) as db:
+            checkout = self._load(db, checkout_id)
+        return self._remember(checkout) if checkout else None
+
+    def complete(self, checkout_id: str, payment_id: str,
+                 on_complete: Optional[Callable[[Session, dict], None]] = None,
+                 db: Optional[Session] = None) -> Optional[dict]:
+        """Offenen Checkout abschließen (abgeschlossene bleiben unverändert)
+        on_complete(db, checkout) läuft nur beim tatsächlichen Abschluss und in
+        derselben Transaktion."""
+        now = datetime.now(timezone.utc)
+        table = self.checkout_model.__table__
+        with self._session(db) as db:
+            result = db.execute(
+                update(table)
+                .where(table.c.id == checkout_id, table.c.status == "pending", table.c.expires_at > now)
+                .values(status="completed", payment_id=payment_id, completed_at=now, expires_at=None)
+            )
+            if result.rowcount and on_complete:
+                try:
+                    on_complete(db, self._load(db, checkout_id))
+                except Exception:
+                    db.rollback()
+                    raise
+            db.commit()
+            checkout = self._load(db, checkout_id)
+        if checkout is None:
+            return None
+        if checkout["status"] == "expired":
+            self._remember(checkout)
+            raise CheckoutExpired(checkout_id)
+        return self._remember(checkout)
+
+    def expire_pending(self, now: datetime = None) -> int:
+        """Abgelaufene offene Checkouts in einem UPDATE auf expired setzen"""
+        now = now or datetime.now(timezone.utc)
+        table = self.checkout_model.__table__
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(table)
+                .where(table.c.status == "pending", table.c.expires_at <= now)
+                .values(status="expired")
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.expired += result.rowcount
+        if result.rowcount:
+            logger.info(f"⏱️ {result.rowcount} offene Checkouts abgelaufen")
+        return result.rowcount
+
+    def stats(self) -> dict:
+        return {
+            "created": self.created,
+            "idempotent_replays": self.idempotent_replays,
+            "expired": self.expired,
+            "pending_ttl_seconds": self.pending_ttl,
+        }
@@ -0,0 +1,44 @@
+"""
+Streaming CSV Export
+Liest eine spaltenbasierte select()-Abfrage batchweise (yield_per - auf
+PostgreSQL ein serverseitiger Cursor) und schreibt die Zeilen mit dem
+csv-Modul chunkweise in einen Generator. Der Speicherbedarf ist damit
+unabhängig von der Anzahl der Zeilen.
+"""
+import csv
+import io
+import logging
+from typing import Callable, Iterator, Sequence
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CSV_BATCH_SIZE = 1000
+
+
+def stream_csv(session_factory: Callable[[], Session], stmt, header: Sequence[str],
+               format_row: Callable = tuple, batch_size: int = CSV_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Generator für StreamingResponse. Öffnet eine eigene Session, weil der
+    Body erst nach dem Handler (und dessen Session) gesendet wird.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    db = session_factory()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            writer.writerows(format_row(row) for row in rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    except Exception as e:
+        logger.error(f"❌ CSV-Export abgebrochen: {e}")
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,266 @@
+"""
+Tages-Rollups (daily_property_stats)
+Buchungen und Bewertungen fließen beim Flush als Deltas in die Zeile
+(property_id, Tag) ein - gleiche Transaktion, atomare Inkremente per Upsert.
+Dashboards lesen nur noch diese Tabelle, ihre Laufzeit hängt damit von der
+Anzahl der Tage ab, nicht von der Anzahl der Buchungen.
+Der nächtliche Backfill rechnet ein Zeitfenster aus den Rohdaten neu und
+korrigiert Abweichungen (z.B. durch Bulk-Updates ohne ORM-Events).
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from database import Booking, Review, Property, DailyPropertyStats
+
+logger = logging.getLogger(__name__)
+
+REVENUE_STATUSES = ('confirmed', 'completed')
+METRICS = ('bookings', 'confirmed', 'completed', 'cancellations', 'revenue', 'nights', 'guests', 'rating_sum', 'rating_count')
+
+BOOKING_FIELDS = ('property_id', 'created_at', 'status', 'total_price', 'check_in', 'check_out', 'guests')
+REVIEW_FIELDS = ('property_id', 'created_at', 'rating')
+
+_DELTAS_KEY = 'daily_stats_deltas'
+
+
+def _day(value) -> date:
+    return (value or datetime.now(timezone.utc)).date()
+
+
+def booking_contribution(values: dict) -> Optional[Tuple[Tuple[str, date], dict]]:
+    """((property_id, Tag), Kennzahlen) einer Buchung"""
+    if not values.get('property_id'):
+        return None
+    status = values.get('status') or 'pending'
+    counted = status in REVENUE_STATUSES
+    nights = 0
+    if counted and values.get('check_in') and values.get('check_out'):
+        nights = max(0, (values['check_out'] - values['check_in']).days)
+    return (str(values['property_id']), _day(values.get('created_at'))), {
+        'bookings': 1,
+        'confirmed': int(status == 'confirmed'),
+        'completed': int(status == 'completed'),
+        'cancellations': int(status == 'cancelled'),
+        'revenue': (values.get('total_price') or 0) if counted else 0,
+        'nights': nights,
+        'guests': values.get('guests') or 1,
+    }
+
+
+def review_contribution(values: dict) -> Optional[Tuple[Tuple[str, date], dict]]:
+    """((property_id, Tag), Kennzahlen) einer Bewertung"""
+    if not values.get('property_id') or values.get('rating') is None:
+        return None
+    return (str(values['property_id']), _day(values.get('created_at'))), {
+        'rating_sum': values['rating'],
+        'rating_count': 1,
+    }
+
+
+_TRACKED = {
+    Booking: (BOOKING_FIELDS, booking_contribution),
+    Review: (REVIEW_FIELDS, review_contribution),
+}
+
+
+def _current_values(obj, fields) -> dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _committed_values(obj, fields) -> dict:
+    """Werte vor der Änderung (active_history sorgt dafür, dass sie geladen sind)"""
+    state = inspect(obj)
+    values = {}
+    for field in fields:
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+        else:
+            values[field] = getattr(obj, field)
+    return values
+
+
+def _add(deltas: dict, contribution, sign: int):
+    if contribution is None:
+        return
+    key, metrics = contribution
+    row = deltas[key]
+    for metric, value in metrics.items():
+        row[metric] += sign * value
+
+
+def _collect_deltas(session: Session, flush_context, instances):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for obj in session.new:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            _add(deltas, tracked[1](_current_values(obj, tracked[0])), 1)
+    for obj in session.dirty:
+        tracked = _TRACKED.get(type(obj))
+        if tracked and session.is_modified(obj, include_collections=False):
+            _add(deltas, tracked[1](_committed_values(obj, tracked[0])), -1)
+            _add(deltas, tracked[1](_current_values(obj, tracked[0])), 1)
+    for obj in session.deleted:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            _add(deltas, tracked[1](_committed_values(obj, tracked[0])), -1)
+    session.info[_DELTAS_KEY] = {
+        key: metrics for key, metrics in deltas.items() if any(metrics.values())
+    }
+
+
+def _apply_deltas(session: Session, flush_context):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def apply_deltas(connection, deltas: Dict[Tuple[str, date], dict]):
+    """Addiere Deltas atomar auf die Tageszeilen (Upsert, sonst UPDATE/INSERT)"""
+    table = DailyPropertyStats.__table__
+    dialect = connection.dialect.name
+    for (property_id, day), metrics in deltas.items():
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            values = {metric: metrics.get(metric, 0) for metric in METRICS}
+            stmt = upsert(table).values(property_id=property_id, day=day, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.property_id, table.c.day],
+                set_={metric: table.c[metric] + stmt.excluded[metric] for metric in metrics}
+            )
+            connection.execute(stmt)
+            continue
+        result = connection.execute(
+            update(table).where(table.c.property_id == property_id, table.c.day == day).values(
+                {metric: table.c[metric] + value for metric, value in metrics.items()}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(
+                property_id=property_id, day=day, **{metric: metrics.get(metric, 0) for metric in METRICS}
+            ))
+
+
+def _noop(target, value, oldvalue, initiator):
+    return value
+
+
+def track_rollups(session_cls=Session):
+    """Registriere die Flush-Hooks (einmal beim Import des Servers)"""
+    if event.contains(session_cls, 'before_flush', _collect_deltas):
+        return
+    for model, (fields, _) in _TRACKED.items():
+        for field in fields:
+            event.listen(getattr(model, field), 'set', _noop, active_history=True, retval=True)
+    event.listen(session_cls, 'before_flush', _collect_deltas)
+    event.listen(session_cls, 'after_flush', _apply_deltas)
+
+
+# ---------- Backfill ----------
+
+def rebuild_daily_stats(db: Session, start_day: date, end_day: date, batch_size: int = 1000) -> dict:
+    """
+    Rechne die Tageszeilen im Fenster [start_day, end_day] aus den Rohdaten neu.
+    Liest nur die benötigten Spalten batchweise und ersetzt das Fenster in einer
+    Transaktion. Gibt zurück, wie viele Zeilen abwichen.
+    """
+    window_start = datetime.combine(start_day, time.min)
+    window_end = datetime.combine(end_day + timedelta(days=1), time.min)
+
+    expected = defaultdict(lambda: defaultdict(int))
+    for model, (fields, contribution) in _TRACKED.items():
+        stmt = select(*[getattr(model, field) for field in fields]).where(
+            model.created_at >= window_start, model.created_at < window_end
+        )
+        for rows in db.execute(stmt.execution_options(yield_per=batch_size)).partitions():
+            for row in rows:
+                _add(expected, contribution(dict(zip(fields, row))), 1)
+
+    in_window = (DailyPropertyStats.day >= start_day, DailyPropertyStats.day <= end_day)
+    current = {
+        (row.property_id, row.day): {metric: getattr(row, metric) for metric in METRICS}
+        for row in db.execute(select(DailyPropertyStats).where(*in_window)).scalars()
+    }
+    rows = [
+        {"property_id": property_id, "day": day, **{metric: metrics.get(metric, 0) for metric in METRICS}}
+        for (property_id, day), metrics in expected.items()
+    ]
+    corrected = sum(
+        1 for row in rows
+        if current.get((row["property_id"], row["day"])) != {metric: row[metric] for metric in METRICS}
+    ) + len(set(current) - set(expected))
+
+    db.execute(delete(DailyPropertyStats).where(*in_window))
+    if rows:
+        db.execute(insert(DailyPropertyStats), rows)
+    db.commit()
+
+    if corrected:
+        logger.warning(f"⚠️ daily_property_stats: {corrected} Zeilen korrigiert ({start_day} - {end_day})")
+    return {"start": start_day.isoformat(), "end": end_day.isoformat(), "rows": len(rows), "corrected": corrected}
+
+
+def first_activity_day(db: Session) -> Optional[date]:
+    """Frühester Tag mit Buchung oder Bewertung (Start für einen vollen Backfill)"""
+    days = [
+        db.execute(select(func.min(model.created_at))).scalar()
+        for model in _TRACKED
+    ]
+    days = [d for d in days if d]
+    return min(days).date() if days else None
+
+
+# ---------- Abfragen ----------
+
+def owned_by(user_id: str):
+    """Filter auf die Unterkünfte eines Hosts"""
+    return DailyPropertyStats.property_id.in_(select(Property.id).where(Property.user_id == user_id))
+
+
+def in_days(start_day: Optional[date] = None, end_day: Optional[date] = None) -> list:
+    criteria = []
+    if start_day:
+        criteria.append(DailyPropertyStats.day >= start_day)
+    if end_day:
+        criteria.append(DailyPropertyStats.day <= end_day)
+    return criteria
+
+
+def rollup_totals(db: Session, *criteria) -> dict:
+    """Summen aller Kennzahlen plus abgeleitete Durchschnitte"""
+    row = db.execute(select(
+        *[func.coalesce(func.sum(getattr(DailyPropertyStats, metric)), 0).label(metric) for metric in METRICS],
+        func.min(DailyPropertyStats.day).label("first_day"),
+        func.max(DailyPropertyStats.day).label("last_day"),
+    ).where(*criteria)).one()
+    result = {metric: getattr(row, metric) for metric in METRICS}
+    paid = result['confirmed'] + result['completed']
+    result['avg_booking_value'] = round(result['revenue'] / paid, 2) if paid else 0
+    result['avg_rating'] = round(result['rating_sum'] / result['rating_count'], 1) if result['rating_count'] else 0
+    result['first_day'] = row.first_day
+    result['last_day'] = row.last_day
+    return result
+
+
+def rollup_per_day(db: Session, *criteria) -> list:
+    """(Tag, Buchungen, Umsatz) je Tag, aufsteigend"""
+    return db.execute(select(
+        DailyPropertyStats.day,
+        func.sum(DailyPropertyStats.bookings),
+        func.sum(DailyPropertyStats.revenue),
+    ).where(*criteria).group_by(DailyPropertyStats.day).order_by(DailyPropertyStats.day)).all()
+
+
+def rollup_per_property(db: Session, *criteria) -> dict:
+    """property_id -> Buchungen"""
+    return dict(db.execute(select(
+        DailyPropertyStats.property_id, func.sum(DailyPropertyStats.bookings)
+    ).where(*criteria).group_by(DailyPropertyStats.property_id)).all())
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Text, Integer, Float, inspect, text
+from sqlalchemy import create_engine, event, exc, Column, String, DateTime, Date, Boolean, Text, Integer, Float, Index, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from datetime import datetime, timezone
 import os
+import threading
+import time
 
 Base = declarative_base()
 
@@ -72,6 +75,8 @@ class Property(Base):
     # WiFi Info
     wifi_name = Column(String(100))
     wifi_password = Column(String(100))
+    # Erhöht bei jeder Änderung an Extras/Bundles (Preisindex, extras_catalog.py)
+    extras_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
 class StatusCheck(Base):
@@ -120,10 +125,12 @@ class Extra(Base):
     
     id = Column(String(36), primary_key=True)
     user_id = Column(String(36), nullable=False, index=True)
+    property_id = Column(String(36), index=True)
     name = Column(String(200), nullable=False)
     description = Column(Text)
+    category = Column(String(50), default="other")  # food, wellness, activity, transport, service, other
     price = Column(Float, default=0)
-    stock = Column(Integer, default=0)
+    stock = Column(Integer)  # NULL = unbegrenzt
     image_url = Column(String(500))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -133,6 +140,7 @@ class Bundle(Base):
     
     id = Column(String(36), primary_key=True)
     user_id = Column(String(36), nullable=False, index=True)
+    property_id = Column(String(36), index=True)
     name = Column(String(200), nullable=False)
     description = Column(Text)
     price = Column(Float, default=0)
@@ -185,6 +193,11 @@ class Feedback(Base):
     response_at = Column(DateTime)  # When owner responded
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    
+    # GET /feedback: Keyset über (created_at, id) pro Gastgeber
+    __table_args__ = (
+        Index("ix_feedback_user_created_id", "user_id", "created_at", "id"),
+    )
 
 
 class SmartRule(Base):
@@ -223,6 +236,16 @@ class Booking(Base):
     invoice_generated = Column(Boolean, default=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # /admin/bookings/feed (Keyset), /admin/stats (Zeitraum pro Gastgeber)
+        Index("ix_bookings_user_created_id", "user_id", "created_at", "id"),
+        # Cron-Jobs: Erinnerung/Willkommen nach Check-in-Tag, Follow-up nach Check-out-Tag
+        Index("ix_bookings_status_check_in", "status", "check_in"),
+        Index("ix_bookings_status_check_out", "status", "check_out"),
+        # Reinigungs-Benachrichtigungen, Belegung: Properties im Check-out-Fenster
+        Index("ix_bookings_property_check_out_status", "property_id", "check_out", "status"),
+    )
 
 
 class Task(Base):
@@ -417,7 +440,8 @@ class ApiKey(Base):
     
     id = Column(String(36), primary_key=True)
     user_id = Column(String(36), nullable=False, index=True)
-    key = Column(String(100), unique=True, nullable=False, index=True)  # wl_xxx format
+    key_digest = Column(String(64), unique=True, nullable=False, index=True)  # HMAC-SHA256 des Keys (api_keys.py)
+    key_prefix = Column(String(20))  # Anzeige, z.B. wl_1a2b3c4d
     name = Column(String(100))  # Friendly name
     permissions = Column(Text)  # JSON: ['read', 'write', 'admin']
     rate_limit = Column(Integer, default=100)  # Requests per minute
@@ -441,6 +465,175 @@ class AuditLog(Base):
     details = Column(Text)  # JSON für zusätzliche Details
     status = Column(String(20), default='success')  # success, failed, blocked
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    
+    # /audit-logs: Filter nach User, Keyset über created_at, optional Aktion
+    __table_args__ = (
+        Index("ix_audit_logs_user_created_action", "user_id", "created_at", "action"),
+    )
+
+
+class MailOutbox(Base):
+    """Persistente Warteschlange für ausgehende E-Mails"""
+    __tablename__ = "mail_outbox"
+    
+    id = Column(String(36), primary_key=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(500), nullable=False)
+    html_body = Column(Text, nullable=False)
+    text_body = Column(Text)
+    status = Column(String(20), default='pending', index=True)  # pending, sending, sent, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(String(500))
+    next_attempt_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    sent_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class WebhookEndpoint(Base):
+    """Webhook-Endpunkte der Benutzer"""
+    __tablename__ = "webhook_endpoints"
+    
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(36), nullable=False, index=True)
+    url = Column(String(1000), nullable=False)
+    events = Column(Text)  # JSON: ['booking.created', ...]
+    secret = Column(String(100), nullable=False)
+    is_active = Column(Boolean, default=True)
+    last_triggered = Column(DateTime)
+    success_count = Column(Integer, default=0)
+    failure_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class WebhookDelivery(Base):
+    """Transaktionale Outbox für Webhook-Events"""
+    __tablename__ = "webhook_outbox"
+    
+    id = Column(String(36), primary_key=True)
+    endpoint_id = Column(String(36), nullable=False, index=True)
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # Serialisiertes JSON (Basis der Signatur)
+    status = Column(String(20), default='pending', index=True)  # pending, delivering, delivered, dead
+    attempts = Column(Integer, default=0)
+    last_status_code = Column(Integer)
+    last_error = Column(String(500))
+    next_attempt_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    delivered_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class Review(Base):
+    """Gästebewertungen pro Unterkunft"""
+    __tablename__ = "reviews"
+    
+    id = Column(String(36), primary_key=True)
+    property_id = Column(String(36), nullable=False, index=True)
+    booking_id = Column(String(36))
+    guest_name = Column(String(200), nullable=False)
+    guest_email = Column(String(200))
+    rating = Column(Integer, nullable=False)  # 1-5
+    title = Column(String(200))
+    comment = Column(Text)
+    reply = Column(Text)
+    reply_at = Column(DateTime)
+    is_approved = Column(Boolean, default=False)
+    is_visible = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # GET /reviews?property_id=&approved_only=false: Keyset über (created_at, id)
+        Index("ix_reviews_property_created_id", "property_id", "created_at", "id"),
+        # GET /reviews?property_id= (nur freigegebene, sichtbare)
+        Index("ix_reviews_property_approved_visible_created", "property_id", "is_approved", "is_visible", "created_at", "id"),
+        # GET /reviews ohne Property: Partial Index nur über öffentliche Bewertungen
+        Index("ix_reviews_public_created", "created_at", "id",
+              sqlite_where=text("is_approved = 1 AND is_visible = 1"),
+              postgresql_where=text("is_approved = true AND is_visible = true")),
+    )
+
+
+class AnalyticsEvent(Base):
+    """Tracking-Events der Gästeansicht (Seitenaufrufe, Klicks)"""
+    __tablename__ = "analytics_events"
+    
+    id = Column(String(36), primary_key=True)
+    event_type = Column(String(100), nullable=False, index=True)
+    property_id = Column(String(36), index=True)
+    event_data = Column(Text)  # JSON
+    guest_token = Column(String(100))
+    ip_address = Column(String(50))
+    user_agent = Column(String(500))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+
+class DailyPropertyStats(Base):
+    """Vorberechnete Tageswerte pro Unterkunft (Buchungen nach Erstellungstag)"""
+    __tablename__ = "daily_property_stats"
+    
+    property_id = Column(String(36), primary_key=True)
+    day = Column(Date, primary_key=True)
+    bookings = Column(Integer, default=0, nullable=False)
+    confirmed = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+    cancellations = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0, nullable=False)  # confirmed + completed
+    nights = Column(Integer, default=0, nullable=False)  # confirmed + completed
+    guests = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_count = Column(Integer, default=0, nullable=False)
+
+
+class RateLimitBucket(Base):
+    """Token-Bucket pro API-Key/Benutzer/IP (RATE_LIMIT_BACKEND=sql, siehe rate_limit.py)"""
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String(200), primary_key=True)  # z.B. key:<id>, user:<id>, ip:<addr>
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # Unix-Zeit in Sekunden
+    allowed = Column(Boolean, nullable=False, default=True)  # Ergebnis der letzten Prüfung
+
+
+class Checkout(Base):
+    """Bestellung von Extras (checkouts.py, ersetzt den prozesslokalen CHECKOUTS_STORE)"""
+    __tablename__ = "checkouts"
+    
+    id = Column(String(50), primary_key=True)  # checkout-<hex>
+    user_id = Column(String(36), nullable=False)
+    property_id = Column(String(36))
+    guest_name = Column(String(200))
+    guest_email = Column(String(255))
+    payment_method = Column(String(20))  # stripe, paypal, cash
+    subtotal = Column(Float, nullable=False, default=0)
+    tax = Column(Float, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default='pending')  # pending, completed, expired
+    payment_id = Column(String(100))
+    idempotency_key = Column(String(100))  # Idempotency-Key-Header beim Anlegen
+    request_hash = Column(String(64))  # SHA-256 des Request-Inhalts: gleicher Key, anderer Inhalt -> 422
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    completed_at = Column(DateTime)
+    expires_at = Column(DateTime)  # nur pending: danach verfällt der Checkout
+    
+    __table_args__ = (
+        # Wiederholtes POST /checkout mit gleichem Key liefert den ersten Checkout
+        Index("uq_checkouts_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+        # /cron/expire-checkouts: pending mit abgelaufenem expires_at
+        Index("ix_checkouts_status_expires", "status", "expires_at"),
+    )
+
+
+class CheckoutItem(Base):
+    """Position eines Checkouts (Preis zum Zeitpunkt der Bestellung)"""
+    __tablename__ = "checkout_items"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    checkout_id = Column(String(50), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    extra_id = Column(String(50), nullable=False)
+    name = Column(String(200))
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
 
 
 def get_database_url():
@@ -463,110 +656,242 @@ def get_database_url():
     
     return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
-def init_db():
-    """Initialisiere Datenbank und erstelle Tabellen"""
+# ============ CONNECTION POOL ============
+# Sizing-Modell (pro Uvicorn-Worker):
+#   Sync-Handler laufen im AnyIO-Threadpool (THREADPOOL_SIZE Threads), dazu
+#   kommen Hintergrund-Threads mit eigener Session (Mail-Outbox, Webhooks,
+#   Analytics-/Audit-Writer: DB_BACKGROUND_CONNECTIONS). Ein Request hält seine
+#   Session und holt kurzzeitig eine zweite Connection, wo bewusst in eigener
+#   Transaktion geschrieben wird (Sync-Audit beim Login, send_email ohne db=):
+#   DB_CONNECTIONS_PER_THREAD (Default 2). Also
+#       Bedarf  = THREADPOOL_SIZE * DB_CONNECTIONS_PER_THREAD + DB_BACKGROUND_CONNECTIONS
+#       Default = DB_POOL_SIZE (dauerhaft offen) + DB_MAX_OVERFLOW (= Bedarf - Pool)
+#   Damit wartet kein Request auf den Pool, solange Threads der Engpass sind.
+#   Liegt der Pool darunter, können alle Threads je eine Connection halten und
+#   auf die zweite warten - dann blockieren sie sich bis DB_POOL_TIMEOUT.
+#   Über alle Worker gilt WEB_CONCURRENCY * (Pool + Overflow) <= DB_MAX_CONNECTIONS
+#   (Postgres max_connections abzüglich Reserve). Ist DB_MAX_CONNECTIONS gesetzt,
+#   wird der Overflow darauf begrenzt - dann THREADPOOL_SIZE mit senken.
+THREADPOOL_SIZE = int(os.environ.get('THREADPOOL_SIZE', 40))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+DB_CONNECTIONS_PER_THREAD = int(os.environ.get('DB_CONNECTIONS_PER_THREAD', 2))
+DB_BACKGROUND_CONNECTIONS = int(os.environ.get('DB_BACKGROUND_CONNECTIONS', 4))
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 0))  # 0 = unbegrenzt
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def pool_sizing() -> dict:
+    """Pool-Größen pro Worker nach dem Sizing-Modell (ENV überschreibt)"""
+    demand = THREADPOOL_SIZE * DB_CONNECTIONS_PER_THREAD + DB_BACKGROUND_CONNECTIONS
+    pool_size = int(os.environ.get('DB_POOL_SIZE', min(10, demand)))
+    max_overflow = int(os.environ.get('DB_MAX_OVERFLOW', max(0, demand - pool_size)))
+    if DB_MAX_CONNECTIONS:
+        budget = max(1, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY))
+        pool_size = min(pool_size, budget)
+        max_overflow = min(max_overflow, budget - pool_size)
+        if pool_size + max_overflow < demand:
+            print(f"[DB] ⚠️  Pool ({pool_size}+{max_overflow}) kleiner als Bedarf ({demand}) - Requests mit "
+                  f"zweiter Connection können sich bis DB_POOL_TIMEOUT blockieren, THREADPOOL_SIZE senken")
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+def is_memory_sqlite(database_url: str) -> bool:
+    return database_url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_url
+
+
+# Callbacks mit der Wartezeit (Sekunden) je Pool-Checkout, z.B. für /metrics
+pool_wait_observers = []
+# Callbacks ohne Argumente je Checkout-Timeout
+pool_timeout_observers = []
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool, der Wartezeit auf Connections und Timeouts misst.
+    Wartezeit = Zeit in der Queue; der Verbindungsaufbau neuer Connections
+    (Overflow) zählt nicht dazu, sondern zu connect_seconds_total.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkout = threading.local()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connect_seconds_total = 0.0
+
+    def _do_get(self):
+        checkout = self._checkout
+        if getattr(checkout, "active", False):
+            # QueuePool._do_get ruft sich bei Wettläufen selbst auf - nur der äußere Aufruf misst
+            return super()._do_get()
+        checkout.active = True
+        checkout.connect_seconds = 0.0
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            for observer in pool_timeout_observers:
+                observer()
+            raise
+        finally:
+            checkout.active = False
+            waited = max(0.0, time.perf_counter() - started - checkout.connect_seconds)
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            for observer in pool_wait_observers:
+                observer(waited)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - started
+            if getattr(self._checkout, "active", False):
+                self._checkout.connect_seconds += elapsed
+            with self._stats_lock:
+                self.connect_seconds_total += elapsed
+
+    def stats(self) -> dict:
+        capacity = self.size() + self._max_overflow
+        checked_out = self.checkedout()
+        return {
+            "class": type(self).__name__,
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self._timeout,
+            "checked_out": checked_out,
+            "overflow": max(0, self.overflow()),
+            "utilization": round(checked_out / capacity, 3) if capacity else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+            "connect_seconds_total": round(self.connect_seconds_total, 3),
+        }
+
+
+def engine_options(database_url: str) -> dict:
+    """create_engine()-Argumente für die Datenbank (Pool, SQLite-Eigenheiten)"""
+    options = {"echo": False, "pool_pre_ping": _env_bool('DB_POOL_PRE_PING', True)}
+    if database_url.startswith("sqlite"):
+        # Sessions wandern zwischen Threadpool-Threads
+        options["connect_args"] = {"check_same_thread": False}
+        if is_memory_sqlite(database_url):
+            # Eine geteilte Connection, sonst sieht jede Connection eine leere DB (Tests)
+            options["poolclass"] = StaticPool
+            options.pop("pool_pre_ping")
+            return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        **pool_sizing(),
+    )
+    return options
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL: Leser blockieren den (einen) Schreiber nicht mehr"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.close()
+
+
+def create_db_engine(database_url: str):
+    """Engine mit konfiguriertem Pool erstellen"""
+    db_engine = create_engine(database_url, **engine_options(database_url))
+    if database_url.startswith("sqlite") and not is_memory_sqlite(database_url):
+        event.listen(db_engine, "connect", _configure_sqlite)
+    return db_engine
+
+
+def pool_stats(db_engine=None) -> dict:
+    """Auslastung und Wartezeiten des Connection-Pools"""
+    pool = (db_engine or engine).pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.stats()
+    return {"class": type(pool).__name__}
+
+
+# ============ SCHEMA BOOTSTRAP ============
+# Web-Worker prüfen beim Boot nur die Schema-Version (eine Query). Tabellen
+# anlegen, Spalten nachziehen und Alembic-Migrationen laufen einmalig über
+# `python migrate.py` (Release-Schritt) - oder beim Boot, falls die Version
+# nicht passt und SKIP_BOOTSTRAP nicht gesetzt ist.
+SCHEMA_VERSION = "009_checkout_request_hash"  # Alembic-Head
+LEGACY_REVISION = "001_user_subscription"  # Datenbanken ohne Alembic-Historie: Stand vor 002_schema_bootstrap
+SKIP_BOOTSTRAP = _env_bool('SKIP_BOOTSTRAP', False)
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def schema_version(db_engine) -> str:
+    """Alembic-Version der Datenbank (None ohne alembic_version-Tabelle)"""
+    try:
+        with db_engine.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except exc.DBAPIError:
+        return None
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def migrate_schema(db_engine) -> str:
+    """Schema auf SCHEMA_VERSION bringen - liefert die neue Version.
+    Ohne Alembic-Historie (neue DB oder per create_all entstanden) zuerst stamp auf
+    LEGACY_REVISION; 002_schema_bootstrap legt dann nur Fehlendes an, die Revisionen
+    danach prüfen ebenso, was schon vorhanden ist."""
+    from alembic import command
+    with db_engine.begin() as conn:
+        config = alembic_config(conn)
+        if not inspect(conn).has_table("alembic_version"):
+            command.stamp(config, LEGACY_REVISION)
+        command.upgrade(config, "head")
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def init_db(skip_bootstrap: bool = None):
+    """Initialisiere Datenbank - Schema-Bootstrap nur, wenn die Version nicht passt"""
     global SessionLocal, engine
     
     database_url = get_database_url()
     print(f"[DB] Verbinde zu: {database_url[:50]}...")
+    if skip_bootstrap is None:
+        skip_bootstrap = SKIP_BOOTSTRAP
     
     try:
-        engine = create_engine(database_url, pool_pre_ping=True, echo=False)
-        print(f"[DB] Engine erstellt")
+        engine = create_db_engine(database_url)
+        pool = pool_stats(engine)
+        print(f"[DB] Engine erstellt ({pool['class']}, Pool {pool.get('size', 1)} + Overflow {pool.get('max_overflow', 0)})")
         
-        # Teste Connection
-        with engine.connect() as conn:
-            print(f"[DB] ✓ Connection erfolgreich")
-        
-        # Erstelle fehlende Tabellen (Fallback für neue Installationen)
-        # Schema-Änderungen werden über Alembic Migrations verwaltet
-        print(f"[DB] Erstelle fehlende Tables (falls nötig)...")
-        Base.metadata.create_all(bind=engine)
-        print(f"[DB] ✓ Tables erstellt/geprüft")
-        
-        # Überprüfe ob Tables existieren
-        insp = inspect(engine)
-        tables = insp.get_table_names()
-        print(f"[DB] ✓ Existierende Tabellen: {tables}")
-        
-        # === FEHLENDE SPALTEN HINZUFÜGEN (Safe Migration) ===
-        # Diese Spalten fehlen in Production und werden automatisch hinzugefügt
-        # Nutzt SQLAlchemy inspect() für DB-unabhängige Column-Erkennung
-        missing_columns = [
-            # User Management & Subscription (v2.9.0+)
-            ("users", "phone", "VARCHAR(50)"),
-            ("users", "company_name", "VARCHAR(200)"),
-            ("users", "plan", "VARCHAR(20) DEFAULT 'free'"),
-            ("users", "trial_ends_at", "TIMESTAMP"),
-            ("users", "max_properties", "INTEGER DEFAULT 1"),
-            ("users", "stripe_customer_id", "VARCHAR(100)"),
-            ("users", "is_active", "BOOLEAN DEFAULT TRUE"),
-            ("users", "is_admin", "BOOLEAN DEFAULT FALSE"),
-            # Invoice Felder
-            ("users", "invoice_name", "VARCHAR(200)"),
-            ("users", "invoice_address", "VARCHAR(500)"),
-            ("users", "invoice_zip", "VARCHAR(20)"),
-            ("users", "invoice_city", "VARCHAR(100)"),
-            ("users", "invoice_country", "VARCHAR(100)"),
-            ("users", "invoice_vat_id", "VARCHAR(50)"),
-            # Branding Felder
-            ("users", "brand_color", "VARCHAR(20)"),
-            ("users", "logo_url", "VARCHAR(500)"),
-            # Keysafe Felder
-            ("users", "keysafe_location", "VARCHAR(500)"),
-            ("users", "keysafe_code", "VARCHAR(100)"),
-            ("users", "keysafe_instructions", "TEXT"),
-            # Email verification
-            ("users", "is_email_verified", "BOOLEAN DEFAULT FALSE"),
-            ("users", "email_verification_token", "VARCHAR(64)"),
-            ("users", "email_verification_token_expires", "TIMESTAMP"),
-        ]
-        
-        for table_name, column, col_type in missing_columns:
-            try:
-                # DB-unabhängige Column-Erkennung mit SQLAlchemy inspect()
-                existing_columns = [col['name'] for col in insp.get_columns(table_name)]
-                if column not in existing_columns:
-                    print(f"[DB] + Füge {table_name}.{column} hinzu...")
-                    with engine.connect() as conn:
-                        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column} {col_type}"))
-                        conn.commit()
-                    print(f"[DB] ✓ {table_name}.{column} hinzugefügt")
-            except Exception as e:
-                print(f"[DB] ⚠️  Konnte {table_name}.{column} nicht prüfen/hinzufügen: {e}")
-        
-        # Entferne UNIQUE Constraint von email_verification_token (SQLite kann keine NULL-Werte)
-        # Erstelle normalen Index für schnellere Suche
-        try:
-            with engine.connect() as conn:
-                # Drop old UNIQUE index if exists
-                conn.execute(text("DROP INDEX IF EXISTS ix_users_email_verification_token"))
-                conn.commit()
-                print(f"[DB] ✓ Alter Index entfernt")
-                # Create new non-unique index
-                conn.execute(text("""
-                    CREATE INDEX IF NOT EXISTS ix_users_email_verification_token 
-                    ON users (email_verification_token)
-                """))
-                conn.commit()
-                print(f"[DB] ✓ Neuer Index erstellt (non-unique)")
-        except Exception as e:
-            print(f"[DB] ⚠️  Index konnte nicht erstellt werden: {e}")
-        
-        # Prüfe ob properties.user_id VARCHAR ist (für UUIDs) - DB-unabhängig
-        try:
-            props_columns = {col['name']: col['type'] for col in insp.get_columns('properties')}
-            if 'user_id' in props_columns:
-                col_type = str(props_columns['user_id']).upper()
-                if 'INT' in col_type and 'VARCHAR' not in col_type:
-                    print(f"[DB] ⚠️  properties.user_id ist Integer, ändere zu VARCHAR(36)...")
-                    # SQLite/PostgreSQL kompatibel
-                    with engine.connect() as conn:
-                        conn.execute(text("ALTER TABLE properties ALTER COLUMN user_id TYPE VARCHAR(36)"))
-                        conn.commit()
-                    print(f"[DB] ✓ user_id Spalte geändert zu VARCHAR(36)")
-        except Exception as e:
-            print(f"[DB] ⚠️  Konnte user_id Spalte nicht prüfen/ändern: {e}")
+        # Eine Query: Connection-Test und Schema-Version zugleich
+        version = schema_version(engine)
+        if version == SCHEMA_VERSION:
+            print(f"[DB] ✓ Schema aktuell ({version})")
+        elif skip_bootstrap:
+            print(f"[DB] ⚠️  Schema-Version {version} statt {SCHEMA_VERSION} - 'python migrate.py' ausführen")
+        else:
+            print(f"[DB] Schema-Version {version} - migriere auf {SCHEMA_VERSION}...")
+            print(f"[DB] ✓ Schema migriert ({migrate_schema(engine)})")
         
         # Erstelle Session Factory
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
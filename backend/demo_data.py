@@ -0,0 +1,110 @@
+"""
+Demo-Benutzer mit Properties und Extras
+Legt migrate.py (Release-Schritt) bzw. der Startup ohne SKIP_BOOTSTRAP an.
+Braucht nur die Models - migrate.py muss dafür nicht die ganze App importieren.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from database import User as DBUser, Property as DBProperty, Extra as DBExtra
+from password_hashing import BCRYPT_ROUNDS, crypt_context
+
+logger = logging.getLogger(__name__)
+
+
+def init_demo_user(db: Session):
+    """Erstelle Demo-Benutzer wenn nicht vorhanden"""
+    demo_email = "demo@welcome-link.de"
+    logger.info(f"Prüfe ob Demo-Benutzer existiert: {demo_email}")
+    
+    try:
+        existing = db.query(DBUser).filter(DBUser.email == demo_email).first()
+    except Exception as e:
+        logger.error(f"❌ Fehler beim Abfragen Demo-Benutzer: {str(e)}")
+        raise
+    
+    if not existing:
+        demo_user = DBUser(
+            id=str(uuid.uuid4()),
+            email=demo_email,
+            password_hash=crypt_context(BCRYPT_ROUNDS).hash("Demo123!"),
+            name="Demo Benutzer",
+            created_at=datetime.now(timezone.utc),
+            is_demo=True
+        )
+        db.add(demo_user)
+        db.commit()
+        
+        # Erstelle Demo-Properties mit fixen IDs für Konsistenz
+        demo_properties = [
+            DBProperty(
+                id="demo-prop-1",
+                user_id=demo_user.id,
+                name="Ferienwohnung Seeblick",
+                description="Moderne 3-Zimmer Ferienwohnung direkt am Bodensee mit eigenem Bootssteg und Panoramaterrasse.",
+                address="Seepromenade 15, 88131 Lindau",
+                brand_color="#F27C2C",
+                wifi_name="Seeblick-Guest",
+                wifi_password="welcome2024",
+                checkin_time="15:00",
+                checkout_time="11:00",
+                created_at=datetime.now(timezone.utc)
+            ),
+            DBProperty(
+                id="demo-prop-2",
+                user_id=demo_user.id,
+                name="Boutique Hotel Alpenblick",
+                description="Charmantes 4-Sterne Hotel mit Bergpanorama in Garmisch-Partenkirchen. 45 Zimmer, Spa-Bereich und regionale Küche.",
+                address="Zugspitzstraße 42, 82467 Garmisch-Partenkirchen",
+                brand_color="#2C5F9E",
+                created_at=datetime.now(timezone.utc)
+            ),
+            DBProperty(
+                id="demo-prop-3",
+                user_id=demo_user.id,
+                name="Stadtapartment München City",
+                description="Stilvolles Apartment im Herzen Münchens, perfekt für Geschäftsreisende. 5 Min. zum Marienplatz.",
+                address="Maximilianstraße 28, 80539 München",
+                brand_color="#4A9D4A",
+                created_at=datetime.now(timezone.utc)
+            )
+        ]
+        
+        for prop in demo_properties:
+            db.add(prop)
+        db.commit()
+        
+        logger.info("✓ Demo-Benutzer und Properties erstellt")
+    
+    seed_demo_extras(db)
+
+
+def get_demo_extras():
+    """Get demo extras"""
+    return [
+        {"id": "extra-1", "property_id": "demo-prop-1", "name": "Frühstück", "description": "Reichhaltiges Frühstück mit frischen Brötchen, Eiern und Kaffee", "price": 15.0, "category": "food", "is_active": True},
+        {"id": "extra-2", "property_id": "demo-prop-1", "name": "Spät-Check-out", "description": "Check-out bis 14:00 Uhr", "price": 25.0, "category": "service", "is_active": True},
+        {"id": "extra-3", "property_id": "demo-prop-1", "name": "Fahrradverleih", "description": "Pro Tag, inkl. Helm und Schloss", "price": 12.0, "category": "activity", "is_active": True},
+        {"id": "extra-4", "property_id": "demo-prop-1", "name": "Sauna", "description": "Private Nutzung für 2 Stunden", "price": 30.0, "category": "wellness", "is_active": True},
+        {"id": "extra-5", "property_id": "demo-prop-1", "name": "Gepäckaufbewahrung", "description": "Sichere Aufbewahrung pro Tag", "price": 5.0, "category": "service", "is_active": True},
+        {"id": "extra-6", "property_id": "demo-prop-1", "name": "Shuttle Service", "description": "Bahnhof-Transfer hin und zurück", "price": 20.0, "category": "transport", "is_active": True},
+        {"id": "extra-7", "property_id": "demo-prop-1", "name": "Willkommens-Paket", "description": "Sekt, Obst & Schokolade bei Anreise", "price": 35.0, "category": "food", "is_active": True},
+        {"id": "extra-8", "property_id": "demo-prop-1", "name": "Haustier", "description": "Pro Nacht, inkl. Futter & Näpfe", "price": 10.0, "category": "other", "is_active": True},
+        {"id": "extra-9", "property_id": "demo-prop-1", "name": "Parkplatz", "description": "Tiefgarage, pro Tag", "price": 8.0, "category": "transport", "is_active": True},
+        {"id": "extra-10", "property_id": "demo-prop-1", "name": "Massage", "description": "60 Min. Rücken-Nacken im Hotel", "price": 65.0, "category": "wellness", "is_active": True},
+    ]
+
+
+def seed_demo_extras(db: Session):
+    """Demo-Extras für demo-prop-1 anlegen, falls die Property noch keine hat"""
+    demo_property = db.query(DBProperty).filter(DBProperty.id == "demo-prop-1").first()
+    if not demo_property or db.query(DBExtra.id).filter(DBExtra.property_id == demo_property.id).first():
+        return
+    now = datetime.now(timezone.utc)
+    for position, extra in enumerate(get_demo_extras()):
+        db.add(DBExtra(user_id=demo_property.user_id, created_at=now + timedelta(microseconds=position), **extra))
+    db.commit()
+    logger.info("✓ Demo-Extras angelegt")
@@ -0,0 +1,210 @@
+"""
+Gepufferte Event-Ingestion (Analytics, Audit-Log)
+Request-Handler legen Events nur in eine begrenzte In-Process-Queue und
+kehren sofort zurück. Ein Writer-Thread schreibt sie gesammelt mit
+Multi-Row-INSERTs in einer eigenen Session - sobald batch_size Events
+anliegen oder das älteste Event flush_interval_ms wartet. Ist die Queue
+voll, wird verworfen statt zu blockieren. Fehlgeschlagene Batches werden
+bis max_attempts erneut eingereiht. Beim Shutdown wird der Rest synchron
+geschrieben.
+"""
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """Begrenzte Queue + Hintergrund-Writer für Event-Tabellen"""
+
+    def __init__(self, session_factory: Callable[[], Session], model, name: str = None,
+                 max_size: int = 10000, batch_size: int = 500, flush_interval_ms: float = 250.0,
+                 max_attempts: int = 1):
+        self.session_factory = session_factory
+        self.model = model
+        self.name = name or model.__tablename__
+        self.max_size = max_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_attempts = max(1, max_attempts)
+        self.enqueued = 0
+        self.written = 0
+        self.written_sync = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_flush_latency_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+        self.last_write_ms = 0.0
+        self._queue: "queue.Queue[Tuple[float, int, dict]]" = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # ---------- Producer ----------
+
+    def _row(self, values: dict) -> dict:
+        return {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc), **values}
+
+    def _enqueue(self, item: Tuple[float, int, dict]) -> bool:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def put(self, **values) -> Optional[str]:
+        """Event einreihen - liefert die Event-ID oder None, wenn die Queue voll ist"""
+        row = self._row(values)
+        if not self._enqueue((time.monotonic(), 0, row)):
+            return None
+        with self._lock:
+            self.enqueued += 1
+        return row["id"]
+
+    def put_many(self, events: Iterable[dict]) -> Tuple[int, int]:
+        """Mehrere Events (Spaltenwerte je Event) einreihen - (angenommen, verworfen)"""
+        accepted = dropped = 0
+        for event in events:
+            if self.put(**event):
+                accepted += 1
+            else:
+                dropped += 1
+        return accepted, dropped
+
+    def write(self, **values) -> str:
+        """Event sofort in eigener Transaktion schreiben (durability 'sync').
+        Schlägt das fehl, wird es für den Writer eingereiht statt verloren zu gehen."""
+        row = self._row(values)
+        db = self.session_factory()
+        try:
+            db.execute(insert(self.model), [row])
+            db.commit()
+            with self._lock:
+                self.written_sync += 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ {self.name}: synchrones Schreiben fehlgeschlagen, wird nachgeholt: {e}")
+            if self._enqueue((time.monotonic(), 1, row)):
+                with self._lock:
+                    self.enqueued += 1
+        finally:
+            db.close()
+        return row["id"]
+
+    # ---------- Writer ----------
+
+    def start(self):
+        """Starte Writer-Thread (idempotent)"""
+        if self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ {self.name}: Writer gestartet (Batch {self.batch_size}, {int(self.flush_interval * 1000)} ms)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stoppe Writer und schreibe verbliebene Events"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        while self.flush():
+            pass
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect(block=True)
+            if batch:
+                self._write(batch)
+
+    def _collect(self, block: bool) -> List[Tuple[float, int, dict]]:
+        """Sammle bis batch_size Events oder bis das erste flush_interval alt ist"""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = batch[0][0] + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if block and remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> int:
+        """Schreibe einen Batch synchron (Tests, Shutdown) - Anzahl verarbeiteter Events"""
+        batch = self._collect(block=False)
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    def _write(self, batch: List[Tuple[float, int, dict]]):
+        started = time.monotonic()
+        db = self.session_factory()
+        try:
+            db.execute(insert(self.model), [row for _, _, row in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self._retry(batch, e)
+            return
+        finally:
+            db.close()
+        finished = time.monotonic()
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_write_ms = round((finished - started) * 1000, 2)
+            self.last_flush_latency_ms = round((finished - batch[0][0]) * 1000, 2)
+            self.max_flush_latency_ms = max(self.max_flush_latency_ms, self.last_flush_latency_ms)
+
+    def _retry(self, batch: List[Tuple[float, int, dict]], error: Exception):
+        retry = [(enqueued_at, attempts + 1, row) for enqueued_at, attempts, row in batch if attempts + 1 < self.max_attempts]
+        lost = len(batch) - len(retry)
+        if self._stopping.is_set():
+            lost, retry = len(batch), []
+        requeued = sum(1 for item in retry if self._enqueue(item))
+        with self._lock:
+            self.failed += lost
+            self.retried += requeued
+        logger.error(f"❌ {self.name}: Batch ({len(batch)} Events) nicht geschrieben, {requeued} erneut eingereiht: {error}")
+
+    # ---------- Metrics ----------
+
+    def stats(self) -> dict:
+        """Queue-Tiefe und Zähler dieses Prozesses"""
+        return {
+            "running": self._thread is not None,
+            "queued": self._queue.qsize(),
+            "max_size": self.max_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "written_sync": self.written_sync,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0,
+            "last_write_ms": self.last_write_ms,
+            "last_flush_latency_ms": self.last_flush_latency_ms,
+            "max_flush_latency_ms": self.max_flush_latency_ms,
+        }
@@ -0,0 +1,207 @@
+"""
+Extras-Katalog mit versioniertem Preisindex pro Property
+Extras und Bundles liegen in extras/bundles/bundle_extras. Für Checkout und
+Guestview wird pro Property ein Preisindex aufgebaut (Dict nach Extra-/Bundle-ID,
+O(1) pro Position statt linearer Suche) und im TTLCache gehalten. Jede
+Änderung erhöht properties.extras_version und verwirft den Index; Checkouts
+prüfen die Version in ihrer Transaktion, damit ein veralteter Index eines
+anderen Workers nie zu falschen Preisen führt. Der Bestand wird pro Extra mit
+genau einem bedingten UPDATE reduziert (kein Überverkauf bei Parallelität).
+"""
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownExtra(ValueError):
+    """Extra oder Bundle gehört nicht (mehr) zum Katalog der Property"""
+
+
+class OutOfStock(Exception):
+    """Bestand eines Extras reicht nicht"""
+
+
+class StalePriceIndex(Exception):
+    """Katalog wurde seit dem Aufbau des Preisindex geändert"""
+
+
+class PriceIndex(NamedTuple):
+    property_id: str
+    version: int
+    items: Dict[str, dict]  # Extra-/Bundle-ID -> {type, name, price, components}
+    extras: List[dict]  # Anzeige (Guestview, GET /extras)
+    bundles: List[dict]
+
+    def price(self, requested: Iterable[Tuple[str, int]]) -> Tuple[List[dict], float]:
+        """(Positionen, Zwischensumme) für (ID, Menge)-Paare"""
+        order_items, subtotal = [], 0.0
+        for item_id, quantity in requested:
+            item = self.items.get(item_id)
+            if item is None:
+                raise UnknownExtra(item_id)
+            total = round(item["price"] * quantity, 2)
+            subtotal += total
+            order_items.append({"extra_id": item_id, "name": item["name"], "price": item["price"],
+                                "quantity": quantity, "total": total})
+        return order_items, round(subtotal, 2)
+
+    def stock_demand(self, order_items: Iterable[dict]) -> Dict[str, int]:
+        """Benötigter Bestand pro Extra (Bundles in ihre Extras aufgelöst)"""
+        demand = defaultdict(int)
+        for order_item in order_items:
+            item = self.items.get(order_item["extra_id"])
+            if item is None:
+                raise UnknownExtra(order_item["extra_id"])
+            for extra_id, quantity in item["components"]:
+                demand[extra_id] += quantity * order_item["quantity"]
+        return dict(demand)
+
+
+class ExtrasCatalog:
+    """Preisindex pro Property, Versionierung und Bestandsbuchung"""
+
+    def __init__(self, session_factory: Callable[[], Session], property_model, extra_model,
+                 bundle_model, bundle_extra_model, cache: TTLCache):
+        self.session_factory = session_factory
+        self.property_model = property_model
+        self.extra_model = extra_model
+        self.bundle_model = bundle_model
+        self.bundle_extra_model = bundle_extra_model
+        self.cache = cache
+        self.builds = 0
+        self.stale = 0
+
+    def _build(self, db: Session, property_ids: List[str]) -> Dict[str, PriceIndex]:
+        """Preisindizes mehrerer Properties mit einer Abfrage pro Tabelle"""
+        Property, Extra, Bundle, BundleExtra = (self.property_model, self.extra_model,
+                                                self.bundle_model, self.bundle_extra_model)
+        versions = dict(db.query(Property.id, Property.extras_version).filter(Property.id.in_(property_ids)))
+        if not versions:
+            return {}
+        extras = defaultdict(list)
+        for extra in db.query(Extra).filter(
+            Extra.property_id.in_(versions), Extra.is_active == True  # noqa: E712
+        ).order_by(Extra.created_at, Extra.id):
+            extras[extra.property_id].append(extra)
+        bundles = defaultdict(list)
+        for bundle in db.query(Bundle).filter(
+            Bundle.property_id.in_(versions), Bundle.is_active == True  # noqa: E712
+        ).order_by(Bundle.created_at, Bundle.id):
+            bundles[bundle.property_id].append(bundle)
+        components = defaultdict(list)
+        bundle_ids = [bundle.id for property_bundles in bundles.values() for bundle in property_bundles]
+        if bundle_ids:
+            for row in db.query(BundleExtra.bundle_id, BundleExtra.extra_id, BundleExtra.quantity).filter(
+                BundleExtra.bundle_id.in_(bundle_ids)
+            ):
+                components[row.bundle_id].append((row.extra_id, row.quantity or 1))
+
+        indexes = {}
+        for property_id, version in versions.items():
+            items, extra_list, bundle_list = {}, [], []
+            for extra in extras[property_id]:
+                extra_list.append({
+                    "id": extra.id, "property_id": property_id, "name": extra.name,
+                    "description": extra.description, "price": extra.price or 0.0,
+                    "category": extra.category or "other", "stock": extra.stock,
+                    "image_url": extra.image_url, "is_active": True,
+                })
+                items[extra.id] = {"type": "extra", "name": extra.name, "price": extra.price or 0.0,
+                                   "components": ((extra.id, 1),)}
+            for bundle in bundles[property_id]:
+                # Bundles mit deaktivierten Extras sind nicht bestellbar
+                if any(extra_id not in items for extra_id, _ in components[bundle.id]):
+                    continue
+                bundle_list.append({
+                    "id": bundle.id, "property_id": property_id, "name": bundle.name,
+                    "description": bundle.description, "price": bundle.price or 0.0,
+                    "extras": [{"extra_id": extra_id, "quantity": quantity} for extra_id, quantity in components[bundle.id]],
+                    "is_active": True,
+                })
+                items[bundle.id] = {"type": "bundle", "name": bundle.name, "price": bundle.price or 0.0,
+                                    "components": tuple(components[bundle.id])}
+            indexes[property_id] = PriceIndex(property_id, version, items, extra_list, bundle_list)
+        self.builds += len(indexes)
+        return indexes
+
+    def price_indexes(self, property_ids: Iterable[str], db: Optional[Session] = None,
+                      refresh: bool = False) -> Dict[str, PriceIndex]:
+        """Preisindizes aus dem Cache, fehlende in einem Durchgang aus der DB.
+        Mit db (Request-Session) wird keine zweite Pool-Connection belegt."""
+        property_ids = list(property_ids)
+        indexes, missing = {}, []
+        for property_id in property_ids:
+            cached = None if refresh else self.cache.get(property_id)
+            if cached is not None:
+                indexes[property_id] = cached
+            else:
+                missing.append(property_id)
+        if missing:
+            if db is not None:
+                built = self._build(db, missing)
+            else:
+                with self.session_factory() as own_db:
+                    built = self._build(own_db, missing)
+            for property_id, index in built.items():
+                self.cache.set(property_id, index)
+            indexes.update(built)
+        return {property_id: indexes[property_id] for property_id in property_ids if property_id in indexes}
+
+    def price_index(self, property_id: str, refresh: bool = False,
+                    db: Optional[Session] = None) -> Optional[PriceIndex]:
+        """Preisindex aus dem Cache oder neu aus der DB (None: Property unbekannt)"""
+        return self.price_indexes([property_id], db, refresh).get(property_id)
+
+    def bump_version(self, db: Session, property_id: str):
+        """Nach einer Katalogänderung (vor dem Commit aufrufen)"""
+        table = self.property_model.__table__
+        db.execute(update(table).where(table.c.id == property_id)
+                   .values(extras_version=table.c.extras_version + 1))
+
+    def invalidate(self, property_id: str):
+        self.cache.pop(property_id)
+
+    def check_version(self, db: Session, index: PriceIndex):
+        """
+        In der Checkout-Transaktion: Index noch aktuell?
+        Sperrt die Property-Zeile (FOR SHARE) bis zum Commit - ein paralleles
+        bump_version wartet, statt zwischen Prüfung und Commit durchzurutschen.
+        """
+        version = db.query(self.property_model.extras_version).filter(
+            self.property_model.id == index.property_id
+        ).with_for_update(read=True).scalar()
+        if version != index.version:
+            self.stale += 1
+            self.invalidate(index.property_id)
+            raise StalePriceIndex(index.property_id)
+
+    def reserve(self, db: Session, index: PriceIndex, order_items: Iterable[dict]):
+        """Bestand pro Extra mit einem bedingten UPDATE reduzieren (NULL = unbegrenzt)"""
+        table = self.extra_model.__table__
+        try:
+            demand = index.stock_demand(order_items)
+        except UnknownExtra as e:
+            # Extra/Bundle wurde nach dem Anlegen des Checkouts entfernt
+            raise OutOfStock(str(e)) from e
+        for extra_id, quantity in sorted(demand.items()):
+            result = db.execute(
+                update(table)
+                .where(table.c.id == extra_id, table.c.property_id == index.property_id,
+                       table.c.is_active == True,  # noqa: E712
+                       (table.c.stock.is_(None)) | (table.c.stock >= quantity))
+                .values(stock=table.c.stock - quantity)
+            )
+            if result.rowcount != 1:
+                raise OutOfStock(extra_id)
+        # Angezeigter Bestand im Index ist jetzt veraltet
+        self.invalidate(index.property_id)
+
+    def stats(self) -> dict:
+        return {"builds": self.builds, "stale_checkouts": self.stale}
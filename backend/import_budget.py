@@ -0,0 +1,83 @@
+"""
+Import-Zeit-Budget für den Boot der Web-Worker
+Importiert ein Modul in einem frischen Interpreter mit `python -X importtime`,
+wertet die Ausgabe aus und prüft Gesamtzeit sowie verzögert zu ladende Module.
+
+    python import_budget.py [modul] [--top 20]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+# Dürfen beim Boot nicht geladen werden (Handler/Warm-up importieren sie)
+DEFERRED_MODULES = ("qrcode", "PIL", "reportlab", "numpy", "psutil", "alembic", "stripe")
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 2500))
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """`-X importtime`-Zeilen -> {Modul: (self µs, kumuliert µs)}"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(module: str = "server") -> Dict[str, Tuple[int, int]]:
+    """Modul in frischem Interpreter importieren (eigene SQLite-DB, kein Bootstrap)"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'import.db')}",
+            "SKIP_BOOTSTRAP": "true",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=backend_dir, env=env, capture_output=True, text=True, timeout=120,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import von {module} fehlgeschlagen:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def deferred_loaded(modules: Dict[str, Tuple[int, int]]) -> List[str]:
+    """Beim Boot geladene Module, die verzögert geladen werden sollten"""
+    return sorted(name for name in modules if name.split(".")[0] in DEFERRED_MODULES)
+
+
+def report(module: str = "server", top: int = 20) -> dict:
+    modules = measure(module)
+    total_ms = modules[module][1] / 1000
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": IMPORT_BUDGET_MS,
+        "within_budget": total_ms <= IMPORT_BUDGET_MS,
+        "deferred_loaded": deferred_loaded(modules),
+        "slowest_self_ms": [(name, round(self_us / 1000, 1)) for name, (self_us, _) in slowest],
+    }
+
+
+def main() -> int:
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    top = int(sys.argv[sys.argv.index("--top") + 1]) if "--top" in sys.argv else 20
+    if "--top" in sys.argv:
+        args.remove(str(top))
+    result = report(args[0] if args else "server", top)
+    print(f"Import {result['module']}: {result['total_ms']} ms (Budget {result['budget_ms']:.0f} ms)")
+    for name, ms in result["slowest_self_ms"]:
+        print(f"  {ms:8.1f} ms  {name}")
+    if result["deferred_loaded"]:
+        print(f"❌ Beim Boot geladen, sollte verzögert sein: {', '.join(result['deferred_loaded'])}")
+    return 0 if result["within_budget"] and not result["deferred_loaded"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""
+Mail Outbox
+Request-Handler legen E-Mails in die Tabelle mail_outbox und kehren sofort zurück.
+Ein kleiner Worker-Pool (Threads) stellt sie zu - jeder Worker hält eine
+wiederverwendete SMTP-Verbindung. Fehlgeschlagene Zustellungen werden mit
+exponentiellem Backoff wiederholt und nach MAIL_MAX_ATTEMPTS als 'failed' markiert.
+
+Mehrere Uvicorn-Worker können parallel arbeiten: eine E-Mail wird per
+bedingtem UPDATE (status='pending' -> 'sending') exklusiv beansprucht.
+"""
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import MailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+# Pause eines Workers nach einem Fehler außerhalb der Zustellung (z.B. DB weg)
+MAX_WORKER_BACKOFF_SECONDS = 60
+
+
+class PooledSMTPConnection:
+    """Wiederverwendbare SMTP-Verbindung eines Workers"""
+
+    def __init__(self, host: str, port: int, user: str = '', password: str = '',
+                 use_tls: bool = True, idle_timeout: float = 60.0, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.idle_timeout = idle_timeout
+        self.smtp_class = smtp_class
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        smtp = self.smtp_class(self.host, self.port, timeout=30)
+        if self.use_tls:
+            smtp.starttls()
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self._smtp = smtp
+
+    def _alive(self) -> bool:
+        if self._smtp is None:
+            return False
+        if time.monotonic() - self._last_used < self.idle_timeout:
+            return True
+        # Länger ungenutzt - Server hat die Verbindung evtl. geschlossen
+        try:
+            return self._smtp.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, sender: str, to_email: str, message: str):
+        """Sende Nachricht, baue Verbindung bei Bedarf (einmal) neu auf"""
+        if not self._alive():
+            self.close()
+            self._connect()
+        try:
+            self._smtp.sendmail(sender, to_email, message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._connect()
+            self._smtp.sendmail(sender, to_email, message)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+class MailQueue:
+    """Outbox + Worker-Pool für ausgehende E-Mails"""
+
+    def __init__(self, session_factory: Callable[[], Session], connection_factory: Callable[[], PooledSMTPConnection],
+                 sender: str, workers: int = 2, max_attempts: int = 5,
+                 backoff_seconds: float = 30.0, poll_interval: float = 5.0,
+                 recover_interval: float = 300.0):
+        self.session_factory = session_factory
+        self.connection_factory = connection_factory
+        self.sender = sender
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_interval = poll_interval
+        self.recover_interval = recover_interval
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.busy_workers = 0
+        self.errors = 0
+        self._last_recovery = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    # ---------- Producer ----------
+
+    def enqueue(self, to_email: str, subject: str, html_body: str, text_body: str = None,
+                db: Optional[Session] = None) -> str:
+        """Lege E-Mail in die Outbox. Mit db wird nur hinzugefügt (Commit durch Aufrufer)."""
+        mail_id = str(uuid.uuid4())
+        row = MailOutbox(
+            id=mail_id,
+            to_email=to_email,
+            subject=subject,
+            html_body=html_body,
+            text_body=text_body,
+            status='pending',
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc),
+        )
+        if db is not None:
+            db.add(row)
+        else:
+            session = self.session_factory()
+            try:
+                session.add(row)
+                session.commit()
+            finally:
+                session.close()
+        with self._lock:
+            self.enqueued += 1
+        self._wakeup.set()
+        return mail_id
+
+    # ---------- Worker ----------
+
+    def start(self):
+        """Starte Worker-Threads (idempotent)"""
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._recover_stale()
+        self._last_recovery = time.monotonic()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"mail-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"✓ Mail-Queue gestartet ({self.workers} Worker)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stoppe Worker nach der aktuellen Zustellung"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        connection = self.connection_factory()
+        failures = 0
+        try:
+            while not self._stopping.is_set():
+                self._maybe_recover()
+                try:
+                    processed = self.process_next(connection)
+                    failures = 0
+                except Exception as e:
+                    # z.B. DB nicht erreichbar - Worker am Leben halten und später erneut versuchen
+                    failures += 1
+                    with self._lock:
+                        self.errors += 1
+                    delay = min(self.poll_interval * (2 ** (failures - 1)), MAX_WORKER_BACKOFF_SECONDS)
+                    logger.error(f"❌ Mail-Worker Fehler, neuer Versuch in {delay:.0f}s: {e}")
+                    connection.close()
+                    self._stopping.wait(delay)
+                    continue
+                if not processed:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+        finally:
+            connection.close()
+
+    def _maybe_recover(self):
+        """Hängengebliebene Einträge regelmäßig zurücksetzen, nicht nur beim Start (ein Worker pro Intervall)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_recovery < self.recover_interval:
+                return
+            self._last_recovery = now
+        self._recover_stale()
+
+    def run_pending(self, limit: int = 100) -> int:
+        """Stelle fällige E-Mails synchron zu (Tests, Cron, Shutdown)"""
+        connection = self.connection_factory()
+        processed = 0
+        try:
+            while processed < limit and self.process_next(connection):
+                processed += 1
+        finally:
+            connection.close()
+        return processed
+
+    def process_next(self, connection: PooledSMTPConnection) -> bool:
+        """Beanspruche und versende eine fällige E-Mail. False wenn nichts fällig ist."""
+        db = self.session_factory()
+        try:
+            row = self._claim(db)
+            if row is None:
+                return False
+            with self._lock:
+                self.busy_workers += 1
+            try:
+                connection.send(self.sender, row.to_email, self._build_message(row))
+            except Exception as e:
+                connection.close()
+                self._mark_failed(db, row, e)
+            else:
+                row.status = 'sent'
+                row.sent_at = datetime.now(timezone.utc)
+                row.last_error = None
+                db.commit()
+                with self._lock:
+                    self.sent += 1
+                logger.info(f"✅ E-Mail gesendet an: {row.to_email}")
+            finally:
+                with self._lock:
+                    self.busy_workers -= 1
+            return True
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> Optional[MailOutbox]:
+        now = datetime.now(timezone.utc)
+        candidates = db.query(MailOutbox.id).filter(
+            MailOutbox.status == 'pending',
+            MailOutbox.next_attempt_at <= now
+        ).order_by(MailOutbox.next_attempt_at).limit(self.workers * 2).all()
+        for (mail_id,) in candidates:
+            claimed = db.query(MailOutbox).filter(
+                MailOutbox.id == mail_id,
+                MailOutbox.status == 'pending'
+            ).update({
+                MailOutbox.status: 'sending',
+                MailOutbox.attempts: MailOutbox.attempts + 1,
+                MailOutbox.next_attempt_at: now,
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return db.query(MailOutbox).filter(MailOutbox.id == mail_id).first()
+        return None
+
+    def _mark_failed(self, db: Session, row: MailOutbox, error: Exception):
+        row.last_error = str(error)[:500]
+        if row.attempts >= self.max_attempts:
+            row.status = 'failed'
+            with self._lock:
+                self.dead += 1
+            logger.error(f"❌ E-Mail an {row.to_email} endgültig fehlgeschlagen: {error}")
+        else:
+            delay = min(self.backoff_seconds * (2 ** (row.attempts - 1)), MAX_BACKOFF_SECONDS)
+            row.status = 'pending'
+            row.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            with self._lock:
+                self.retried += 1
+            logger.warning(f"⚠️  E-Mail an {row.to_email} fehlgeschlagen (Versuch {row.attempts}), neuer Versuch in {delay:.0f}s: {error}")
+        db.commit()
+
+    def _recover_stale(self, older_than_minutes: int = 10):
+        """Setze hängengebliebene 'sending'-Einträge (z.B. nach Absturz) zurück"""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+            db.query(MailOutbox).filter(
+                MailOutbox.status == 'sending',
+                MailOutbox.next_attempt_at < cutoff
+            ).update({MailOutbox.status: 'pending'}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️  Mail-Outbox Recovery fehlgeschlagen: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _build_message(self, row: MailOutbox) -> str:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.sender
+        msg['To'] = row.to_email
+        msg['Subject'] = row.subject
+        if row.text_body:
+            msg.attach(MIMEText(row.text_body, 'plain'))
+        msg.attach(MIMEText(row.html_body, 'html'))
+        return msg.as_string()
+
+    # ---------- Metrics ----------
+
+    def stats(self, db: Optional[Session] = None) -> dict:
+        """Queue-Tiefe (aus der DB) und Zähler dieses Prozesses"""
+        counts = {}
+        session = db or self.session_factory()
+        try:
+            counts = dict(session.query(MailOutbox.status, func.count(MailOutbox.id)).group_by(MailOutbox.status).all())
+        except Exception as e:
+            logger.warning(f"⚠️  Mail-Queue Statistik nicht verfügbar: {e}")
+        finally:
+            if db is None:
+                session.close()
+        return {
+            "workers": len(self._threads),
+            "busy_workers": self.busy_workers,
+            "pending": counts.get('pending', 0),
+            "sending": counts.get('sending', 0),
+            "failed": counts.get('failed', 0),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "errors": self.errors,
+        }
@@ -0,0 +1,243 @@
+"""
+Metriken im Prometheus-Textformat
+Kleine In-Process-Registry für Counter, Gauges und Histogramme mit Labels.
+Mehrere Uvicorn-Worker: ist ein gemeinsames Verzeichnis gesetzt
+(METRICS_MULTIPROC_DIR), schreibt jeder Worker regelmäßig einen Snapshot
+als JSON-Datei dorthin. /metrics führt alle Snapshots zusammen - Counter und
+Histogramme werden summiert (auch von beendeten Workern), Gauges nur von
+Workern, deren Snapshot aktuell ist, je nach Gauge als Summe, Maximum/Minimum
+oder pro Worker (Label pid; für Quoten wie eine Auslastung ergibt eine Summe
+keinen Sinn). Das Verzeichnis sollte beim Deploy geleert werden (analog
+PROMETHEUS_MULTIPROC_DIR).
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Literal, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+Labels = Tuple[Tuple[str, str], ...]
+Aggregation = Literal["sum", "max", "min", "pid"]
+
+
+def _labels(labels: Optional[dict]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Counter, Gauges und Histogramme eines Prozesses (thread-sicher)"""
+
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._meta: Dict[str, Tuple[str, str, Sequence[float]]] = {}
+        self._aggregation: Dict[str, Aggregation] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # ---------- Definition ----------
+
+    def counter(self, name: str, help: str):
+        self._meta[name] = ("counter", help, ())
+
+    def gauge(self, name: str, help: str, aggregate: Aggregation = "sum"):
+        """aggregate: wie Werte mehrerer Worker zusammengeführt werden (pid = je Worker eine Serie)"""
+        self._meta[name] = ("gauge", help, ())
+        self._aggregation[name] = aggregate
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help, tuple(buckets))
+
+    def collect(self, callback):
+        """Callback, der vor jedem Export Gauges aktualisiert (z.B. Pool-Auslastung)"""
+        self._collectors.append(callback)
+        return callback
+
+    # ---------- Erfassung ----------
+
+    def inc(self, name: str, labels: dict = None, value: float = 1):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: dict = None):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def add(self, name: str, value: float, labels: dict = None):
+        """Gauge relativ ändern (z.B. In-Flight +1/-1)"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        buckets = self._meta[name][2]
+        key = (name, _labels(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            else:
+                entry[0][-1] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    # ---------- Snapshots / Multi-Worker ----------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                "histograms": [[name, list(labels), list(entry[0]), entry[1], entry[2]]
+                               for (name, labels), entry in self._histograms.items()],
+            }
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{os.getpid()}.json")
+
+    def dump(self):
+        """Snapshot dieses Workers atomar ins gemeinsame Verzeichnis schreiben"""
+        if not self.multiproc_dir:
+            return
+        try:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.multiproc_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, self._snapshot_path())
+        except OSError as e:
+            logger.warning(f"⚠️ Metrik-Snapshot nicht geschrieben: {e}")
+
+    def start(self):
+        """Periodische Snapshots (nur mit multiproc_dir)"""
+        if not self.multiproc_dir or self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(self.flush_interval)
+            self._thread = None
+        self.dump()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.dump()
+
+    def _snapshots(self) -> list:
+        """Eigener Live-Snapshot plus die der anderen Worker: (Snapshot, live = Gauges zählen, Worker)"""
+        snapshots = [(self.snapshot(), True, str(os.getpid()))]
+        if not self.multiproc_dir:
+            return snapshots
+        self.dump()
+        own = os.path.basename(self._snapshot_path())
+        stale_after = time.time() - 3 * self.flush_interval
+        try:
+            names = os.listdir(self.multiproc_dir)
+        except OSError:
+            return snapshots
+        for name in names:
+            if name == own or not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            path = os.path.join(self.multiproc_dir, name)
+            try:
+                live = os.path.getmtime(path) >= stale_after
+                with open(path) as f:
+                    snapshots.append((json.load(f), live, name[len("metrics-"):-len(".json")]))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # ---------- Export ----------
+
+    def render(self) -> str:
+        """Alle Metriken (über alle Worker) im Prometheus-Textformat"""
+        for callback in self._collectors:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrik-Collector fehlgeschlagen: {e}")
+        counters, gauges, histograms = {}, {}, {}
+        for snapshot, live, worker in self._snapshots():
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            if live:
+                for name, labels, value in snapshot["gauges"]:
+                    labels = tuple(map(tuple, labels))
+                    aggregate = self._aggregation.get(name, "sum")
+                    if aggregate == "pid":
+                        labels = tuple(sorted(labels + (("pid", worker),)))
+                    key = (name, labels)
+                    if key not in gauges or aggregate == "pid":
+                        gauges[key] = value
+                    elif aggregate == "max":
+                        gauges[key] = max(gauges[key], value)
+                    elif aggregate == "min":
+                        gauges[key] = min(gauges[key], value)
+                    else:
+                        gauges[key] = gauges[key] + value
+            for name, labels, buckets, total, count in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                entry = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+                entry[1] += total
+                entry[2] += count
+
+        lines = []
+        for name, (kind, help, bounds) in sorted(self._meta.items()):
+            source = {"counter": counters, "gauge": gauges, "histogram": histograms}[kind]
+            series = sorted((labels, value) for (metric, labels), value in source.items() if metric == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*bounds, float('inf')), value[0]):
+                    cumulative += bucket_count
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labels + le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[2]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,65 @@
+"""
+Schema-Migration als Release-Schritt
+Bringt die Datenbank einmalig auf SCHEMA_VERSION (Tabellen, Spalten-Patches,
+Alembic-Migrationen) und legt den Demo-Benutzer an. Die Web-Worker starten
+danach mit SKIP_BOOTSTRAP=1 und prüfen nur noch die Version.
+Ist daily_property_stats noch leer, wird sie einmalig aus der kompletten
+Historie befüllt (der nächtliche Cron gleicht danach nur die letzten Tage ab).
+
+    python migrate.py                   # migrieren + Tages-Rollups + Demo-Daten
+    python migrate.py --check           # Exit-Code 1, wenn eine Migration aussteht
+    python migrate.py --backfill-stats  # Tages-Rollups auch bei vorhandenen Zeilen neu rechnen
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+from sqlalchemy.orm import Session
+
+import database
+from demo_data import init_demo_user
+
+
+def backfill_daily_stats(db_engine, force: bool = False):
+    """Volle Befüllung von daily_property_stats, standardmäßig nur solange die Tabelle leer ist"""
+    from daily_stats import first_activity_day, rebuild_daily_stats
+
+    with Session(db_engine) as db:
+        if not force and db.query(database.DailyPropertyStats.property_id).first() is not None:
+            return None
+        start_day = first_activity_day(db)
+        if start_day is None:
+            return None
+        return rebuild_daily_stats(db, start_day, datetime.now(timezone.utc).date())
+
+
+def main() -> int:
+    db_engine = database.create_db_engine(database.get_database_url())
+    try:
+        version = database.schema_version(db_engine)
+        if "--check" in sys.argv:
+            print(f"[DB] Schema-Version {version}, erwartet {database.SCHEMA_VERSION}")
+            return 0 if version == database.SCHEMA_VERSION else 1
+        if version != database.SCHEMA_VERSION:
+            print(f"[DB] ✓ Schema migriert ({database.migrate_schema(db_engine)})")
+        else:
+            print(f"[DB] ✓ Schema aktuell ({version})")
+        result = backfill_daily_stats(db_engine, force="--backfill-stats" in sys.argv)
+        if result is not None:
+            print(f"[DB] ✓ Tages-Rollups aus der Historie berechnet ({result})")
+
+        # Demo-Benutzer (mit SKIP_BOOTSTRAP nicht mehr beim Startup jedes Workers)
+        with Session(db_engine) as db:
+            init_demo_user(db)
+            db.commit()
+            print("[DB] ✓ Demo-Benutzer geprüft")
+    finally:
+        db_engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Monatsfenster für Statistiken und Belegung
+Ohne NumPy, damit server.py die Helfer beim Import nutzen kann (occupancy
+lädt NumPy erst bei Bedarf).
+"""
+from datetime import date
+from typing import List
+
+
+def month_range(first_month: date, months: int) -> List[date]:
+    """Monatsanfänge ab first_month (inklusive)"""
+    starts = []
+    year, month = first_month.year, first_month.month
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return starts
+
+
+def last_months(today: date, months: int) -> List[date]:
+    """Monatsanfänge der letzten months Monate inkl. aktuellem, ältester zuerst"""
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return month_range(date(index // 12, index % 12 + 1, 1), months)
@@ -0,0 +1,119 @@
+"""
+Keyset-Pagination über (created_at, id)
+Listen-Endpoints sortieren neueste zuerst und blättern mit einem opaken Cursor
+(letztes created_at + id der Seite) statt mit OFFSET: jede Seite ist ein
+Index-Range-Scan, unabhängig davon, wie weit geblättert wurde. Die passenden
+Composite-Indizes ((Filter, created_at, id)) legt Migration 007 an.
+Gesamtzahlen sind optional: exakt (COUNT), geschätzt (Planner-Schätzung auf
+PostgreSQL, sonst exakt) oder gar nicht.
+Zeilen ohne created_at (Altdaten) folgen nach allen anderen, sortiert nach id -
+als eigener Abschnitt, damit beide Abfragen den Index nutzen.
+"""
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import List, Literal, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+CountMode = Literal["exact", "estimated", "none"]
+
+
+class InvalidCursor(ValueError):
+    """Cursor ist nicht von uns oder beschädigt"""
+
+
+class Page(NamedTuple):
+    items: List
+    next_cursor: Optional[str]
+    total: Optional[int]
+
+
+def encode_cursor(created_at: Optional[datetime], row_id) -> str:
+    """created_at None = Cursor im Abschnitt der Zeilen ohne created_at"""
+    stamp = created_at.isoformat() if created_at is not None else ""
+    return base64.urlsafe_b64encode(f"{stamp}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), row_id
+    except Exception as e:
+        raise InvalidCursor(cursor) from e
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+
+
+def estimated_count(query: Query) -> int:
+    """Zeilenschätzung des Planners (PostgreSQL), sonst exaktes COUNT"""
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.order_by(None).count()
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(query: Query, mode: Optional[str], first_page: bool) -> Optional[int]:
+    """Gesamtzahl je nach Modus; ohne Angabe nur auf der ersten Seite exakt"""
+    if mode is None:
+        mode = "exact" if first_page else "none"
+    if mode == "exact":
+        return query.order_by(None).count()
+    if mode == "estimated":
+        return estimated_count(query)
+    return None
+
+
+def keyset_page(query: Query, created_at_column, id_column, limit: Optional[int] = None,
+                cursor: Optional[str] = None, count: Optional[str] = None, offset: int = 0) -> Page:
+    """
+    Eine Seite neueste zuerst. offset nur noch für alte Clients ohne Cursor.
+    Wirft InvalidCursor bei ungültigem Cursor.
+    """
+    limit = clamp_limit(limit)
+    total = count_rows(query, count, first_page=not cursor and not offset)
+    cursor_created_at, cursor_id = decode_cursor(cursor) if cursor else (None, None)
+
+    offset = offset if not cursor else 0
+    rows = []
+    if cursor_id is None or cursor_created_at is not None:
+        dated = query.filter(created_at_column.isnot(None))
+        if cursor_id is not None:
+            dated = dated.filter(or_(
+                created_at_column < cursor_created_at,
+                and_(created_at_column == cursor_created_at, id_column < cursor_id)
+            ))
+        rows = dated.order_by(created_at_column.desc(), id_column.desc()).offset(offset or None).limit(limit + 1).all()
+        if offset and not rows:
+            # Offset reicht über die datierten Zeilen hinaus - Rest gilt für den undatierten Abschnitt
+            offset = max(0, offset - dated.order_by(None).count())
+        else:
+            offset = 0
+    if len(rows) <= limit:
+        # Datierte Zeilen erschöpft - mit den Zeilen ohne created_at auffüllen
+        undated = query.filter(created_at_column.is_(None))
+        if cursor_created_at is None and cursor_id is not None:
+            undated = undated.filter(id_column < cursor_id)
+        rows += undated.order_by(id_column.desc()).offset(offset or None).limit(limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_at_column.key), getattr(last, id_column.key))
+    return Page(rows, next_cursor, total)
@@ -0,0 +1,145 @@
+"""
+Passwort-Hashing in einem eigenen, begrenzten Prozess-Pool
+bcrypt kostet pro Aufruf ~100-250 ms reine CPU. Im Event-Loop oder im
+gemeinsamen Threadpool blockiert ein Login-Burst damit alle anderen Requests.
+Der PasswordHasher führt hash/verify in wenigen eigenen Prozessen aus (nicht
+an den GIL gebunden), begrenzt die Warteschlange (PasswordHasherBusy statt
+unbegrenzt wachsender Latenz) und misst Warte- und Rechenzeit.
+Ändert sich die Kostenstufe (BCRYPT_ROUNDS), liefert verify_and_update beim
+nächsten erfolgreichen Login einen neuen Hash (Rehash-on-Login).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))  # Änderung -> Rehash beim nächsten Login
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Warteschlange voll - Request später wiederholen"""
+
+
+@lru_cache(maxsize=4)
+def crypt_context(rounds: int) -> CryptContext:
+    # min_rounds = rounds: Hashes mit niedrigerer Kostenstufe gelten als veraltet
+    return CryptContext(schemes=["bcrypt"], deprecated="auto",
+                        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+
+def _lower_priority(niceness: int):
+    # Web-Worker haben Vorrang, Logins warten bei CPU-Knappheit statt Requests
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def _timed(function, *args) -> tuple:
+    started = time.perf_counter()
+    return function(*args), time.perf_counter() - started
+
+
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return crypt_context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """bcrypt in dedizierten Worker-Prozessen mit Back-Pressure"""
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 64, niceness: int = 10):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.niceness = niceness
+        self.observers: List[Callable[[str, float, float], None]] = []  # (Operation, Wartezeit, Rechenzeit)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def context(self) -> CryptContext:
+        return crypt_context(self.rounds)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    # spawn: kein fork() eines Prozesses mit laufenden Threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_lower_priority, initargs=(self.niceness,))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-hasher")
+                logger.info(f"✓ Passwort-Hasher gestartet ({self.workers or 'Thread'} Worker, bcrypt rounds {self.rounds})")
+            return self._executor
+
+    async def _run(self, operation: str, function, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy(f"{self.pending} Passwort-Operationen in der Warteschlange")
+            self.pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, run_seconds = await loop.run_in_executor(self._get_executor(), _timed, function, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+        total = time.perf_counter() - started
+        with self._lock:
+            self.completed += 1
+        for observer in self.observers:
+            observer(operation, max(0.0, total - run_seconds), run_seconds)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(gültig, neuer Hash falls die Kostenstufe veraltet ist, sonst None)"""
+        valid, new_hash = await self._run("verify", _verify_and_update, password, hashed, self.rounds)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def start(self):
+        """Worker-Prozesse vorab starten (sonst beim ersten Login)"""
+        executor = self._get_executor()
+        if isinstance(executor, ProcessPoolExecutor):
+            for future in [executor.submit(_timed, int) for _ in range(self.workers)]:
+                future.result()
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._executor is not None,
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
@@ -0,0 +1,185 @@
+"""
+QR-Code Rendering
+Reine Funktionen ohne App-/DB-Abhängigkeiten: Eingaben rein, Bytes raus.
+Dadurch lassen sich die Ergebnisse content-adressiert cachen und die
+Funktionen auch in Worker-Prozessen ausführen.
+"""
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Iterable, Iterator, Optional, Tuple
+
+QR_FILL_COLOR = "#F27C2C"
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def render_qr_png(url: str, box_size: int = 10, border: int = 4, error_correction: str = "M",
+                  fill_color: str = QR_FILL_COLOR) -> bytes:
+    """Erzeuge einen gestylten QR-Code als PNG"""
+    import qrcode
+    from qrcode.image.styledpil import StyledPilImage
+    from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{error_correction}"),
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    img = qr.make_image(
+        image_factory=StyledPilImage,
+        module_drawer=RoundedModuleDrawer(),
+        fill_color=fill_color,
+        back_color="white"
+    )
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def qr_pdf_elements(png: bytes, url: str, property_name: str, address: str = None, created_at: str = None) -> list:
+    """Reportlab-Elemente für eine QR-Seite (Titel, Code, Anleitung, Unterkunft)"""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Image as RLImage, Paragraph, Spacer
+    from reportlab.lib.units import cm
+
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # Title
+    elements.append(Paragraph(f"QR-Code: {property_name}", styles['Title']))
+    elements.append(Paragraph(f"Erstellt am: {created_at or datetime.now().strftime('%d.%m.%Y %H:%M')}", styles['Normal']))
+    elements.append(Spacer(1, 1*cm))
+
+    # QR Code image (centered)
+    elements.append(RLImage(BytesIO(png), width=10*cm, height=10*cm))
+    elements.append(Spacer(1, 1*cm))
+
+    # Instructions
+    elements.append(Paragraph("Anleitung:", styles['Heading2']))
+    elements.append(Paragraph("1. Scannen Sie den QR-Code mit Ihrem Smartphone", styles['Normal']))
+    elements.append(Paragraph("2. Sie gelangen direkt zur digitalen Gästemappe", styles['Normal']))
+    elements.append(Paragraph("3. Teilen Sie diesen Code mit Ihren Gästen", styles['Normal']))
+    elements.append(Spacer(1, 0.5*cm))
+
+    # URL
+    elements.append(Paragraph("URL:", styles['Heading2']))
+    elements.append(Paragraph(url, styles['Normal']))
+    elements.append(Spacer(1, 1*cm))
+
+    # Property info
+    elements.append(Paragraph("Unterkunft:", styles['Heading2']))
+    elements.append(Paragraph(property_name, styles['Normal']))
+    if address:
+        elements.append(Paragraph(address, styles['Normal']))
+    return elements
+
+
+def render_qr_pdf(png: bytes, url: str, property_name: str, address: str = None) -> bytes:
+    """Erzeuge druckfertiges A4-PDF mit QR-Code (ImportError ohne reportlab)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"QR-Code {property_name}")
+    doc.build(qr_pdf_elements(png, url, property_name, address))
+    return buffer.getvalue()
+
+
+def render_qr_sheet_pdf(pages: Iterable[Tuple[bytes, str, str, Optional[str]]], title: str = "QR-Codes") -> bytes:
+    """Mehrseitiges PDF - eine Seite pro (png, url, property_name, address)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, PageBreak
+
+    created_at = datetime.now().strftime('%d.%m.%Y %H:%M')
+    elements = []
+    for png, url, property_name, address in pages:
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(qr_pdf_elements(png, url, property_name, address, created_at))
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=title)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# ---------- Bulk-Rendering im Prozess-Pool ----------
+
+def get_render_pool(workers: int) -> ProcessPoolExecutor:
+    """Lazy Prozess-Pool (spawn: Worker importieren nur dieses Modul, keine App-Threads)"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _render_pool
+
+
+def shutdown_render_pool():
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def _render_qr_png_job(job: tuple) -> bytes:
+    url, box_size, border, error_correction = job
+    return render_qr_png(url, box_size=box_size, border=border, error_correction=error_correction)
+
+
+def render_qr_sheet_pdf_pooled(pages: list, title: str, workers: int) -> bytes:
+    """render_qr_sheet_pdf in einem Pool-Prozess statt im Request-Thread (reportlab ist CPU-gebunden)"""
+    if workers <= 1:
+        return render_qr_sheet_pdf(pages, title)
+    return get_render_pool(workers).submit(render_qr_sheet_pdf, pages, title).result()
+
+
+def render_qr_pngs(jobs: list, workers: int, inline_threshold: int = 2) -> Iterator[bytes]:
+    """Rendere (url, box_size, border, error_correction)-Jobs, Ergebnisse in Job-Reihenfolge"""
+    if len(jobs) <= inline_threshold or workers <= 1:
+        return (_render_qr_png_job(job) for job in jobs)
+    chunksize = max(1, len(jobs) // (workers * 4))
+    return get_render_pool(workers).map(_render_qr_png_job, jobs, chunksize=chunksize)
+
+
+class _ChunkBuffer:
+    """Nicht-seekbarer Schreibpuffer, den ein Generator leert"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Streame ein ZIP-Archiv, während die Dateien (name, bytes) eintreffen"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
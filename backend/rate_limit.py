@@ -0,0 +1,207 @@
+"""
+Token-Bucket-Rate-Limiting pro API-Key, Benutzer und IP
+Jeder Schlüssel hat einen Bucket mit `limit` Tokens (Requests pro Minute),
+der kontinuierlich mit limit/60 Tokens pro Sekunde aufgefüllt wird. Ein
+Request kostet ein Token; ist keins mehr da, wird abgelehnt. Eine Prüfung
+ist O(1): ein Dict-Zugriff bzw. ein atomares UPSERT oder Lua-Skript.
+
+Backends:
+- MemoryBucketStore: pro Prozess (ein Uvicorn-Worker)
+- SQLBucketStore: gemeinsame Tabelle in SQLite/Postgres (mehrere Worker)
+- RedisBucketStore: Redis oder kompatibler Server (optionales redis-Paket)
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case, delete
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60.0
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float  # bis der Bucket wieder voll ist
+    retry_after: float  # bis zum nächsten Token (0 wenn erlaubt)
+
+
+def _result(allowed: bool, tokens: float, limit: int) -> RateLimitResult:
+    rate = limit / WINDOW_SECONDS
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit,
+        remaining=int(tokens),
+        reset_seconds=(limit - tokens) / rate,
+        retry_after=0.0 if allowed else (1 - tokens) / rate,
+    )
+
+
+class MemoryBucketStore:
+    """Buckets im Prozess (LRU-begrenzt)"""
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: int, now: float = None) -> RateLimitResult:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit / WINDOW_SECONDS)
+                bucket[1] = now
+            allowed = bucket[0] >= 1
+            if allowed:
+                bucket[0] -= 1
+            tokens = bucket[0]
+        return _result(allowed, tokens, limit)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLBucketStore:
+    """Buckets in einer Tabelle - ein UPSERT ... RETURNING pro Prüfung"""
+    blocking = True
+
+    def __init__(self, engine, model, idle_seconds: float = 3600, purge_every: int = 5000):
+        self.engine = engine
+        self.model = model
+        self.idle_seconds = idle_seconds
+        self.purge_every = purge_every
+        self._calls = 0
+
+    def _insert(self):
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f"SQLBucketStore unterstützt {dialect} nicht")
+        return insert(self.model.__table__)
+
+    def take(self, key: str, limit: int, now: float = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        table = self.model.__table__
+        refill = table.c.tokens + (now - table.c.updated_at) * (limit / WINDOW_SECONDS)
+        refilled = case((refill > limit, float(limit)), else_=refill)
+        statement = self._insert().values(key=key, tokens=float(limit - 1), updated_at=now, allowed=True)
+        # SET-Ausdrücke sehen die alten Werte der Zeile (SQLite und Postgres)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "allowed": refilled >= 1,
+                "updated_at": now,
+            },
+        ).returning(table.c.tokens, table.c.allowed)
+        with self.engine.begin() as conn:
+            tokens, allowed = conn.execute(statement).one()
+            self._calls += 1
+            if self._calls % self.purge_every == 0:
+                conn.execute(delete(table).where(table.c.updated_at < now - self.idle_seconds))
+        return _result(bool(allowed), tokens, limit)
+
+
+REDIS_TAKE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local rate = limit / tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or limit
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Buckets in Redis - atomar per Lua-Skript"""
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis  # optional
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(REDIS_TAKE_SCRIPT)
+
+    def take(self, key: str, limit: int, now: float = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[limit, now, WINDOW_SECONDS])
+        return _result(bool(allowed), float(tokens), limit)
+
+
+def create_store(backend: str, engine=None, model=None, redis_url: str = None):
+    """Store für RATE_LIMIT_BACKEND (memory, sql, redis)"""
+    if backend == "sql":
+        return SQLBucketStore(engine, model)
+    if backend == "redis":
+        try:
+            return RedisBucketStore(redis_url)
+        except ImportError:
+            logger.warning("⚠️ redis nicht installiert - Rate-Limiting nur pro Worker")
+    return MemoryBucketStore()
+
+
+class RateLimiter:
+    """Prüft Buckets und zählt Ablehnungen pro Schlüsselart (key, user, ip)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.checks = 0
+        self.rejected = {}
+        self.errors = 0
+
+    def check(self, kind: str, identity: str, limit: int) -> Optional[RateLimitResult]:
+        """Ein Token nehmen - None, wenn der Store nicht erreichbar ist (fail open)"""
+        self.checks += 1
+        try:
+            result = self.store.take(f"{kind}:{identity}", limit)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Rate-Limit-Store nicht erreichbar: {e}")
+            return None
+        if not result.allowed:
+            self.rejected[kind] = self.rejected.get(kind, 0) + 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "checks": self.checks,
+            "rejected": dict(self.rejected),
+            "errors": self.errors,
+        }
+
+
+def rate_limit_headers(result: RateLimitResult) -> list:
+    """X-RateLimit-* (und Retry-After bei Ablehnung) als ASGI-Header"""
+    headers = [
+        (b"x-ratelimit-limit", str(result.limit).encode()),
+        (b"x-ratelimit-remaining", str(result.remaining).encode()),
+        (b"x-ratelimit-reset", str(int(result.reset_seconds + 0.999)).encode()),
+    ]
+    if not result.allowed:
+        headers.append((b"retry-after", str(int(result.retry_after + 0.999)).encode()))
+    return headers
@@ -1,40 +1,55 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import event as sa_event, select, func, case
+from sqlalchemy.orm import Session, make_transient_to_detached
 import os
 import logging
 import json
+import hashlib
+import base64
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, validator
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, date, timezone, timedelta
 import secrets
 import jwt
-from passlib.context import CryptContext
 from slowapi import Limiter
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from slowapi.util import get_remote_address
 from slowapi.util import get_remote_address
 import time
-# psutil is optional - used for system metrics in health check
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    psutil = None
-    PSUTIL_AVAILABLE = False
-    import sys
-    print("⚠️  psutil not available - system metrics disabled", file=sys.stderr)
+import anyio
+import hmac
+from contextvars import ContextVar
 
 from database import init_db, get_db, User as DBUser, Property as DBProperty, StatusCheck as DBStatusCheck, GuestView as DBGuestView, Booking as DBBooking
+from database import WebhookEndpoint as DBWebhookEndpoint, WebhookDelivery as DBWebhookDelivery
+from database import DailyPropertyStats as DBDailyPropertyStats, AnalyticsEvent as DBAnalyticsEvent, AuditLog as DBAuditLog
+from database import ApiKey as DBApiKey, RateLimitBucket as DBRateLimitBucket
+from database import Checkout as DBCheckout, CheckoutItem as DBCheckoutItem
+from database import Extra as DBExtra, Bundle as DBBundle, BundleExtra as DBBundleExtra
+from database import THREADPOOL_SIZE, WEB_CONCURRENCY, SKIP_BOOTSTRAP, pool_stats, pool_wait_observers, pool_timeout_observers
+from cache import TTLCache, ArtifactCache
+from qr_codes import render_qr_png, render_qr_pdf, render_qr_sheet_pdf_pooled, render_qr_pngs, iter_zip, shutdown_render_pool, QR_FILL_COLOR
+from mail_queue import MailQueue, PooledSMTPConnection
+from webhook_outbox import WebhookDispatcher, enqueue_event, sign_payload
+from csv_export import stream_csv
+from event_buffer import EventBuffer
+from metrics import MetricsRegistry, COUNT_BUCKETS
+from warmup import Warmup, optional_import
+from api_keys import LastUsedTracker, key_digest, key_prefix
+from rate_limit import RateLimiter, create_store, rate_limit_headers
+from password_hashing import BCRYPT_ROUNDS, PasswordHasher, PasswordHasherBusy
+from checkouts import CheckoutStore, CheckoutExpired, IdempotencyKeyReused
+from pagination import CountMode, InvalidCursor, Page, keyset_page
+from extras_catalog import ExtrasCatalog, OutOfStock, StalePriceIndex, UnknownExtra
+from months import last_months, month_range
+from demo_data import init_demo_user
+from daily_stats import track_rollups, rebuild_daily_stats, first_activity_day, owned_by, in_days, rollup_totals, rollup_per_day, rollup_per_property
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -58,41 +73,61 @@ if JWT_SECRET and len(JWT_SECRET) < 32:
     if ENVIRONMENT != 'development':
         raise ValueError("❌ SECRET_KEY muss mindestens 32 Zeichen lang sein!")
 
+# API-Key-Digests nicht am JWT-Secret hängen lassen - sonst macht eine
+# Rotation von SECRET_KEY alle gespeicherten API-Keys ungültig
+if ENVIRONMENT == 'production' and not os.environ.get('API_KEY_SECRET'):
+    raise ValueError("❌ API_KEY_SECRET ist nicht gesetzt (bei bestehenden Keys: bisherigen SECRET_KEY übernehmen)!")
+
 # ============ SMTP CONFIG ============
 SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
 SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
 SMTP_USER = os.environ.get('SMTP_USER', '')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
 SMTP_FROM = os.environ.get('SMTP_FROM', 'noreply@welcome-link.de')
+# SMTP_USE_TLS=false erlaubt einen lokalen Relay/Debug-Server ohne Login
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+SMTP_CONFIGURED = bool(SMTP_PASSWORD) or not SMTP_USE_TLS
+
+# Mail-Queue
+MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS', 2))
+MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+MAIL_RETRY_BACKOFF_SECONDS = float(os.environ.get('MAIL_RETRY_BACKOFF_SECONDS', 30))
+MAIL_POLL_INTERVAL_SECONDS = float(os.environ.get('MAIL_POLL_INTERVAL_SECONDS', 5))
+
+# Webhook-Outbox
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 6))
+WEBHOOK_RETRY_BACKOFF_SECONDS = float(os.environ.get('WEBHOOK_RETRY_BACKOFF_SECONDS', 10))
+WEBHOOK_PER_ENDPOINT_CONCURRENCY = int(os.environ.get('WEBHOOK_PER_ENDPOINT_CONCURRENCY', 2))
+WEBHOOK_MAX_CONCURRENCY = int(os.environ.get('WEBHOOK_MAX_CONCURRENCY', 50))
+WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get('WEBHOOK_TIMEOUT_SECONDS', 10))
+
+# Analytics-Ingestion (gepuffert, Multi-Row-INSERTs)
+ANALYTICS_BUFFER_SIZE = int(os.environ.get('ANALYTICS_BUFFER_SIZE', 10000))
+ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', 500))
+ANALYTICS_FLUSH_INTERVAL_MS = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL_MS', 250))
+ANALYTICS_MAX_EVENTS_PER_REQUEST = int(os.environ.get('ANALYTICS_MAX_EVENTS_PER_REQUEST', 100))
+
+# Audit-Log: 'async' = gepuffert (Standard), 'sync' = sofort in eigener Transaktion
+AUDIT_LOG_DURABILITY = os.environ.get('AUDIT_LOG_DURABILITY', 'async')
+AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+AUDIT_FLUSH_INTERVAL_MS = float(os.environ.get('AUDIT_FLUSH_INTERVAL_MS', 500))
 
 # Warnung wenn SMTP nicht konfiguriert in Production
-if ENVIRONMENT == 'production' and not SMTP_PASSWORD:
+if ENVIRONMENT == 'production' and not SMTP_CONFIGURED:
     import sys
     print(f"⚠️  WARNING: SMTP_PASSWORD nicht gesetzt - E-Mails werden nicht versendet!", file=sys.stderr)
 
 # ============ EMAIL HELPER ============
-def send_email(to_email: str, subject: str, html_body: str, text_body: str = None):
-    """Sende E-Mail über SMTP"""
-    if not SMTP_PASSWORD:
+def send_email(to_email: str, subject: str, html_body: str, text_body: str = None, db: Session = None):
+    """Lege E-Mail in die Mail-Outbox (Versand durch die Mail-Worker)"""
+    if not SMTP_CONFIGURED:
         logger.warning(f"E-Mail nicht gesendet (SMTP nicht konfiguriert): {to_email}")
         return False
     
     try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SMTP_FROM
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        if text_body:
-            msg.attach(MIMEText(text_body, 'plain'))
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_FROM, to_email, msg.as_string())
-        
-        logger.info(f"✅ E-Mail gesendet an: {to_email}")
+        mail_queue.enqueue(to_email, subject, html_body, text_body, db=db)
+        logger.info(f"✉️  E-Mail eingereiht für: {to_email}")
         return True
     except Exception as e:
         logger.error(f"❌ E-Mail-Fehler: {str(e)}")
@@ -196,7 +231,7 @@ Dieser Link ist 24 Stunden gültig.
     
     return send_email(email, "Bestätigen Sie Ihre E-Mail - Welcome Link", html, text)
 
-def send_booking_confirmation_email(email: str, name: str, property_name: str, checkin: str, checkout: str, guests: int, total: float):
+def send_booking_confirmation_email(email: str, name: str, property_name: str, checkin: str, checkout: str, guests: int, total: float, db: Session = None):
     """Sende Buchungsbestätigungs-E-Mail"""
     html = f"""
     <html>
@@ -258,9 +293,9 @@ Buchungsdetails:
 Bei Fragen: support@welcome-link.de
 """
     
-    return send_email(email, f"Buchungsbestätigung - {property_name}", html, text)
+    return send_email(email, f"Buchungsbestätigung - {property_name}", html, text, db=db)
 
-def send_payment_receipt_email(email: str, name: str, amount: float, payment_method: str, transaction_id: str, property_name: str):
+def send_payment_receipt_email(email: str, name: str, amount: float, payment_method: str, transaction_id: str, property_name: str, db: Session = None):
     """Sende Zahlungsbestätigungs-E-Mail"""
     html = f"""
     <html>
@@ -322,9 +357,9 @@ Die Zahlung wurde erfolgreich verarbeitet.
 Bei Fragen: support@welcome-link.de
 """
     
-    return send_email(email, f"Zahlungsbestätigung - €{amount:.2f}", html, text)
+    return send_email(email, f"Zahlungsbestätigung - €{amount:.2f}", html, text, db=db)
 
-def send_guest_welcome_email(email: str, guest_name: str, property_name: str, host_name: str, checkin: str, checkout: str, wifi_name: str, wifi_password: str, guestview_url: str):
+def send_guest_welcome_email(email: str, guest_name: str, property_name: str, host_name: str, checkin: str, checkout: str, wifi_name: str, wifi_password: str, guestview_url: str, db: Session = None):
     """Sende Willkommens-E-Mail an Gäste"""
     html = f"""
     <html>
@@ -403,7 +438,7 @@ Digitale Gästemappe: {guestview_url}
 Viel Spaß bei Ihrem Aufenthalt!
 """
     
-    return send_email(email, f"Willkommen in {property_name}!", html, text)
+    return send_email(email, f"Willkommen in {property_name}!", html, text, db=db)
 
 # ============ SENTRY ERROR TRACKING ============
 SENTRY_DSN = os.environ.get("SENTRY_DSN")
@@ -432,12 +467,59 @@ logger = logging.getLogger(__name__)
 try:
     engine, SessionLocal = init_db()
     logger.info("✓ Datenbank initialisiert")
+    # Buchungen/Bewertungen aktualisieren daily_property_stats beim Flush
+    track_rollups()
 except Exception as e:
     logger.error(f"❌ Datenbankverbindung fehlgeschlagen: {str(e)}", exc_info=True)
     raise ValueError(f"❌ Datenbankverbindung fehlgeschlagen: {str(e)}")
 
-# Password Hashing mit Bcrypt (SICHER!)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Mail-Outbox: Handler reihen ein, Worker versenden über wiederverwendete SMTP-Verbindungen
+mail_queue = MailQueue(
+    session_factory=SessionLocal,
+    connection_factory=lambda: PooledSMTPConnection(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, use_tls=SMTP_USE_TLS),
+    sender=SMTP_FROM,
+    workers=MAIL_WORKERS,
+    max_attempts=MAIL_MAX_ATTEMPTS,
+    backoff_seconds=MAIL_RETRY_BACKOFF_SECONDS,
+    poll_interval=MAIL_POLL_INTERVAL_SECONDS,
+)
+
+# Webhook-Outbox: asyncio-Dispatcher mit gemeinsamem HTTP-Client
+webhook_dispatcher = WebhookDispatcher(
+    session_factory=SessionLocal,
+    max_attempts=WEBHOOK_MAX_ATTEMPTS,
+    backoff_seconds=WEBHOOK_RETRY_BACKOFF_SECONDS,
+    per_endpoint_concurrency=WEBHOOK_PER_ENDPOINT_CONCURRENCY,
+    max_concurrency=WEBHOOK_MAX_CONCURRENCY,
+    timeout=WEBHOOK_TIMEOUT_SECONDS,
+)
+
+# Analytics-Events: Queue im Prozess, Flusher-Thread schreibt in Batches
+analytics_buffer = EventBuffer(
+    session_factory=SessionLocal,
+    model=DBAnalyticsEvent,
+    max_size=ANALYTICS_BUFFER_SIZE,
+    batch_size=ANALYTICS_BATCH_SIZE,
+    flush_interval_ms=ANALYTICS_FLUSH_INTERVAL_MS,
+)
+
+# Audit-Log: eigene Session, Batches, fehlgeschlagene Batches werden wiederholt
+audit_sink = EventBuffer(
+    session_factory=SessionLocal,
+    model=DBAuditLog,
+    name="audit_log",
+    max_size=AUDIT_BUFFER_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval_ms=AUDIT_FLUSH_INTERVAL_MS,
+    max_attempts=3,
+)
+
+# Password Hashing mit Bcrypt (SICHER!) - in eigenen Worker-Prozessen,
+# damit Login-Bursts weder Event-Loop noch Threadpool blockieren
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))  # 0 = ein Thread
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+password_hasher = PasswordHasher(rounds=BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
+pwd_context = password_hasher.context
 
 # Rate Limiting für ALLE Endpoints
 limiter = Limiter(key_func=get_remote_address)
@@ -449,6 +531,13 @@ JWT_EXPIRATION_HOURS = 24
 # API Key Settings
 API_KEY_PREFIX = "wl_"  # Welcome Link API Key Prefix
 API_KEY_LENGTH = 32
+API_KEY_CACHE_TTL_SECONDS = float(os.environ.get('API_KEY_CACHE_TTL_SECONDS', 30))
+API_KEY_LAST_USED_FLUSH_SECONDS = float(os.environ.get('API_KEY_LAST_USED_FLUSH_SECONDS', 30))
+
+# Verifizierte Keys pro Digest. Widerruf invalidiert nur lokal - andere Worker
+# akzeptieren einen widerrufenen Key noch bis zu API_KEY_CACHE_TTL_SECONDS
+api_key_cache = TTLCache("api_keys", maxsize=2048, ttl=API_KEY_CACHE_TTL_SECONDS)
+api_key_last_used = LastUsedTracker(lambda: SessionLocal(), DBApiKey, flush_interval_seconds=API_KEY_LAST_USED_FLUSH_SECONDS)
 
 # Audit Log Settings
 AUDIT_LOG_ENABLED = True
@@ -466,25 +555,21 @@ app.state.limiter = limiter
 
 
 # ============ SECURITY HEADERS MIDDLEWARE ============
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Fügt Security Headers zu allen Responses hinzu"""
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
+# Reines ASGI statt BaseHTTPMiddleware: kein Extra-Task pro Request und
+# StreamingResponses (CSV/PDF/ZIP-Exporte) werden ungepuffert durchgereicht.
+def _build_security_headers() -> tuple:
+    """Security Headers einmalig als unveränderliche (name, value)-Bytes-Liste"""
+    headers = [
         # Prevent clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
-        
+        ("X-Frame-Options", "DENY"),
         # Prevent MIME-type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        
+        ("X-Content-Type-Options", "nosniff"),
         # XSS Protection
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
+        ("X-XSS-Protection", "1; mode=block"),
         # Referrer Policy
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
         # Content Security Policy (basic)
-        response.headers["Content-Security-Policy"] = (
+        ("Content-Security-Policy", (
             "default-src 'self'; "
             "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; "
             "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
@@ -492,38 +577,160 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "img-src 'self' data: https: blob:; "
             "connect-src 'self' https://api.welcome-link.de https://www.welcome-link.de; "
             "frame-ancestors 'none';"
-        )
-        
-        # HSTS (nur in Production)
-        if ENVIRONMENT == "production":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # Permissions Policy
-        response.headers["Permissions-Policy"] = (
-            "geolocation=(), "
-            "microphone=(), "
-            "camera=(), "
-            "payment=()"
-        )
+        )),
+    ]
+    # HSTS (nur in Production)
+    if ENVIRONMENT == "production":
+        headers.append(("Strict-Transport-Security", "max-age=31536000; includeSubDomains"))
+    # Permissions Policy
+    headers.append(("Permissions-Policy", "geolocation=(), microphone=(), camera=(), payment=()"))
+    return tuple((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers)
+
+SECURITY_HEADERS = _build_security_headers()
+
+class SecurityHeadersMiddleware:
+    """Fügt Security Headers zu allen Responses hinzu"""
+    def __init__(self, app, headers: tuple = SECURITY_HEADERS):
+        self.app = app
+        self.headers = headers
+        self.header_names = frozenset(name for name, _ in headers)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        return response
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                # Eigene Werte ersetzen gleichnamige Header der Response
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in self.header_names]
+                headers.extend(self.headers)
+                message["headers"] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+# ============ METRICS ============
+# Prometheus-Format unter /api/metrics; mit METRICS_MULTIPROC_DIR über alle Worker
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+metrics = MetricsRegistry(multiproc_dir=METRICS_MULTIPROC_DIR, flush_interval=METRICS_FLUSH_SECONDS)
+metrics.counter("http_requests_total", "HTTP requests by route template and status")
+metrics.histogram("http_request_duration_seconds", "HTTP request latency by route template")
+metrics.gauge("http_requests_in_flight", "HTTP requests currently being processed")
+metrics.histogram("http_request_db_queries", "DB queries per HTTP request", buckets=COUNT_BUCKETS)
+metrics.histogram("http_request_db_seconds", "DB time per HTTP request")
+metrics.counter("db_queries_total", "DB queries executed")
+metrics.histogram("db_query_duration_seconds", "DB query latency")
+metrics.gauge("threadpool_threads_busy", "Busy threads of the sync endpoint threadpool")
+metrics.gauge("threadpool_threads_total", "Size of the sync endpoint threadpool")
+metrics.counter("threadpool_saturated_total", "Requests that arrived while the threadpool was full")
+metrics.histogram("db_pool_wait_seconds", "Time spent queued for a pooled DB connection (excludes connect time of new connections)")
+metrics.gauge("db_pool_size", "Persistent connections of the DB pool")
+metrics.gauge("db_pool_checked_out", "DB connections currently checked out")
+metrics.gauge("db_pool_overflow", "DB connections opened beyond the pool size")
+metrics.gauge("db_pool_utilization", "Checked out connections / (pool size + max overflow), busiest worker",
+              aggregate="max")
+metrics.counter("db_pool_timeouts_total", "Pool checkouts that timed out")
+metrics.histogram("password_hash_queue_seconds", "Time password operations wait for a hasher process")
+metrics.histogram("password_hash_duration_seconds", "CPU time of bcrypt hash/verify in the hasher process")
+metrics.gauge("password_hash_pending", "Password operations queued or running")
+metrics.counter("password_hash_rejected_total", "Password operations rejected because the queue was full")
+
+pool_wait_observers.append(lambda seconds: metrics.observe("db_pool_wait_seconds", seconds))
+pool_timeout_observers.append(lambda: metrics.inc("db_pool_timeouts_total"))
+
+def _observe_password_hash(operation: str, wait_seconds: float, run_seconds: float):
+    metrics.observe("password_hash_queue_seconds", wait_seconds, {"operation": operation})
+    metrics.observe("password_hash_duration_seconds", run_seconds, {"operation": operation})
+
+password_hasher.observers.append(_observe_password_hash)
+
+@metrics.collect
+def _collect_password_hasher():
+    metrics.set("password_hash_pending", password_hasher.pending)
+
+@metrics.collect
+def _collect_pool_stats():
+    stats = pool_stats(engine)
+    for key in ("size", "checked_out", "overflow", "utilization"):
+        if key in stats:
+            metrics.set(f"db_pool_{key}", stats[key])
+
+# [Anzahl, Sekunden] der DB-Queries des laufenden Requests (propagiert in den Threadpool)
+_request_db_stats: ContextVar[Optional[list]] = ContextVar("request_db_stats", default=None)
+
+@sa_event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+@sa_event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.inc("db_queries_total")
+    metrics.observe("db_query_duration_seconds", elapsed)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+def _sample_threadpool():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    metrics.set("threadpool_threads_busy", limiter.borrowed_tokens)
+    metrics.set("threadpool_threads_total", limiter.total_tokens)
+    return limiter.borrowed_tokens >= limiter.total_tokens
 
 # ============ REQUEST TIMING MIDDLEWARE ============
-class RequestTimingMiddleware(BaseHTTPMiddleware):
-    """Track request timing for performance monitoring"""
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        
-        # Add timing header for debugging
-        response.headers["X-Process-Time-Ms"] = f"{process_time:.2f}"
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+
+class RequestTimingMiddleware:
+    """Track request timing for performance monitoring (Header, Slow-Log, Metriken)"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Log slow requests (>500ms)
-        if process_time > 500:
-            logger.warning(f"⚠️ Slow request: {request.method} {request.url.path} took {process_time:.2f}ms")
+        start_ns = time.perf_counter_ns()
+        status = [500]
+        db_stats = [0, 0.0]
+        token = _request_db_stats.set(db_stats)
+        metrics.add("http_requests_in_flight", 1)
+        if _sample_threadpool():
+            metrics.inc("threadpool_saturated_total")
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                process_time = (time.perf_counter_ns() - start_ns) / 1_000_000
+                # Add timing header for debugging
+                message["headers"] = [*message.get("headers", ()), (b"x-process-time-ms", f"{process_time:.2f}".encode("latin-1"))]
+                # Log slow requests
+                if process_time > SLOW_REQUEST_MS:
+                    logger.warning(f"⚠️ Slow request: {scope['method']} {scope['path']} took {process_time:.2f}ms")
+            await send(message)
         
-        return response
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_db_stats.reset(token)
+            metrics.add("http_requests_in_flight", -1)
+            _sample_threadpool()
+            # Route-Template statt Pfad (begrenzte Kardinalität)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = {"method": scope["method"], "route": route}
+            metrics.inc("http_requests_total", {**labels, "status": status[0]})
+            metrics.observe("http_request_duration_seconds", (time.perf_counter_ns() - start_ns) / 1_000_000_000, labels)
+            metrics.observe("http_request_db_queries", db_stats[0], labels)
+            metrics.observe("http_request_db_seconds", db_stats[1], labels)
 
 # ============ GLOBAL EXCEPTION HANDLER ============
 @app.exception_handler(HTTPException)
@@ -537,7 +744,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "message": exc.detail,
             "path": str(request.url.path),
             "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -694,6 +902,38 @@ def verify_password(password: str, hashed: str) -> bool:
     """Überprüfe Passwort gegen Hash"""
     return pwd_context.verify(password, hashed)
 
+def _password_hasher_busy() -> HTTPException:
+    metrics.inc("password_hash_rejected_total")
+    logger.warning(f"⚠️ Passwort-Hasher ausgelastet ({password_hasher.pending} in der Warteschlange)")
+    return HTTPException(status_code=503, detail="Zu viele Anmeldungen gleichzeitig - bitte erneut versuchen",
+                         headers={"Retry-After": "1"})
+
+def commit_before_hashing(db: Session):
+    """Offene Transaktion committen und die Pool-Connection freigeben, bevor bcrypt läuft -
+    sonst leert ein Login-Burst den DB-Pool. Handler rufen das vor hash/verify explizit auf."""
+    if db.in_transaction():
+        db.commit()
+
+async def hash_password_pooled(password: str) -> str:
+    """Bcrypt im Passwort-Pool statt im Request-Thread"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+
+async def verify_password_pooled(password: str, user: DBUser, db: Session) -> bool:
+    """Überprüfe Passwort im Passwort-Pool; veraltete Hashes werden ersetzt (Commit über db)"""
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+    if valid and new_hash:
+        user.password_hash = new_hash
+        db.commit()
+        invalidate_principal(user.id)
+        logger.info(f"🔐 Passwort-Hash von {user.email} auf bcrypt rounds {BCRYPT_ROUNDS} aktualisiert")
+    return valid
+
 def create_token(user_id: str, email: str) -> str:
     """Erstelle einen sicheren JWT Token"""
     payload = {
@@ -713,78 +953,80 @@ def generate_api_key() -> str:
 
 
 def hash_api_key(api_key: str) -> str:
-    """Hash API Key für sichere Speicherung"""
-    return pwd_context.hash(api_key)
+    """Digest des API Keys für Speicherung und Lookup (HMAC-SHA256, kein bcrypt)"""
+    return key_digest(api_key)
 
 
 def verify_api_key(api_key: str, hashed_key: str) -> bool:
-    """Verifiziere API Key gegen Hash"""
-    return pwd_context.verify(api_key, hashed_key)
+    """Verifiziere API Key gegen Digest (konstante Laufzeit)"""
+    return hmac.compare_digest(key_digest(api_key), hashed_key)
 
 
-def log_audit_event(db: Session, user_id: str, action: str, resource: str = None, 
-                    resource_id: str = None, ip_address: str = None, 
-                    user_agent: str = None, details: dict = None, status: str = 'success'):
-    """Protokolliere Sicherheitsereignisse"""
+def log_audit_event(user_id: str, action: str, resource: str = None,
+                    resource_id: str = None, ip_address: str = None,
+                    user_agent: str = None, details: dict = None, status: str = 'success',
+                    durability: str = None):
+    """
+    Protokolliere Sicherheitsereignisse über den Audit-Sink.
+    durability='sync' schreibt sofort (Logins), 'async' reiht nur ein.
+    Nutzt nie die Session des Aufrufers - kein zusätzlicher Commit im Request.
+    """
     if not AUDIT_LOG_ENABLED:
-        return
-    
-    from database import AuditLog as DBAuditLog
+        return None
     
-    try:
-        log = DBAuditLog(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            action=action,
-            resource=resource,
-            resource_id=resource_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            details=json.dumps(details) if details else None,
-            status=status
-        )
-        db.add(log)
-        db.commit()
-    except Exception as e:
-        logging.error(f"Failed to log audit event: {e}")
+    values = dict(
+        user_id=user_id,
+        action=action,
+        resource=resource,
+        resource_id=resource_id,
+        ip_address=ip_address,
+        user_agent=user_agent[:500] if user_agent else None,
+        details=json.dumps(details) if details else None,
+        status=status
+    )
+    if (durability or AUDIT_LOG_DURABILITY) == 'sync':
+        return audit_sink.write(**values)
+    event_id = audit_sink.put(**values)
+    if not event_id:
+        logger.error(f"❌ Audit-Log Queue voll, Ereignis verworfen: {action} ({user_id})")
+    return event_id
 
 
 def get_api_key_user(api_key: str, db: Session) -> Optional[dict]:
-    """Validiere API Key und gib User zurück"""
-    from database import ApiKey as DBApiKey
-    
+    """Validiere API Key und gib User zurück (ein Join, gecacht, last_used gebündelt)"""
     if not api_key or not api_key.startswith(API_KEY_PREFIX):
         return None
     
-    key_record = db.query(DBApiKey).filter(
-        DBApiKey.key == api_key,
-        DBApiKey.is_active == True
-    ).first()
-    
-    if not key_record:
-        return None
+    digest = key_digest(api_key)
+    principal = api_key_cache.get(digest)
+    if principal is None:
+        row = db.query(
+            DBApiKey.id, DBApiKey.permissions, DBApiKey.rate_limit, DBApiKey.expires_at,
+            DBUser.id.label("user_id"), DBUser.email, DBUser.name, DBUser.plan
+        ).join(DBUser, DBUser.id == DBApiKey.user_id).filter(
+            DBApiKey.key_digest == digest,
+            DBApiKey.is_active == True
+        ).first()
+        if not row:
+            return None
+        principal = {
+            "id": row.user_id,
+            "email": row.email,
+            "name": row.name,
+            "plan": row.plan,
+            "api_key_id": row.id,
+            "permissions": json.loads(row.permissions) if row.permissions else ['read'],
+            "rate_limit": row.rate_limit,
+            "expires_at": row.expires_at.replace(tzinfo=timezone.utc) if row.expires_at and not row.expires_at.tzinfo else row.expires_at
+        }
+        api_key_cache.set(digest, principal)
     
     # Check expiration
-    if key_record.expires_at and key_record.expires_at < datetime.now(timezone.utc):
+    if principal["expires_at"] and principal["expires_at"] < datetime.now(timezone.utc):
         return None
     
-    # Update last used
-    key_record.last_used = datetime.now(timezone.utc)
-    db.commit()
-    
-    # Get user
-    user = db.query(DBUser).filter(DBUser.id == key_record.user_id).first()
-    if not user:
-        return None
-    
-    return {
-        "id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "plan": user.plan,
-        "api_key_id": key_record.id,
-        "permissions": json.loads(key_record.permissions) if key_record.permissions else ['read']
-    }
+    api_key_last_used.touch(principal["api_key_id"])
+    return {key: value for key, value in principal.items() if key != "expires_at"}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def verify_token(token: str) -> dict:
@@ -798,85 +1040,63 @@ def verify_token(token: str) -> dict:
         logger.warning(f"Ungültiger Token-Versuch: {str(e)}")
         raise HTTPException(status_code=401, detail="Ungültiger Token")
 
+# ============ PRINCIPAL CACHE ============
+# Verifizierte Benutzer pro (user_id, iat) - erspart den SELECT auf users pro Request.
+# Schreibende Endpoints rufen invalidate_principal() auf; die TTL begrenzt die
+# Veraltung in anderen Uvicorn-Workern.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', 60))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.environ.get('PRINCIPAL_CACHE_MAX_SIZE', 2048))
+
+principal_cache = TTLCache("principal", maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def _principal_snapshot(user: DBUser) -> dict:
+    """Spalten-Snapshot eines Users (ohne Session-Bindung)"""
+    return {attr.key: getattr(user, attr.key) for attr in DBUser.__mapper__.column_attrs}
+
+
+def _principal_from_snapshot(snapshot: dict, db: Session) -> DBUser:
+    """Hänge einen gecachten User ohne SELECT an die Request-Session"""
+    user = DBUser(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Entferne alle gecachten Principals eines Users"""
+    if user_id:
+        principal_cache.invalidate(lambda key, value: key[0] == user_id)
+
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Hole den aktuellen authentifizierten Benutzer"""
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentifizierung erforderlich")
     
     payload = verify_token(credentials.credentials)
+    cache_key = (payload["user_id"], payload.get("iat"))
+    snapshot = principal_cache.get(cache_key)
+    if snapshot is not None:
+        return _principal_from_snapshot(snapshot, db)
+    
     user = db.query(DBUser).filter(DBUser.id == payload["user_id"]).first()
     
     if not user:
         logger.warning(f"Benutzer {payload['user_id']} nicht gefunden")
         raise HTTPException(status_code=401, detail="Benutzer nicht gefunden")
     
+    principal_cache.set(cache_key, _principal_snapshot(user))
     return user
 
-# ============ INIT DEMO USER ============
+# ============ PAGINATION ============
 
-def init_demo_user(db: Session):
-    """Erstelle Demo-Benutzer wenn nicht vorhanden"""
-    demo_email = "demo@welcome-link.de"
-    logger.info(f"Prüfe ob Demo-Benutzer existiert: {demo_email}")
-    
+def paginate(query, created_at_column, id_column, limit: Optional[int], cursor: Optional[str],
+             count: Optional[str] = None, offset: int = 0) -> Page:
+    """Keyset-Seite (pagination.py), ungültiger Cursor -> 400"""
     try:
-        existing = db.query(DBUser).filter(DBUser.email == demo_email).first()
-    except Exception as e:
-        logger.error(f"❌ Fehler beim Abfragen Demo-Benutzer: {str(e)}")
-        raise
-    
-    if not existing:
-        demo_user = DBUser(
-            id=str(uuid.uuid4()),
-            email=demo_email,
-            password_hash=hash_password("Demo123!"),
-            name="Demo Benutzer",
-            created_at=datetime.now(timezone.utc),
-            is_demo=True
-        )
-        db.add(demo_user)
-        db.commit()
-        
-        # Erstelle Demo-Properties mit fixen IDs für Konsistenz
-        demo_properties = [
-            DBProperty(
-                id="demo-prop-1",
-                user_id=demo_user.id,
-                name="Ferienwohnung Seeblick",
-                description="Moderne 3-Zimmer Ferienwohnung direkt am Bodensee mit eigenem Bootssteg und Panoramaterrasse.",
-                address="Seepromenade 15, 88131 Lindau",
-                brand_color="#F27C2C",
-                wifi_name="Seeblick-Guest",
-                wifi_password="welcome2024",
-                checkin_time="15:00",
-                checkout_time="11:00",
-                created_at=datetime.now(timezone.utc)
-            ),
-            DBProperty(
-                id="demo-prop-2",
-                user_id=demo_user.id,
-                name="Boutique Hotel Alpenblick",
-                description="Charmantes 4-Sterne Hotel mit Bergpanorama in Garmisch-Partenkirchen. 45 Zimmer, Spa-Bereich und regionale Küche.",
-                address="Zugspitzstraße 42, 82467 Garmisch-Partenkirchen",
-                brand_color="#2C5F9E",
-                created_at=datetime.now(timezone.utc)
-            ),
-            DBProperty(
-                id="demo-prop-3",
-                user_id=demo_user.id,
-                name="Stadtapartment München City",
-                description="Stilvolles Apartment im Herzen Münchens, perfekt für Geschäftsreisende. 5 Min. zum Marienplatz.",
-                address="Maximilianstraße 28, 80539 München",
-                brand_color="#4A9D4A",
-                created_at=datetime.now(timezone.utc)
-            )
-        ]
-        
-        for prop in demo_properties:
-            db.add(prop)
-        db.commit()
-        
-        logger.info("✓ Demo-Benutzer und Properties erstellt")
+        return keyset_page(query, created_at_column, id_column, limit, cursor, count, offset)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
 
 # ============ AUTH ROUTES ============
 
@@ -891,12 +1111,14 @@ async def register(request: Request, data: UserRegister, db: Session = Depends(g
             logger.warning(f"Registrierungsversuch mit existierender E-Mail: {data.email}")
             raise HTTPException(status_code=400, detail="E-Mail bereits registriert")
         
-        # Erstelle Benutzer
+        # Erstelle Benutzer (Connection während bcrypt freigeben)
+        commit_before_hashing(db)
+        password_hash = await hash_password_pooled(data.password)
         user_id = str(uuid.uuid4())
         db_user = DBUser(
             id=user_id,
             email=data.email.lower(),
-            password_hash=hash_password(data.password),
+            password_hash=password_hash,
             name=data.name or data.email.split("@")[0],
             created_at=datetime.now(timezone.utc),
             is_demo=False
@@ -955,9 +1177,15 @@ async def login(request: Request, data: UserLogin, db: Session = Depends(get_db)
             logger.warning(f"Benutzer nicht gefunden: {data.email}")
             raise HTTPException(status_code=401, detail="E-Mail oder Passwort falsch")
         
-        # Überprüfe Passwort
-        if not verify_password(data.password, user.password_hash):
+        # Überprüfe Passwort (Connection während bcrypt freigeben)
+        commit_before_hashing(db)
+        if not await verify_password_pooled(data.password, user, db):
             logger.warning(f"Falsches Passwort für: {data.email}")
+            log_audit_event(
+                user_id=user.id, action="login", resource="user", resource_id=user.id,
+                ip_address=request.client.host if request.client else None,
+                user_agent=request.headers.get("user-agent"), status="failed", durability="sync"
+            )
             raise HTTPException(status_code=401, detail="E-Mail oder Passwort falsch")
         
         # Prüfe E-Mail-Bestätigung (außer für Demo-Accounts)
@@ -971,6 +1199,11 @@ async def login(request: Request, data: UserLogin, db: Session = Depends(get_db)
         # Erstelle Token
         token = create_token(user.id, user.email)
         logger.info(f"✓ Benutzer eingeloggt: {data.email}")
+        log_audit_event(
+            user_id=user.id, action="login", resource="user", resource_id=user.id,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent"), durability="sync"
+        )
         
         return AuthResponse(
             token=token,
@@ -1037,6 +1270,7 @@ async def verify_email(request: Request, data: VerifyEmailRequest, db: Session =
         user.email_verification_token = ""
         user.email_verification_token_expires = None
         db.commit()
+        invalidate_principal(user.id)
         
         # Sende Welcome Email
         try:
@@ -1130,8 +1364,9 @@ async def admin_login(request: Request, data: UserLogin, db: Session = Depends(g
             logger.warning(f"Admin-Login fehlgeschlagen: Benutzer nicht gefunden - {data.email}")
             raise HTTPException(status_code=401, detail="Zugriff verweigert")
 
-        # Überprüfe Passwort
-        if not verify_password(data.password, user.password_hash):
+        # Überprüfe Passwort (Connection während bcrypt freigeben)
+        commit_before_hashing(db)
+        if not await verify_password_pooled(data.password, user, db):
             logger.warning(f"Admin-Login fehlgeschlagen: Falsches Passwort - {data.email}")
             raise HTTPException(status_code=401, detail="Zugriff verweigert")
 
@@ -1189,12 +1424,14 @@ async def create_admin_account(request: Request, data: AdminCreateRequest, db: S
     if existing:
         raise HTTPException(status_code=400, detail="Admin-Account existiert bereits")
 
-    # Erstelle Admin
+    # Erstelle Admin (Connection während bcrypt freigeben)
+    commit_before_hashing(db)
+    password_hash = await hash_password_pooled(data.password)
     admin_user = DBUser(
         id=str(uuid.uuid4()),
         email="admin@welcome-link.de",
         name="Administrator",
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         is_demo=False,
         created_at=datetime.now(timezone.utc)
     )
@@ -1268,14 +1505,13 @@ async def request_password_reset(request: Request, data: PasswordResetRequest, d
 @api_router.post("/auth/password-reset/confirm")
 async def confirm_password_reset(data: PasswordResetConfirm, db: Session = Depends(get_db)):
     """Bestätige Password Reset mit Token"""
-    # Prüfe Token
-    token_data = password_reset_tokens.get(data.token)
+    # Token vor dem Hashing verbrauchen - ein paralleler zweiter Request bekommt 400
+    token_data = password_reset_tokens.pop(data.token, None)
     
     if not token_data:
         raise HTTPException(status_code=400, detail="Ungültiger oder abgelaufener Token")
     
     if datetime.now(timezone.utc) > token_data["expires"]:
-        del password_reset_tokens[data.token]
         raise HTTPException(status_code=400, detail="Token ist abgelaufen")
     
     # Finde User
@@ -1283,12 +1519,16 @@ async def confirm_password_reset(data: PasswordResetConfirm, db: Session = Depen
     if not user:
         raise HTTPException(status_code=404, detail="User nicht gefunden")
     
-    # Update Passwort
-    user.password_hash = pwd_context.hash(data.new_password)
+    # Update Passwort (Connection während bcrypt freigeben)
+    commit_before_hashing(db)
+    try:
+        user.password_hash = await hash_password_pooled(data.new_password)
+    except HTTPException:
+        # z.B. 503 bei vollem Passwort-Pool - Token bleibt für einen neuen Versuch gültig
+        password_reset_tokens[data.token] = token_data
+        raise
     db.commit()
-    
-    # Lösche Token
-    del password_reset_tokens[data.token]
+    invalidate_principal(user.id)
     
     logger.info(f"Password reset completed for: {user.email}")
     
@@ -1337,6 +1577,7 @@ def create_property(data: PropertyCreate, user: DBUser = Depends(get_current_use
         db.add(db_property)
         db.commit()
         db.refresh(db_property)
+        invalidate_guestview(user.id)
         
         logger.info(f"Property erstellt: {prop_id} für Benutzer {user.id}")
         
@@ -1406,6 +1647,7 @@ def delete_property(property_id: str, user: DBUser = Depends(get_current_user),
         
         db.delete(prop)
         db.commit()
+        invalidate_guestview(user.id)
         
         logger.info(f"Property gelöscht: {property_id}")
         return {"message": "Property gelöscht"}
@@ -1422,6 +1664,13 @@ def delete_property(property_id: str, user: DBUser = Depends(get_current_user),
 def root():
     return {"message": "Welcome Link API", "version": "2.10.0", "status": "healthy"}
 
+@api_router.get("/metrics")
+async def prometheus_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Metriken im Prometheus-Textformat (optional per METRICS_TOKEN geschützt)"""
+    if METRICS_TOKEN and (not credentials or not hmac.compare_digest(credentials.credentials, METRICS_TOKEN)):
+        raise HTTPException(status_code=401, detail="Ungültiger Metrics-Token")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @api_router.get("/health")
 def health_check(db: Session = Depends(get_db)):
     """Detaillierter Health Check für Monitoring"""
@@ -1441,7 +1690,8 @@ def health_check(db: Session = Depends(get_db)):
         db.execute(text("SELECT 1"))
         health["services"]["database"] = {
             "status": "healthy",
-            "type": "sqlite"
+            "type": engine.dialect.name,
+            "pool": pool_stats(engine)
         }
     except Exception as e:
         health["services"]["database"] = {
@@ -1458,12 +1708,44 @@ def health_check(db: Session = Depends(get_db)):
     
     # Rate limiting check
     health["services"]["rate_limiting"] = {
-        "status": "healthy",
+        "status": "healthy" if RATE_LIMIT_ENABLED else "disabled",
         "limits": {
             "register": "5/minute",
             "login": "10/minute",
-            "magic_link": "3/minute"
-        }
+            "magic_link": "3/minute",
+            "api_key": "ApiKey.rate_limit/minute",
+            "user": f"{RATE_LIMIT_USER_PER_MINUTE}/minute",
+            "ip": f"{RATE_LIMIT_IP_PER_MINUTE}/minute"
+        },
+        "token_bucket": rate_limiter.stats()
+    }
+    
+    # Mail-Outbox
+    health["services"]["mail_queue"] = {
+        "status": "healthy" if SMTP_CONFIGURED else "disabled",
+        **mail_queue.stats(db)
+    }
+    
+    # Webhook-Outbox
+    health["services"]["webhooks"] = webhook_dispatcher.stats(db)
+    health["services"]["analytics_ingestion"] = analytics_buffer.stats()
+    health["services"]["audit_log"] = audit_sink.stats()
+    health["services"]["warmup"] = warmup.stats()
+    health["services"]["api_key_last_used"] = api_key_last_used.stats()
+    health["services"]["password_hasher"] = password_hasher.stats()
+    health["services"]["checkouts"] = checkout_store.stats()
+    health["services"]["extras_catalog"] = extras_catalog.stats()
+    
+    # In-Process Caches
+    health["caches"] = {
+        "principal": principal_cache.stats(),
+        "guestview": guestview_cache.stats(),
+        "qr_artifacts": qr_artifact_cache.stats(),
+        "admin_stats": admin_stats_cache.stats(),
+        "api_keys": api_key_cache.stats(),
+        "rate_limit_unknown_keys": rate_limit_unknown_keys.stats(),
+        "extras_catalog": catalog_cache.stats(),
+        "checkouts": checkout_cache.stats()
     }
     
     return health
@@ -1513,6 +1795,7 @@ def create_guestview_token(user: DBUser = Depends(get_current_user), db: Session
         db.add(guest_view)
         db.commit()
         db.refresh(guest_view)
+        invalidate_guestview(user.id)
         
         logger.info(f"Guestview Token erstellt für User {user.email}: {token}")
         
@@ -1521,9 +1804,41 @@ def create_guestview_token(user: DBUser = Depends(get_current_user), db: Session
         logger.error(f"Fehler beim Erstellen des Guestview Tokens: {str(e)}")
         raise HTTPException(status_code=500, detail="Fehler beim Erstellen des Tokens")
 
+# Snapshot-Cache für den öffentlichen Guestview (höchster Traffic, QR-Scans).
+# Eintrag: (JSON-Bytes, ETag, user_id). Invalidierung pro Gastgeber bei Änderungen -
+# nur im eigenen Worker, daher kurze TTL und bei jedem Treffer ein Index-Lookup,
+# ob der Token noch existiert (neu erzeugte Tokens widerrufen die alten sofort).
+GUESTVIEW_CACHE_TTL_SECONDS = float(os.environ.get('GUESTVIEW_CACHE_TTL_SECONDS', 60))
+GUESTVIEW_CACHE_MAX_SIZE = int(os.environ.get('GUESTVIEW_CACHE_MAX_SIZE', 4096))
+GUESTVIEW_CACHE_CONTROL = os.environ.get('GUESTVIEW_CACHE_CONTROL', 'private, max-age=60, must-revalidate')
+
+guestview_cache = TTLCache("guestview", maxsize=GUESTVIEW_CACHE_MAX_SIZE, ttl=GUESTVIEW_CACHE_TTL_SECONDS)
+
+
+def invalidate_guestview(user_id: str) -> None:
+    """Verwerfe alle Guestview-Snapshots eines Gastgebers"""
+    if user_id:
+        guestview_cache.invalidate(lambda key, value: value[2] == user_id)
+
+
+def _guestview_response(request: Request, body: bytes, etag: str) -> Response:
+    """Antwort mit ETag/Cache-Control, 304 bei passendem If-None-Match"""
+    headers = {"ETag": etag, "Cache-Control": GUESTVIEW_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @api_router.get("/guestview/{token}")
-def get_guestview_by_token(token: str, db: Session = Depends(get_db)):
+def get_guestview_by_token(token: str, request: Request, db: Session = Depends(get_db)):
     """Rufe Guestview Daten anhand Token oder Property-ID ab (ohne Auth)"""
+    cached = guestview_cache.get(token)
+    if cached is not None:
+        if token.isdigit() or db.query(DBGuestView.id).filter(DBGuestView.token == token).first():
+            return _guestview_response(request, cached[0], cached[1])
+        guestview_cache.pop(token)
+    
     try:
         # Check if token is a property ID (numeric)
         is_property_id = token.isdigit()
@@ -1557,8 +1872,10 @@ def get_guestview_by_token(token: str, db: Session = Depends(get_db)):
             properties = db.query(DBProperty).filter(DBProperty.user_id == user.id).all()
         
         logger.info(f"Guestview aufgerufen für User {user.email} via Token")
+        # Preisindizes über die Request-Session, fehlende mit einer Abfrage pro Tabelle
+        catalog_indexes = list(extras_catalog.price_indexes([p.id for p in properties], db).values())
         
-        return {
+        payload = {
             "user": {
                 "id": user.id,
                 "email": user.email,
@@ -1594,8 +1911,15 @@ def get_guestview_by_token(token: str, db: Session = Depends(get_db)):
                 ],
                 "created_at": p.created_at.isoformat() if p.created_at else None
             } for p in properties],
-            "extras": get_demo_extras()  # Extras für Buchung
+            # Extras/Bundles für Buchung aus dem Preisindex der Properties
+            "extras": [extra for index in catalog_indexes for extra in index.extras],
+            "bundles": [bundle for index in catalog_indexes for bundle in index.bundles]
         }
+        
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        guestview_cache.set(token, (body, etag, user.id))
+        return _guestview_response(request, body, etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -1604,12 +1928,131 @@ def get_guestview_by_token(token: str, db: Session = Depends(get_db)):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Fehler beim Abrufen des Guestviews: {str(e)}")
 
+# ============ RATE LIMITING (TOKEN BUCKET) ============
+# Pro API-Key (ApiKey.rate_limit), sonst pro Benutzer (JWT), sonst pro IP.
+# Mit mehreren Workern RATE_LIMIT_BACKEND=sql oder redis, sonst zählt jeder Worker
+# für sich. Die slowapi-Limits einzelner Endpoints (Login etc.) gelten zusätzlich.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory | sql | redis
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_USER_PER_MINUTE = int(os.environ.get('RATE_LIMIT_USER_PER_MINUTE', 600))
+RATE_LIMIT_IP_PER_MINUTE = int(os.environ.get('RATE_LIMIT_IP_PER_MINUTE', 600))
+# Hinter dem Render-Proxy: Client-IP ist der Eintrag, den der vertrauenswürdige Proxy
+# angehängt hat - von rechts gezählt (RATE_LIMIT_PROXY_HOPS Proxies). Die Einträge
+# links davon kommen vom Client und sind beliebig fälschbar.
+RATE_LIMIT_TRUST_PROXY = os.environ.get('RATE_LIMIT_TRUST_PROXY', 'true').lower() == 'true'
+RATE_LIMIT_PROXY_HOPS = max(1, int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 1)))
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/api/health", "/api/metrics"})
+
+rate_limiter = RateLimiter(create_store(RATE_LIMIT_BACKEND, engine, DBRateLimitBucket, RATE_LIMIT_REDIS_URL))
+# Bearer-Token -> user_id, erspart jwt.decode pro Request
+rate_limit_token_cache = TTLCache("rate_limit_tokens", maxsize=4096, ttl=60)
+# Digests unbekannter API-Keys - erfundene Keys kosten nicht bei jedem Request einen DB-Lookup
+RATE_LIMIT_UNKNOWN_KEY_TTL_SECONDS = int(os.environ.get('RATE_LIMIT_UNKNOWN_KEY_TTL_SECONDS', 30))
+rate_limit_unknown_keys = TTLCache("rate_limit_unknown_keys", maxsize=4096, ttl=RATE_LIMIT_UNKNOWN_KEY_TTL_SECONDS)
+
+def _lookup_api_key(api_key: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        return get_api_key_user(api_key, db)
+    finally:
+        db.close()
+
+def _client_ip(scope, headers: dict) -> str:
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded and RATE_LIMIT_TRUST_PROXY:
+        entries = [entry.strip() for entry in forwarded.split(b",") if entry.strip()]
+        if entries:
+            return entries[-min(RATE_LIMIT_PROXY_HOPS, len(entries))].decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _user_from_token(token: str) -> Optional[str]:
+    user_id = rate_limit_token_cache.get(token)
+    if user_id is None:
+        try:
+            user_id = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]).get("user_id")
+        except jwt.InvalidTokenError:
+            return None
+        rate_limit_token_cache.set(token, user_id)
+    return user_id
+
+class RateLimitMiddleware:
+    """Token-Bucket pro API-Key, Benutzer oder IP mit X-RateLimit-* Headern"""
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+    
+    async def _check(self, kind: str, identity: str, limit: int):
+        if self.limiter.store.blocking:
+            return await anyio.to_thread.run_sync(self.limiter.check, kind, identity, limit)
+        return self.limiter.check(kind, identity, limit)
+    
+    async def _limit(self, scope):
+        """Passenden Bucket belasten - API-Key vor Benutzer vor IP"""
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"")
+        token = authorization[7:].decode("latin-1") if authorization[:7].lower() == b"bearer " else None
+        api_key = headers.get(b"x-api-key", b"").decode("latin-1") or (token if token and token.startswith(API_KEY_PREFIX) else None)
+        if api_key:
+            digest = key_digest(api_key)
+            principal = api_key_cache.get(digest)
+            if principal is None:
+                # Nicht gecachter Key: erst den IP-Bucket belasten, damit der DB-Lookup
+                # selbst begrenzt ist; bekannte Fehlversuche gar nicht erst nachschlagen
+                result = await self._check("ip", _client_ip(scope, headers), RATE_LIMIT_IP_PER_MINUTE)
+                if (result is not None and not result.allowed) or rate_limit_unknown_keys.get(digest):
+                    return result
+                principal = await anyio.to_thread.run_sync(_lookup_api_key, api_key)
+                if not principal:
+                    rate_limit_unknown_keys.set(digest, True)
+                    return result
+            return await self._check("key", principal["api_key_id"], principal["rate_limit"] or RATE_LIMIT_USER_PER_MINUTE)
+        if token:
+            user_id = _user_from_token(token)
+            if user_id:
+                return await self._check("user", user_id, RATE_LIMIT_USER_PER_MINUTE)
+        return await self._check("ip", _client_ip(scope, headers), RATE_LIMIT_IP_PER_MINUTE)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in RATE_LIMIT_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        result = await self._limit(scope)
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+        
+        limit_headers = rate_limit_headers(result)
+        if not result.allowed:
+            body = json.dumps({"detail": "Zu viele Anfragen - bitte später erneut versuchen"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *limit_headers],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        
+        async def send_with_limits(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *limit_headers]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_limits)
+
+# Innerhalb von CORS, damit auch 429-Antworten CORS-Header tragen
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=CORS_ORIGINS,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "X-API-Key"],
+    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"],
 )
 
 # Security Headers Middleware (nach CORS)
@@ -1649,6 +2092,32 @@ else:
     )
 logger = logging.getLogger(__name__)
 
+# ============ WARM-UP ============
+# Schwere Module (qrcode/PIL, reportlab, numpy, psutil) werden erst im Handler
+# importiert; der Warm-up lädt sie nach dem Startup im Hintergrund vor
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', 'true').lower() == 'true'
+WARMUP_DELAY_SECONDS = float(os.environ.get('WARMUP_DELAY_SECONDS', 1))
+
+def _warm_qr_pdf():
+    url = "https://www.welcome-link.de/guestview/warmup"
+    render_qr_pdf(render_qr_png(url, 15, 2, "H"), url, "Warm-up")
+
+def _warm_occupancy():
+    from occupancy import OccupancyGrid
+    OccupancyGrid(["warmup"], last_months(date.today(), 1), []).nights_per_month()
+
+def _warm_psutil():
+    psutil = optional_import("psutil")
+    if psutil:
+        psutil.cpu_percent(interval=None)
+
+warmup = Warmup([
+    ("qr_pdf", _warm_qr_pdf),
+    ("occupancy", _warm_occupancy),
+    ("psutil", _warm_psutil),
+    ("password_hasher", password_hasher.start),
+], delay_seconds=WARMUP_DELAY_SECONDS)
+
 @app.on_event("startup")
 def startup():
     """Initialisiere Demo-Benutzer beim Start"""
@@ -1658,24 +2127,61 @@ def startup():
             logger.error("❌ SessionLocal ist nicht initialisiert!")
             return
         
-        db = SessionLocal()
-        logger.info("✓ DB-Session geöffnet")
-        
-        try:
-            init_demo_user(db)
-            db.commit()
-            logger.info("✓ Demo-Benutzer initialisiert")
-        finally:
-            db.close()
+        # Mit SKIP_BOOTSTRAP legt migrate.py den Demo-Benutzer an (keine Query beim Boot)
+        if not SKIP_BOOTSTRAP:
+            db = SessionLocal()
+            logger.info("✓ DB-Session geöffnet")
+            
+            try:
+                init_demo_user(db)
+                db.commit()
+                logger.info("✓ Demo-Benutzer initialisiert")
+            finally:
+                db.close()
+        
+        if SMTP_CONFIGURED:
+            mail_queue.start()
+        analytics_buffer.start()
+        audit_sink.start()
+        metrics.start()
+        api_key_last_used.start()
+        if WARMUP_ON_STARTUP:
+            warmup.start()
         
         logger.info("✓ Application gestartet")
     except Exception as e:
         logger.error(f"❌ Fehler beim Startup: {str(e)}", exc_info=True)
 
+@app.on_event("startup")
+async def configure_threadpool():
+    """Threadpool für Sync-Handler auf THREADPOOL_SIZE setzen (siehe Pool-Sizing in database.py)"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def start_webhook_dispatcher():
+    """Starte Webhook-Dispatcher im Event-Loop"""
+    try:
+        await webhook_dispatcher.start()
+    except Exception as e:
+        logger.error(f"❌ Webhook-Dispatcher konnte nicht gestartet werden: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_webhook_dispatcher():
+    """Stoppe Webhook-Dispatcher"""
+    await webhook_dispatcher.stop()
+
 @app.on_event("shutdown")
 def shutdown_db_client():
     """Beende Datenbankverbindung"""
     try:
+        mail_queue.stop()
+        analytics_buffer.stop()
+        audit_sink.stop()
+        metrics.stop()
+        warmup.stop()
+        api_key_last_used.stop()
+        password_hasher.stop()
+        shutdown_render_pool()
         engine.dispose()
         logger.info("✓ Datenbankverbindung geschlossen")
     except Exception as e:
@@ -1688,6 +2194,8 @@ class ExtraBase(BaseModel):
     description: Optional[str] = None
     price: float = Field(ge=0)
     category: str = "other"  # food, wellness, activity, transport, other
+    stock: Optional[int] = Field(None, ge=0)  # None = unbegrenzt
+    image_url: Optional[str] = None
     is_active: bool = True
 
 class ExtraCreate(ExtraBase):
@@ -1695,55 +2203,154 @@ class ExtraCreate(ExtraBase):
 
 class Extra(ExtraBase):
     id: str
-    property_id: int
+    property_id: str
 
-# In-Memory Extras Store (simplified for demo)
-EXTRAS_STORE = {}
+class BundleItem(BaseModel):
+    extra_id: str
+    quantity: int = Field(1, ge=1, le=10)
 
-def get_demo_extras():
-    """Get demo extras"""
-    return [
-        {"id": "extra-1", "property_id": "demo-prop-1", "name": "Frühstück", "description": "Reichhaltiges Frühstück mit frischen Brötchen, Eiern und Kaffee", "price": 15.0, "category": "food", "is_active": True},
-        {"id": "extra-2", "property_id": "demo-prop-1", "name": "Spät-Check-out", "description": "Check-out bis 14:00 Uhr", "price": 25.0, "category": "service", "is_active": True},
-        {"id": "extra-3", "property_id": "demo-prop-1", "name": "Fahrradverleih", "description": "Pro Tag, inkl. Helm und Schloss", "price": 12.0, "category": "activity", "is_active": True},
-        {"id": "extra-4", "property_id": "demo-prop-1", "name": "Sauna", "description": "Private Nutzung für 2 Stunden", "price": 30.0, "category": "wellness", "is_active": True},
-        {"id": "extra-5", "property_id": "demo-prop-1", "name": "Gepäckaufbewahrung", "description": "Sichere Aufbewahrung pro Tag", "price": 5.0, "category": "service", "is_active": True},
-        {"id": "extra-6", "property_id": "demo-prop-1", "name": "Shuttle Service", "description": "Bahnhof-Transfer hin und zurück", "price": 20.0, "category": "transport", "is_active": True},
-        {"id": "extra-7", "property_id": "demo-prop-1", "name": "Willkommens-Paket", "description": "Sekt, Obst & Schokolade bei Anreise", "price": 35.0, "category": "food", "is_active": True},
-        {"id": "extra-8", "property_id": "demo-prop-1", "name": "Haustier", "description": "Pro Nacht, inkl. Futter & Näpfe", "price": 10.0, "category": "other", "is_active": True},
-        {"id": "extra-9", "property_id": "demo-prop-1", "name": "Parkplatz", "description": "Tiefgarage, pro Tag", "price": 8.0, "category": "transport", "is_active": True},
-        {"id": "extra-10", "property_id": "demo-prop-1", "name": "Massage", "description": "60 Min. Rücken-Nacken im Hotel", "price": 65.0, "category": "wellness", "is_active": True},
-    ]
+class BundleCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    price: float = Field(ge=0)
+    extras: List[BundleItem] = Field(min_length=1)
+
+# Extras/Bundles in der DB, pro Property ein versionierter Preisindex (extras_catalog.py)
+CATALOG_CACHE_MAX_SIZE = int(os.environ.get('CATALOG_CACHE_MAX_SIZE', 4096))
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get('CATALOG_CACHE_TTL_SECONDS', 600))
+
+catalog_cache = TTLCache("extras_catalog", maxsize=CATALOG_CACHE_MAX_SIZE, ttl=CATALOG_CACHE_TTL_SECONDS)
+extras_catalog = ExtrasCatalog(
+    lambda: SessionLocal(), DBProperty, DBExtra, DBBundle, DBBundleExtra, catalog_cache,
+)
+
+def _owned_property(db: Session, property_id: str, user) -> DBProperty:
+    property = db.query(DBProperty).filter(DBProperty.id == property_id).first()
+    if not property:
+        raise HTTPException(status_code=404, detail="Property nicht gefunden")
+    if property.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Kein Zugriff auf diese Property")
+    return property
+
+def _catalog_changed(db: Session, property: DBProperty):
+    """Version erhöhen, committen, Preisindex und Guestview-Snapshots verwerfen"""
+    extras_catalog.bump_version(db, property.id)
+    db.commit()
+    extras_catalog.invalidate(property.id)
+    invalidate_guestview(property.user_id)
+
+def _extra_dict(extra: DBExtra) -> dict:
+    return {
+        "id": extra.id, "property_id": extra.property_id, "name": extra.name,
+        "description": extra.description, "price": extra.price, "category": extra.category,
+        "stock": extra.stock, "image_url": extra.image_url, "is_active": extra.is_active,
+    }
 
 @api_router.get("/properties/{property_id}/extras")
-def get_extras(property_id: int):
+def get_extras(property_id: str):
     """Get all extras for a property"""
-    extras = get_demo_extras()
-    return {"extras": extras}
+    index = extras_catalog.price_index(property_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Property nicht gefunden")
+    return {"extras": index.extras, "bundles": index.bundles, "version": index.version}
 
 @api_router.post("/properties/{property_id}/extras")
-def create_extra(property_id: int, data: ExtraCreate, user = Depends(get_current_user)):
+def create_extra(property_id: str, data: ExtraCreate, user = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new extra"""
-    extra_id = f"extra-{uuid.uuid4().hex[:8]}"
-    extra = {
-        "id": extra_id,
-        "property_id": property_id,
-        **data.model_dump()
-    }
-    if property_id not in EXTRAS_STORE:
-        EXTRAS_STORE[property_id] = []
-    EXTRAS_STORE[property_id].append(extra)
-    return extra
+    property = _owned_property(db, property_id, user)
+    extra = DBExtra(id=str(uuid.uuid4()), user_id=user.id, property_id=property.id, **data.model_dump())
+    db.add(extra)
+    _catalog_changed(db, property)
+    return _extra_dict(extra)
+
+@api_router.put("/properties/{property_id}/extras/{extra_id}")
+def update_extra(property_id: str, extra_id: str, data: ExtraCreate, user = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Update an extra (Preis, Bestand, Aktivierung)"""
+    property = _owned_property(db, property_id, user)
+    extra = db.query(DBExtra).filter(DBExtra.id == extra_id, DBExtra.property_id == property.id).first()
+    if not extra:
+        raise HTTPException(status_code=404, detail="Extra nicht gefunden")
+    for field, value in data.model_dump().items():
+        setattr(extra, field, value)
+    _catalog_changed(db, property)
+    return _extra_dict(extra)
+
+@api_router.delete("/properties/{property_id}/extras/{extra_id}")
+def delete_extra(property_id: str, extra_id: str, user = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Delete an extra (und Bundle-Zuordnungen)"""
+    property = _owned_property(db, property_id, user)
+    extra = db.query(DBExtra).filter(DBExtra.id == extra_id, DBExtra.property_id == property.id).first()
+    if not extra:
+        raise HTTPException(status_code=404, detail="Extra nicht gefunden")
+    db.query(DBBundleExtra).filter(DBBundleExtra.extra_id == extra.id).delete(synchronize_session=False)
+    db.delete(extra)
+    _catalog_changed(db, property)
+    return {"status": "deleted", "id": extra_id}
+
+@api_router.post("/properties/{property_id}/bundles")
+def create_bundle(property_id: str, data: BundleCreate, user = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Create a bundle from extras of the same property"""
+    property = _owned_property(db, property_id, user)
+    extra_ids = {item.extra_id for item in data.extras}
+    found = db.query(DBExtra.id).filter(DBExtra.id.in_(extra_ids), DBExtra.property_id == property.id).count()
+    if found != len(extra_ids):
+        raise HTTPException(status_code=400, detail="Unbekanntes Extra im Bundle")
+    bundle = DBBundle(id=str(uuid.uuid4()), user_id=user.id, property_id=property.id,
+                      name=data.name, description=data.description, price=data.price)
+    db.add(bundle)
+    db.add_all([DBBundleExtra(id=str(uuid.uuid4()), bundle_id=bundle.id, extra_id=item.extra_id, quantity=item.quantity)
+                for item in data.extras])
+    _catalog_changed(db, property)
+    return {"id": bundle.id, "property_id": property.id, "name": bundle.name, "description": bundle.description,
+            "price": bundle.price, "extras": [item.model_dump() for item in data.extras], "is_active": True}
+
+@api_router.delete("/properties/{property_id}/bundles/{bundle_id}")
+def delete_bundle(property_id: str, bundle_id: str, user = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Delete a bundle"""
+    property = _owned_property(db, property_id, user)
+    bundle = db.query(DBBundle).filter(DBBundle.id == bundle_id, DBBundle.property_id == property.id).first()
+    if not bundle:
+        raise HTTPException(status_code=404, detail="Bundle nicht gefunden")
+    db.query(DBBundleExtra).filter(DBBundleExtra.bundle_id == bundle.id).delete(synchronize_session=False)
+    db.delete(bundle)
+    _catalog_changed(db, property)
+    return {"status": "deleted", "id": bundle_id}
 
 # ============ QR CODE ENDPOINTS ============
+# QR-PNGs und PDFs hängen nur von URL, Farbe, Größe und Property-Name/-Adresse ab
+# und werden content-adressiert gecacht (Speicher-LRU, optional QR_CACHE_DIR).
+QR_CACHE_MAX_BYTES = int(os.environ.get('QR_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR') or None
+
+qr_artifact_cache = ArtifactCache("qr", max_bytes=QR_CACHE_MAX_BYTES, disk_dir=QR_CACHE_DIR)
+
+
+def _property_guestview_url(property) -> str:
+    base_url = os.environ.get('FRONTEND_URL', 'https://www.welcome-link.de')
+    return f"{base_url}/guestview/{property.public_id if hasattr(property, 'public_id') and property.public_id else property.id}"
+
+
+def cached_qr_png(url: str, box_size: int, border: int, error_correction: str) -> bytes:
+    """QR-PNG aus dem Artefakt-Cache (einmalig gerendert)"""
+    return qr_artifact_cache.get_or_create(
+        "png",
+        lambda: render_qr_png(url, box_size=box_size, border=border, error_correction=error_correction),
+        url=url, box_size=box_size, border=border, error_correction=error_correction, fill_color=QR_FILL_COLOR
+    )
+
+
+def cached_qr_pdf(url: str, property_name: str, address: Optional[str]) -> bytes:
+    """QR-PDF aus dem Artefakt-Cache (einmalig gebaut)"""
+    return qr_artifact_cache.get_or_create(
+        "pdf",
+        lambda: render_qr_pdf(cached_qr_png(url, 15, 2, "H"), url, property_name, address),
+        url=url, property_name=property_name, address=address, fill_color=QR_FILL_COLOR
+    )
+
 
 @api_router.get("/properties/{property_id}/qr")
 def get_property_qr(property_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Generate QR code for property guest view"""
-    import qrcode
-    from qrcode.image.styledpil import StyledPilImage
-    from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
-    from io import BytesIO
     import base64
     try:
         # Convert property_id to int if possible, otherwise use string
@@ -1761,34 +2368,17 @@ def get_property_qr(property_id: str, user: DBUser = Depends(get_current_user),
             raise HTTPException(status_code=404, detail="Property not found")
         
         # Generate guestview URL
-        base_url = os.environ.get('FRONTEND_URL', 'https://www.welcome-link.de')
-        guestview_url = f"{base_url}/guestview/{property.public_id if hasattr(property, 'public_id') and property.public_id else property.id}"
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(guestview_url)
-        qr.make(fit=True)
-        
-        # Create styled QR code
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=RoundedModuleDrawer(),
-            fill_color="#F27C2C",
-            back_color="white"
-        )
+        guestview_url = _property_guestview_url(property)
         
-        # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Base64 Data-URL (gecacht)
+        data_url = qr_artifact_cache.get_or_create(
+            "data_url",
+            lambda: b"data:image/png;base64," + base64.b64encode(cached_qr_png(guestview_url, 10, 4, "M")),
+            url=guestview_url, box_size=10, border=4, error_correction="M", fill_color=QR_FILL_COLOR
+        )
         
         return {
-            "qr_code": f"data:image/png;base64,{img_base64}",
+            "qr_code": data_url.decode(),
             "url": guestview_url,
             "property_name": property.name,
             "property_id": str(property.id)
@@ -1802,12 +2392,6 @@ def get_property_qr(property_id: str, user: DBUser = Depends(get_current_user),
 @api_router.get("/properties/{property_id}/qr/download")
 def download_property_qr(property_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Download QR code as PNG file"""
-    import qrcode
-    from qrcode.image.styledpil import StyledPilImage
-    from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
-    from io import BytesIO
-    from fastapi.responses import Response
-
     try:
         # Convert property_id to int if possible
         try:
@@ -1822,33 +2406,12 @@ def download_property_qr(property_id: str, user: DBUser = Depends(get_current_us
         if not property:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        # Generate guestview URL
-        base_url = os.environ.get('FRONTEND_URL', 'https://www.welcome-link.de')
-        guestview_url = f"{base_url}/guestview/{property.public_id if hasattr(property, 'public_id') and property.public_id else property.id}"
-        
-        # Generate high-res QR code for printing
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=20,
-            border=4,
-        )
-        qr.add_data(guestview_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=RoundedModuleDrawer(),
-            fill_color="#F27C2C",
-            back_color="white"
-        )
+        # High-res QR code for printing (gecacht)
+        png = cached_qr_png(_property_guestview_url(property), 20, 4, "H")
         
         # Return as downloadable file
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        
         return Response(
-            content=buffer.getvalue(),
+            content=png,
             media_type="image/png",
             headers={
                 "Content-Disposition": f"attachment; filename=qr-{property.name.replace(' ', '-')}.png"
@@ -1863,12 +2426,6 @@ def download_property_qr(property_id: str, user: DBUser = Depends(get_current_us
 @api_router.post("/properties/{property_id}/qr/pdf")
 def generate_qr_pdf(property_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Generate print-ready PDF with QR code for property"""
-    import qrcode
-    from qrcode.image.styledpil import StyledPilImage
-    from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
-    from io import BytesIO
-    from fastapi.responses import Response
-
     try:
         # Convert property_id
         try:
@@ -1883,93 +2440,25 @@ def generate_qr_pdf(property_id: str, user: DBUser = Depends(get_current_user),
         if not property:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        # Generate guestview URL
-        base_url = os.environ.get('FRONTEND_URL', 'https://www.welcome-link.de')
-        guestview_url = f"{base_url}/guestview/{property.public_id if hasattr(property, 'public_id') and property.public_id else property.id}"
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=15,
-            border=2,
-        )
-        qr.add_data(guestview_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=RoundedModuleDrawer(),
-            fill_color="#F27C2C",
-            back_color="white"
-        )
+        guestview_url = _property_guestview_url(property)
+        filename = f"qr-{property.name.replace(' ', '-')}"
         
-        # Create PDF
-        buffer = BytesIO()
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.styles import getSampleStyleSheet
-            from reportlab.platypus import SimpleDocTemplate, Image as RLImage, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib import colors
-            from reportlab.lib.units import cm
-            
-            doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"QR-Code {property.name}")
-            styles = getSampleStyleSheet()
-            elements = []
-            
-            # Title
-            elements.append(Paragraph(f"QR-Code: {property.name}", styles['Title']))
-            elements.append(Paragraph(f"Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M')}", styles['Normal']))
-            elements.append(Spacer(1, 1*cm))
-            
-            # QR Code image
-            img_buffer = BytesIO()
-            img.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            
-            # Add image (centered)
-            elements.append(RLImage(img_buffer, width=10*cm, height=10*cm))
-            elements.append(Spacer(1, 1*cm))
-            
-            # Instructions
-            elements.append(Paragraph("Anleitung:", styles['Heading2']))
-            elements.append(Paragraph("1. Scannen Sie den QR-Code mit Ihrem Smartphone", styles['Normal']))
-            elements.append(Paragraph("2. Sie gelangen direkt zur digitalen Gästemappe", styles['Normal']))
-            elements.append(Paragraph("3. Teilen Sie diesen Code mit Ihren Gästen", styles['Normal']))
-            elements.append(Spacer(1, 0.5*cm))
-            
-            # URL
-            elements.append(Paragraph("URL:", styles['Heading2']))
-            elements.append(Paragraph(guestview_url, styles['Normal']))
-            elements.append(Spacer(1, 1*cm))
-            
-            # Property info
-            elements.append(Paragraph("Unterkunft:", styles['Heading2']))
-            elements.append(Paragraph(property.name, styles['Normal']))
-            if property.address:
-                elements.append(Paragraph(property.address, styles['Normal']))
-            
-            doc.build(elements)
-            buffer.seek(0)
-            
+            pdf = cached_qr_pdf(guestview_url, property.name, property.address)
             return Response(
-                content=buffer.getvalue(),
+                content=pdf,
                 media_type="application/pdf",
                 headers={
-                    "Content-Disposition": f"attachment; filename=qr-{property.name.replace(' ', '-')}.pdf"
+                    "Content-Disposition": f"attachment; filename={filename}.pdf"
                 }
             )
         except ImportError:
             # Fallback: return PNG if reportlab not available
-            img_buffer = BytesIO()
-            img.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            
             return Response(
-                content=img_buffer.getvalue(),
+                content=cached_qr_png(guestview_url, 15, 2, "H"),
                 media_type="image/png",
                 headers={
-                    "Content-Disposition": f"attachment; filename=qr-{property.name.replace(' ', '-')}.png"
+                    "Content-Disposition": f"attachment; filename={filename}.png"
                 }
             )
     except HTTPException:
@@ -1978,6 +2467,81 @@ def generate_qr_pdf(property_id: str, user: DBUser = Depends(get_current_user),
         logging.error(f"Error generating QR PDF: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate QR PDF")
 
+# ============ BULK QR SHEETS ============
+# Prozesse pro Uvicorn-Worker - höchstens die CPUs, die diesem Worker rechnerisch zustehen
+QR_BULK_WORKERS = max(1, min(int(os.environ.get('QR_BULK_WORKERS', 2)), (os.cpu_count() or 1) // WEB_CONCURRENCY))
+QR_BULK_MAX_PROPERTIES = int(os.environ.get('QR_BULK_MAX_PROPERTIES', 500))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class QRBulkRequest(BaseModel):
+    property_ids: Optional[List[str]] = None  # None = alle Properties des Users
+    format: str = "pdf"  # pdf, zip
+
+def _bulk_qr_pngs(items: list, box_size: int, border: int, error_correction: str) -> Iterator[bytes]:
+    """PNGs für (property, url)-Paare: Cache-Treffer direkt, Rest im Prozess-Pool"""
+    inputs = dict(box_size=box_size, border=border, error_correction=error_correction, fill_color=QR_FILL_COLOR)
+    cached = [qr_artifact_cache.get("png", url=url, **inputs) for _, url in items]
+    missing = [url for (_, url), png in zip(items, cached) if png is None]
+    rendered = render_qr_pngs([(url, box_size, border, error_correction) for url in missing], QR_BULK_WORKERS)
+    for (_, url), png in zip(items, cached):
+        if png is None:
+            png = next(rendered)
+            qr_artifact_cache.put("png", png, url=url, **inputs)
+        yield png
+
+@api_router.post("/properties/qr/bulk")
+def generate_bulk_qr(data: QRBulkRequest, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """QR-Codes für mehrere Properties: ein mehrseitiges PDF oder ein ZIP mit PNGs"""
+    if data.format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="Format muss 'pdf' oder 'zip' sein")
+    
+    query = db.query(DBProperty.id, DBProperty.name, DBProperty.address).filter(DBProperty.user_id == user.id)
+    if data.property_ids:
+        query = query.filter(DBProperty.id.in_(data.property_ids))
+    properties = query.order_by(DBProperty.name).limit(QR_BULK_MAX_PROPERTIES + 1).all()
+    
+    if not properties:
+        raise HTTPException(status_code=404, detail="Keine Properties gefunden")
+    if len(properties) > QR_BULK_MAX_PROPERTIES:
+        raise HTTPException(status_code=400, detail=f"Maximal {QR_BULK_MAX_PROPERTIES} Properties pro Export")
+    
+    items = [(p, _property_guestview_url(p)) for p in properties]
+    date_suffix = datetime.now().strftime('%Y%m%d')
+    
+    if data.format == "zip":
+        # Print-PNGs wie /qr/download, ZIP wird gestreamt während die Worker rendern
+        def files():
+            seen = set()
+            for (prop, _), png in zip(items, _bulk_qr_pngs(items, 20, 4, "H")):
+                name = f"qr-{prop.name.replace(' ', '-').replace('/', '-')}"
+                if name in seen:
+                    name = f"{name}-{prop.id}"
+                seen.add(name)
+                yield f"{name}.png", png
+        
+        return StreamingResponse(
+            iter_zip(files()),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename=qr-codes-{date_suffix}.zip"}
+        )
+    
+    try:
+        # Seiten wie /qr/pdf. Das PDF wird nicht gestreamt: reportlab baut es im
+        # Prozess-Pool komplett, erst danach wird es in Chunks gesendet.
+        pages = [(png, url, prop.name, prop.address) for (prop, url), png in zip(items, _bulk_qr_pngs(items, 15, 2, "H"))]
+        pdf = render_qr_sheet_pdf_pooled(pages, f"QR-Codes {user.name or user.email}", QR_BULK_WORKERS)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="PDF-Export nicht verfügbar (reportlab fehlt)")
+    except Exception as e:
+        logger.error(f"Fehler beim Bulk-QR-Export: {str(e)}")
+        raise HTTPException(status_code=500, detail="Fehler beim Erstellen der QR-Codes")
+    
+    return StreamingResponse(
+        (pdf[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(pdf), STREAM_CHUNK_SIZE)),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=qr-codes-{date_suffix}.pdf"}
+    )
+
 # ============ CHECKOUT MODELS & ROUTES ============
 
 class CheckoutItem(BaseModel):
@@ -1985,7 +2549,7 @@ class CheckoutItem(BaseModel):
     quantity: int = Field(ge=1, le=10)
     
 class CheckoutRequest(BaseModel):
-    property_id: int
+    property_id: Union[str, int]
     items: List[CheckoutItem]
     guest_name: str
     guest_email: str
@@ -1997,79 +2561,112 @@ class CheckoutResponse(BaseModel):
     payment_url: Optional[str] = None
     status: str
 
-# In-Memory Checkouts Store
-CHECKOUTS_STORE = {}
+# Checkouts in der DB (für alle Worker sichtbar), abgeschlossene zusätzlich im LRU-Cache
+CHECKOUT_PENDING_TTL_MINUTES = float(os.environ.get('CHECKOUT_PENDING_TTL_MINUTES', 60))
+CHECKOUT_CACHE_MAX_SIZE = int(os.environ.get('CHECKOUT_CACHE_MAX_SIZE', 2048))
+CHECKOUT_CACHE_TTL_SECONDS = float(os.environ.get('CHECKOUT_CACHE_TTL_SECONDS', 3600))
+
+checkout_cache = TTLCache("checkouts", maxsize=CHECKOUT_CACHE_MAX_SIZE, ttl=CHECKOUT_CACHE_TTL_SECONDS)
+checkout_store = CheckoutStore(
+    lambda: SessionLocal(), DBCheckout, DBCheckoutItem, checkout_cache,
+    pending_ttl_seconds=CHECKOUT_PENDING_TTL_MINUTES * 60,
+)
 
 @api_router.post("/checkout")
-def create_checkout(data: CheckoutRequest, user = Depends(get_current_user)):
-    """Create a new checkout/order"""
-    checkout_id = f"checkout-{uuid.uuid4().hex[:8]}"
-    
-    # Calculate total
-    extras = get_demo_extras()
-    total = 0.0
-    order_items = []
-    
-    for item in data.items:
-        extra = next((e for e in extras if e["id"] == item.extra_id), None)
-        if extra:
-            item_total = extra["price"] * item.quantity
-            total += item_total
-            order_items.append({
-                "extra_id": item.extra_id,
-                "name": extra["name"],
-                "price": extra["price"],
-                "quantity": item.quantity,
-                "total": item_total
-            })
-    
-    checkout = {
-        "id": checkout_id,
-        "property_id": data.property_id,
-        "items": order_items,
-        "guest_name": data.guest_name,
-        "guest_email": data.guest_email,
-        "payment_method": data.payment_method,
-        "subtotal": total,
-        "tax": round(total * 0.19, 2),
-        "total": round(total * 1.19, 2),
-        "status": "pending",
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    CHECKOUTS_STORE[checkout_id] = checkout
-    
-    # For demo: auto-complete payment
-    if data.payment_method == "stripe":
-        checkout["status"] = "completed"
-        checkout["payment_id"] = f"pi_{uuid.uuid4().hex[:24]}"
+def create_checkout(
+    data: CheckoutRequest,
+    user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
+    db: Session = Depends(get_db)
+):
+    """Create a new checkout/order (Idempotency-Key: Wiederholung liefert den ersten Checkout,
+    derselbe Key mit anderem Inhalt -> 422)"""
+    property_id = str(data.property_id)
+    request_hash = hashlib.sha256(
+        json.dumps({**data.model_dump(), "property_id": property_id}, sort_keys=True).encode()
+    ).hexdigest()
+    # Einmal wiederholen, falls der Katalog zwischen Preisindex und Commit geändert wurde
+    # Alles über die Request-Session (auch die von get_current_user) - eine Pool-Connection pro Request
+    for attempt in range(2):
+        index = extras_catalog.price_index(property_id, refresh=attempt > 0, db=db)
+        if index is None:
+            raise HTTPException(status_code=404, detail="Property nicht gefunden")
+        try:
+            order_items, total = index.price((item.extra_id, item.quantity) for item in data.items)
+        except UnknownExtra as e:
+            raise HTTPException(status_code=400, detail=f"Unbekanntes Extra: {e}")
+        
+        checkout = {
+            "property_id": property_id,
+            "guest_name": data.guest_name,
+            "guest_email": data.guest_email,
+            "payment_method": data.payment_method,
+            "subtotal": total,
+            "tax": round(total * 0.19, 2),
+            "total": round(total * 1.19, 2),
+            "status": "pending"
+        }
+        
+        # For demo: auto-complete payment
+        if data.payment_method == "stripe":
+            checkout["status"] = "completed"
+            checkout["payment_id"] = f"pi_{uuid.uuid4().hex[:24]}"
+        
+        def before_commit(db, index=index, order_items=order_items, completed=checkout["status"] == "completed"):
+            extras_catalog.check_version(db, index)
+            if completed:
+                extras_catalog.reserve(db, index, order_items)
+        
+        try:
+            checkout, _ = checkout_store.create(user.id, checkout, order_items, idempotency_key, before_commit,
+                                                db=db, request_hash=request_hash)
+            break
+        except IdempotencyKeyReused:
+            raise HTTPException(status_code=422, detail="Idempotency-Key wurde bereits für einen anderen Checkout verwendet")
+        except StalePriceIndex:
+            if attempt:
+                raise HTTPException(status_code=409, detail="Extras wurden gerade geändert, bitte erneut versuchen")
+        except OutOfStock as e:
+            raise HTTPException(status_code=409, detail=f"Extra ausverkauft: {e}")
     
     return CheckoutResponse(
-        checkout_id=checkout_id,
+        checkout_id=checkout["id"],
         total=checkout["total"],
         payment_url=None,
         status=checkout["status"]
     )
 
 @api_router.get("/checkout/{checkout_id}")
-def get_checkout(checkout_id: str):
+def get_checkout(checkout_id: str, db: Session = Depends(get_db)):
     """Get checkout details"""
-    checkout = CHECKOUTS_STORE.get(checkout_id)
+    checkout = checkout_store.get(checkout_id, db=db)
     if not checkout:
         raise HTTPException(status_code=404, detail="Checkout not found")
     return checkout
 
+def _reserve_stock(db: Session, checkout: dict):
+    """Bestand beim Bezahlen buchen (in der Transaktion von checkout_store.complete)"""
+    index = extras_catalog.price_index(checkout["property_id"], db=db)
+    if index is None:
+        return
+    try:
+        extras_catalog.check_version(db, index)
+    except StalePriceIndex:
+        index = extras_catalog.price_index(checkout["property_id"], refresh=True, db=db)
+    extras_catalog.reserve(db, index, checkout["items"])
+
 @api_router.post("/checkout/{checkout_id}/complete")
-def complete_checkout(checkout_id: str, user = Depends(get_current_user)):
+def complete_checkout(checkout_id: str, user = Depends(get_current_user), db: Session = Depends(get_db)):
     """Complete a checkout (simulate payment)"""
-    checkout = CHECKOUTS_STORE.get(checkout_id)
+    try:
+        checkout = checkout_store.complete(checkout_id, f"pi_{uuid.uuid4().hex[:24]}", _reserve_stock, db=db)
+    except CheckoutExpired:
+        raise HTTPException(status_code=409, detail="Checkout abgelaufen")
+    except OutOfStock as e:
+        raise HTTPException(status_code=409, detail=f"Extra ausverkauft: {e}")
     if not checkout:
         raise HTTPException(status_code=404, detail="Checkout not found")
     
-    checkout["status"] = "completed"
-    checkout["completed_at"] = datetime.now(timezone.utc).isoformat()
-    checkout["payment_id"] = f"pi_{uuid.uuid4().hex[:24]}"
-    
     return checkout
 
 # ============ PAYPAL WEBHOOK ============
@@ -2155,6 +2752,31 @@ def update_reminder_settings(data: ReminderSettings, user: DBUser = Depends(get_
     }
 
 # ============ CRON JOBS ============
+# Set-basiert: Buchungen werden mit Property/Host in einer JOIN-Query geladen,
+# E-Mails landen in Chunks in der Mail-Outbox (ein Commit pro Chunk).
+CRON_MAIL_CHUNK_SIZE = int(os.environ.get('CRON_MAIL_CHUNK_SIZE', 200))
+
+def _day_range(day):
+    """Start/Ende eines Tages (UTC) für Datumsfilter"""
+    return (
+        datetime.combine(day, datetime.min.time()).replace(tzinfo=timezone.utc),
+        datetime.combine(day, datetime.max.time()).replace(tzinfo=timezone.utc)
+    )
+
+def _enqueue_mail_chunked(db: Session, send_fn, mails) -> int:
+    """Reihe E-Mails (kwargs je Mail) in die Outbox ein, Commit alle CRON_MAIL_CHUNK_SIZE"""
+    queued = 0
+    pending = 0
+    for kwargs in mails:
+        if send_fn(db=db, **kwargs):
+            queued += 1
+        pending += 1
+        if pending >= CRON_MAIL_CHUNK_SIZE:
+            db.commit()
+            pending = 0
+    db.commit()
+    return queued
+
 @api_router.post("/cron/booking-reminders")
 async def send_booking_reminders(db: Session = Depends(get_db)):
     """
@@ -2165,32 +2787,35 @@ async def send_booking_reminders(db: Session = Depends(get_db)):
     try:
         # Get bookings with check-in tomorrow
         tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).date()
+        day_start, day_end = _day_range(tomorrow)
         
-        # Query real bookings with check-in tomorrow
+        # Query real bookings with check-in tomorrow (eine Query inkl. Property)
         reminders_sent = 0
         try:
-            bookings = db.query(DBBooking).filter(
-                DBBooking.check_in >= datetime.combine(tomorrow, datetime.min.time()).replace(tzinfo=timezone.utc),
-                DBBooking.check_in < datetime.combine(tomorrow, datetime.max.time()).replace(tzinfo=timezone.utc),
-                DBBooking.status == "confirmed"
+            rows = db.query(
+                DBBooking.guest_email, DBBooking.guest_name, DBBooking.check_in, DBBooking.check_out,
+                DBBooking.guests, DBBooking.total_price, DBProperty.name
+            ).join(DBProperty, DBProperty.id == DBBooking.property_id).filter(
+                DBBooking.check_in >= day_start,
+                DBBooking.check_in < day_end,
+                DBBooking.status == "confirmed",
+                DBBooking.guest_email.isnot(None),
+                DBBooking.guest_email != ""
             ).all()
             
-            for booking in bookings:
-                # Get property for booking
-                property = db.query(DBProperty).filter(DBProperty.id == booking.property_id).first()
-                if property and booking.guest_email:
-                    # Send reminder email
-                    send_booking_confirmation_email(
-                        email=booking.guest_email,
-                        name=booking.guest_name or "Gast",
-                        property_name=property.name,
-                        checkin=booking.check_in.strftime("%d.%m.%Y"),
-                        checkout=booking.check_out.strftime("%d.%m.%Y"),
-                        guests=booking.guests or 1,
-                        total=booking.total_price or 0
-                    )
-                    reminders_sent += 1
+            reminders_sent = _enqueue_mail_chunked(db, send_booking_confirmation_email, (
+                dict(
+                    email=row.guest_email,
+                    name=row.guest_name or "Gast",
+                    property_name=row.name,
+                    checkin=row.check_in.strftime("%d.%m.%Y"),
+                    checkout=row.check_out.strftime("%d.%m.%Y"),
+                    guests=row.guests or 1,
+                    total=row.total_price or 0
+                ) for row in rows
+            ))
         except Exception as query_error:
+            db.rollback()
             logger.warning(f"Could not query bookings (demo mode?): {query_error}")
         
         logger.info(f"Booking reminders sent: {reminders_sent}")
@@ -2213,35 +2838,40 @@ async def send_guest_welcome_emails(db: Session = Depends(get_db)):
     """
     try:
         today = datetime.now(timezone.utc).date()
+        day_start, day_end = _day_range(today)
         
-        # Query real bookings with check-in today
+        # Query real bookings with check-in today (eine Query inkl. Property und Host)
         welcomes_sent = 0
         try:
-            bookings = db.query(DBBooking).filter(
-                DBBooking.check_in >= datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc),
-                DBBooking.check_in < datetime.combine(today, datetime.max.time()).replace(tzinfo=timezone.utc),
-                DBBooking.status == "confirmed"
+            rows = db.query(
+                DBBooking.guest_email, DBBooking.guest_name, DBBooking.check_in, DBBooking.check_out,
+                DBProperty.name.label("property_name"), DBProperty.wifi_name, DBProperty.wifi_password,
+                DBUser.name.label("host_name")
+            ).join(DBProperty, DBProperty.id == DBBooking.property_id).outerjoin(
+                DBUser, DBUser.id == DBBooking.user_id
+            ).filter(
+                DBBooking.check_in >= day_start,
+                DBBooking.check_in < day_end,
+                DBBooking.status == "confirmed",
+                DBBooking.guest_email.isnot(None),
+                DBBooking.guest_email != ""
             ).all()
             
-            for booking in bookings:
-                # Get property details for WiFi
-                property = db.query(DBProperty).filter(DBProperty.id == booking.property_id).first()
-                user = db.query(DBUser).filter(DBUser.id == booking.user_id).first()
-                
-                if property and booking.guest_email:
-                    send_guest_welcome_email(
-                        email=booking.guest_email,
-                        guest_name=booking.guest_name or "Gast",
-                        property_name=property.name,
-                        host_name=user.name if user else "Ihr Gastgeber",
-                        checkin=booking.check_in.strftime("%d.%m.%Y"),
-                        checkout=booking.check_out.strftime("%d.%m.%Y"),
-                        wifi_name=getattr(property, 'wifi_name', 'WLAN'),
-                        wifi_password=getattr(property, 'wifi_password', ''),
-                        guestview_url=f"https://www.welcome-link.de/guestview/{property.public_id}" if hasattr(property, 'public_id') else ""
-                    )
-                    welcomes_sent += 1
+            welcomes_sent = _enqueue_mail_chunked(db, send_guest_welcome_email, (
+                dict(
+                    email=row.guest_email,
+                    guest_name=row.guest_name or "Gast",
+                    property_name=row.property_name,
+                    host_name=row.host_name or "Ihr Gastgeber",
+                    checkin=row.check_in.strftime("%d.%m.%Y"),
+                    checkout=row.check_out.strftime("%d.%m.%Y"),
+                    wifi_name=row.wifi_name,
+                    wifi_password=row.wifi_password,
+                    guestview_url=""
+                ) for row in rows
+            ))
         except Exception as query_error:
+            db.rollback()
             logger.warning(f"Could not query bookings (demo mode?): {query_error}")
         
         logger.info(f"Guest welcome emails sent: {welcomes_sent}")
@@ -2264,31 +2894,35 @@ async def send_checkout_followup_emails(db: Session = Depends(get_db)):
     """
     try:
         yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).date()
+        day_start, day_end = _day_range(yesterday)
         
-        # Query real bookings with checkout yesterday
+        # Query real bookings with checkout yesterday (eine Query inkl. Property)
         followups_sent = 0
         try:
-            bookings = db.query(DBBooking).filter(
-                DBBooking.check_out >= datetime.combine(yesterday, datetime.min.time()).replace(tzinfo=timezone.utc),
-                DBBooking.check_out < datetime.combine(yesterday, datetime.max.time()).replace(tzinfo=timezone.utc),
-                DBBooking.status == "completed"
+            rows = db.query(
+                DBBooking.id, DBBooking.guest_email, DBBooking.guest_name, DBBooking.total_price,
+                DBBooking.payment_method, DBProperty.name
+            ).join(DBProperty, DBProperty.id == DBBooking.property_id).filter(
+                DBBooking.check_out >= day_start,
+                DBBooking.check_out < day_end,
+                DBBooking.status == "completed",
+                DBBooking.guest_email.isnot(None),
+                DBBooking.guest_email != ""
             ).all()
             
-            for booking in bookings:
-                property = db.query(DBProperty).filter(DBProperty.id == booking.property_id).first()
-                
-                if property and booking.guest_email:
-                    # Send follow-up email asking for feedback
-                    send_payment_receipt_email(
-                        email=booking.guest_email,
-                        name=booking.guest_name or "Gast",
-                        amount=booking.total_price or 0,
-                        payment_method=booking.payment_method or "none",
-                        transaction_id=booking.id,
-                        property_name=property.name
-                    )
-                    followups_sent += 1
+            # Send follow-up email asking for feedback
+            followups_sent = _enqueue_mail_chunked(db, send_payment_receipt_email, (
+                dict(
+                    email=row.guest_email,
+                    name=row.guest_name or "Gast",
+                    amount=row.total_price or 0,
+                    payment_method=row.payment_method or "none",
+                    transaction_id=row.id,
+                    property_name=row.name
+                ) for row in rows
+            ))
         except Exception as query_error:
+            db.rollback()
             logger.warning(f"Could not query bookings (demo mode?): {query_error}")
         
         logger.info(f"Checkout followup emails sent: {followups_sent}")
@@ -2303,6 +2937,47 @@ async def send_checkout_followup_emails(db: Session = Depends(get_db)):
         logger.error(f"Checkout followup error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/cron/expire-checkouts")
+def expire_checkouts():
+    """
+    Offene Checkouts nach CHECKOUT_PENDING_TTL_MINUTES auf expired setzen.
+    Lesen zeigt abgelaufene sofort als expired; der Job räumt den Status in der DB auf.
+    """
+    try:
+        return {"status": "success", "expired": checkout_store.expire_pending()}
+    except Exception as e:
+        logger.error(f"Checkout expiry error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+DAILY_STATS_BACKFILL_DAYS = int(os.environ.get('DAILY_STATS_BACKFILL_DAYS', 3))
+# full=true liest die komplette Historie - nur mit X-Cron-Secret (leer = gesperrt,
+# die einmalige Befüllung übernimmt migrate.py)
+CRON_SECRET = os.environ.get('CRON_SECRET', '')
+
+@api_router.post("/cron/daily-stats")
+def backfill_daily_stats(full: bool = False, x_cron_secret: Optional[str] = Header(None),
+                         db: Session = Depends(get_db)):
+    """
+    Reconcile daily_property_stats with bookings and reviews.
+    This endpoint should be called by a cron job nightly.
+    Rebuilds the last DAILY_STATS_BACKFILL_DAYS days (full=true: complete history, requires X-Cron-Secret).
+    """
+    today = datetime.now(timezone.utc).date()
+    start_day = today - timedelta(days=DAILY_STATS_BACKFILL_DAYS - 1)
+    if full:
+        if not CRON_SECRET or not hmac.compare_digest(x_cron_secret or '', CRON_SECRET):
+            raise HTTPException(status_code=403, detail="Voller Backfill nur mit Cron-Secret")
+        start_day = first_activity_day(db) or today
+    try:
+        result = rebuild_daily_stats(db, start_day, today)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Daily stats backfill error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"✓ daily_property_stats neu berechnet: {result}")
+    return {"status": "success", **result}
+
 # ============ STRIPE CONFIG ============
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
 
@@ -2377,142 +3052,164 @@ class WebhookEndpointUpdate(BaseModel):
     events: Optional[List[str]] = None
     is_active: Optional[bool] = None
 
-# In-memory storage for webhooks (in production, use database)
-WEBHOOKS_STORE = {}
+def _webhook_to_dict(webhook) -> dict:
+    return {
+        "id": webhook.id,
+        "url": webhook.url,
+        "events": json.loads(webhook.events or '[]'),
+        "secret": webhook.secret,
+        "is_active": webhook.is_active,
+        "created_at": webhook.created_at.isoformat() if webhook.created_at else None,
+        "last_triggered": webhook.last_triggered.isoformat() if webhook.last_triggered else None,
+        "success_count": webhook.success_count or 0,
+        "failure_count": webhook.failure_count or 0
+    }
+
+def _get_user_webhook(db: Session, webhook_id: str, user_id: str):
+    webhook = db.query(DBWebhookEndpoint).filter(
+        DBWebhookEndpoint.id == webhook_id,
+        DBWebhookEndpoint.user_id == user_id
+    ).first()
+    if not webhook:
+        raise HTTPException(status_code=404, detail="Webhook nicht gefunden")
+    return webhook
 
 @api_router.get("/webhooks")
-def get_webhooks(user: DBUser = Depends(get_current_user)):
+def get_webhooks(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all webhook endpoints for user"""
-    user_webhooks = WEBHOOKS_STORE.get(str(user.id), [])
-    return {"webhooks": user_webhooks}
+    webhooks = db.query(DBWebhookEndpoint).filter(
+        DBWebhookEndpoint.user_id == str(user.id)
+    ).order_by(DBWebhookEndpoint.created_at).all()
+    return {"webhooks": [_webhook_to_dict(w) for w in webhooks]}
 
 @api_router.post("/webhooks")
-def create_webhook(data: WebhookEndpoint, user: DBUser = Depends(get_current_user)):
+def create_webhook(data: WebhookEndpoint, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new webhook endpoint"""
-    import httpx
-    
-    webhook_id = str(uuid.uuid4())
-    webhook = {
-        "id": webhook_id,
-        "url": data.url,
-        "events": data.events,
-        "secret": data.secret or secrets.token_urlsafe(32),
-        "is_active": data.is_active,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "last_triggered": None,
-        "success_count": 0,
-        "failure_count": 0
-    }
-    
-    if str(user.id) not in WEBHOOKS_STORE:
-        WEBHOOKS_STORE[str(user.id)] = []
-    
-    WEBHOOKS_STORE[str(user.id)].append(webhook)
+    webhook = DBWebhookEndpoint(
+        id=str(uuid.uuid4()),
+        user_id=str(user.id),
+        url=data.url,
+        events=json.dumps(data.events),
+        secret=data.secret or secrets.token_urlsafe(32),
+        is_active=data.is_active,
+        success_count=0,
+        failure_count=0
+    )
+    db.add(webhook)
+    db.commit()
+    db.refresh(webhook)
     
-    return {"message": "Webhook erstellt", "webhook": webhook}
+    return {"message": "Webhook erstellt", "webhook": _webhook_to_dict(webhook)}
 
 @api_router.put("/webhooks/{webhook_id}")
-def update_webhook(webhook_id: str, data: WebhookEndpointUpdate, user: DBUser = Depends(get_current_user)):
+def update_webhook(webhook_id: str, data: WebhookEndpointUpdate, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update webhook endpoint"""
-    user_webhooks = WEBHOOKS_STORE.get(str(user.id), [])
-    
-    for webhook in user_webhooks:
-        if webhook["id"] == webhook_id:
-            if data.url:
-                webhook["url"] = data.url
-            if data.events:
-                webhook["events"] = data.events
-            if data.is_active is not None:
-                webhook["is_active"] = data.is_active
-            return {"message": "Webhook aktualisiert", "webhook": webhook}
-    
-    raise HTTPException(status_code=404, detail="Webhook nicht gefunden")
+    webhook = _get_user_webhook(db, webhook_id, str(user.id))
+    if data.url:
+        webhook.url = data.url
+    if data.events:
+        webhook.events = json.dumps(data.events)
+    if data.is_active is not None:
+        webhook.is_active = data.is_active
+    db.commit()
+    db.refresh(webhook)
+    return {"message": "Webhook aktualisiert", "webhook": _webhook_to_dict(webhook)}
 
 @api_router.delete("/webhooks/{webhook_id}")
-def delete_webhook(webhook_id: str, user: DBUser = Depends(get_current_user)):
+def delete_webhook(webhook_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Delete webhook endpoint"""
-    user_webhooks = WEBHOOKS_STORE.get(str(user.id), [])
-    
-    for i, webhook in enumerate(user_webhooks):
-        if webhook["id"] == webhook_id:
-            user_webhooks.pop(i)
-            return {"message": "Webhook gelöscht"}
-    
-    raise HTTPException(status_code=404, detail="Webhook nicht gefunden")
+    webhook = _get_user_webhook(db, webhook_id, str(user.id))
+    db.query(DBWebhookDelivery).filter(
+        DBWebhookDelivery.endpoint_id == webhook.id,
+        DBWebhookDelivery.status.in_(['pending', 'dead'])
+    ).delete(synchronize_session=False)
+    db.delete(webhook)
+    db.commit()
+    return {"message": "Webhook gelöscht"}
+
+@api_router.get("/webhooks/{webhook_id}/deliveries")
+def get_webhook_deliveries(webhook_id: str, status: Optional[str] = None, limit: int = 50,
+                           user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Letzte Zustellungen eines Webhooks (inkl. Dead-Letter)"""
+    webhook = _get_user_webhook(db, webhook_id, str(user.id))
+    query = db.query(DBWebhookDelivery).filter(DBWebhookDelivery.endpoint_id == webhook.id)
+    if status:
+        query = query.filter(DBWebhookDelivery.status == status)
+    deliveries = query.order_by(DBWebhookDelivery.created_at.desc()).limit(min(limit, 200)).all()
+    return {"deliveries": [{
+        "id": d.id,
+        "event": d.event_type,
+        "status": d.status,
+        "attempts": d.attempts,
+        "last_status_code": d.last_status_code,
+        "last_error": d.last_error,
+        "next_attempt_at": d.next_attempt_at.isoformat() if d.next_attempt_at else None,
+        "delivered_at": d.delivered_at.isoformat() if d.delivered_at else None,
+        "created_at": d.created_at.isoformat() if d.created_at else None
+    } for d in deliveries]}
+
+@api_router.post("/webhooks/{webhook_id}/deliveries/{delivery_id}/retry")
+def retry_webhook_delivery(webhook_id: str, delivery_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Stelle eine Dead-Letter-Zustellung erneut in die Outbox"""
+    webhook = _get_user_webhook(db, webhook_id, str(user.id))
+    delivery = db.query(DBWebhookDelivery).filter(
+        DBWebhookDelivery.id == delivery_id,
+        DBWebhookDelivery.endpoint_id == webhook.id
+    ).first()
+    if not delivery:
+        raise HTTPException(status_code=404, detail="Zustellung nicht gefunden")
+    if delivery.status != 'dead':
+        raise HTTPException(status_code=400, detail="Nur fehlgeschlagene Zustellungen können wiederholt werden")
+    delivery.status = 'pending'
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.now(timezone.utc)
+    db.commit()
+    webhook_dispatcher.notify()
+    return {"message": "Zustellung erneut eingereiht"}
 
 @api_router.post("/webhooks/{webhook_id}/test")
-def test_webhook(webhook_id: str, user: DBUser = Depends(get_current_user)):
+def test_webhook(webhook_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Test webhook endpoint by sending a test payload"""
     import httpx
     
-    user_webhooks = WEBHOOKS_STORE.get(str(user.id), [])
-    
-    for webhook in user_webhooks:
-        if webhook["id"] == webhook_id:
-            test_payload = {
-                "event": "test",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "data": {
-                    "message": "This is a test webhook",
-                    "user_id": str(user.id)
-                }
-            }
-            
-            try:
-                response = httpx.post(
-                    webhook["url"],
-                    json=test_payload,
-                    headers={
-                        "Content-Type": "application/json",
-                        "X-Webhook-Secret": webhook["secret"]
-                    },
-                    timeout=10.0
-                )
-                
-                return {
-                    "success": response.status_code == 200,
-                    "status_code": response.status_code,
-                    "response": response.text[:500]
-                }
-            except Exception as e:
-                return {"success": False, "error": str(e)}
-    
-    raise HTTPException(status_code=404, detail="Webhook nicht gefunden")
-
-def trigger_webhooks(event_type: str, data: dict, user_id: str):
-    """Internal function to trigger webhooks for events"""
-    import httpx
-    
-    user_webhooks = WEBHOOKS_STORE.get(user_id, [])
+    webhook = _get_user_webhook(db, webhook_id, str(user.id))
+    test_payload = json.dumps({
+        "event": "test",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "data": {
+            "message": "This is a test webhook",
+            "user_id": str(user.id)
+        }
+    })
     
-    for webhook in user_webhooks:
-        if not webhook["is_active"]:
-            continue
-        
-        if event_type not in webhook["events"]:
-            continue
+    try:
+        response = httpx.post(
+            webhook.url,
+            content=test_payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Webhook-Signature": sign_payload(test_payload, webhook.secret),
+                "X-Webhook-Timestamp": datetime.now(timezone.utc).isoformat(),
+                "X-Webhook-Event": "test"
+            },
+            timeout=10.0
+        )
         
-        payload = {
-            "event": event_type,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "data": data
+        return {
+            "success": response.status_code == 200,
+            "status_code": response.status_code,
+            "response": response.text[:500]
         }
-        
-        try:
-            httpx.post(
-                webhook["url"],
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "X-Webhook-Secret": webhook["secret"]
-                },
-                timeout=5.0
-            )
-            webhook["success_count"] = webhook.get("success_count", 0) + 1
-            webhook["last_triggered"] = datetime.now(timezone.utc).isoformat()
-        except Exception as e:
-            webhook["failure_count"] = webhook.get("failure_count", 0) + 1
-            logger.error(f"Webhook delivery failed: {e}")
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def trigger_webhooks(event_type: str, data: dict, user_id: str, db: Session):
+    """Schreibe Webhook-Events in die Outbox (Commit erfolgt mit der fachlichen Änderung)"""
+    queued = enqueue_event(db, user_id, event_type, data)
+    if queued:
+        # Dispatcher erst nach dem Commit des Aufrufers wecken
+        sa_event.listen(db, "after_commit", lambda session: webhook_dispatcher.notify(), once=True)
+    return queued
 
 # ============ GOOGLE CALENDAR SYNC ============
 
@@ -2620,7 +3317,7 @@ def disconnect_calendar(user: DBUser = Depends(get_current_user)):
 # ============ CHECKOUT ENDPOINTS ============
 def get_invoice(checkout_id: str):
     """Get invoice PDF for checkout"""
-    checkout = CHECKOUTS_STORE.get(checkout_id)
+    checkout = checkout_store.get(checkout_id)
     if not checkout:
         raise HTTPException(status_code=404, detail="Checkout not found")
     
@@ -2681,6 +3378,7 @@ def update_property(property_id: int, data: PropertyUpdate, user = Depends(get_c
     
     db.commit()
     db.refresh(prop)
+    invalidate_guestview(prop.user_id)
     
     # Return full property data
     return {
@@ -2888,11 +3586,13 @@ def get_feedback_list(
     rating: Optional[int] = None,
     is_public: Optional[bool] = None,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     offset: int = 0,
     user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get feedback list for user's properties"""
+    """Get feedback list for user's properties (Keyset: next_cursor als cursor übergeben)"""
     query = db.query(DBFeedback).filter(DBFeedback.user_id == user.id)
     
     if property_id:
@@ -2902,15 +3602,16 @@ def get_feedback_list(
     if is_public is not None:
         query = query.filter(DBFeedback.is_public == is_public)
     
-    total = query.count()
-    feedbacks = query.order_by(DBFeedback.created_at.desc()).offset(offset).limit(limit).all()
+    page = paginate(query, DBFeedback.created_at, DBFeedback.id, limit, cursor, count, offset)
+    feedbacks = page.items
     
     # Get property names
     property_ids = list(set(f.property_id for f in feedbacks))
     properties = {str(p.id): p.name for p in db.query(DBProperty).filter(DBProperty.id.in_(property_ids)).all()}
     
     return {
-        "total": total,
+        "total": page.total,
+        "next_cursor": page.next_cursor,
         "feedback": [
             {
                 "id": f.id,
@@ -3084,75 +3785,107 @@ def get_public_feedback(property_id: str, db: Session = Depends(get_db)):
     }
 
 # ============ STATS ENDPOINTS ============
+# Lesen aus daily_property_stats statt aus den Buchungen
+GERMAN_MONTHS = ["Jan", "Feb", "Mär", "Apr", "Mai", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dez"]
+
+class BookingStatsFilter(BaseModel):
+    start_date: Optional[str] = None  # YYYY-MM-DD
+    end_date: Optional[str] = None
+    property_id: Optional[str] = None
+
+def _parse_day(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Ungültiges Datum: {value}")
+
+def _booking_stats(totals: dict) -> dict:
+    return {
+        "total_bookings": totals["bookings"],
+        "confirmed_bookings": totals["confirmed"],
+        "completed_bookings": totals["completed"],
+        "cancelled_bookings": totals["cancellations"],
+        "total_revenue": round(totals["revenue"], 2),
+        "avg_booking_value": totals["avg_booking_value"],
+    }
+
 @api_router.get("/stats/global")
 def get_global_stats(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get global statistics for user"""
     # Get property count
     property_count = db.query(DBProperty).filter(DBProperty.user_id == user.id).count()
+    totals = rollup_totals(db, owned_by(user.id))
+    
+    # Letzte 7 Monate (Jahr + Monat als Schlüssel)
+    today = datetime.now(timezone.utc).date()
+    month_starts = last_months(today, 7)
+    months = [(month.year, month.month) for month in month_starts]
+    monthly = {}
+    for day, bookings, revenue in rollup_per_day(db, owned_by(user.id), *in_days(month_starts[0])):
+        key = (day.year, day.month)
+        count, total = monthly.get(key, (0, 0))
+        monthly[key] = (count + bookings, total + revenue)
     
     return {
         "total_properties": property_count,
-        "total_bookings": 42,
-        "confirmed_bookings": 38,
-        "completed_bookings": 35,
-        "cancelled_bookings": 4,
-        "total_revenue": 5280.00,
-        "avg_booking_value": 125.71,
-        "total_guests": 89,
-        "avg_rating": 4.8,
-        "period_start": "2026-01-01",
-        "period_end": "2026-03-06",
+        **_booking_stats(totals),
+        "total_guests": totals["guests"],
+        "avg_rating": totals["avg_rating"],
+        "period_start": (totals["first_day"] or today).isoformat(),
+        "period_end": today.isoformat(),
         "chart_data": {
-            "bookings": [12, 15, 18, 22, 28, 35, 42],
-            "revenue": [1200, 1500, 1800, 2200, 2800, 3500, 4200],
-            "months": ["Jan", "Feb", "Mär", "Apr", "Mai", "Jun", "Jul"]
+            "bookings": [monthly.get(key, (0, 0))[0] for key in months],
+            "revenue": [round(monthly.get(key, (0, 0))[1], 2) for key in months],
+            "months": [GERMAN_MONTHS[m - 1] for _, m in months]
         }
     }
 
 @api_router.post("/stats/booking/filter")
-def get_booking_stats(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_booking_stats(filter: Optional[BookingStatsFilter] = None, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get booking statistics with optional filters"""
+    filter = filter or BookingStatsFilter()
+    start_day, end_day = _parse_day(filter.start_date), _parse_day(filter.end_date)
+    criteria = [owned_by(user.id), *in_days(start_day, end_day)]
+    if filter.property_id:
+        criteria.append(DBDailyPropertyStats.property_id == str(filter.property_id))
+    totals = rollup_totals(db, *criteria)
+    
     return {
-        "total_bookings": 42,
-        "confirmed_bookings": 38,
-        "completed_bookings": 35,
-        "cancelled_bookings": 4,
-        "total_revenue": 5280.00,
-        "avg_booking_value": 125.71,
-        "period_start": "2026-01-01",
-        "period_end": "2026-03-04",
-        "filters_applied": {}
+        **_booking_stats(totals),
+        "period_start": (start_day or totals["first_day"] or datetime.now(timezone.utc).date()).isoformat(),
+        "period_end": (end_day or datetime.now(timezone.utc).date()).isoformat(),
+        "filters_applied": filter.model_dump(exclude_none=True)
     }
 
 # ============ EXPORT ENDPOINTS ============
 @api_router.get("/export/bookings/csv")
 def export_bookings_csv(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Export bookings as CSV with real data"""
-    from fastapi.responses import StreamingResponse
-    import io
-    
-    # Get user's properties for name lookup
-    properties = {str(p.id): p.name for p in db.query(DBProperty).filter(DBProperty.user_id == user.id).all()}
-    
-    # Fetch real bookings
-    bookings = db.query(DBBooking).filter(DBBooking.user_id == user.id).order_by(DBBooking.check_in.desc()).all()
-    
-    output = io.StringIO()
-    # CSV Header
-    output.write("Booking ID,Guest Name,Email,Phone,Property,Check-in,Check-out,Nights,Guests,Status,Total Price,Payment Method,Created At\n")
-    
-    # CSV Data
-    for b in bookings:
-        nights = 0
-        if b.check_in and b.check_out:
-            nights = (b.check_out - b.check_in).days
-        
-        output.write(f"{b.id},{b.guest_name or ''},{b.guest_email or ''},{b.guest_phone or ''},{properties.get(str(b.property_id), 'Unknown')},{b.check_in.strftime('%Y-%m-%d') if b.check_in else ''},{b.check_out.strftime('%Y-%m-%d') if b.check_out else ''},{nights},{b.guests or 1},{b.status or 'pending'},{b.total_price or 0},{b.payment_method or ''},{b.created_at.strftime('%Y-%m-%d %H:%M') if b.created_at else ''}\n")
-    
-    output.seek(0)
+    """Export bookings as CSV with real data (gestreamt)"""
+    stmt = select(
+        DBBooking.id, DBBooking.guest_name, DBBooking.guest_email, DBBooking.guest_phone,
+        DBProperty.name, DBBooking.check_in, DBBooking.check_out, DBBooking.guests,
+        DBBooking.status, DBBooking.total_price, DBBooking.payment_method, DBBooking.created_at
+    ).outerjoin(
+        DBProperty, (DBProperty.id == DBBooking.property_id) & (DBProperty.user_id == DBBooking.user_id)
+    ).where(DBBooking.user_id == user.id).order_by(DBBooking.check_in.desc())
+    
+    def format_row(b):
+        nights = (b.check_out - b.check_in).days if b.check_in and b.check_out else 0
+        return (
+            b.id, b.guest_name or '', b.guest_email or '', b.guest_phone or '', b.name or 'Unknown',
+            b.check_in.strftime('%Y-%m-%d') if b.check_in else '',
+            b.check_out.strftime('%Y-%m-%d') if b.check_out else '',
+            nights, b.guests or 1, b.status or 'pending', b.total_price or 0, b.payment_method or '',
+            b.created_at.strftime('%Y-%m-%d %H:%M') if b.created_at else ''
+        )
     
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_csv(SessionLocal, stmt, [
+            "Booking ID", "Guest Name", "Email", "Phone", "Property", "Check-in", "Check-out",
+            "Nights", "Guests", "Status", "Total Price", "Payment Method", "Created At"
+        ], format_row),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=bookings_export_{datetime.now().strftime('%Y%m%d')}.csv"}
     )
@@ -3248,20 +3981,19 @@ def export_bookings_pdf(user: DBUser = Depends(get_current_user), db: Session =
 
 @api_router.get("/export/properties/csv")
 def export_properties_csv(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Export properties as CSV"""
-    from fastapi.responses import StreamingResponse
-    import io
-    
-    properties = db.query(DBProperty).filter(DBProperty.user_id == user.id).all()
+    """Export properties as CSV (gestreamt)"""
+    stmt = select(
+        DBProperty.id, DBProperty.name, DBProperty.address, DBProperty.wifi_name,
+        DBProperty.checkin_time, DBProperty.checkout_time
+    ).where(DBProperty.user_id == user.id).order_by(DBProperty.created_at)
     
-    output = io.StringIO()
-    output.write("Property ID,Name,Address,WiFi Name,Check-in Time,Check-out Time\n")
-    for p in properties:
-        output.write(f"{p.id},{p.name},{p.address or ''},{p.wifi_name or ''},{p.checkin_time or '15:00'},{p.checkout_time or '11:00'}\n")
-    output.seek(0)
+    def format_row(p):
+        return (p.id, p.name, p.address or '', p.wifi_name or '', p.checkin_time or '15:00', p.checkout_time or '11:00')
     
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_csv(SessionLocal, stmt, [
+            "Property ID", "Name", "Address", "WiFi Name", "Check-in Time", "Check-out Time"
+        ], format_row),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=properties_export.csv"}
     )
@@ -3319,96 +4051,88 @@ def export_bookings_ical(user: DBUser = Depends(get_current_user), db: Session =
     )
 
 # ============ ADMIN ENDPOINTS ============
+# Dashboard-Statistiken per GROUP BY; Ergebnis pro (User, Zeitraum) kurz gecacht
+ADMIN_STATS_CACHE_TTL_SECONDS = float(os.environ.get('ADMIN_STATS_CACHE_TTL_SECONDS', 30))
+
+admin_stats_cache = TTLCache("admin_stats", maxsize=1024, ttl=ADMIN_STATS_CACHE_TTL_SECONDS)
+
+
 @api_router.get("/admin/stats")
 def get_admin_stats(date_range: str = "7d", user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get admin statistics for dashboard with real data"""
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
+    if date_range not in ("7d", "30d", "90d"):
+        date_range = "7d"
+    cache_key = (user.id, date_range)
+    cached = admin_stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Calculate date range
     now = datetime.now(timezone.utc)
-    if date_range == "30d":
-        start_date = now - timedelta(days=30)
-    elif date_range == "90d":
-        start_date = now - timedelta(days=90)
-    else:  # 7d
-        start_date = now - timedelta(days=7)
+    start_date = now - timedelta(days={"7d": 7, "30d": 30, "90d": 90}[date_range])
+    in_range = (DBBooking.user_id == user.id, DBBooking.created_at >= start_date)
+    confirmed_revenue = func.coalesce(func.sum(case((DBBooking.status == 'confirmed', DBBooking.total_price), else_=0)), 0)
     
-    # Get user's properties
-    properties = db.query(DBProperty).filter(DBProperty.user_id == user.id).all()
-    property_ids = [p.id for p in properties]
-    properties_count = len(properties)
+    properties_count = db.query(func.count(DBProperty.id)).filter(DBProperty.user_id == user.id).scalar()
     
-    # Get bookings in date range
-    bookings_query = db.query(DBBooking).filter(
-        DBBooking.user_id == user.id,
-        DBBooking.created_at >= start_date
-    )
-    bookings = bookings_query.all()
-    
-    # Calculate real stats
-    total_bookings = len(bookings)
-    confirmed_bookings = [b for b in bookings if b.status == 'confirmed']
-    total_revenue = sum(b.total_price or 0 for b in confirmed_bookings)
-    total_guests = sum(b.guests or 1 for b in bookings)
+    # Totals in einer Aggregat-Query
+    total_bookings, total_revenue, total_guests = db.query(
+        func.count(DBBooking.id),
+        confirmed_revenue,
+        func.coalesce(func.sum(func.coalesce(DBBooking.guests, 1)), 0)
+    ).filter(*in_range).one()
     
     # Get guest views for QR scans
-    guest_views = db.query(DBGuestView).filter(
+    guest_views = db.query(func.count(DBGuestView.id)).filter(
         DBGuestView.user_id == user.id,
         DBGuestView.created_at >= start_date
-    ).count() if hasattr(DBGuestView, 'created_at') else len(properties) * 50
+    ).scalar()
     
     # Calculate trends (compare with previous period)
     prev_start = start_date - (now - start_date)
-    prev_bookings = db.query(DBBooking).filter(
+    prev_bookings = db.query(func.count(DBBooking.id)).filter(
         DBBooking.user_id == user.id,
         DBBooking.created_at >= prev_start,
         DBBooking.created_at < start_date
-    ).count()
+    ).scalar()
     
     bookings_trend_percent = 0
     if prev_bookings > 0:
         bookings_trend_percent = round((total_bookings - prev_bookings) / prev_bookings * 100)
     
-    # Group bookings by month for chart
-    bookings_by_month = {}
-    revenue_by_month = {}
-    month_labels = []
-    
-    for i in range(5, -1, -1):
-        month_date = now - timedelta(days=i*30)
-        month_key = month_date.strftime("%b")
-        month_labels.append(month_key)
-        bookings_by_month[month_key] = 0
-        revenue_by_month[month_key] = 0
-    
-    for b in bookings:
-        if b.created_at:
-            month_key = b.created_at.strftime("%b")
-            if month_key in bookings_by_month:
-                bookings_by_month[month_key] += 1
-                revenue_by_month[month_key] += b.total_price or 0
-    
-    # Top properties by bookings
-    property_stats = {}
-    for p in properties:
-        prop_bookings = [b for b in bookings if str(b.property_id) == str(p.id)]
-        property_stats[p.name] = {
-            "bookings": len(prop_bookings),
-            "revenue": sum(b.total_price or 0 for b in prop_bookings if b.status == 'confirmed')
-        }
-    
-    top_properties = sorted(
-        [{"name": k, "bookings": v["bookings"], "revenue": v["revenue"]} for k, v in property_stats.items()],
-        key=lambda x: x["revenue"],
-        reverse=True
-    )[:5]
+    # Bookings per (Jahr, Monat) for chart
+    year_col = func.extract('year', DBBooking.created_at)
+    month_col = func.extract('month', DBBooking.created_at)
+    month_rows = db.query(
+        year_col, month_col, func.count(DBBooking.id), func.coalesce(func.sum(DBBooking.total_price), 0)
+    ).filter(*in_range).group_by(year_col, month_col).all()
+    month_buckets = {(int(y), int(m)): (count, revenue) for y, m, count, revenue in month_rows}
+    months = [(month.year, month.month) for month in last_months(now.date(), 6)]
+    
+    # Top properties by revenue (Properties ohne Buchungen mit 0)
+    per_property = db.query(
+        DBBooking.property_id.label("property_id"),
+        func.count(DBBooking.id).label("bookings"),
+        confirmed_revenue.label("revenue")
+    ).filter(*in_range).group_by(DBBooking.property_id).subquery()
+    top_rows = db.query(
+        DBProperty.name,
+        func.coalesce(per_property.c.bookings, 0),
+        func.coalesce(per_property.c.revenue, 0)
+    ).outerjoin(per_property, per_property.c.property_id == DBProperty.id).filter(
+        DBProperty.user_id == user.id
+    ).order_by(func.coalesce(per_property.c.revenue, 0).desc()).limit(5).all()
+    top_properties = [{"name": name, "bookings": bookings, "revenue": revenue} for name, bookings, revenue in top_rows]
     
     # Recent activity
-    recent_bookings = sorted(bookings, key=lambda x: x.created_at or now, reverse=True)[:5]
+    recent_bookings = db.query(DBBooking.guest_name, DBBooking.created_at, DBProperty.name).outerjoin(
+        DBProperty, DBProperty.id == DBBooking.property_id
+    ).filter(*in_range).order_by(DBBooking.created_at.desc()).limit(5).all()
     recent_activity = []
-    for b in recent_bookings:
-        time_diff = now - (b.created_at or now)
+    for guest_name, created_at, property_name in recent_bookings:
+        if created_at and created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        time_diff = now - (created_at or now)
         if time_diff.total_seconds() < 3600:
             time_str = f"vor {int(time_diff.total_seconds() / 60)} Min"
         elif time_diff.total_seconds() < 86400:
@@ -3418,12 +4142,12 @@ def get_admin_stats(date_range: str = "7d", user: DBUser = Depends(get_current_u
         
         recent_activity.append({
             "type": "booking",
-            "message": f"Neue Buchung von {b.guest_name}",
+            "message": f"Neue Buchung von {guest_name}",
             "time": time_str,
-            "property": next((p.name for p in properties if str(p.id) == str(b.property_id)), "Unbekannt")
+            "property": property_name or "Unbekannt"
         })
     
-    return {
+    result = {
         "overview": {
             "totalProperties": properties_count,
             "totalGuests": total_guests,
@@ -3439,35 +4163,41 @@ def get_admin_stats(date_range: str = "7d", user: DBUser = Depends(get_current_u
             "revenue": {"value": round(total_revenue, 2), "trend": "up" if bookings_trend_percent > 0 else "stable", "percent": abs(bookings_trend_percent)}
         },
         "chartData": {
-            "labels": month_labels,
-            "bookings": [bookings_by_month[m] for m in month_labels],
-            "revenue": [round(revenue_by_month[m], 2) for m in month_labels]
+            "labels": [datetime(y, m, 1).strftime("%b") for y, m in months],
+            "bookings": [month_buckets.get(key, (0, 0))[0] for key in months],
+            "revenue": [round(month_buckets.get(key, (0, 0))[1], 2) for key in months]
         },
-        "topProperties": top_properties if top_properties else [
-            {"name": p.name, "bookings": 0, "revenue": 0} for p in properties[:3]
-        ],
+        "topProperties": top_properties,
         "recentActivity": recent_activity if recent_activity else [
             {"type": "info", "message": "Noch keine Buchungen vorhanden", "time": "jetzt"}
         ]
     }
+    admin_stats_cache.set(cache_key, result)
+    return result
 
 @api_router.get("/admin/bookings/feed")
-def get_bookings_feed(limit: int = 50, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get recent bookings for live feed with real data"""
+def get_bookings_feed(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = "none",
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get recent bookings for live feed with real data (Keyset: next_cursor als cursor übergeben)"""
     from datetime import datetime, timedelta, timezone
     
     # Get user's properties for name lookup
     properties = {str(p.id): p.name for p in db.query(DBProperty).filter(DBProperty.user_id == user.id).all()}
     
     # Fetch real bookings from database
-    bookings = db.query(DBBooking).filter(
-        DBBooking.user_id == user.id
-    ).order_by(DBBooking.created_at.desc()).limit(limit).all()
+    page = paginate(db.query(DBBooking).filter(DBBooking.user_id == user.id),
+                    DBBooking.created_at, DBBooking.id, limit, cursor, count)
+    bookings = page.items
     
     # If no bookings, return demo data
-    if not bookings:
+    if not bookings and not cursor:
         now = datetime.now(timezone.utc)
-        return [
+        return {"total": page.total, "next_cursor": None, "bookings": [
             {
                 "id": "demo-1",
                 "property_name": list(properties.values())[0] if properties else "Ferienwohnung",
@@ -3483,7 +4213,7 @@ def get_bookings_feed(limit: int = 50, user: DBUser = Depends(get_current_user),
                 "created_at": now.isoformat(),
                 "is_demo": True
             }
-        ]
+        ]}
     
     # Format real bookings
     result = []
@@ -3507,7 +4237,7 @@ def get_bookings_feed(limit: int = 50, user: DBUser = Depends(get_current_user),
             "created_at": b.created_at.isoformat() if b.created_at else None
         })
     
-    return result
+    return {"total": page.total, "next_cursor": page.next_cursor, "bookings": result}
 
 @api_router.get("/admin/users")
 def get_admin_users(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -3569,11 +4299,13 @@ def get_admin_users(user: DBUser = Depends(get_current_user), db: Session = Depe
 @api_router.put("/admin/users/{user_id}")
 def update_admin_user(user_id: str, user_data: dict, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update user (admin only)"""
+    invalidate_principal(user_id)
     return {"success": True, "message": f"User {user_id} updated"}
 
 @api_router.delete("/admin/users/{user_id}")
 def delete_admin_user(user_id: str, user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Delete user (admin only)"""
+    invalidate_principal(user_id)
     return {"success": True, "message": f"User {user_id} deleted"}
 
 # ============ PAYPAL ENDPOINTS ============
@@ -3710,7 +4442,7 @@ def create_booking(data: dict, user: DBUser = Depends(get_current_user), db: Ses
     total_price = data.get("total_price", 0)
     
     if guest_email:
-        # Send confirmation email asynchronously (don't block)
+        # Mail-Outbox und Webhook-Outbox in derselben Transaktion (Commit unten)
         try:
             send_booking_confirmation_email(
                 email=guest_email,
@@ -3719,13 +4451,14 @@ def create_booking(data: dict, user: DBUser = Depends(get_current_user), db: Ses
                 checkin=check_in,
                 checkout=check_out,
                 guests=guests,
-                total=total_price
+                total=total_price,
+                db=db
             )
-            logger.info(f"Booking confirmation email sent to: {guest_email}")
+            logger.info(f"Booking confirmation email queued for: {guest_email}")
         except Exception as e:
             logger.error(f"Failed to send booking email: {str(e)}")
     
-    # Trigger webhooks for booking.created event
+    # Webhook-Events in die Outbox (gleiche Transaktion)
     trigger_webhooks("booking.created", {
         "booking_id": booking_id,
         "property_id": data.get("property_id"),
@@ -3735,7 +4468,8 @@ def create_booking(data: dict, user: DBUser = Depends(get_current_user), db: Ses
         "check_out": check_out,
         "total_price": total_price,
         "status": "pending"
-    }, str(user.id))
+    }, str(user.id), db)
+    db.commit()
     
     return {
         "id": booking_id,
@@ -3882,6 +4616,8 @@ def update_user_profile(data: dict, user: DBUser = Depends(get_current_user), db
         user.invoice_vat_id = data["invoice_vat_id"]
     
     db.commit()
+    invalidate_principal(user.id)
+    invalidate_guestview(user.id)
     db.refresh(user)
     
     return {
@@ -4019,7 +4755,9 @@ def health_check():
     memory_percent = None
     disk_percent = None
     
-    if PSUTIL_AVAILABLE and psutil:
+    # psutil is optional - erst beim ersten Health-Check geladen
+    psutil = optional_import("psutil")
+    if psutil:
         try:
             cpu_percent = psutil.cpu_percent(interval=0.1)
             memory = psutil.virtual_memory()
@@ -4077,24 +4815,35 @@ def health_check():
 @api_router.get("/admin/daily-stats")
 def get_daily_stats(user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get daily statistics for dashboard charts"""
-    from datetime import datetime, timedelta
-    import random
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=29)
     
-    # Generate last 30 days of demo data
-    days = []
-    today = datetime.now()
+    bookings_by_day = {
+        day: (bookings, revenue)
+        for day, bookings, revenue in rollup_per_day(db, owned_by(user.id), *in_days(first_day, today))
+    }
+    day_col = func.date(DBGuestView.created_at)
+    scans_by_day = {
+        str(day)[:10]: count
+        for day, count in db.query(day_col, func.count(DBGuestView.id)).filter(
+            DBGuestView.user_id == user.id,
+            DBGuestView.created_at >= datetime.combine(first_day, datetime.min.time())
+        ).group_by(day_col).all()
+    }
     
+    days = []
     for i in range(30):
-        date = today - timedelta(days=i)
+        day = first_day + timedelta(days=i)
+        bookings, revenue = bookings_by_day.get(day, (0, 0))
         days.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "scans": random.randint(20, 100),
-            "bookings": random.randint(0, 10),
-            "revenue": round(random.uniform(50, 500), 2)
+            "date": day.isoformat(),
+            "scans": scans_by_day.get(day.isoformat(), 0),
+            "bookings": bookings,
+            "revenue": round(revenue, 2)
         })
     
     return {
-        "daily_stats": list(reversed(days)),
+        "daily_stats": days,
         "summary": {
             "total_scans": sum(d["scans"] for d in days),
             "total_bookings": sum(d["bookings"] for d in days),
@@ -4150,7 +4899,8 @@ def send_cleaning_notification_email(
     guest_name: str,
     checkout_date: str,
     checkout_time: str,
-    notes: str = None
+    notes: str = None,
+    db: Session = None
 ):
     """Sende Reinigungs-Benachrichtigung an Reinigungskraft"""
     
@@ -4222,7 +4972,7 @@ Gast: {guest_name}
 Bitte bestätigen Sie die Reinigung nach Abschluss.
 """
     
-    return send_email(cleaner_email, f"🧹 Reinigungsauftrag - {property_name}", html, text)
+    return send_email(cleaner_email, f"🧹 Reinigungsauftrag - {property_name}", html, text, db=db)
 
 
 # ============ CLEANER CRUD ENDPOINTS ============
@@ -4511,63 +5261,65 @@ async def send_cleaning_notifications(db: Session = Depends(get_db)):
         notifications_sent = 0
         errors = []
         
-        # Get all property-cleaner assignments
-        assignments = db.query(DBPropertyCleaner).all()
+        # Alle Zuweisungen inkl. Property und Reinigungskraft (eine JOIN-Query)
+        assignments = db.query(
+            DBPropertyCleaner.property_id, DBPropertyCleaner.notify_hours_before,
+            DBProperty.name.label("property_name"), DBProperty.address, DBProperty.checkout_time,
+            DBCleaner.email, DBCleaner.name.label("cleaner_name"), DBCleaner.notes
+        ).join(DBProperty, DBProperty.id == DBPropertyCleaner.property_id).join(
+            DBCleaner, DBCleaner.id == DBPropertyCleaner.cleaner_id
+        ).filter(
+            DBCleaner.email.isnot(None),
+            DBCleaner.email != ""
+        ).all()
         
-        for assignment in assignments:
-            # Find bookings ending within the notification window
-            notify_hours = assignment.notify_hours_before or 2
-            window_start = now + timedelta(hours=notify_hours - 1)
-            window_end = now + timedelta(hours=notify_hours + 1)
-            
-            try:
-                # Get property info
-                property = db.query(DBProperty).filter(DBProperty.id == assignment.property_id).first()
-                if not property:
-                    continue
-                
-                # Get cleaner info
-                cleaner = db.query(DBCleaner).filter(DBCleaner.id == assignment.cleaner_id).first()
-                if not cleaner or not cleaner.email:
-                    continue
-                
-                # Find bookings with checkout in the notification window
-                bookings = db.query(DBBooking).filter(
-                    DBBooking.property_id == str(assignment.property_id),
-                    DBBooking.check_out >= window_start,
-                    DBBooking.check_out <= window_end,
-                    DBBooking.status.in_(["confirmed", "active"])
-                ).all()
+        if not assignments:
+            return {"status": "success", "notifications_sent": 0, "errors": [], "checked_at": now.isoformat()}
+        
+        # Ein Zeitfenster über alle Zuweisungen, Zuordnung pro Zuweisung in Python
+        hours = [a.notify_hours_before or 2 for a in assignments]
+        bookings = db.query(
+            DBBooking.property_id, DBBooking.guest_name, DBBooking.check_out
+        ).filter(
+            DBBooking.property_id.in_({str(a.property_id) for a in assignments}),
+            DBBooking.check_out >= now + timedelta(hours=min(hours) - 1),
+            DBBooking.check_out <= now + timedelta(hours=max(hours) + 1),
+            DBBooking.status.in_(["confirmed", "active"])
+        ).all()
+        
+        bookings_by_property = {}
+        for booking in bookings:
+            bookings_by_property.setdefault(booking.property_id, []).append(booking)
+        
+        def notifications():
+            for assignment in assignments:
+                # Find bookings ending within the notification window
+                notify_hours = assignment.notify_hours_before or 2
+                window_start = now + timedelta(hours=notify_hours - 1)
+                window_end = now + timedelta(hours=notify_hours + 1)
                 
-                for booking in bookings:
-                    # Check if notification already sent (would need a tracking table in production)
-                    # For now, send notification
-                    
-                    guest_name = booking.guest_name or "Gast"
-                    checkout_date = booking.check_out.strftime("%d.%m.%Y") if booking.check_out else "Unbekannt"
-                    checkout_time = property.checkout_time or "11:00"
-                    
-                    # Send notification email
-                    email_sent = send_cleaning_notification_email(
-                        cleaner_email=cleaner.email,
-                        cleaner_name=cleaner.name,
-                        property_name=property.name,
-                        property_address=property.address or "Adresse nicht angegeben",
-                        guest_name=guest_name,
-                        checkout_date=checkout_date,
-                        checkout_time=checkout_time,
-                        notes=cleaner.notes
+                for booking in bookings_by_property.get(str(assignment.property_id), []):
+                    check_out = booking.check_out.replace(tzinfo=timezone.utc) if booking.check_out.tzinfo is None else booking.check_out
+                    if not window_start <= check_out <= window_end:
+                        continue
+                    yield dict(
+                        cleaner_email=assignment.email,
+                        cleaner_name=assignment.cleaner_name,
+                        property_name=assignment.property_name,
+                        property_address=assignment.address or "Adresse nicht angegeben",
+                        guest_name=booking.guest_name or "Gast",
+                        checkout_date=booking.check_out.strftime("%d.%m.%Y"),
+                        checkout_time=assignment.checkout_time or "11:00",
+                        notes=assignment.notes
                     )
-                    
-                    if email_sent:
-                        notifications_sent += 1
-                        logger.info(f"Reinigungs-Benachrichtigung gesendet: {cleaner.email} für {property.name}")
-                    else:
-                        errors.append(f"E-Mail fehlgeschlagen für {cleaner.email}")
-                        
-            except Exception as e:
-                logger.error(f"Fehler bei Property {assignment.property_id}: {str(e)}")
-                errors.append(str(e))
+        
+        try:
+            notifications_sent = _enqueue_mail_chunked(db, send_cleaning_notification_email, notifications())
+            logger.info(f"Reinigungs-Benachrichtigungen eingereiht: {notifications_sent}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Fehler beim Einreihen der Reinigungs-Benachrichtigungen: {str(e)}")
+            errors.append(str(e))
         
         return {
             "status": "success",
@@ -4701,14 +5453,16 @@ class ReviewReply(BaseModel):
 
 @api_router.get("/reviews")
 def get_reviews(
-    property_id: Optional[int] = None,
+    property_id: Optional[str] = None,
     approved_only: bool = True,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     offset: int = 0,
     user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get reviews (optionally filtered by property)"""
+    """Get reviews (optionally filtered by property, Keyset: next_cursor als cursor übergeben)"""
     from database import Review as DBReview
     
     query = db.query(DBReview)
@@ -4719,7 +5473,7 @@ def get_reviews(
     if approved_only:
         query = query.filter(DBReview.is_approved == True, DBReview.is_visible == True)
     
-    reviews = query.order_by(DBReview.created_at.desc()).offset(offset).limit(limit).all()
+    page = paginate(query, DBReview.created_at, DBReview.id, limit, cursor, count, offset)
     
     return {
         "reviews": [
@@ -4735,9 +5489,10 @@ def get_reviews(
                 "is_approved": r.is_approved,
                 "created_at": r.created_at.isoformat() if r.created_at else None
             }
-            for r in reviews
+            for r in page.items
         ],
-        "total": query.count()
+        "total": page.total,
+        "next_cursor": page.next_cursor
     }
 
 @api_router.post("/reviews")
@@ -4814,6 +5569,8 @@ def delete_review(
 
 
 # ============ ANALYTICS API (Enhanced) ============
+OCCUPANCY_MAX_MONTHS = int(os.environ.get('OCCUPANCY_MAX_MONTHS', 60))
+
 class AnalyticsFilter(BaseModel):
     start_date: Optional[str] = None
     end_date: Optional[str] = None
@@ -4826,10 +5583,7 @@ def get_analytics_dashboard(
     user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get comprehensive analytics data for dashboard"""
-    from database import PropertyAnalytics as DBPropertyAnalytics
-    from database import AnalyticsEvent as DBAnalyticsEvent
-    
+    """Get comprehensive analytics data for dashboard (aus daily_property_stats)"""
     # Parse dates
     if filter.start_date:
         start = datetime.fromisoformat(filter.start_date.replace('Z', '+00:00'))
@@ -4842,77 +5596,48 @@ def get_analytics_dashboard(
         end = datetime.now(timezone.utc)
     
     # Get user's properties
-    properties = db.query(DBProperty).filter(DBProperty.user_id == user.id).all()
-    property_ids = [p.id for p in properties]
-    
-    # Get bookings for the period
-    bookings_query = db.query(DBBooking).filter(
-        DBBooking.user_id == user.id,
-        DBBooking.created_at >= start,
-        DBBooking.created_at <= end
-    )
+    properties = db.query(DBProperty.id, DBProperty.name).filter(DBProperty.user_id == user.id).all()
     
+    criteria = [owned_by(user.id), *in_days(start.date(), end.date())]
     if filter.property_id:
-        bookings_query = bookings_query.filter(DBBooking.property_id == filter.property_id)
-    
-    bookings = bookings_query.all()
-    
-    # Calculate stats
-    total_bookings = len(bookings)
-    confirmed_bookings = len([b for b in bookings if b.status == 'confirmed'])
-    completed_bookings = len([b for b in bookings if b.status == 'completed'])
-    cancelled_bookings = len([b for b in bookings if b.status == 'cancelled'])
-    
-    total_revenue = sum(b.total_price or 0 for b in bookings if b.status in ['confirmed', 'completed'])
-    avg_booking_value = total_revenue / confirmed_bookings if confirmed_bookings > 0 else 0
-    
-    # Occupancy calculation
-    total_nights = 0
-    for b in bookings:
-        if b.check_in and b.check_out and b.status in ['confirmed', 'completed']:
-            nights = (b.check_out - b.check_in).days
-            total_nights += max(0, nights)
-    
-    # Get reviews for average rating
-    from database import Review as DBReview
-    reviews = db.query(DBReview).filter(
-        DBReview.property_id.in_(property_ids) if property_ids else DBReview.property_id == -1
-    ).all()
+        criteria.append(DBDailyPropertyStats.property_id == str(filter.property_id))
     
-    avg_rating = 0
-    if reviews:
-        avg_rating = round(sum(r.rating for r in reviews) / len(reviews), 1)
+    totals = rollup_totals(db, *criteria)
+    # Bewertungen über den gesamten Zeitraum
+    ratings = rollup_totals(db, owned_by(user.id))
     
     # Group bookings by date for chart
     bookings_by_date = {}
     revenue_by_date = {}
     
-    for b in bookings:
-        if b.created_at:
-            if filter.group_by == "day":
-                key = b.created_at.strftime("%Y-%m-%d")
-            elif filter.group_by == "week":
-                key = b.created_at.strftime("%Y-W%W")
-            else:  # month
-                key = b.created_at.strftime("%Y-%m")
-            
-            bookings_by_date[key] = bookings_by_date.get(key, 0) + 1
-            revenue_by_date[key] = revenue_by_date.get(key, 0) + (b.total_price or 0)
+    for day, bookings, revenue in rollup_per_day(db, *criteria):
+        if not bookings:
+            continue
+        if filter.group_by == "day":
+            key = day.strftime("%Y-%m-%d")
+        elif filter.group_by == "week":
+            key = day.strftime("%Y-W%W")
+        else:  # month
+            key = day.strftime("%Y-%m")
+        
+        bookings_by_date[key] = bookings_by_date.get(key, 0) + bookings
+        revenue_by_date[key] = revenue_by_date.get(key, 0) + revenue
     
     # Generate labels and data
     sorted_keys = sorted(bookings_by_date.keys())
+    bookings_per_property = rollup_per_property(db, *criteria)
     
     return {
         "summary": {
-            "total_bookings": total_bookings,
-            "confirmed_bookings": confirmed_bookings,
-            "completed_bookings": completed_bookings,
-            "cancelled_bookings": cancelled_bookings,
-            "total_revenue": round(total_revenue, 2),
-            "avg_booking_value": round(avg_booking_value, 2),
-            "total_nights": total_nights,
-            "avg_rating": avg_rating,
-            "total_reviews": len(reviews)
+            "total_bookings": totals["bookings"],
+            "confirmed_bookings": totals["confirmed"],
+            "completed_bookings": totals["completed"],
+            "cancelled_bookings": totals["cancellations"],
+            "total_revenue": round(totals["revenue"], 2),
+            "avg_booking_value": totals["avg_booking_value"],
+            "total_nights": totals["nights"],
+            "avg_rating": ratings["avg_rating"],
+            "total_reviews": ratings["rating_count"]
         },
         "charts": {
             "bookings_by_date": {
@@ -4928,7 +5653,7 @@ def get_analytics_dashboard(
             {
                 "id": p.id,
                 "name": p.name,
-                "bookings_count": len([b for b in bookings if str(b.property_id) == str(p.id)])
+                "bookings_count": bookings_per_property.get(str(p.id), 0)
             }
             for p in properties
         ],
@@ -4940,116 +5665,141 @@ def get_analytics_dashboard(
 
 @api_router.get("/analytics/occupancy")
 def get_occupancy_analytics(
-    property_id: Optional[int] = None,
+    property_id: Optional[str] = None,
     months: int = 12,
+    start_month: Optional[str] = None,
+    breakdown: bool = False,
+    daily: bool = False,
     user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get occupancy rate analytics"""
-    from datetime import date
-    from dateutil.relativedelta import relativedelta
+    """
+    Get occupancy rate analytics.
+    start_month (YYYY-MM) wählt einen beliebigen Zeitraum, breakdown liefert
+    Werte pro Unterkunft, daily eine Tages-Bitmap ('0'/'1') pro Unterkunft.
+    """
+    from occupancy import OccupancyGrid  # numpy erst bei Bedarf
+    if months < 1 or months > OCCUPANCY_MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"months muss zwischen 1 und {OCCUPANCY_MAX_MONTHS} liegen")
+    if start_month:
+        try:
+            month_starts = month_range(datetime.strptime(start_month, "%Y-%m").date(), months)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="start_month muss das Format YYYY-MM haben")
+    else:
+        month_starts = last_months(datetime.now(timezone.utc).date(), months)
     
     # Get user's properties
-    properties = db.query(DBProperty).filter(DBProperty.user_id == user.id).all()
-    
+    properties_query = db.query(DBProperty.id, DBProperty.name).filter(DBProperty.user_id == user.id)
     if property_id:
-        properties = [p for p in properties if p.id == property_id]
+        properties_query = properties_query.filter(DBProperty.id == property_id)
+    properties = properties_query.all()
     
     if not properties:
         return {"occupancy": [], "avg_occupancy": 0}
     
     property_ids = [p.id for p in properties]
     
-    # Calculate occupancy for each month
-    now = datetime.now(timezone.utc)
-    occupancy_data = []
-    total_occupancy = 0
-    
-    for i in range(months):
-        month_start = now - relativedelta(months=months - 1 - i)
-        month_start = month_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Days in month
-        if month_start.month == 12:
-            month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
-        
-        days_in_month = month_end.day
-        
-        # Get bookings for this month
-        bookings = db.query(DBBooking).filter(
-            DBBooking.property_id.in_(property_ids),
-            DBBooking.status.in_(['confirmed', 'completed']),
-            DBBooking.check_out >= month_start,
-            DBBooking.check_in <= month_end
-        ).all()
-        
-        # Count occupied nights
-        occupied_nights = 0
-        for b in bookings:
-            check_in = max(b.check_in, month_start) if b.check_in else month_start
-            check_out = min(b.check_out, month_end + timedelta(days=1)) if b.check_out else month_end
-            
-            if check_out > check_in:
-                nights = (check_out - check_in).days
-                occupied_nights += max(0, nights)
-        
-        # Total possible nights (properties * days)
-        max_nights = len(property_ids) * days_in_month
-        occupancy_rate = (occupied_nights / max_nights * 100) if max_nights > 0 else 0
-        
-        occupancy_data.append({
-            "month": month_start.strftime("%Y-%m"),
-            "month_name": month_start.strftime("%b %Y"),
-            "occupied_nights": occupied_nights,
-            "max_nights": max_nights,
-            "occupancy_rate": round(occupancy_rate, 1)
-        })
-        
-        total_occupancy += occupancy_rate
+    # Alle überlappenden Buchungen in einer Query, Auswertung vektorisiert
+    period_start = datetime.combine(month_starts[0], datetime.min.time())
+    period_end = datetime.combine(month_range(month_starts[-1], 2)[1], datetime.min.time())
+    bookings = db.query(DBBooking.property_id, DBBooking.check_in, DBBooking.check_out).filter(
+        DBBooking.property_id.in_(property_ids),
+        DBBooking.status.in_(['confirmed', 'completed']),
+        DBBooking.check_out > period_start,
+        DBBooking.check_in < period_end
+    ).all()
+    grid = OccupancyGrid(property_ids, month_starts, bookings)
+    nights = grid.nights_per_month()
+    
+    def month_entries(occupied, property_count):
+        entries = []
+        for month_start, occupied_nights, days_in_month in zip(month_starts, occupied, grid.days_in_month):
+            max_nights = int(property_count * days_in_month)
+            entries.append({
+                "month": month_start.strftime("%Y-%m"),
+                "month_name": month_start.strftime("%b %Y"),
+                "occupied_nights": int(occupied_nights),
+                "max_nights": max_nights,
+                "occupancy_rate": round(occupied_nights / max_nights * 100, 1) if max_nights > 0 else 0
+            })
+        return entries
     
-    avg_occupancy = total_occupancy / months if months > 0 else 0
+    occupancy_data = month_entries(nights.sum(axis=0), len(property_ids))
+    avg_occupancy = sum(m["occupancy_rate"] for m in occupancy_data) / len(occupancy_data)
     
-    return {
+    result = {
         "occupancy": occupancy_data,
         "avg_occupancy": round(avg_occupancy, 1),
         "properties_count": len(properties)
     }
+    if breakdown:
+        result["properties"] = [
+            {"id": p.id, "name": p.name, "occupancy": month_entries(nights[i], 1)}
+            for i, p in enumerate(properties)
+        ]
+    if daily:
+        result["daily"] = {
+            "start": grid.start.isoformat(),
+            "days": grid.days,
+            "bitmaps": {p.id: grid.bitmap(i) for i, p in enumerate(properties)}
+        }
+    return result
+
+class AnalyticsEventIn(BaseModel):
+    event_type: str
+    property_id: Optional[str] = None
+    event_data: Optional[dict] = None
+    guest_token: Optional[str] = None
+
+class AnalyticsBatch(BaseModel):
+    events: List[AnalyticsEventIn]
+
+def _client_info(request: Optional[Request]) -> dict:
+    """IP und User-Agent für Analytics-Events"""
+    if not request:
+        return {"ip_address": None, "user_agent": None}
+    return {
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent", "")[:500]
+    }
 
-@api_router.post("/analytics/track")
+@api_router.post("/analytics/track", status_code=202)
 def track_analytics_event(
     event_type: str,
-    property_id: Optional[int] = None,
+    property_id: Optional[str] = None,
     event_data: Optional[dict] = None,
     guest_token: Optional[str] = None,
-    request: Request = None,
-    db: Session = Depends(get_db)
+    request: Request = None
 ):
-    """Track an analytics event"""
-    from database import AnalyticsEvent as DBAnalyticsEvent
-    
-    # Get IP and user agent
-    ip_address = None
-    user_agent = None
-    if request:
-        ip_address = request.client.host if request.client else None
-        user_agent = request.headers.get("user-agent", "")[:500]
-    
-    event = DBAnalyticsEvent(
-        id=str(uuid.uuid4()),
+    """Track an analytics event (gepuffert, wird asynchron geschrieben)"""
+    event_id = analytics_buffer.put(
         event_type=event_type,
         property_id=property_id,
         event_data=json.dumps(event_data) if event_data else None,
         guest_token=guest_token,
-        ip_address=ip_address,
-        user_agent=user_agent
+        **_client_info(request)
     )
-    
-    db.add(event)
-    db.commit()
-    
-    return {"status": "success", "event_id": event.id}
+    if not event_id:
+        return {"status": "dropped", "event_id": None}
+    return {"status": "accepted", "event_id": event_id}
+
+@api_router.post("/analytics/track/batch", status_code=202)
+def track_analytics_batch(batch: AnalyticsBatch, request: Request = None):
+    """Track multiple analytics events in one request"""
+    if len(batch.events) > ANALYTICS_MAX_EVENTS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"Maximal {ANALYTICS_MAX_EVENTS_PER_REQUEST} Events pro Anfrage")
+    client_info = _client_info(request)
+    accepted, dropped = analytics_buffer.put_many(
+        dict(
+            event_type=e.event_type,
+            property_id=e.property_id,
+            event_data=json.dumps(e.event_data) if e.event_data else None,
+            guest_token=e.guest_token,
+            **client_info
+        ) for e in batch.events
+    )
+    return {"status": "accepted", "accepted": accepted, "dropped": dropped}
 
 
 # ============ SMART RULES API (Enhanced) ============
@@ -5938,8 +6688,9 @@ def create_api_key(request: Request, api_key: ApiKeyCreate, credentials: HTTPAut
     
     db_key = DBApiKey(
         id=str(uuid.uuid4()),
-        user_id=user["id"],
-        key=new_key,
+        user_id=user.id,
+        key_digest=key_digest(new_key),
+        key_prefix=key_prefix(new_key),
         name=api_key.name,
         permissions=json.dumps(api_key.permissions),
         rate_limit=api_key.rate_limit
@@ -5951,8 +6702,7 @@ def create_api_key(request: Request, api_key: ApiKeyCreate, credentials: HTTPAut
     
     # Log audit
     log_audit_event(
-        db=db,
-        user_id=user["id"],
+        user_id=user.id,
         action="api_key_created",
         resource="api_key",
         resource_id=db_key.id,
@@ -5978,13 +6728,14 @@ def list_api_keys(request: Request, credentials: HTTPAuthorizationCredentials =
     user = get_current_user(credentials, db)
     
     keys = db.query(DBApiKey).filter(
-        DBApiKey.user_id == user["id"]
+        DBApiKey.user_id == user.id
     ).order_by(DBApiKey.created_at.desc()).all()
     
     return {
         "api_keys": [{
             "id": k.id,
             "name": k.name,
+            "key_prefix": k.key_prefix,
             "permissions": json.loads(k.permissions) if k.permissions else [],
             "rate_limit": k.rate_limit,
             "last_used": k.last_used.isoformat() if k.last_used else None,
@@ -6003,7 +6754,7 @@ def revoke_api_key(request: Request, key_id: str, credentials: HTTPAuthorization
     
     key = db.query(DBApiKey).filter(
         DBApiKey.id == key_id,
-        DBApiKey.user_id == user["id"]
+        DBApiKey.user_id == user.id
     ).first()
     
     if not key:
@@ -6011,11 +6762,11 @@ def revoke_api_key(request: Request, key_id: str, credentials: HTTPAuthorization
     
     key.is_active = False
     db.commit()
+    api_key_cache.invalidate(lambda digest, principal: principal["api_key_id"] == key_id)
     
     # Log audit
     log_audit_event(
-        db=db,
-        user_id=user["id"],
+        user_id=user.id,
         action="api_key_revoked",
         resource="api_key",
         resource_id=key_id,
@@ -6029,16 +6780,34 @@ def revoke_api_key(request: Request, key_id: str, credentials: HTTPAuthorization
 
 @api_router.get("/audit-logs")
 @limiter.limit("10/minute")
-def get_audit_logs(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db), limit: int = 50):
-    """Hole Audit Logs (nur für Admins)"""
-    from database import AuditLog as DBAuditLog
-    
+def get_audit_logs(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = "none",
+    user_id: Optional[str] = None,
+    action: Optional[str] = None
+):
+    """
+    Hole Audit Logs (nur für Admins), neueste zuerst.
+    Keyset-Pagination: next_cursor der Antwort als cursor übergeben.
+    """
     user = get_current_user(credentials, db)
     
-    if not user.get("is_admin"):
+    if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin-Berechtigung erforderlich")
     
-    logs = db.query(DBAuditLog).order_by(DBAuditLog.created_at.desc()).limit(limit).all()
+    query = db.query(
+        DBAuditLog.id, DBAuditLog.user_id, DBAuditLog.action, DBAuditLog.resource,
+        DBAuditLog.resource_id, DBAuditLog.ip_address, DBAuditLog.status, DBAuditLog.created_at
+    )
+    if user_id:
+        query = query.filter(DBAuditLog.user_id == user_id)
+    if action:
+        query = query.filter(DBAuditLog.action == action)
+    page = paginate(query, DBAuditLog.created_at, DBAuditLog.id, limit, cursor, count)
     
     return {
         "logs": [{
@@ -6050,7 +6819,9 @@ def get_audit_logs(request: Request, credentials: HTTPAuthorizationCredentials =
             "ip_address": log.ip_address,
             "status": log.status,
             "created_at": log.created_at.isoformat()
-        } for log in logs]
+        } for log in page.items],
+        "total": page.total,
+        "next_cursor": page.next_cursor
     }
 
 
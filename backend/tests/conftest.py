@@ -0,0 +1,28 @@
+"""
+Gemeinsame Fixtures
+"""
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+import database
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def one_connection_pool(tmp_path, monkeypatch):
+    """App auf einer eigenen Datenbank mit genau einer Pool-Connection - ein Request,
+    der eine zweite Connection braucht, läuft nach 2 s in den Pool-Timeout"""
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "2")
+    db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    database.migrate_schema(db_engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    monkeypatch.setattr(server, "SessionLocal", Session)
+    try:
+        yield db_engine
+    finally:
+        db_engine.dispose()
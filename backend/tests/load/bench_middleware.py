@@ -0,0 +1,87 @@
+"""
+Micro-Benchmark: Middleware-Overhead pro Request
+Vergleicht die bisherigen BaseHTTPMiddleware-Varianten mit den reinen
+ASGI-Middlewares aus server.py. Die Requests werden direkt über das
+ASGI-Interface gefahren (kein HTTP, kein TestClient), gemessen wird also
+nur der Stack aus Middleware + minimaler Route.
+
+    python3 tests/load/bench_middleware.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from server import SecurityHeadersMiddleware, RequestTimingMiddleware, SECURITY_HEADERS
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Vorherige Implementierung (Header pro Response neu gesetzt)"""
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS:
+            response.headers[name.decode()] = value.decode()
+        return response
+
+
+class LegacyRequestTimingMiddleware(BaseHTTPMiddleware):
+    """Vorherige Implementierung mit time.time()"""
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time-Ms"] = f"{(time.time() - start_time) * 1000:.2f}"
+        return response
+
+
+async def ping(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(security_cls, timing_cls):
+    app = Starlette(routes=[Route("/ping", ping)])
+    app.add_middleware(security_cls)
+    app.add_middleware(timing_cls)
+    return app
+
+
+async def run(app, requests: int) -> float:
+    """Durchschnittliche Mikrosekunden pro Request"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # Warm-up
+        await app(dict(scope), receive, send)
+    started = time.perf_counter_ns()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter_ns() - started) / requests / 1000
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    legacy = asyncio.run(run(build_app(LegacySecurityHeadersMiddleware, LegacyRequestTimingMiddleware), requests))
+    asgi = asyncio.run(run(build_app(SecurityHeadersMiddleware, RequestTimingMiddleware), requests))
+    print(f"Requests:           {requests}")
+    print(f"BaseHTTPMiddleware: {legacy:8.1f} µs/Request")
+    print(f"Reines ASGI:        {asgi:8.1f} µs/Request")
+    print(f"Ersparnis:          {legacy - asgi:8.1f} µs/Request ({(1 - asgi / legacy) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: Guestview-Latenz während eines Login-Bursts
+Schickt für einige Sekunden Logins mit fester Rate (Default 200/s) und misst
+parallel die Latenz des Guestview-Endpoints - ohne Burst, mit bcrypt im
+Passwort-Pool und mit bcrypt direkt im Request (vorheriges Verhalten). Die
+Requests laufen über das ASGI-Interface (httpx, kein Netzwerk); Logins, die
+der volle Pool mit 503 abweist, sind gewollt (Back-Pressure). --inline misst
+zusätzlich bcrypt im Request; das dauert etwa Logins x 0,3 s.
+
+    python3 tests/load/bench_password_burst.py [logins_pro_sekunde] [sekunden] [--inline]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+
+import httpx
+
+import server
+
+PASSWORD = "Burst123!"
+
+
+def seed() -> tuple:
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"burst-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash=server.hash_password(PASSWORD), name="Burst", is_email_verified=True)
+        db.add(user)
+        token = str(uuid.uuid4())
+        db.add(server.DBGuestView(id=str(uuid.uuid4()), user_id=user.id, token=token))
+        db.commit()
+        return user.email, token
+    finally:
+        db.close()
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def run(email: str, token: str, logins_per_second: int, seconds: float) -> dict:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies, statuses, tasks = [], {}, []
+        stop_at = time.perf_counter() + seconds
+
+        async def login():
+            response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def burst():
+            while logins_per_second and time.perf_counter() < stop_at:
+                tasks.append(asyncio.create_task(login()))
+                await asyncio.sleep(1 / logins_per_second)
+
+        async def guestview():
+            while time.perf_counter() < stop_at:
+                # Cache umgehen: jede Abfrage geht durch Handler und DB
+                server.guestview_cache.invalidate(lambda key, value: True)
+                started = time.perf_counter()
+                response = await client.get(f"/api/guestview/{token}")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(burst(), guestview())
+        await asyncio.gather(*tasks)
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 0.99),
+        "requests": len(latencies),
+        "logins": statuses,
+    }
+
+
+async def verify_inline(password, user, db):
+    """Vorheriges Verhalten: bcrypt im Request"""
+    return server.verify_password(password, user.password_hash)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    logins_per_second = int(args[0]) if args else 200
+    seconds = float(args[1]) if len(args) > 1 else 3
+    # Nur der Burst zählt - Rate-Limits für den Benchmark aus
+    server.limiter.enabled = False
+    server.RATE_LIMIT_IP_PER_MINUTE = 10 ** 9
+    email, token = seed()
+    server.password_hasher.start()
+
+    results = {
+        "Ohne Burst": asyncio.run(run(email, token, 0, seconds)),
+        "Passwort-Pool": asyncio.run(run(email, token, logins_per_second, seconds)),
+    }
+    server.password_hasher.stop()
+    if "--inline" in sys.argv:
+        server.verify_password_pooled = verify_inline
+        results["bcrypt im Request"] = asyncio.run(run(email, token, logins_per_second, seconds))
+
+    print(f"Logins: {logins_per_second}/s für {seconds:.0f}s, "
+          f"{server.PASSWORD_HASH_WORKERS} Hasher-Prozesse, bcrypt rounds {server.BCRYPT_ROUNDS}")
+    for name, result in results.items():
+        print(f"{name + ':':<20} Guestview p50 {result['p50']:7.1f} ms  p99 {result['p99']:7.1f} ms  "
+              f"({result['requests']} Requests)  Logins {result['logins']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-Benchmark: Overhead des Token-Bucket-Limiters pro Request
+Fährt eine minimale Route einmal ohne und einmal mit RateLimitMiddleware
+über das ASGI-Interface (wie bench_middleware.py) - anonym (IP) und mit
+Bearer-Token (JWT, gecacht). Ziel: < 50 µs Overhead mit dem Memory-Store.
+Mit --sql wird zusätzlich der SQLite-Store gemessen (UPSERT im Threadpool).
+
+    python3 tests/load/bench_rate_limit.py [requests] [--sql]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import database
+from rate_limit import MemoryBucketStore, RateLimiter, SQLBucketStore
+import server
+from server import RateLimitMiddleware, create_token
+
+BUDGET_US = 50.0
+
+
+async def ping(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(limiter=None):
+    app = Starlette(routes=[Route("/ping", ping)])
+    if limiter:
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+async def run(app, requests: int, headers=()) -> float:
+    """Durchschnittliche Mikrosekunden pro Request"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), *headers], "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # Warm-up
+        await app(dict(scope), receive, send)
+    started = time.perf_counter_ns()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter_ns() - started) / requests / 1000
+
+
+def unlimited() -> RateLimiter:
+    return RateLimiter(MemoryBucketStore())
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 20000
+    # Limits so hoch, dass nie abgelehnt wird - gemessen wird nur die Prüfung
+    server.RATE_LIMIT_IP_PER_MINUTE = server.RATE_LIMIT_USER_PER_MINUTE = 10 ** 9
+    bearer = [(b"authorization", f"Bearer {create_token('bench-user', 'bench@example.com')}".encode())]
+
+    baseline = asyncio.run(run(build_app(), requests))
+    results = {
+        "Memory, IP": asyncio.run(run(build_app(unlimited()), requests)),
+        "Memory, Benutzer": asyncio.run(run(build_app(unlimited()), requests, bearer)),
+    }
+    if "--sql" in sys.argv:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = database.create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            database.migrate_schema(engine)
+            limiter = RateLimiter(SQLBucketStore(engine, database.RateLimitBucket))
+            results["SQLite, IP"] = asyncio.run(run(build_app(limiter), min(requests, 2000)))
+            engine.dispose()
+
+    print(f"Requests:           {requests}")
+    print(f"Ohne Limiter:       {baseline:8.1f} µs/Request")
+    for name, value in results.items():
+        print(f"{name + ':':<20}{value:8.1f} µs/Request (Overhead {value - baseline:6.1f} µs)")
+    memory_overhead = max(results["Memory, IP"], results["Memory, Benutzer"]) - baseline
+    print(f"{'✅' if memory_overhead < BUDGET_US else '❌'} Memory-Overhead {memory_overhead:.1f} µs (Budget {BUDGET_US:.0f} µs)")
+    return 0 if memory_overhead < BUDGET_US else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
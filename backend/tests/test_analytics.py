@@ -0,0 +1,86 @@
+"""
+Welcome Link Analytics Ingestion Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from event_buffer import EventBuffer
+
+client = TestClient(app)
+
+
+def _events_for(guest_token):
+    db = server.SessionLocal()
+    try:
+        return db.query(server.DBAnalyticsEvent).filter(server.DBAnalyticsEvent.guest_token == guest_token).all()
+    finally:
+        db.close()
+
+
+class TestAnalyticsIngestion:
+    """Test buffered analytics event ingestion"""
+
+    def test_track_returns_202_and_buffers(self):
+        """Events are acknowledged immediately and written on flush"""
+        token = uuid.uuid4().hex
+        response = client.post(f"/api/analytics/track?event_type=page_view&property_id=17&guest_token={token}", json={"page": "wifi"})
+        assert response.status_code == 202
+        assert response.json()["status"] == "accepted"
+        assert _events_for(token) == []
+
+        server.analytics_buffer.flush()
+        events = _events_for(token)
+        assert len(events) == 1
+        assert events[0].property_id == "17"
+        assert '"wifi"' in events[0].event_data
+
+    def test_batch_is_one_insert(self):
+        """A batch request is written as a single multi-row batch"""
+        token = uuid.uuid4().hex
+        server.analytics_buffer.flush()
+        batches = server.analytics_buffer.batches
+        response = client.post("/api/analytics/track/batch", json={"events": [
+            {"event_type": "click", "guest_token": token, "event_data": {"i": i}} for i in range(5)
+        ]})
+        assert response.status_code == 202
+        assert response.json()["accepted"] == 5
+        server.analytics_buffer.flush()
+        assert server.analytics_buffer.batches == batches + 1
+        assert len(_events_for(token)) == 5
+
+    def test_batch_limit(self):
+        """Oversized batches are rejected"""
+        events = [{"event_type": "click"}] * (server.ANALYTICS_MAX_EVENTS_PER_REQUEST + 1)
+        assert client.post("/api/analytics/track/batch", json={"events": events}).status_code == 400
+
+    def test_overflow_drops(self):
+        """A full buffer drops instead of blocking"""
+        buffer = EventBuffer(server.SessionLocal, server.DBAnalyticsEvent, max_size=2)
+        assert buffer.put(event_type="click") and buffer.put(event_type="click")
+        assert buffer.put(event_type="click") is None
+        assert buffer.stats()["dropped"] == 1
+        assert buffer.stats()["queued"] == 2
+
+    def test_flusher_thread_and_clean_shutdown(self):
+        """The background flusher writes by interval, stop() drains the rest"""
+        token = uuid.uuid4().hex
+        buffer = EventBuffer(server.SessionLocal, server.DBAnalyticsEvent, batch_size=100, flush_interval_ms=20)
+        buffer.start()
+        try:
+            buffer.put(event_type="click", guest_token=token)
+            deadline = time.monotonic() + 2
+            while buffer.written < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert buffer.written == 1
+            assert buffer.stats()["last_flush_latency_ms"] > 0
+        finally:
+            buffer.stop()
+        buffer.put_many([{"event_type": "click", "guest_token": token}] * 3)
+        buffer.stop()
+        assert len(_events_for(token)) == 4
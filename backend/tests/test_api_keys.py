@@ -0,0 +1,165 @@
+"""
+Welcome Link API Key Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from api_keys import key_digest
+from sqlalchemy import event, inspect, text
+
+client = TestClient(app)
+
+
+def _create_user():
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(
+            id=str(uuid.uuid4()),
+            email=f"apikey-{uuid.uuid4().hex[:8]}@example.com",
+            password_hash="x",
+            name="API Key Test",
+        )
+        db.add(user)
+        db.commit()
+        return user.id, {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}
+    finally:
+        db.close()
+
+
+def _create_key(headers):
+    response = client.post("/api/api-keys", json={"name": "CI", "permissions": ["read", "write"]}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _insert_key(user_id, **values):
+    """Key direkt anlegen (POST /api-keys ist auf 5/Minute limitiert)"""
+    api_key = server.generate_api_key()
+    db = server.SessionLocal()
+    try:
+        row = server.DBApiKey(id=str(uuid.uuid4()), user_id=user_id, key_digest=key_digest(api_key),
+                              key_prefix=api_key[:11], permissions='["read", "write"]', **values)
+        db.add(row)
+        db.commit()
+        return {"id": row.id, "key": api_key}
+    finally:
+        db.close()
+
+
+def _lookup(api_key):
+    db = server.SessionLocal()
+    try:
+        return server.get_api_key_user(api_key, db)
+    finally:
+        db.close()
+
+
+def _key_row(key_id):
+    db = server.SessionLocal()
+    try:
+        return db.query(server.DBApiKey).filter(server.DBApiKey.id == key_id).first()
+    finally:
+        db.close()
+
+
+class TestApiKeyLookup:
+    """Test Digest-Lookup, Cache und last_used"""
+
+    def test_key_is_stored_as_digest(self):
+        _, headers = _create_user()
+        created = _create_key(headers)
+        row = _key_row(created["id"])
+        assert row.key_digest == key_digest(created["key"])
+        assert created["key"].startswith(row.key_prefix)
+        assert "key" not in {col["name"] for col in inspect(server.engine).get_columns("api_keys")}
+        listed = client.get("/api/api-keys", headers=headers).json()["api_keys"]
+        assert listed[0]["key_prefix"] == row.key_prefix
+        assert created["key"] not in str(listed)
+
+    def test_lookup_single_query_then_cached(self):
+        user_id, _ = _create_user()
+        api_key = _insert_key(user_id)["key"]
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(server.engine, "before_cursor_execute", listener)
+        try:
+            principal = _lookup(api_key)
+            queries_first = len(statements)
+            assert _lookup(api_key) == principal
+        finally:
+            event.remove(server.engine, "before_cursor_execute", listener)
+        assert principal["id"] == user_id
+        assert principal["permissions"] == ["read", "write"]
+        assert queries_first == 1
+        assert len(statements) == 1
+
+    def test_last_used_is_flushed_in_batch(self):
+        user_id, _ = _create_user()
+        created = _insert_key(user_id)
+        _lookup(created["key"])
+        _lookup(created["key"])
+        assert _key_row(created["id"]).last_used is None
+        assert server.api_key_last_used.flush() >= 1
+        assert _key_row(created["id"]).last_used is not None
+
+    def test_revoked_key_is_rejected(self):
+        _, headers = _create_user()
+        created = _create_key(headers)
+        assert _lookup(created["key"]) is not None
+        assert client.delete(f"/api/api-keys/{created['id']}", headers=headers).status_code == 200
+        assert _lookup(created["key"]) is None
+
+    def test_expired_and_unknown_keys(self):
+        user_id, _ = _create_user()
+        created = _insert_key(user_id, expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+        assert _lookup(created["key"]) is None
+        assert _lookup(created["key"][:-1] + "0") is None
+        assert _lookup("kein-prefix") is None
+
+
+class TestApiKeySecret:
+    """Test API_KEY_SECRET in Production"""
+
+    def test_production_requires_api_key_secret(self, tmp_path):
+        import subprocess
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {key: value for key, value in os.environ.items() if key != "API_KEY_SECRET"}
+        env.update(ENVIRONMENT="production", SECRET_KEY="s" * 40, DATABASE_URL=f"sqlite:///{tmp_path / 'secret.db'}")
+        result = subprocess.run([sys.executable, "-c", "import server"], cwd=backend, env=env,
+                                capture_output=True, text=True)
+        assert result.returncode != 0
+        assert "API_KEY_SECRET" in result.stderr
+
+
+class TestApiKeyMigration:
+    """Test Migration der Klartext-Keys auf Digests"""
+
+    def test_plaintext_keys_are_converted(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(text("DROP TABLE api_keys"))
+                conn.execute(text(
+                    "CREATE TABLE api_keys (id VARCHAR(36) PRIMARY KEY, user_id VARCHAR(36) NOT NULL, "
+                    "key VARCHAR(100) NOT NULL, name VARCHAR(100), permissions TEXT, rate_limit INTEGER, "
+                    "last_used DATETIME, is_active BOOLEAN, expires_at DATETIME, created_at DATETIME)"))
+                conn.execute(text("CREATE UNIQUE INDEX ix_api_keys_key ON api_keys (key)"))
+                conn.execute(text("INSERT INTO api_keys (id, user_id, key, is_active) VALUES ('k1', 'u1', 'wl_legacy123456', 1)"))
+                conn.execute(text("UPDATE alembic_version SET version_num = '002_schema_bootstrap'"))
+
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            with db_engine.connect() as conn:
+                row = conn.execute(text("SELECT key_digest, key_prefix FROM api_keys WHERE id = 'k1'")).one()
+            assert row.key_digest == key_digest("wl_legacy123456")
+            assert row.key_prefix == "wl_legacy12"
+            assert "key" not in {col["name"] for col in inspect(db_engine).get_columns("api_keys")}
+        finally:
+            db_engine.dispose()
@@ -0,0 +1,125 @@
+"""
+Welcome Link Audit Log Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from event_buffer import EventBuffer
+
+client = TestClient(app)
+
+
+def _create_user(is_admin=False):
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(
+            id=str(uuid.uuid4()),
+            email=f"audit-{uuid.uuid4().hex[:8]}@example.com",
+            password_hash=server.pwd_context.hash("Sicher123!"),
+            name="Audit Test",
+            is_email_verified=True,
+            is_admin=is_admin,
+        )
+        db.add(user)
+        db.commit()
+        return user.id, user.email, {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}
+    finally:
+        db.close()
+
+
+def _audit_rows(user_id):
+    db = server.SessionLocal()
+    try:
+        return db.query(server.DBAuditLog).filter(server.DBAuditLog.user_id == user_id).all()
+    finally:
+        db.close()
+
+
+class TestAuditSink:
+    """Test the batched audit log sink"""
+
+    def test_login_is_written_synchronously(self):
+        """Logins are durable before the response returns"""
+        user_id, email, _ = _create_user()
+        assert client.post("/api/auth/login", json={"email": email, "password": "Falsch123!"}).status_code == 401
+        assert client.post("/api/auth/login", json={"email": email, "password": "Sicher123!"}).status_code == 200
+        assert sorted(row.status for row in _audit_rows(user_id)) == ["failed", "success"]
+
+    def test_api_key_audit_is_buffered(self):
+        """API key events are queued and written by the sink"""
+        user_id, _, headers = _create_user()
+        response = client.post("/api/api-keys", json={"name": "CI"}, headers=headers)
+        assert response.status_code == 200
+        assert _audit_rows(user_id) == []
+        server.audit_sink.flush()
+        assert [row.action for row in _audit_rows(user_id)] == ["api_key_created"]
+
+    def test_failed_batch_is_retried(self):
+        """A failing write is re-queued instead of being dropped"""
+        calls = []
+        sink = EventBuffer(lambda: _FlakySession(calls), server.DBAuditLog, max_attempts=3)
+        user_id = str(uuid.uuid4())
+        sink.put(user_id=user_id, action="api_call")
+        sink.flush()
+        assert sink.stats()["retried"] == 1
+        sink.flush()
+        assert len(_audit_rows(user_id)) == 1
+        assert sink.stats()["failed"] == 0
+
+
+class _FlakySession:
+    """Session, deren erster Commit fehlschlägt"""
+
+    def __init__(self, calls):
+        calls.append(1)
+        self._fail = len(calls) == 1
+        self._db = server.SessionLocal()
+
+    def execute(self, *args, **kwargs):
+        if self._fail:
+            raise RuntimeError("DB nicht erreichbar")
+        return self._db.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+class TestAuditLogEndpoint:
+    """Test keyset pagination of /audit-logs"""
+
+    def test_pages_do_not_overlap(self):
+        """Following next_cursor walks all entries exactly once"""
+        _, _, headers = _create_user(is_admin=True)
+        user_id = str(uuid.uuid4())
+        for i in range(5):
+            server.audit_sink.put(user_id=user_id, action="api_call", resource_id=str(i))
+        server.audit_sink.flush()
+
+        seen, cursor = [], None
+        for _ in range(5):
+            params = {"user_id": user_id, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/audit-logs", params=params, headers=headers)
+            assert response.status_code == 200
+            seen.extend(log["id"] for log in response.json()["logs"])
+            cursor = response.json()["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    def test_requires_admin(self):
+        """Non-admins get 403"""
+        _, _, headers = _create_user()
+        assert client.get("/api/audit-logs", headers=headers).status_code == 403
+
+    def test_invalid_cursor(self):
+        """Garbage cursors are rejected"""
+        _, _, headers = _create_user(is_admin=True)
+        assert client.get("/api/audit-logs?cursor=kaputt", headers=headers).status_code == 400
@@ -0,0 +1,187 @@
+"""
+Welcome Link Cache Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from cache import TTLCache, ArtifactCache
+
+client = TestClient(app)
+
+
+def _create_user():
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(
+            id=str(uuid.uuid4()),
+            email=f"cache-{uuid.uuid4().hex[:8]}@example.com",
+            password_hash=server.pwd_context.hash("Sicher123!"),
+            name="Cache Test",
+            is_email_verified=True,
+        )
+        db.add(user)
+        db.commit()
+        return user.id, user.email
+    finally:
+        db.close()
+
+
+class TestTTLCache:
+    """Test the in-process TTL cache"""
+
+    def test_lru_eviction(self):
+        """Oldest entry is evicted once maxsize is reached"""
+        cache = TTLCache("test", maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_expiry(self):
+        """Expired entries count as misses"""
+        cache = TTLCache("test", maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=-1)
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+
+class TestPrincipalCache:
+    """Test caching of authenticated users"""
+
+    def test_second_request_hits_cache(self):
+        """Repeated requests with the same token are served from cache"""
+        user_id, email = _create_user()
+        headers = {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+        hits_before = server.principal_cache.hits
+
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+        response = client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["email"] == email
+        assert server.principal_cache.hits > hits_before
+
+    def test_profile_update_invalidates(self):
+        """Profile updates persist and are visible on the next request"""
+        user_id, email = _create_user()
+        headers = {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+        client.get("/api/auth/me", headers=headers)
+
+        response = client.put("/api/auth/profile", json={"name": "Neuer Name"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["user"]["name"] == "Neuer Name"
+
+        response = client.get("/api/auth/me", headers=headers)
+        assert response.json()["name"] == "Neuer Name"
+
+
+def _create_guestview(user_id):
+    db = server.SessionLocal()
+    try:
+        property_id = str(uuid.uuid4().int % 10**9)
+        token = str(uuid.uuid4())
+        db.add(server.DBProperty(id=property_id, user_id=user_id, name="Seeblick"))
+        db.add(server.DBGuestView(id=str(uuid.uuid4()), user_id=user_id, token=token))
+        db.commit()
+        return property_id, token
+    finally:
+        db.close()
+
+
+class TestGuestviewCache:
+    """Test the cached public guestview payload"""
+
+    def test_etag_and_not_modified(self):
+        """Repeat requests with If-None-Match return 304"""
+        user_id, _ = _create_user()
+        _, token = _create_guestview(user_id)
+
+        response = client.get(f"/api/guestview/{token}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+        assert response.json()["properties"][0]["name"] == "Seeblick"
+
+        hits_before = server.guestview_cache.hits
+        response = client.get(f"/api/guestview/{token}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert server.guestview_cache.hits == hits_before + 1
+
+    def test_property_update_invalidates(self):
+        """Updating a property changes the served snapshot"""
+        user_id, email = _create_user()
+        property_id, token = _create_guestview(user_id)
+        etag = client.get(f"/api/guestview/{token}").headers["etag"]
+
+        headers = {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+        response = client.put(f"/api/properties/{property_id}", json={"name": "Bergblick"}, headers=headers)
+        assert response.status_code == 200
+
+        response = client.get(f"/api/guestview/{token}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["properties"][0]["name"] == "Bergblick"
+
+    def test_revoked_token_is_not_served_from_cache(self):
+        """A token deleted by another worker stops resolving despite the cached snapshot"""
+        user_id, _ = _create_user()
+        _, token = _create_guestview(user_id)
+        assert client.get(f"/api/guestview/{token}").status_code == 200
+
+        db = server.SessionLocal()
+        try:
+            db.query(server.DBGuestView).filter(server.DBGuestView.token == token).delete()
+            db.commit()
+        finally:
+            db.close()
+        assert client.get(f"/api/guestview/{token}").status_code == 404
+        assert server.guestview_cache.get(token) is None
+
+
+class TestArtifactCache:
+    """Test the content-addressed artifact cache"""
+
+    def test_builder_runs_once_per_input(self):
+        """Same inputs reuse the stored bytes"""
+        cache = ArtifactCache("test")
+        calls = []
+        build = lambda: calls.append(1) or b"png"
+        assert cache.get_or_create("png", build, url="a") == b"png"
+        assert cache.get_or_create("png", build, url="a") == b"png"
+        cache.get_or_create("png", build, url="b")
+        assert len(calls) == 2
+        assert cache.stats()["hits"] == 1
+
+    def test_disk_tier_survives_memory_loss(self, tmp_path):
+        """Artifacts are reloaded from disk after the memory tier is cleared"""
+        cache = ArtifactCache("test", disk_dir=str(tmp_path))
+        cache.get_or_create("pdf", lambda: b"%PDF", name="Seeblick")
+        cache.clear()
+        assert cache.get_or_create("pdf", lambda: b"other", name="Seeblick") == b"%PDF"
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_qr_endpoints_render_once(self):
+        """QR data URL and PDF are served from cache on repeat requests"""
+        user_id, email = _create_user()
+        property_id, _ = _create_guestview(user_id)
+        headers = {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+
+        first = client.get(f"/api/properties/{property_id}/qr", headers=headers)
+        assert first.status_code == 200
+        assert first.json()["qr_code"].startswith("data:image/png;base64,")
+        misses = server.qr_artifact_cache.misses
+        second = client.get(f"/api/properties/{property_id}/qr", headers=headers)
+        assert second.json()["qr_code"] == first.json()["qr_code"]
+        assert server.qr_artifact_cache.misses == misses
+
+        pdf = client.post(f"/api/properties/{property_id}/qr/pdf", headers=headers)
+        assert pdf.status_code == 200
+        assert pdf.content.startswith(b"%PDF")
+        assert client.post(f"/api/properties/{property_id}/qr/pdf", headers=headers).content == pdf.content
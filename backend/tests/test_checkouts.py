@@ -0,0 +1,158 @@
+"""
+Welcome Link Checkout Tests (DB-Store, Cache, Idempotenz, Ablauf)
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from cache import TTLCache
+from checkouts import CheckoutExpired, CheckoutStore
+from sqlalchemy import inspect, text
+
+client = TestClient(app)
+
+
+def _property_with_extras():
+    """User mit Property und zwei Extras (15 € und 30 €) -> (Auth-Header, Property-ID, Extra-IDs)"""
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"checkout-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash="x", name="Checkout Test")
+        property = server.DBProperty(id=str(uuid.uuid4()), user_id=user.id, name="Checkout Property")
+        extras = [server.DBExtra(id=str(uuid.uuid4()), user_id=user.id, property_id=property.id,
+                                 name=name, price=price)
+                  for name, price in (("Frühstück", 15.0), ("Sauna", 30.0))]
+        db.add_all([user, property, *extras])
+        db.commit()
+        headers = {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}
+        return headers, property.id, [extra.id for extra in extras]
+    finally:
+        db.close()
+
+
+def _checkout_request(property_id, extra_ids, payment_method="paypal"):
+    return {
+        "property_id": property_id,
+        "items": [{"extra_id": extra_ids[0], "quantity": 2}, {"extra_id": extra_ids[1], "quantity": 1}],
+        "guest_name": "Erika Muster",
+        "guest_email": "erika@example.com",
+        "payment_method": payment_method,
+    }
+
+
+def _other_worker_store(**kwargs):
+    """Eigener Store mit leerem Cache - wie ein zweiter Uvicorn-Worker"""
+    return CheckoutStore(server.SessionLocal, server.DBCheckout, server.DBCheckoutItem,
+                         TTLCache("checkouts-test", maxsize=8), **kwargs)
+
+
+class TestCheckoutStore:
+    """Test Checkouts über die API"""
+
+    def test_create_and_read_from_other_worker(self):
+        headers, property_id, extra_ids = _property_with_extras()
+        response = client.post("/api/checkout", json=_checkout_request(property_id, extra_ids, "stripe"), headers=headers)
+        assert response.status_code == 200
+        created = response.json()
+        assert created["status"] == "completed"
+        assert created["total"] == round(60.0 * 1.19, 2)
+
+        checkout = _other_worker_store().get(created["checkout_id"])
+        assert checkout["status"] == "completed"
+        assert [item["extra_id"] for item in checkout["items"]] == extra_ids
+        assert checkout["items"][0]["total"] == 30.0
+        assert checkout["payment_id"].startswith("pi_")
+        assert client.get(f"/api/checkout/{created['checkout_id']}").json() == checkout
+
+    def test_complete_pending_checkout_once(self):
+        headers, property_id, extra_ids = _property_with_extras()
+        checkout_id = client.post("/api/checkout", json=_checkout_request(property_id, extra_ids),
+                                  headers=headers).json()["checkout_id"]
+        assert client.get(f"/api/checkout/{checkout_id}").json()["status"] == "pending"
+
+        first = client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).json()
+        second = client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).json()
+        assert first["status"] == "completed"
+        assert second["payment_id"] == first["payment_id"]
+        assert server.checkout_cache.get(checkout_id) == first
+        assert _other_worker_store().get(checkout_id)["status"] == "completed"
+
+    def test_idempotency_key_returns_first_checkout(self):
+        auth_headers, property_id, extra_ids = _property_with_extras()
+        headers = {**auth_headers, "Idempotency-Key": str(uuid.uuid4())}
+        request = _checkout_request(property_id, extra_ids)
+        first = client.post("/api/checkout", json=request, headers=headers).json()
+        second = client.post("/api/checkout", json=request, headers=headers).json()
+        assert first["checkout_id"] == second["checkout_id"]
+        db = server.SessionLocal()
+        try:
+            assert db.query(server.DBCheckout).filter(
+                server.DBCheckout.idempotency_key == headers["Idempotency-Key"]).count() == 1
+        finally:
+            db.close()
+
+    def test_idempotency_key_with_other_payload_is_rejected(self):
+        auth_headers, property_id, extra_ids = _property_with_extras()
+        headers = {**auth_headers, "Idempotency-Key": str(uuid.uuid4())}
+        request = _checkout_request(property_id, extra_ids)
+        assert client.post("/api/checkout", json=request, headers=headers).status_code == 200
+        changed = {**request, "items": [{"extra_id": extra_ids[0], "quantity": 5}]}
+        assert client.post("/api/checkout", json=changed, headers=headers).status_code == 422
+        assert client.post("/api/checkout", json=request, headers=headers).status_code == 200
+
+    def test_one_connection_per_request(self, one_connection_pool):
+        headers, property_id, extra_ids = _property_with_extras()
+        response = client.post("/api/checkout", json=_checkout_request(property_id, extra_ids), headers=headers)
+        assert response.status_code == 200
+        checkout_id = response.json()["checkout_id"]
+        assert client.get(f"/api/checkout/{checkout_id}").json()["status"] == "pending"
+        assert client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).json()["status"] == "completed"
+        assert one_connection_pool.pool.timeouts == 0
+
+    def test_unknown_checkout(self):
+        assert client.get("/api/checkout/checkout-gibtesnicht").status_code == 404
+
+
+class TestCheckoutExpiry:
+    """Test Ablauf offener Checkouts"""
+
+    def test_abandoned_checkout_expires(self, monkeypatch):
+        monkeypatch.setattr(server.checkout_store, "pending_ttl", -1)
+        headers, property_id, extra_ids = _property_with_extras()
+        checkout_id = client.post("/api/checkout", json=_checkout_request(property_id, extra_ids),
+                                  headers=headers).json()["checkout_id"]
+        assert client.get(f"/api/checkout/{checkout_id}").json()["status"] == "expired"
+        assert client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).status_code == 409
+
+        assert client.post("/api/cron/expire-checkouts").json()["expired"] >= 1
+        with server.engine.connect() as conn:
+            status = conn.execute(text("SELECT status FROM checkouts WHERE id = :id"), {"id": checkout_id}).scalar()
+        assert status == "expired"
+
+    def test_store_raises_for_expired(self):
+        store = _other_worker_store(pending_ttl_seconds=-1)
+        checkout, created = store.create("user-expiry", {"total": 1.0, "status": "pending"}, [])
+        assert created
+        with pytest.raises(CheckoutExpired):
+            store.complete(checkout["id"], "pi_test")
+
+    def test_migration_creates_tables(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'checkouts.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(text("DROP TABLE checkout_items"))
+                conn.execute(text("DROP TABLE checkouts"))
+                conn.execute(text("UPDATE alembic_version SET version_num = '004_rate_limit_buckets'"))
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            inspector = inspect(db_engine)
+            assert {"checkouts", "checkout_items"} <= set(inspector.get_table_names())
+            assert "uq_checkouts_user_idempotency_key" in {i["name"] for i in inspector.get_indexes("checkouts")}
+            assert "request_hash" in {c["name"] for c in inspector.get_columns("checkouts")}
+        finally:
+            db_engine.dispose()
@@ -0,0 +1,111 @@
+"""
+Welcome Link Cron Job Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import event
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from database import MailOutbox, Cleaner, PropertyCleaner
+
+client = TestClient(app)
+
+
+@contextmanager
+def count_selects():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(server.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(server.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _seed(bookings_per_property, check_in=None, check_out=None, status="confirmed", cleaner_hours=None):
+    """Create two properties with bookings (and optionally a cleaner each)"""
+    db = server.SessionLocal()
+    try:
+        user_id = str(uuid.uuid4())
+        db.add(server.DBUser(id=user_id, email=f"cron-{user_id[:8]}@example.com", password_hash="x", name="Host"))
+        for _ in range(2):
+            property_id = str(uuid.uuid4())
+            db.add(server.DBProperty(id=property_id, user_id=user_id, name="Seeblick", address="Seestr. 1"))
+            if cleaner_hours:
+                cleaner_id = str(uuid.uuid4())
+                db.add(Cleaner(id=cleaner_id, user_id=user_id, name="Clara", email="clara@example.com"))
+                db.add(PropertyCleaner(id=str(uuid.uuid4()), property_id=property_id, cleaner_id=cleaner_id,
+                                       notify_hours_before=cleaner_hours))
+            for i in range(bookings_per_property):
+                db.add(server.DBBooking(
+                    id=str(uuid.uuid4()), property_id=property_id, user_id=user_id,
+                    guest_name=f"Gast {i}", guest_email=f"gast{i}@example.com",
+                    check_in=check_in, check_out=check_out, guests=2, total_price=100, status=status
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def mail_enabled(monkeypatch):
+    monkeypatch.setattr(server, "SMTP_CONFIGURED", True)
+    db = server.SessionLocal()
+    db.query(MailOutbox).delete()
+    db.query(server.DBBooking).delete()
+    db.query(PropertyCleaner).delete()
+    db.commit()
+    db.close()
+
+
+@pytest.mark.usefixtures("mail_enabled")
+class TestCronJobs:
+    """Test that cron jobs run a constant number of queries"""
+
+    def _run(self, path):
+        with count_selects() as selects:
+            response = client.post(path)
+        assert response.status_code == 200
+        return response.json(), len(selects)
+
+    def test_booking_reminders_query_count_is_constant(self):
+        """Reminder job does not query per booking"""
+        tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+        _seed(2, check_in=tomorrow, check_out=tomorrow + timedelta(days=3))
+        small, small_queries = self._run("/api/cron/booking-reminders")
+        _seed(10, check_in=tomorrow, check_out=tomorrow + timedelta(days=3))
+        large, large_queries = self._run("/api/cron/booking-reminders")
+
+        assert small["reminders_sent"] == 4
+        assert large["reminders_sent"] == 24
+        assert large_queries == small_queries
+
+    def test_guest_welcome_enqueues_mail(self):
+        """Welcome job feeds the mail outbox"""
+        now = datetime.now(timezone.utc)
+        _seed(3, check_in=now, check_out=now + timedelta(days=2))
+        data, _ = self._run("/api/cron/guest-welcome")
+        assert data["welcomes_sent"] == 6
+        assert server.mail_queue.stats()["pending"] == 6
+
+    def test_cleaning_notifications_query_count_is_constant(self):
+        """Cleaning job loads assignments and bookings set-based"""
+        check_out = datetime.now(timezone.utc) + timedelta(hours=24)
+        _seed(1, check_in=check_out - timedelta(days=2), check_out=check_out, cleaner_hours=24)
+        small, small_queries = self._run("/api/cron/cleaning-notifications")
+        _seed(5, check_in=check_out - timedelta(days=2), check_out=check_out, cleaner_hours=24)
+        large, large_queries = self._run("/api/cron/cleaning-notifications")
+
+        assert small["notifications_sent"] == 2
+        assert large["notifications_sent"] == 12
+        assert large_queries == small_queries
@@ -0,0 +1,212 @@
+"""
+Welcome Link Database Tests (Pool, Schema-Bootstrap)
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import sqlite3
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from sqlalchemy import event, exc, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+client = TestClient(app)
+
+
+class TestPoolSizing:
+    """Test Pool-Sizing aus Threadpool und Worker-Anzahl"""
+
+    def test_default_covers_threadpool(self, monkeypatch):
+        monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+        monkeypatch.delenv("DB_MAX_OVERFLOW", raising=False)
+        monkeypatch.setattr(database, "THREADPOOL_SIZE", 40)
+        monkeypatch.setattr(database, "DB_CONNECTIONS_PER_THREAD", 2)
+        monkeypatch.setattr(database, "DB_BACKGROUND_CONNECTIONS", 4)
+        monkeypatch.setattr(database, "DB_MAX_CONNECTIONS", 0)
+        # Request-Session plus eine eigene Transaktion pro Thread
+        assert database.pool_sizing() == {"pool_size": 10, "max_overflow": 74}
+
+    def test_env_overrides(self, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "3")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+        monkeypatch.setattr(database, "DB_MAX_CONNECTIONS", 0)
+        assert database.pool_sizing() == {"pool_size": 3, "max_overflow": 2}
+
+    def test_connection_budget_split_across_workers(self, monkeypatch):
+        monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+        monkeypatch.delenv("DB_MAX_OVERFLOW", raising=False)
+        monkeypatch.setattr(database, "DB_MAX_CONNECTIONS", 90)
+        monkeypatch.setattr(database, "WEB_CONCURRENCY", 4)
+        sizing = database.pool_sizing()
+        assert sizing["pool_size"] + sizing["max_overflow"] == 22
+
+    def test_memory_sqlite_uses_static_pool(self):
+        options = database.engine_options("sqlite://")
+        assert options["poolclass"] is StaticPool
+        assert options["connect_args"] == {"check_same_thread": False}
+
+    def test_file_sqlite_uses_wal(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+        try:
+            with db_engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert isinstance(db_engine.pool, database.TimedQueuePool)
+        finally:
+            db_engine.dispose()
+
+
+class TestPoolMetrics:
+    """Test Wartezeit- und Auslastungs-Metriken des Pools"""
+
+    def test_timeouts_and_utilization(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "1")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+        try:
+            with db_engine.connect():
+                assert database.pool_stats(db_engine)["utilization"] == 1
+                with pytest.raises(exc.TimeoutError):
+                    db_engine.connect()
+            stats = database.pool_stats(db_engine)
+            assert stats["timeouts"] == 1
+            assert stats["checked_out"] == 0
+            assert stats["max_wait_ms"] >= 50
+        finally:
+            db_engine.dispose()
+
+    def test_wait_excludes_connect_time(self):
+        """Opening a new connection is not reported as queue wait"""
+        def slow_connect():
+            time.sleep(0.1)
+            return sqlite3.connect(":memory:")
+
+        pool = database.TimedQueuePool(slow_connect, pool_size=1, max_overflow=0, timeout=1)
+        try:
+            pool.connect().close()
+            stats = pool.stats()
+            assert stats["checkouts"] == 1
+            assert stats["max_wait_ms"] < 50
+            assert stats["connect_seconds_total"] >= 0.1
+        finally:
+            pool.dispose()
+
+    def test_timeouts_counter(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "1")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "0.01")
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'timeouts.db'}")
+        try:
+            with db_engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    db_engine.connect()
+        finally:
+            db_engine.dispose()
+        text_format = client.get("/api/metrics").text
+        assert "# TYPE db_pool_timeouts_total counter" in text_format
+        assert "db_pool_timeouts_total " in text_format
+
+    def test_pool_exported(self):
+        health = client.get("/api/health").json()
+        assert "class" in health["services"]["database"]["pool"]
+        text_format = client.get("/api/metrics").text
+        if isinstance(server.engine.pool, database.TimedQueuePool):
+            assert "db_pool_utilization" in text_format
+            assert "db_pool_wait_seconds_count" in text_format
+
+
+class TestSchemaBootstrap:
+    """Test Schema-Version beim Boot und migrate_schema()"""
+
+    def test_schema_version_is_alembic_head(self):
+        from alembic.script import ScriptDirectory
+        assert ScriptDirectory.from_config(database.alembic_config()).get_current_head() == database.SCHEMA_VERSION
+
+    def _init_db(self, monkeypatch, url, skip_bootstrap=False):
+        monkeypatch.setenv("DATABASE_URL", url)
+        monkeypatch.setattr(database, "engine", database.engine)
+        monkeypatch.setattr(database, "SessionLocal", database.SessionLocal)
+        db_engine, _ = database.init_db(skip_bootstrap=skip_bootstrap)
+        return db_engine
+
+    def test_fresh_database_is_bootstrapped_and_stamped(self, tmp_path, monkeypatch):
+        db_engine = self._init_db(monkeypatch, f"sqlite:///{tmp_path / 'fresh.db'}")
+        try:
+            assert database.schema_version(db_engine) == database.SCHEMA_VERSION
+            assert "daily_property_stats" in inspect(db_engine).get_table_names()
+        finally:
+            db_engine.dispose()
+
+    def test_current_schema_boots_with_one_query(self, tmp_path, monkeypatch):
+        url = f"sqlite:///{tmp_path / 'ready.db'}"
+        self._init_db(monkeypatch, url).dispose()
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(Engine, "before_cursor_execute", listener)
+        try:
+            db_engine = self._init_db(monkeypatch, url)
+        finally:
+            event.remove(Engine, "before_cursor_execute", listener)
+        db_engine.dispose()
+        assert [s for s in statements if not s.startswith("PRAGMA")] == ["SELECT version_num FROM alembic_version"]
+
+    def test_skip_bootstrap_does_not_touch_schema(self, tmp_path, monkeypatch):
+        db_engine = self._init_db(monkeypatch, f"sqlite:///{tmp_path / 'empty.db'}", skip_bootstrap=True)
+        try:
+            assert inspect(db_engine).get_table_names() == []
+        finally:
+            db_engine.dispose()
+
+    def test_outdated_schema_is_upgraded(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(text("UPDATE alembic_version SET version_num = '001_user_subscription'"))
+                conn.execute(text("DROP TABLE reviews"))
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            assert inspect(db_engine).has_table("reviews")
+        finally:
+            db_engine.dispose()
+
+    def _schema_diff(self, db_engine):
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        with db_engine.connect() as conn:
+            return compare_metadata(MigrationContext.configure(conn), database.Base.metadata)
+
+    def test_migrations_match_models(self, tmp_path):
+        # 002 legt das eingefrorene Schema an, 003-008 müssen es auf den Stand der Models bringen
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'models.db'}")
+        try:
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            assert self._schema_diff(db_engine) == []
+        finally:
+            db_engine.dispose()
+
+    def test_legacy_create_all_database_is_patched(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        try:
+            with db_engine.begin() as conn:
+                conn.execute(text("CREATE TABLE users (id VARCHAR(36) PRIMARY KEY, email VARCHAR(255), "
+                                  "password_hash VARCHAR(255), name VARCHAR(255), created_at DATETIME)"))
+                conn.execute(text("CREATE UNIQUE INDEX ix_users_email_verification_token ON users (id)"))
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            users = inspect(db_engine)
+            assert {"plan", "is_email_verified", "keysafe_code"} <= {c["name"] for c in users.get_columns("users")}
+            index = next(ix for ix in users.get_indexes("users") if ix["name"] == "ix_users_email_verification_token")
+            assert not index["unique"]
+            assert users.has_table("reviews")
+        finally:
+            db_engine.dispose()
+
+    def test_migrate_does_not_import_app(self):
+        import subprocess
+        code = "import sys, migrate; sys.exit('server' in sys.modules)"
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        assert subprocess.run([sys.executable, "-c", code], cwd=backend).returncode == 0
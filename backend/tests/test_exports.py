@@ -0,0 +1,124 @@
+"""
+Welcome Link Export Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import csv
+import io
+import sys
+import os
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+
+client = TestClient(app)
+
+
+def _host_with_properties(count):
+    db = server.SessionLocal()
+    try:
+        user_id = str(uuid.uuid4())
+        email = f"export-{user_id[:8]}@example.com"
+        db.add(server.DBUser(id=user_id, email=email, password_hash="x", name="Hotel Bayerhof"))
+        property_ids = []
+        for i in range(count):
+            property_id = str(uuid.uuid4())
+            db.add(server.DBProperty(id=property_id, user_id=user_id, name=f"Zimmer {i}", address="Bahnhofstr. 1"))
+            property_ids.append(property_id)
+        db.commit()
+        return {"Authorization": f"Bearer {server.create_token(user_id, email)}"}, property_ids
+    finally:
+        db.close()
+
+
+class TestBulkQR:
+    """Test bulk QR sheet generation"""
+
+    def test_zip_contains_one_png_per_property(self):
+        """ZIP export renders every property in the worker pool"""
+        headers, _ = _host_with_properties(4)
+        response = client.post("/api/properties/qr/bulk", json={"format": "zip"}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        names = archive.namelist()
+        assert len(names) == 4
+        assert all(archive.read(name).startswith(b"\x89PNG") for name in names)
+
+    def test_pdf_for_selected_properties(self):
+        """PDF export is limited to the selected properties"""
+        headers, property_ids = _host_with_properties(3)
+        response = client.post("/api/properties/qr/bulk", json={"property_ids": property_ids[:2]}, headers=headers)
+        assert response.status_code == 200
+        assert response.content.startswith(b"%PDF")
+        assert response.content.count(b"/Type /Page\n") == 2
+
+    def test_sheet_pdf_is_built_in_pool(self):
+        """The reportlab build runs in a pool process, not in the request thread"""
+        from qr_codes import render_qr_sheet_pdf_pooled, shutdown_render_pool
+        url = "https://www.welcome-link.de/guestview/pool"
+        png = server.render_qr_png(url, 15, 2, "H")
+        try:
+            pdf = render_qr_sheet_pdf_pooled([(png, url, "Zimmer 1", None)] * 2, "QR-Codes", workers=2)
+        finally:
+            shutdown_render_pool()
+        assert pdf.startswith(b"%PDF")
+        assert pdf.count(b"/Type /Page\n") == 2
+        assert 1 <= server.QR_BULK_WORKERS <= (os.cpu_count() or 1)
+
+    def test_invalid_format(self):
+        """Unknown formats are rejected"""
+        headers, _ = _host_with_properties(1)
+        response = client.post("/api/properties/qr/bulk", json={"format": "tiff"}, headers=headers)
+        assert response.status_code == 400
+
+
+class TestCSVExport:
+    """Test streaming CSV exports"""
+
+    def test_bookings_csv_is_quoted(self):
+        """Values with commas and quotes survive the export"""
+        headers, property_ids = _host_with_properties(1)
+        db = server.SessionLocal()
+        try:
+            prop = db.query(server.DBProperty).filter(server.DBProperty.id == property_ids[0]).first()
+            check_in = datetime(2026, 7, 1)
+            for i in range(5):
+                db.add(server.DBBooking(
+                    id=str(uuid.uuid4()), property_id=prop.id, user_id=prop.user_id,
+                    guest_name=f'Müller, "Hans" {i}', check_in=check_in, check_out=check_in + timedelta(days=3),
+                    status="confirmed", total_price=300
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+        response = client.get("/api/export/bookings/csv", headers=headers)
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0][0] == "Booking ID"
+        assert len(rows) == 6
+        assert rows[1][1].startswith('Müller, "Hans"')
+        assert rows[1][4] == "Zimmer 0"
+        assert rows[1][7] == "3"
+
+    def test_properties_csv(self):
+        """Properties export lists every property of the host"""
+        headers, _ = _host_with_properties(3)
+        response = client.get("/api/export/properties/csv", headers=headers)
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["Property ID", "Name", "Address", "WiFi Name", "Check-in Time", "Check-out Time"]
+        assert len(rows) == 4
+
+    def test_stream_is_chunked(self):
+        """The engine yields one chunk per batch instead of one big string"""
+        from csv_export import stream_csv
+        from sqlalchemy import select
+        _host_with_properties(5)
+        stmt = select(server.DBProperty.id, server.DBProperty.name)
+        chunks = list(stream_csv(server.SessionLocal, stmt, ["id", "name"], batch_size=2))
+        assert len(chunks) > 2
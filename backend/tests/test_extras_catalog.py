@@ -0,0 +1,247 @@
+"""
+Welcome Link Extras-Katalog Tests (Preisindex, Versionierung, Bestand, Bundles)
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from cache import TTLCache
+from extras_catalog import ExtrasCatalog, OutOfStock, StalePriceIndex, UnknownExtra
+from sqlalchemy import event, inspect, text
+from sqlalchemy.dialects import postgresql
+
+client = TestClient(app)
+
+
+def _host():
+    """Gastgeber mit leerer Property -> (Auth-Header, Property-ID)"""
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"catalog-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash="x", name="Catalog Test")
+        property = server.DBProperty(id=str(uuid.uuid4()), user_id=user.id, name="Catalog Property")
+        db.add_all([user, property])
+        db.commit()
+        return {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}, property.id
+    finally:
+        db.close()
+
+
+def _create_extra(headers, property_id, **fields):
+    response = client.post(f"/api/properties/{property_id}/extras", headers=headers,
+                           json={"name": "Frühstück", "price": 15.0, **fields})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _checkout(headers, property_id, items, payment_method="stripe"):
+    return client.post("/api/checkout", headers=headers, json={
+        "property_id": property_id,
+        "items": [{"extra_id": extra_id, "quantity": quantity} for extra_id, quantity in items],
+        "guest_name": "Erika Muster",
+        "guest_email": "erika@example.com",
+        "payment_method": payment_method,
+    })
+
+
+def _stock(extra_id):
+    with server.engine.connect() as conn:
+        return conn.execute(text("SELECT stock FROM extras WHERE id = :id"), {"id": extra_id}).scalar()
+
+
+class TestPriceIndex:
+    """Test Preisindex pro Property"""
+
+    def test_index_is_cached_and_invalidated_on_edit(self):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id)
+        builds = server.extras_catalog.builds
+        first = client.get(f"/api/properties/{property_id}/extras").json()
+        second = client.get(f"/api/properties/{property_id}/extras").json()
+        assert first == second
+        assert server.extras_catalog.builds == builds + 1
+        assert [extra["price"] for extra in first["extras"]] == [15.0]
+
+        response = client.put(f"/api/properties/{property_id}/extras/{extra_id}", headers=headers,
+                              json={"name": "Frühstück", "price": 18.0})
+        assert response.status_code == 200
+        updated = client.get(f"/api/properties/{property_id}/extras").json()
+        assert updated["version"] == first["version"] + 1
+        assert [extra["price"] for extra in updated["extras"]] == [18.0]
+
+    def test_stale_index_of_other_worker_is_rejected(self):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id)
+        other_worker = ExtrasCatalog(server.SessionLocal, server.DBProperty, server.DBExtra, server.DBBundle,
+                                     server.DBBundleExtra, TTLCache("catalog-test", maxsize=8))
+        index = other_worker.price_index(property_id)
+        assert index.price([(extra_id, 2)]) == (
+            [{"extra_id": extra_id, "name": "Frühstück", "price": 15.0, "quantity": 2, "total": 30.0}], 30.0)
+        with pytest.raises(UnknownExtra):
+            index.price([("gibt-es-nicht", 1)])
+
+        client.put(f"/api/properties/{property_id}/extras/{extra_id}", headers=headers,
+                   json={"name": "Frühstück", "price": 18.0})
+        db = server.SessionLocal()
+        statements = []
+        event.listen(db, "do_orm_execute", lambda state: statements.append(state.statement))
+        try:
+            with pytest.raises(StalePriceIndex):
+                other_worker.check_version(db, index)
+        finally:
+            db.close()
+        # Property-Zeile bleibt bis zum Commit gesperrt (SQLite serialisiert Schreiber ohnehin)
+        assert "FOR SHARE" in str(statements[0].compile(dialect=postgresql.dialect()))
+        assert other_worker.price_index(property_id).items[extra_id]["price"] == 18.0
+
+    def test_unknown_property_and_foreign_owner(self):
+        headers, _ = _host()
+        _, foreign_property_id = _host()
+        assert client.get("/api/properties/gibt-es-nicht/extras").status_code == 404
+        response = client.post(f"/api/properties/{foreign_property_id}/extras", headers=headers,
+                               json={"name": "Sauna", "price": 30.0})
+        assert response.status_code == 403
+
+
+class TestCatalogCheckout:
+    """Test Checkout mit Preisindex und Bestand"""
+
+    def test_checkout_prices_from_catalog(self):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id, price=12.5)
+        response = _checkout(headers, property_id, [(extra_id, 2)])
+        assert response.status_code == 200
+        assert response.json()["total"] == round(25.0 * 1.19, 2)
+        assert _checkout(headers, property_id, [("gibt-es-nicht", 1)]).status_code == 400
+
+    def test_stock_is_decremented_atomically(self):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id, stock=3)
+        assert _checkout(headers, property_id, [(extra_id, 2)]).status_code == 200
+        assert _stock(extra_id) == 1
+        response = _checkout(headers, property_id, [(extra_id, 2)])
+        assert response.status_code == 409
+        assert _stock(extra_id) == 1
+
+        # Offene Checkouts buchen den Bestand erst beim Bezahlen
+        checkout_id = _checkout(headers, property_id, [(extra_id, 1)], "paypal").json()["checkout_id"]
+        assert _stock(extra_id) == 1
+        assert client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).status_code == 200
+        assert _stock(extra_id) == 0
+
+    def test_reserve_single_update_per_extra(self):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id, stock=1)
+        index = server.extras_catalog.price_index(property_id)
+        order_items, _ = index.price([(extra_id, 1)])
+        first, second = server.SessionLocal(), server.SessionLocal()
+        try:
+            server.extras_catalog.reserve(first, index, order_items)
+            first.commit()
+            with pytest.raises(OutOfStock):
+                server.extras_catalog.reserve(second, index, order_items)
+        finally:
+            first.close()
+            second.close()
+        assert _stock(extra_id) == 0
+
+    def test_bundle_pricing_and_component_stock(self):
+        headers, property_id = _host()
+        breakfast = _create_extra(headers, property_id, stock=5)
+        sauna = _create_extra(headers, property_id, name="Sauna", price=30.0)
+        response = client.post(f"/api/properties/{property_id}/bundles", headers=headers, json={
+            "name": "Wellness-Wochenende", "price": 50.0,
+            "extras": [{"extra_id": breakfast, "quantity": 2}, {"extra_id": sauna, "quantity": 1}],
+        })
+        assert response.status_code == 200
+        bundle_id = response.json()["id"]
+
+        catalog = client.get(f"/api/properties/{property_id}/extras").json()
+        assert [bundle["id"] for bundle in catalog["bundles"]] == [bundle_id]
+        checkout = _checkout(headers, property_id, [(bundle_id, 2)])
+        assert checkout.status_code == 200
+        assert checkout.json()["total"] == round(100.0 * 1.19, 2)
+        assert _stock(breakfast) == 1
+        assert _checkout(headers, property_id, [(bundle_id, 1)]).status_code == 409
+
+    def test_guestview_lists_catalog_extras(self):
+        headers, property_id = _host()
+        token = str(uuid.uuid4())
+        db = server.SessionLocal()
+        try:
+            user_id = db.query(server.DBProperty).filter(server.DBProperty.id == property_id).first().user_id
+            db.add(server.DBGuestView(id=str(uuid.uuid4()), user_id=user_id, token=token))
+            db.commit()
+        finally:
+            db.close()
+        assert client.get(f"/api/guestview/{token}").json()["extras"] == []
+
+        # Neues Extra verwirft den Guestview-Snapshot
+        extra_id = _create_extra(headers, property_id)
+        assert [extra["id"] for extra in client.get(f"/api/guestview/{token}").json()["extras"]] == [extra_id]
+
+    def test_guestview_and_completion_use_the_request_connection(self, one_connection_pool):
+        headers, property_id = _host()
+        extra_id = _create_extra(headers, property_id, stock=2)
+        token = str(uuid.uuid4())
+        db = server.SessionLocal()
+        try:
+            user_id = db.query(server.DBProperty).filter(server.DBProperty.id == property_id).first().user_id
+            db.add(server.DBGuestView(id=str(uuid.uuid4()), user_id=user_id, token=token))
+            db.commit()
+        finally:
+            db.close()
+        server.extras_catalog.invalidate(property_id)
+        assert [extra["id"] for extra in client.get(f"/api/guestview/{token}").json()["extras"]] == [extra_id]
+
+        checkout_id = _checkout(headers, property_id, [(extra_id, 1)], "paypal").json()["checkout_id"]
+        server.extras_catalog.invalidate(property_id)
+        assert client.post(f"/api/checkout/{checkout_id}/complete", headers=headers).status_code == 200
+        assert one_connection_pool.pool.timeouts == 0
+
+    def test_price_indexes_batch_properties(self):
+        headers, first = _host()
+        second = str(uuid.uuid4())
+        db = server.SessionLocal()
+        try:
+            user_id = db.query(server.DBProperty).filter(server.DBProperty.id == first).first().user_id
+            db.add(server.DBProperty(id=second, user_id=user_id, name="Zweite Property"))
+            db.commit()
+        finally:
+            db.close()
+        extra_id = _create_extra(headers, second)
+        statements = []
+        db = server.SessionLocal()
+        event.listen(db, "do_orm_execute", lambda state: statements.append(state.statement))
+        try:
+            indexes = server.extras_catalog.price_indexes([second, first, "gibt-es-nicht"], db, refresh=True)
+        finally:
+            db.close()
+        assert list(indexes) == [second, first]
+        assert list(indexes[second].items) == [extra_id]
+        assert len(statements) == 3  # Versionen, Extras, Bundles - unabhängig von der Anzahl Properties
+
+
+class TestCatalogMigration:
+    """Test Migration 006"""
+
+    def test_upgrade_from_005(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(text("DROP INDEX ix_extras_property_id"))
+                conn.execute(text("ALTER TABLE extras DROP COLUMN property_id"))
+                conn.execute(text("ALTER TABLE properties DROP COLUMN extras_version"))
+                conn.execute(text("UPDATE alembic_version SET version_num = '005_checkouts'"))
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            inspector = inspect(db_engine)
+            assert "extras_version" in {c["name"] for c in inspector.get_columns("properties")}
+            assert "ix_extras_property_id" in {i["name"] for i in inspector.get_indexes("extras")}
+        finally:
+            db_engine.dispose()
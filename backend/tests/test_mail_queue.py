@@ -0,0 +1,125 @@
+"""
+Welcome Link Mail Queue Tests
+"""
+import pytest
+import sys
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from database import MailOutbox
+from mail_queue import MailQueue, PooledSMTPConnection
+
+
+class FakeSMTP:
+    """Minimal SMTP stand-in recording every delivery"""
+    instances = []
+    fail_next = 0
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        return (250, b"OK")
+
+    def sendmail(self, sender, to_email, message):
+        if FakeSMTP.fail_next:
+            FakeSMTP.fail_next -= 1
+            raise smtplib.SMTPServerDisconnected("relay gone")
+        self.sent.append(to_email)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def queue():
+    FakeSMTP.instances = []
+    FakeSMTP.fail_next = 0
+    db = server.SessionLocal()
+    db.query(MailOutbox).delete()
+    db.commit()
+    db.close()
+    return MailQueue(
+        session_factory=server.SessionLocal,
+        connection_factory=lambda: PooledSMTPConnection("localhost", 1025, use_tls=False, smtp_class=FakeSMTP),
+        sender="noreply@welcome-link.de",
+        max_attempts=2,
+        backoff_seconds=0,
+    )
+
+
+class TestMailQueue:
+    """Test the mail outbox and its workers"""
+
+    def test_enqueue_persists_pending_mail(self, queue):
+        """Enqueued mail is stored and counted as queue depth"""
+        queue.enqueue("gast@example.com", "Hallo", "<p>Hallo</p>")
+        stats = queue.stats()
+        assert stats["pending"] == 1
+        assert stats["enqueued"] == 1
+
+    def test_worker_reuses_connection(self, queue):
+        """A single SMTP connection delivers the whole batch"""
+        for i in range(3):
+            queue.enqueue(f"gast{i}@example.com", "Hallo", "<p>Hallo</p>", "Hallo")
+        assert queue.run_pending() == 3
+        assert len(FakeSMTP.instances) == 1
+        assert len(FakeSMTP.instances[0].sent) == 3
+        assert queue.stats()["pending"] == 0
+
+    def test_retry_then_dead_letter(self, queue):
+        """Failed deliveries are retried and finally marked failed"""
+        FakeSMTP.fail_next = 10
+        queue.enqueue("gast@example.com", "Hallo", "<p>Hallo</p>")
+        queue.run_pending()
+        stats = queue.stats()
+        assert stats["failed"] == 1
+        assert stats["retried"] == 1
+        assert stats["dead"] == 1
+
+    def test_worker_survives_errors_and_recovers_stale(self, queue):
+        """A failing poll does not kill the worker; stale 'sending' rows are reset while running"""
+        queue.poll_interval = 0.01
+        queue.recover_interval = 0
+        mail_id = queue.enqueue("gast@example.com", "Hallo", "<p>Hallo</p>")
+        db = server.SessionLocal()
+        db.query(MailOutbox).filter(MailOutbox.id == mail_id).update({
+            MailOutbox.status: 'sending',
+            MailOutbox.next_attempt_at: datetime.now(timezone.utc) - timedelta(minutes=30),
+        })
+        db.commit()
+        db.close()
+
+        process_next = queue.process_next
+        calls = []
+
+        def flaky(connection):
+            calls.append(connection)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return process_next(connection)
+
+        queue.process_next = flaky
+        queue._last_recovery = time.monotonic()
+        queue._threads = [threading.Thread(target=queue._run, daemon=True)]
+        queue._threads[0].start()
+        try:
+            deadline = time.monotonic() + 5
+            while queue.sent < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            queue.stop()
+        assert queue.sent == 1
+        assert queue.stats()["errors"] == 1
+
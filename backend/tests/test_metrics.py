@@ -0,0 +1,145 @@
+"""
+Welcome Link Metrics Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from metrics import MetricsRegistry, COUNT_BUCKETS
+
+client = TestClient(app)
+
+
+def _sample(text, name, **labels):
+    """Wert einer Zeitreihe aus dem Textformat (None, wenn nicht vorhanden)"""
+    for line in text.splitlines():
+        if line.startswith("#") or not line.startswith(name):
+            continue
+        series, value = line.rsplit(" ", 1)
+        if series.split("{")[0] != name:
+            continue
+        if all(f'{k}="{v}"' in series for k, v in labels.items()):
+            return float(value)
+    return None
+
+
+class TestMetricsEndpoint:
+    """Test /api/metrics"""
+
+    def test_prometheus_text_format(self):
+        client.get("/api/")
+        response = client.get("/api/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "# TYPE http_requests_total counter" in response.text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/",le="+Inf"}' in response.text
+
+    def test_route_label_uses_template(self):
+        token = f"missing-{uuid.uuid4().hex}"
+        client.get(f"/api/guestview/{token}")
+        text = client.get("/api/metrics").text
+        assert token not in text
+        assert _sample(text, "http_requests_total", route="/api/guestview/{token}", status="404") >= 1
+
+    def test_unmatched_route(self):
+        client.get(f"/api/does-not-exist-{uuid.uuid4().hex}")
+        text = client.get("/api/metrics").text
+        assert _sample(text, "http_requests_total", route="unmatched", status="404") >= 1
+
+    def test_db_queries_per_request(self):
+        before = server.metrics.snapshot()
+        client.get(f"/api/guestview/missing-{uuid.uuid4().hex}")
+        text = client.get("/api/metrics").text
+        # Mindestens die Guestview-Abfrage wurde dem Request zugeordnet
+        assert _sample(text, "http_request_db_queries_sum", route="/api/guestview/{token}") >= 1
+        assert _sample(text, "db_queries_total") > sum(
+            value for name, _, value in before["counters"] if name == "db_queries_total")
+        assert _sample(text, "threadpool_threads_total") > 0
+
+    def test_token_protection(self, monkeypatch):
+        monkeypatch.setattr(server, "METRICS_TOKEN", "geheim")
+        assert client.get("/api/metrics").status_code == 401
+        assert client.get("/api/metrics", headers={"Authorization": "Bearer falsch"}).status_code == 401
+        assert client.get("/api/metrics", headers={"Authorization": "Bearer geheim"}).status_code == 200
+
+
+class TestMetricsRegistry:
+    """Test MetricsRegistry (Histogramme, Multi-Worker)"""
+
+    def _registry(self, directory=None):
+        registry = MetricsRegistry(multiproc_dir=directory)
+        registry.counter("jobs_total", "Jobs")
+        registry.gauge("busy", "Busy")
+        registry.histogram("items", "Items", buckets=COUNT_BUCKETS)
+        return registry
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = self._registry()
+        for value in (0, 1, 3, 300):
+            registry.observe("items", value)
+        text = registry.render()
+        assert 'items_bucket{le="0"} 1' in text
+        assert 'items_bucket{le="5"} 3' in text
+        assert 'items_bucket{le="250"} 3' in text
+        assert 'items_bucket{le="+Inf"} 4' in text
+        assert "items_sum 304" in text
+        assert "items_count 4" in text
+
+    def test_label_values_are_escaped(self):
+        registry = self._registry()
+        registry.inc("jobs_total", {"name": 'a"b\\c'})
+        assert 'jobs_total{name="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_workers_are_aggregated(self, tmp_path):
+        worker_a = self._registry(str(tmp_path))
+        worker_b = self._registry(str(tmp_path))
+        # Zweiter Worker simuliert: eigener Snapshot-Dateiname
+        worker_b._snapshot_path = lambda: str(tmp_path / "metrics-other.json")
+        worker_a.inc("jobs_total", value=2)
+        worker_b.inc("jobs_total", value=3)
+        worker_a.set("busy", 1)
+        worker_b.set("busy", 4)
+        worker_b.observe("items", 2)
+        worker_b.dump()
+
+        text = worker_a.render()
+        assert "jobs_total 5" in text
+        assert "busy 5" in text
+        assert "items_count 1" in text
+
+    def test_gauge_aggregation_modes(self, tmp_path):
+        """Ratios are not summed across workers"""
+        worker_a = self._registry(str(tmp_path))
+        worker_b = self._registry(str(tmp_path))
+        worker_b._snapshot_path = lambda: str(tmp_path / "metrics-other.json")
+        for registry in (worker_a, worker_b):
+            registry.gauge("utilization", "Utilization", aggregate="max")
+            registry.gauge("queue", "Queue", aggregate="pid")
+        worker_a.set("utilization", 0.5)
+        worker_b.set("utilization", 0.75)
+        worker_a.set("queue", 1, {"pool": "db"})
+        worker_b.set("queue", 3, {"pool": "db"})
+        worker_b.dump()
+
+        text = worker_a.render()
+        assert "utilization 0.75" in text
+        assert f'queue{{pid="{os.getpid()}",pool="db"}} 1' in text
+        assert 'queue{pid="other",pool="db"} 3' in text
+
+    def test_stale_worker_gauges_are_ignored(self, tmp_path):
+        worker_a = self._registry(str(tmp_path))
+        worker_b = self._registry(str(tmp_path))
+        worker_b._snapshot_path = lambda: str(tmp_path / "metrics-other.json")
+        worker_b.inc("jobs_total")
+        worker_b.set("busy", 7)
+        worker_b.dump()
+        os.utime(tmp_path / "metrics-other.json", (0, 0))
+
+        text = worker_a.render()
+        assert "jobs_total 1" in text
+        assert "busy" not in text
@@ -0,0 +1,183 @@
+"""
+Welcome Link Pagination Tests (Keyset-Cursor, Zählmodi, Listen-Endpoints)
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from pagination import InvalidCursor, MAX_LIMIT, decode_cursor, encode_cursor, keyset_page
+from sqlalchemy import inspect, text
+
+client = TestClient(app)
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0)
+
+
+def _host(rows=0, model=None, **fields):
+    """Gastgeber mit `rows` Einträgen, je zwei mit gleichem created_at -> (Auth-Header, User-ID)"""
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"pages-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash="x", name="Pagination Test")
+        db.add(user)
+        for i in range(rows):
+            db.add(model(id=str(uuid.uuid4()), user_id=user.id, created_at=BASE_TIME + timedelta(minutes=i // 2),
+                         **fields))
+        db.commit()
+        return {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}, user.id
+    finally:
+        db.close()
+
+
+def _walk(path, key, headers, **params):
+    """Allen next_cursor folgen -> (IDs in Reihenfolge, Antworten)"""
+    ids, responses, cursor = [], [], None
+    for _ in range(20):
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200
+        responses.append(response.json())
+        ids.extend(item["id"] for item in response.json()[key])
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+    return ids, responses
+
+
+class TestKeysetHelper:
+    """Test Cursor und Seitenbildung"""
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor(BASE_TIME, "abc|def")) == (BASE_TIME, "abc|def")
+        with pytest.raises(InvalidCursor):
+            decode_cursor("kaputt")
+
+    def test_pages_cover_ties_and_counts(self):
+        _, user_id = _host(7, server.DBBooking, property_id="prop-pages")
+        db = server.SessionLocal()
+        try:
+            query = db.query(server.DBBooking).filter(server.DBBooking.user_id == user_id)
+            expected = [b.id for b in query.order_by(server.DBBooking.created_at.desc(), server.DBBooking.id.desc())]
+            first = keyset_page(query, server.DBBooking.created_at, server.DBBooking.id, limit=3)
+            second = keyset_page(query, server.DBBooking.created_at, server.DBBooking.id, limit=3,
+                                 cursor=first.next_cursor)
+            third = keyset_page(query, server.DBBooking.created_at, server.DBBooking.id, limit=3,
+                                cursor=second.next_cursor, count="estimated")
+            assert [b.id for page in (first, second, third) for b in page.items] == expected
+            assert (first.total, second.total, third.total) == (7, None, 7)
+            assert third.next_cursor is None
+            assert keyset_page(query, server.DBBooking.created_at, server.DBBooking.id,
+                               limit=10_000, count="none").total is None
+        finally:
+            db.close()
+        assert MAX_LIMIT == 200
+
+    def test_rows_without_created_at_follow_dated_rows(self):
+        _, user_id = _host(3, server.DBBooking, property_id="prop-pages")
+        db = server.SessionLocal()
+        try:
+            undated = sorted(str(uuid.uuid4()) for _ in range(3))
+            db.add_all(server.DBBooking(id=booking_id, user_id=user_id, property_id="prop-pages") for booking_id in undated)
+            db.commit()
+            db.query(server.DBBooking).filter(server.DBBooking.id.in_(undated)).update(
+                {server.DBBooking.created_at: None}, synchronize_session=False)
+            db.commit()
+
+            query = db.query(server.DBBooking).filter(server.DBBooking.user_id == user_id)
+            ids, cursor = [], None
+            for _ in range(5):
+                page = keyset_page(query, server.DBBooking.created_at, server.DBBooking.id, limit=2, cursor=cursor)
+                ids.extend(b.id for b in page.items)
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+            assert len(ids) == len(set(ids)) == 6
+            assert ids[3:] == undated[::-1]
+        finally:
+            db.close()
+        assert decode_cursor(encode_cursor(None, "abc")) == (None, "abc")
+
+    def test_legacy_offset_continues_into_undated_rows(self):
+        _, user_id = _host(3, server.DBBooking, property_id="prop-pages")
+        db = server.SessionLocal()
+        try:
+            undated = sorted(str(uuid.uuid4()) for _ in range(4))
+            db.add_all(server.DBBooking(id=booking_id, user_id=user_id, property_id="prop-pages") for booking_id in undated)
+            db.commit()
+            db.query(server.DBBooking).filter(server.DBBooking.id.in_(undated)).update(
+                {server.DBBooking.created_at: None}, synchronize_session=False)
+            db.commit()
+
+            query = db.query(server.DBBooking).filter(server.DBBooking.user_id == user_id)
+            pages = [[b.id for b in keyset_page(query, server.DBBooking.created_at, server.DBBooking.id,
+                                                limit=2, offset=offset, count="none").items]
+                     for offset in range(0, 8, 2)]
+            ids = [booking_id for page in pages for booking_id in page]
+            assert len(ids) == len(set(ids)) == 7
+            assert ids[3:] == undated[::-1]
+            assert pages[3] == [undated[0]]
+        finally:
+            db.close()
+
+
+class TestListEndpoints:
+    """Test next_cursor-Umschlag der Listen-Endpoints"""
+
+    def test_feedback_pages(self):
+        headers, _ = _host(5, server.DBFeedback, property_id="prop-pages", rating=5)
+        ids, responses = _walk("/api/feedback", "feedback", headers, limit=2)
+        assert len(ids) == len(set(ids)) == 5
+        assert responses[0]["total"] == 5
+        assert all(page["total"] is None for page in responses[1:])
+
+    def test_reviews_pages(self):
+        property_id = str(uuid.uuid4())
+        db = server.SessionLocal()
+        try:
+            for i in range(5):
+                db.add(database.Review(id=str(uuid.uuid4()), property_id=property_id, guest_name="Gast", rating=4,
+                                       is_approved=True, created_at=BASE_TIME + timedelta(minutes=i // 2)))
+            db.commit()
+        finally:
+            db.close()
+        headers, _ = _host()
+        ids, responses = _walk("/api/reviews", "reviews", headers, property_id=property_id, limit=2)
+        assert len(ids) == len(set(ids)) == 5
+        assert responses[0]["total"] == 5
+
+    def test_bookings_feed_envelope(self):
+        headers, _ = _host(3, server.DBBooking, property_id="prop-pages", guest_name="Gast")
+        ids, responses = _walk("/api/admin/bookings/feed", "bookings", headers, limit=2)
+        assert len(ids) == len(set(ids)) == 3
+        assert responses[0]["total"] is None
+
+        empty_headers, _ = _host()
+        feed = client.get("/api/admin/bookings/feed", headers=empty_headers).json()
+        assert feed["next_cursor"] is None
+        assert feed["bookings"][0]["is_demo"] is True
+
+    def test_invalid_cursor_and_count(self):
+        headers, _ = _host()
+        assert client.get("/api/feedback?cursor=kaputt", headers=headers).status_code == 400
+        assert client.get("/api/reviews?count=ungefaehr", headers=headers).status_code == 422
+
+
+class TestKeysetMigration:
+    """Test Migration 007"""
+
+    def test_upgrade_from_006(self, tmp_path):
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pages.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(text("DROP INDEX ix_feedback_user_created_id"))
+                conn.execute(text("UPDATE alembic_version SET version_num = '006_extras_catalog'"))
+            assert database.migrate_schema(db_engine) == database.SCHEMA_VERSION
+            assert "ix_feedback_user_created_id" in {i["name"] for i in inspect(db_engine).get_indexes("feedback")}
+        finally:
+            db_engine.dispose()
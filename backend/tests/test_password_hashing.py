@@ -0,0 +1,136 @@
+"""
+Welcome Link Password Hashing Tests (Prozess-Pool, Back-Pressure, Rehash)
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from password_hashing import PasswordHasher, PasswordHasherBusy, crypt_context
+
+client = TestClient(app)
+
+
+def _create_user(password_hash):
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"hasher-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash=password_hash, name="Hasher Test", is_email_verified=True)
+        db.add(user)
+        db.commit()
+        return user.id, user.email
+    finally:
+        db.close()
+
+
+def _password_hash(user_id):
+    db = server.SessionLocal()
+    try:
+        return db.query(server.DBUser).filter(server.DBUser.id == user_id).first().password_hash
+    finally:
+        db.close()
+
+
+class TestPasswordHasher:
+    """Test Hashing im eigenen Pool"""
+
+    def test_process_pool_hash_and_verify(self):
+        observed = []
+        hasher = PasswordHasher(rounds=4, workers=1)
+        hasher.observers.append(lambda operation, wait, run: observed.append(operation))
+        try:
+            hashed = asyncio.run(hasher.hash("Geheim123!"))
+            assert hashed.startswith("$2b$04$")
+            assert asyncio.run(hasher.verify_and_update("Geheim123!", hashed)) == (True, None)
+            assert asyncio.run(hasher.verify_and_update("Falsch123!", hashed)) == (False, None)
+        finally:
+            hasher.stop()
+        assert observed == ["hash", "verify", "verify"]
+        assert hasher.stats()["completed"] == 3
+
+    def test_rehash_when_rounds_change(self):
+        hasher = PasswordHasher(rounds=5, workers=0)
+        try:
+            valid, new_hash = asyncio.run(hasher.verify_and_update("Geheim123!", crypt_context(4).hash("Geheim123!")))
+        finally:
+            hasher.stop()
+        assert valid
+        assert new_hash.startswith("$2b$05$")
+        assert hasher.stats()["rehashed"] == 1
+
+    def test_full_queue_is_rejected(self):
+        hasher = PasswordHasher(rounds=4, workers=0, max_pending=0)
+        with pytest.raises(PasswordHasherBusy):
+            asyncio.run(hasher.hash("Geheim123!"))
+        assert hasher.stats()["rejected"] == 1
+
+
+class TestPasswordEndpoints:
+    """Test Login über den Passwort-Pool"""
+
+    def test_login_rehashes_outdated_hash(self, monkeypatch):
+        monkeypatch.setattr(server.password_hasher, "rounds", 5)
+        user_id, email = _create_user(crypt_context(4).hash("Sicher123!"))
+        response = client.post("/api/auth/login", json={"email": email, "password": "Sicher123!"})
+        assert response.status_code == 200
+        assert _password_hash(user_id).startswith("$2b$05$")
+
+    def test_rehash_invalidates_cached_principal(self, monkeypatch):
+        monkeypatch.setattr(server.password_hasher, "rounds", 5)
+        user_id, email = _create_user(crypt_context(4).hash("Sicher123!"))
+        invalidated = []
+        monkeypatch.setattr(server, "invalidate_principal", invalidated.append)
+        assert client.post("/api/auth/login", json={"email": email, "password": "Sicher123!"}).status_code == 200
+        assert invalidated == [user_id]
+
+    def test_login_returns_503_when_hasher_is_full(self, monkeypatch):
+        monkeypatch.setattr(server.password_hasher, "max_pending", 0)
+        _, email = _create_user(crypt_context(4).hash("Sicher123!"))
+        response = client.post("/api/auth/login", json={"email": email, "password": "Sicher123!"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert "password_hash_rejected_total" in server.metrics.render()
+
+    def test_concurrent_reset_confirm_uses_token_once(self, monkeypatch):
+        """The second request for the same token gets 400 instead of a 500"""
+        user_id, email = _create_user("x")
+        token = f"reset-{uuid.uuid4().hex}"
+
+        async def slow_hash(password):
+            await asyncio.sleep(0.05)
+            return f"hashed-{password}"
+
+        async def confirm():
+            db = server.SessionLocal()
+            try:
+                return await server.confirm_password_reset(
+                    server.PasswordResetConfirm(token=token, new_password="Neu12345!"), db)
+            finally:
+                db.close()
+
+        async def run():
+            return await asyncio.gather(confirm(), confirm(), return_exceptions=True)
+
+        monkeypatch.setattr(server, "hash_password_pooled", slow_hash)
+        server.password_reset_tokens[token] = {"email": email,
+                                               "expires": server.datetime.now(server.timezone.utc) + server.timedelta(hours=1)}
+        first, second = asyncio.run(run())
+        assert first == {"message": "Passwort erfolgreich zurückgesetzt"}
+        assert second.status_code == 400
+        assert _password_hash(user_id) == "hashed-Neu12345!"
+        assert token not in server.password_reset_tokens
+
+    def test_reset_token_survives_busy_hasher(self, monkeypatch):
+        monkeypatch.setattr(server.password_hasher, "max_pending", 0)
+        _, email = _create_user("x")
+        token = f"reset-{uuid.uuid4().hex}"
+        server.password_reset_tokens[token] = {"email": email,
+                                               "expires": server.datetime.now(server.timezone.utc) + server.timedelta(hours=1)}
+        response = client.post("/api/auth/password-reset/confirm", json={"token": token, "new_password": "Neu12345!"})
+        assert response.status_code == 503
+        assert token in server.password_reset_tokens
+
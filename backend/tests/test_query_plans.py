@@ -0,0 +1,167 @@
+"""
+Welcome Link Query-Plan Tests (EXPLAIN für heiße Filter)
+Seedet einen realistischen Datenbestand in eine eigene Datenbank (SQLite oder
+QUERY_PLAN_DATABASE_URL, z.B. eine leere PostgreSQL-Testdatenbank), ruft die
+Endpoints gegen diese Datenbank auf, zeichnet das erzeugte SQL auf und prüft
+per EXPLAIN, dass Abfragen auf die großen Tabellen keine Tabelle vollständig
+scannen (auch nicht über einen Join, z.B. SCAN properties + Lookup in bookings).
+Neue Listen-/Cron-Endpoints gehören in HOT_QUERIES.
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import random
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import sessionmaker
+
+client = TestClient(app)
+
+HOSTS = 20
+PROPERTIES_PER_HOST = 10
+BOOKINGS = 6000
+FEEDBACK = 2000
+REVIEWS = 3000
+
+HOT_QUERIES = [
+    # (Name, Methode, Pfad, Tabellen, deren Abfragen geprüft werden)
+    ("admin_stats", "GET", "/api/admin/stats?date_range=90d", {"bookings"}),
+    ("bookings_feed", "GET", "/api/admin/bookings/feed?limit=20", {"bookings"}),
+    ("booking_reminders", "POST", "/api/cron/booking-reminders", {"bookings"}),
+    ("guest_welcome", "POST", "/api/cron/guest-welcome", {"bookings"}),
+    ("checkout_followup", "POST", "/api/cron/checkout-followup", {"bookings"}),
+    ("cleaning_notifications", "POST", "/api/cron/cleaning-notifications", {"bookings"}),
+    ("occupancy", "GET", "/api/analytics/occupancy?months=3", {"bookings"}),
+    ("feedback_list", "GET", "/api/feedback?limit=20", {"feedback"}),
+    ("reviews_property", "GET", "/api/reviews?property_id={property_id}&limit=20", {"reviews"}),
+    ("reviews_public", "GET", "/api/reviews?limit=20&count=none", {"reviews"}),
+]
+
+
+def _seed(db_engine):
+    """Gastgeber, Properties, Buchungen, Feedback, Bewertungen, Reinigungskräfte"""
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    users = [{"id": str(uuid.uuid4()), "email": f"plan-{i}-{uuid.uuid4().hex[:6]}@example.com",
+              "password_hash": "x", "name": f"Host {i}"} for i in range(HOSTS)]
+    properties = [{"id": str(uuid.uuid4()), "user_id": user["id"], "name": f"Unterkunft {i}"}
+                  for user in users for i in range(PROPERTIES_PER_HOST)]
+    bookings = []
+    for _ in range(BOOKINGS):
+        property = rng.choice(properties)
+        check_in = now + timedelta(days=rng.randint(-365, 365), hours=rng.randint(0, 23))
+        bookings.append({
+            "id": str(uuid.uuid4()), "property_id": property["id"], "user_id": property["user_id"],
+            "guest_name": "Gast", "guest_email": "gast@example.com", "guests": rng.randint(1, 4),
+            "check_in": check_in, "check_out": check_in + timedelta(days=rng.randint(1, 14)),
+            "total_price": rng.randint(80, 2000),
+            "status": rng.choices(["confirmed", "completed", "pending", "cancelled", "active"], [45, 30, 10, 10, 5])[0],
+            "created_at": check_in - timedelta(days=rng.randint(1, 120)),
+        })
+    feedback = [{
+        "id": str(uuid.uuid4()), "user_id": property["user_id"], "property_id": property["id"],
+        "rating": rng.randint(1, 5), "created_at": now - timedelta(minutes=rng.randint(0, 500_000)),
+    } for property in (rng.choice(properties) for _ in range(FEEDBACK))]
+    reviews = [{
+        "id": str(uuid.uuid4()), "property_id": rng.choice(properties)["id"], "guest_name": "Gast",
+        "rating": rng.randint(1, 5), "is_approved": rng.random() < 0.3, "is_visible": rng.random() < 0.9,
+        "created_at": now - timedelta(minutes=rng.randint(0, 500_000)),
+    } for _ in range(REVIEWS)]
+    cleaner = {"id": str(uuid.uuid4()), "user_id": users[0]["id"], "name": "Anna Rein", "email": "anna@example.com"}
+    assignments = [{"id": str(uuid.uuid4()), "property_id": property["id"], "cleaner_id": cleaner["id"],
+                    "notify_hours_before": 24} for property in properties[:PROPERTIES_PER_HOST]]
+
+    with db_engine.begin() as conn:
+        for model, rows in ((database.User, users), (database.Property, properties),
+                            (database.Booking, bookings), (database.Feedback, feedback),
+                            (database.Review, reviews), (database.Cleaner, [cleaner]),
+                            (database.PropertyCleaner, assignments)):
+            conn.execute(insert(model), rows)
+        conn.execute(text("ANALYZE"))
+    return users[0], properties[0]["id"]
+
+
+@pytest.fixture(scope="module")
+def plan_db(tmp_path_factory):
+    """Geseedete Datenbank, Endpoints laufen per get_db-Override dagegen"""
+    url = os.environ.get("QUERY_PLAN_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    db_engine = database.create_db_engine(url)
+    database.migrate_schema(db_engine)
+    host, property_id = _seed(db_engine)
+    statements = []
+    Session = sessionmaker(bind=db_engine)
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    app.dependency_overrides[server.get_db] = override_get_db
+    try:
+        headers = {"Authorization": f"Bearer {server.create_token(host['id'], host['email'])}"}
+        yield db_engine, statements, headers, property_id
+    finally:
+        app.dependency_overrides.pop(server.get_db, None)
+        event.remove(db_engine, "before_cursor_execute", record)
+        db_engine.dispose()
+
+
+def _full_scans(db_engine, statement, parameters) -> list:
+    """Tabellen, die der Plan vollständig liest"""
+    with db_engine.connect() as conn:
+        if db_engine.dialect.name == "sqlite":
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            # "SEARCH t USING INDEX" ist gut, "SCAN t" liest alles. "SCAN t USING INDEX"
+            # (sortiert über den Index) nur mit LIMIT, dann endet der Scan vorzeitig.
+            limited = re.search(r"\bLIMIT\b", statement, re.IGNORECASE)
+            return [row[3] for row in plan
+                    if (match := re.match(r"SCAN (\w+)( USING (?:COVERING )?INDEX)?", row[3]))
+                    and match.group(1) in database.Base.metadata.tables and not (match.group(2) and limited)]
+        # PostgreSQL: bei kleinen Tabellen ist ein Seq Scan billiger - nur prüfen, ob ein Index nutzbar ist
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        scans, nodes = [], [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                scans.append(f"Seq Scan {node['Relation Name']}")
+            nodes.extend(node.get("Plans", []))
+        return scans
+
+
+@pytest.mark.parametrize("name,method,path,tables", HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_index(plan_db, name, method, path, tables):
+    db_engine, statements, headers, property_id = plan_db
+    statements.clear()
+    response = client.request(method, path.format(property_id=property_id), headers=headers)
+    assert response.status_code == 200, response.text
+
+    pattern = re.compile(r"\b(?:FROM|JOIN)\s+(" + "|".join(tables) + r")\b", re.IGNORECASE)
+    relevant = [(statement, parameters) for statement, parameters in statements if pattern.search(statement)]
+    assert relevant, f"{name}: keine Abfrage auf {tables} aufgezeichnet"
+    for statement, parameters in relevant:
+        scans = _full_scans(db_engine, statement, parameters)
+        assert not scans, f"{name}: Full Scan {scans} in\n{statement}"
+
+
+def test_harness_detects_full_scan(plan_db):
+    """Ohne passenden Index meldet der Harness den Scan"""
+    db_engine = plan_db[0]
+    parameters = () if db_engine.dialect.name == "sqlite" else {}
+    assert _full_scans(db_engine, "SELECT id FROM bookings WHERE guest_name = 'Gast'", parameters)
+    assert _full_scans(db_engine, "SELECT bookings.id FROM properties JOIN bookings "
+                       "ON bookings.property_id = properties.id WHERE bookings.guests = 3", parameters)
@@ -0,0 +1,168 @@
+"""
+Welcome Link Rate-Limit Tests (Token-Bucket pro API-Key, Benutzer, IP)
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+import database
+from api_keys import key_digest
+from rate_limit import MemoryBucketStore, RateLimiter, SQLBucketStore, rate_limit_headers
+
+client = TestClient(app)
+
+
+def _insert_key(rate_limit):
+    api_key = server.generate_api_key()
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(id=str(uuid.uuid4()), email=f"ratelimit-{uuid.uuid4().hex[:8]}@example.com",
+                             password_hash="x", name="Rate Limit Test")
+        db.add(user)
+        db.add(server.DBApiKey(id=str(uuid.uuid4()), user_id=user.id, key_digest=key_digest(api_key),
+                               key_prefix=api_key[:11], permissions='["read"]', rate_limit=rate_limit))
+        db.commit()
+        return api_key
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def sql_engine(tmp_path):
+    db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'buckets.db'}")
+    database.migrate_schema(db_engine)
+    yield db_engine
+    db_engine.dispose()
+
+
+class TestBucketStores:
+    """Test Token-Bucket-Logik der Stores"""
+
+    def test_memory_bucket_denies_and_refills(self):
+        store = MemoryBucketStore()
+        results = [store.take("ip:1", 3, now=100.0) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == pytest.approx(20.0)
+        # 3/Minute -> nach 20 Sekunden wieder ein Token
+        assert store.take("ip:1", 3, now=120.0).allowed
+        assert not store.take("ip:1", 3, now=120.0).allowed
+        assert store.take("ip:2", 3, now=120.0).allowed
+
+    def test_memory_store_is_bounded(self):
+        store = MemoryBucketStore(max_keys=2)
+        for key in ("a", "b", "c"):
+            store.take(key, 10)
+        assert len(store) == 2
+
+    def test_sql_bucket_denies_and_refills(self, sql_engine):
+        store = SQLBucketStore(sql_engine, database.RateLimitBucket)
+        results = [store.take("key:1", 2, now=1000.0) for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert store.take("key:1", 2, now=1030.0).allowed
+        assert not store.take("key:1", 2, now=1030.0).allowed
+        assert store.take("key:2", 2, now=1030.0).allowed
+
+    def test_redis_store(self):
+        pytest.importorskip("redis")
+        from rate_limit import RedisBucketStore
+        try:
+            store = RedisBucketStore(os.environ.get("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+            store.client.ping()
+        except Exception:
+            pytest.skip("Redis nicht erreichbar")
+        key = f"test:{uuid.uuid4()}"
+        assert [store.take(key, 2).allowed for _ in range(3)] == [True, True, False]
+
+    def test_store_errors_fail_open(self):
+        class BrokenStore:
+            blocking = False
+            def take(self, key, limit):
+                raise ConnectionError("weg")
+        limiter = RateLimiter(BrokenStore())
+        assert limiter.check("ip", "1.2.3.4", 10) is None
+        assert limiter.stats()["errors"] == 1
+
+    def test_headers(self):
+        denied = MemoryBucketStore()
+        denied.take("x", 1, now=0.0)
+        headers = dict(rate_limit_headers(denied.take("x", 1, now=0.0)))
+        assert headers[b"x-ratelimit-limit"] == b"1"
+        assert headers[b"x-ratelimit-remaining"] == b"0"
+        assert headers[b"retry-after"] == b"60"
+
+
+class TestRateLimitMiddleware:
+    """Test Durchsetzung über die Middleware"""
+
+    def test_headers_on_responses(self):
+        response = client.get("/api/", headers={"X-Forwarded-For": f"10.0.{uuid.uuid4().int % 250}.1"})
+        assert response.headers["X-RateLimit-Limit"] == str(server.RATE_LIMIT_IP_PER_MINUTE)
+        assert int(response.headers["X-RateLimit-Remaining"]) == server.RATE_LIMIT_IP_PER_MINUTE - 1
+        assert "X-RateLimit-Limit" not in client.get("/api/health").headers
+
+    def test_api_key_limit_from_model(self):
+        api_key = _insert_key(rate_limit=2)
+        headers = {"X-API-Key": api_key}
+        responses = [client.get("/api/", headers=headers) for _ in range(3)]
+        assert all(r.status_code != 429 for r in responses[:2])
+        assert responses[0].headers["X-RateLimit-Limit"] == "2"
+        assert responses[2].status_code == 429
+        assert int(responses[2].headers["Retry-After"]) >= 1
+        # Eigener Bucket pro Key - auch als Bearer-Token erkannt
+        other = _insert_key(rate_limit=2)
+        assert client.get("/api/", headers={"Authorization": f"Bearer {other}"}).status_code != 429
+        assert server.rate_limiter.stats()["rejected"]["key"] >= 1
+
+    def test_ip_limit_uses_forwarded_for(self, monkeypatch):
+        monkeypatch.setattr(server, "RATE_LIMIT_IP_PER_MINUTE", 2)
+        ip = f"10.1.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}"
+        statuses = [client.get("/api/", headers={"X-Forwarded-For": ip}).status_code for _ in range(3)]
+        assert statuses[2] == 429
+        assert client.get("/api/", headers={"X-Forwarded-For": "10.2.0.1"}).status_code != 429
+
+    def test_spoofed_forwarded_for_keeps_bucket(self, monkeypatch):
+        """Vom Client vorangestellte Einträge ergeben keinen neuen Bucket"""
+        monkeypatch.setattr(server, "RATE_LIMIT_IP_PER_MINUTE", 2)
+        ip = f"10.4.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}"
+        statuses = [client.get("/api/", headers={"X-Forwarded-For": f"192.0.2.{i}, {ip}"}).status_code
+                    for i in range(3)]
+        assert statuses[2] == 429
+
+    def test_proxy_hops(self, monkeypatch):
+        monkeypatch.setattr(server, "RATE_LIMIT_PROXY_HOPS", 2)
+        scope = {"client": ("10.9.9.9", 1234)}
+        assert server._client_ip(scope, {b"x-forwarded-for": b"6.6.6.6, 1.2.3.4, 10.0.0.2"}) == "1.2.3.4"
+        assert server._client_ip(scope, {b"x-forwarded-for": b"1.2.3.4"}) == "1.2.3.4"
+        assert server._client_ip(scope, {}) == "10.9.9.9"
+
+    def test_unknown_api_keys_charge_ip_bucket(self, monkeypatch):
+        """Erfundene Keys laufen ins IP-Limit und werden nur einmal nachgeschlagen"""
+        monkeypatch.setattr(server, "RATE_LIMIT_IP_PER_MINUTE", 3)
+        lookups = []
+        monkeypatch.setattr(server, "_lookup_api_key", lambda api_key: lookups.append(api_key))
+        ip = f"10.5.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}"
+        fake_key = f"{server.API_KEY_PREFIX}{uuid.uuid4().hex}"
+        statuses = [client.get("/api/", headers={"X-API-Key": fake_key, "X-Forwarded-For": ip}).status_code
+                    for _ in range(3)]
+        assert lookups == [fake_key]
+        assert server.rate_limit_unknown_keys.get(key_digest(fake_key))
+
+        # Jeder Request mit neuem Key belastet trotzdem den IP-Bucket
+        response = client.get("/api/", headers={"X-API-Key": f"{server.API_KEY_PREFIX}{uuid.uuid4().hex}",
+                                                "X-Forwarded-For": ip})
+        assert response.status_code == 429
+        assert len(lookups) == 1
+        assert statuses[0] != 429
+
+    def test_user_bucket_separate_from_ip(self, monkeypatch):
+        monkeypatch.setattr(server, "RATE_LIMIT_USER_PER_MINUTE", 1)
+        token = server.create_token(str(uuid.uuid4()), "bucket@example.com")
+        headers = {"Authorization": f"Bearer {token}", "X-Forwarded-For": "10.3.0.1"}
+        assert client.get("/api/", headers=headers).headers["X-RateLimit-Limit"] == "1"
+        assert client.get("/api/", headers=headers).status_code == 429
+        assert client.get("/api/", headers={"X-Forwarded-For": "10.3.0.1"}).status_code != 429
@@ -53,6 +53,59 @@ class TestSecurityHeaders:
         pass
 
 
+class TestASGIMiddleware:
+    """Test the pure-ASGI security header and timing middlewares"""
+
+    def _app(self, endpoint):
+        from starlette.applications import Starlette
+        from starlette.routing import Route
+        from server import SecurityHeadersMiddleware, RequestTimingMiddleware
+        inner = Starlette(routes=[Route("/", endpoint)])
+        inner.add_middleware(SecurityHeadersMiddleware)
+        inner.add_middleware(RequestTimingMiddleware)
+        return inner
+
+    def test_headers_on_api_response(self):
+        """Every API response carries the precomputed headers and a timing header"""
+        response = client.get("/api/")
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "frame-ancestors 'none'" in response.headers["content-security-policy"]
+        assert response.headers["permissions-policy"].startswith("geolocation=()")
+        assert float(response.headers["x-process-time-ms"]) >= 0
+
+    def test_headers_replace_response_values(self):
+        """Security headers override same-named headers instead of duplicating them"""
+        from starlette.responses import PlainTextResponse
+        test_client = TestClient(self._app(lambda request: PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})))
+        response = test_client.get("/")
+        assert response.headers.get_list("x-frame-options") == ["DENY"]
+
+    def test_streaming_is_not_buffered(self):
+        """Streaming bodies reach the server chunk by chunk"""
+        import asyncio
+        from starlette.responses import StreamingResponse
+        inner = self._app(lambda request: StreamingResponse(iter([b"a,b\n", b"1,2\n", b"3,4\n"]), media_type="text/csv"))
+        messages = []
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.sleep(10)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/", "raw_path": b"/", "root_path": "",
+                 "query_string": b"", "headers": [], "scheme": "http", "server": ("test", 80)}
+        asyncio.run(inner(scope, receive, send))
+        bodies = [m["body"] for m in messages if m["type"] == "http.response.body" and m.get("body")]
+        assert bodies == [b"a,b\n", b"1,2\n", b"3,4\n"]
+        assert (b"x-frame-options", b"DENY") in messages[0]["headers"]
+
+
 class TestGlobalExceptionHandler:
     """Test Global Exception Handler
 
@@ -0,0 +1,72 @@
+"""
+Welcome Link Startup Tests (Import-Budget, Warm-up)
+"""
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+import import_budget
+from warmup import Warmup, optional_import
+
+
+@pytest.fixture(scope="module")
+def import_report():
+    return import_budget.report("server")
+
+
+class TestImportBudget:
+    """Test Import-Zeit der Web-Worker"""
+
+    def test_parse_importtime(self):
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     json.decoder",
+            "import time:       300 |        420 |   json",
+            "import time:      1000 |       1420 | server",
+        ])
+        assert import_budget.parse_importtime(output) == {
+            "json.decoder": (120, 120), "json": (300, 420), "server": (1000, 1420)}
+
+    def test_server_import_defers_heavy_modules(self, import_report):
+        assert import_report["deferred_loaded"] == []
+
+    @pytest.mark.skipif(not os.environ.get("IMPORT_BUDGET_STRICT"),
+                        reason="Wall-Clock-Budget nur mit IMPORT_BUDGET_STRICT=1 (schwankt auf geteilten Runnern)")
+    def test_server_import_within_budget(self, import_report):
+        assert import_report["within_budget"], \
+            f"Import dauert {import_report['total_ms']} ms: {import_report['slowest_self_ms']}"
+
+
+class TestWarmup:
+    """Test Warm-up nach dem Startup"""
+
+    def test_steps_are_timed_and_failures_isolated(self):
+        calls = []
+        def broken():
+            raise RuntimeError("kaputt")
+        warmup = Warmup([("broken", broken), ("ok", lambda: calls.append(1))])
+        warmup.run()
+        stats = warmup.stats()
+        assert stats["finished"]
+        assert stats["steps"]["broken"]["status"] == "failed"
+        assert stats["steps"]["ok"]["status"] == "ok"
+        assert calls == [1]
+
+    def test_stop_before_delay_skips_steps(self):
+        warmup = Warmup([("never", lambda: pytest.fail("darf nicht laufen"))], delay_seconds=30)
+        warmup.start()
+        warmup.stop()
+        warmup._thread.join(5)
+        assert not warmup._thread.is_alive()
+        assert warmup.stats()["steps"] == {}
+
+    def test_server_steps_render_qr_and_pdf(self):
+        warmup = Warmup(server.warmup.steps)
+        warmup.run()
+        assert {name: step["status"] for name, step in warmup.stats()["steps"].items()} == {
+            "qr_pdf": "ok", "occupancy": "ok", "psutil": "ok", "password_hasher": "ok"}
+
+    def test_optional_import_missing_module(self):
+        assert optional_import("welcome_link_gibt_es_nicht") is None
+        assert optional_import("json") is sys.modules["json"]
@@ -0,0 +1,293 @@
+"""
+Welcome Link Statistics Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+
+client = TestClient(app)
+
+
+def _host_with_bookings(created_ats, status="confirmed", price=100.0):
+    db = server.SessionLocal()
+    try:
+        user_id = str(uuid.uuid4())
+        email = f"stats-{user_id[:8]}@example.com"
+        db.add(server.DBUser(id=user_id, email=email, password_hash="x", name="Statistik"))
+        property_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        db.add(server.DBProperty(id=property_ids[0], user_id=user_id, name="Seeblick"))
+        db.add(server.DBProperty(id=property_ids[1], user_id=user_id, name="Bergblick"))
+        for i, created_at in enumerate(created_ats):
+            db.add(server.DBBooking(
+                id=str(uuid.uuid4()), property_id=property_ids[i % 2], user_id=user_id,
+                guest_name=f"Gast {i}", guests=2, check_in=created_at, check_out=created_at + timedelta(days=2),
+                status=status, total_price=price, created_at=created_at
+            ))
+        db.commit()
+        return {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+    finally:
+        db.close()
+
+
+class TestAdminStats:
+    """Test the aggregated admin dashboard statistics"""
+
+    def test_totals_and_top_properties(self):
+        """Totals and per-property revenue come from the aggregate queries"""
+        now = datetime.now(timezone.utc)
+        headers = _host_with_bookings([now - timedelta(hours=i + 1) for i in range(3)])
+        response = client.get("/api/admin/stats?date_range=30d", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["overview"]["totalProperties"] == 2
+        assert data["overview"]["totalBookings"] == 3
+        assert data["overview"]["totalGuests"] == 6
+        assert data["overview"]["totalRevenue"] == 300
+        assert data["topProperties"][0] == {"name": "Seeblick", "bookings": 2, "revenue": 200}
+        assert len(data["recentActivity"]) == 3
+        assert data["recentActivity"][0]["property"] in ("Seeblick", "Bergblick")
+        assert sum(data["chartData"]["bookings"]) == 3
+
+    def test_month_buckets_include_year(self, monkeypatch):
+        """Across a year boundary every in-range booking lands in its own (year, month) slot"""
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return cls(2031, 1, 20, 12, 0, tzinfo=tz)
+
+        # Dezember und Januar im Bereich; Januar des Vorjahres hat dieselbe Monatsnummer
+        headers = _host_with_bookings([datetime(2031, 1, 5, tzinfo=timezone.utc),
+                                       datetime(2030, 12, 20, tzinfo=timezone.utc),
+                                       datetime(2030, 12, 21, tzinfo=timezone.utc),
+                                       datetime(2030, 1, 5, tzinfo=timezone.utc)])
+        monkeypatch.setattr(server, "datetime", FrozenDatetime)
+        data = client.get("/api/admin/stats?date_range=90d", headers=headers).json()
+        assert data["chartData"]["labels"] == ["Aug", "Sep", "Oct", "Nov", "Dec", "Jan"]
+        assert data["chartData"]["bookings"] == [0, 0, 0, 0, 2, 1]
+        assert data["overview"]["totalBookings"] == 3
+
+    def test_last_months_window(self):
+        from months import last_months
+        assert [(m.year, m.month) for m in last_months(datetime(2031, 2, 3).date(), 3)] == [
+            (2030, 12), (2031, 1), (2031, 2)]
+
+    def test_second_call_is_cached(self):
+        """Repeated dashboard loads are served from the per-user cache"""
+        headers = _host_with_bookings([datetime.now(timezone.utc)])
+        client.get("/api/admin/stats", headers=headers)
+        hits_before = server.admin_stats_cache.hits
+        response = client.get("/api/admin/stats", headers=headers)
+        assert response.status_code == 200
+        assert server.admin_stats_cache.hits == hits_before + 1
+
+
+def _rollup(property_id):
+    db = server.SessionLocal()
+    try:
+        rows = db.query(server.DBDailyPropertyStats).filter(server.DBDailyPropertyStats.property_id == property_id).all()
+        return {metric: sum(getattr(r, metric) for r in rows) for metric in ("bookings", "confirmed", "cancellations", "revenue", "nights", "rating_sum", "rating_count")}
+    finally:
+        db.close()
+
+
+class TestDailyRollup:
+    """Test the incremental daily_property_stats rollup"""
+
+    def _property(self):
+        db = server.SessionLocal()
+        try:
+            user_id = str(uuid.uuid4())
+            email = f"rollup-{user_id[:8]}@example.com"
+            property_id = str(uuid.uuid4().int % 10**9)
+            db.add(server.DBUser(id=user_id, email=email, password_hash="x", name="Rollup"))
+            db.add(server.DBProperty(id=property_id, user_id=user_id, name="Seeblick"))
+            db.commit()
+            return property_id, user_id, {"Authorization": f"Bearer {server.create_token(user_id, email)}"}
+        finally:
+            db.close()
+
+    def _booking(self, db, property_id, user_id, status="confirmed"):
+        check_in = datetime(2026, 8, 1)
+        booking = server.DBBooking(
+            id=str(uuid.uuid4()), property_id=property_id, user_id=user_id, guest_name="Gast",
+            check_in=check_in, check_out=check_in + timedelta(days=4), status=status, total_price=400.0
+        )
+        db.add(booking)
+        return booking
+
+    def test_booking_writes_update_rollup(self):
+        """Inserts, status changes and deletes are applied as deltas"""
+        property_id, user_id, _ = self._property()
+        db = server.SessionLocal()
+        try:
+            booking = self._booking(db, property_id, user_id)
+            self._booking(db, property_id, user_id, status="pending")
+            db.commit()
+            assert _rollup(property_id) == {"bookings": 2, "confirmed": 1, "cancellations": 0, "revenue": 400, "nights": 4, "rating_sum": 0, "rating_count": 0}
+
+            booking.status = "cancelled"
+            db.commit()
+            assert _rollup(property_id)["cancellations"] == 1
+            assert _rollup(property_id)["revenue"] == 0
+
+            db.delete(booking)
+            db.commit()
+            assert _rollup(property_id)["bookings"] == 1
+        finally:
+            db.close()
+
+    def test_rollback_discards_deltas(self):
+        """Rolled back bookings leave the rollup untouched"""
+        property_id, user_id, _ = self._property()
+        db = server.SessionLocal()
+        try:
+            self._booking(db, property_id, user_id)
+            db.flush()
+            db.rollback()
+        finally:
+            db.close()
+        assert _rollup(property_id)["bookings"] == 0
+
+    def test_reviews_feed_dashboard_rating(self):
+        """Dashboard rating comes from the review counters"""
+        property_id, user_id, headers = self._property()
+        for rating in (5, 4):
+            response = client.post("/api/reviews", json={"property_id": int(property_id), "guest_name": "Gast", "rating": rating})
+            assert response.status_code == 200
+        db = server.SessionLocal()
+        try:
+            self._booking(db, property_id, user_id)
+            db.commit()
+        finally:
+            db.close()
+
+        response = client.post("/api/analytics/dashboard", json={}, headers=headers)
+        assert response.status_code == 200
+        summary = response.json()["summary"]
+        assert summary["avg_rating"] == 4.5
+        assert summary["total_reviews"] == 2
+        assert summary["total_bookings"] == 1
+        assert summary["total_nights"] == 4
+        assert response.json()["properties"][0]["bookings_count"] == 1
+
+    def test_backfill_reconciles_bulk_updates(self):
+        """The nightly backfill corrects writes that bypassed the ORM"""
+        property_id, user_id, _ = self._property()
+        db = server.SessionLocal()
+        try:
+            self._booking(db, property_id, user_id)
+            db.commit()
+            db.query(server.DBBooking).filter(server.DBBooking.property_id == property_id).update({"status": "cancelled"})
+            db.commit()
+        finally:
+            db.close()
+        assert _rollup(property_id)["cancellations"] == 0
+
+        response = client.post("/api/cron/daily-stats")
+        assert response.status_code == 200
+        assert response.json()["corrected"] >= 1
+        assert _rollup(property_id)["cancellations"] == 1
+        assert client.post("/api/cron/daily-stats").json()["corrected"] == 0
+
+    def test_full_backfill_requires_cron_secret(self, monkeypatch):
+        """full=true scans the whole history and is only allowed with X-Cron-Secret"""
+        monkeypatch.setattr(server, "CRON_SECRET", "")
+        assert client.post("/api/cron/daily-stats?full=true").status_code == 403
+        monkeypatch.setattr(server, "CRON_SECRET", "nachts")
+        assert client.post("/api/cron/daily-stats?full=true", headers={"X-Cron-Secret": "falsch"}).status_code == 403
+        response = client.post("/api/cron/daily-stats?full=true", headers={"X-Cron-Secret": "nachts"})
+        assert response.status_code == 200
+
+    def test_migrate_fills_empty_rollup_once(self, tmp_path):
+        """migrate.py backfills the complete history while the rollup table is empty"""
+        import database
+        import migrate
+        from sqlalchemy import insert
+
+        db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+        try:
+            database.migrate_schema(db_engine)
+            with db_engine.begin() as conn:
+                conn.execute(insert(database.Booking), [{
+                    "id": str(uuid.uuid4()), "property_id": "p-history", "user_id": "u", "guest_name": "Gast",
+                    "status": "confirmed", "total_price": 100.0, "created_at": datetime(2021, 3, 1),
+                }])
+            assert migrate.backfill_daily_stats(db_engine)["rows"] == 1
+            assert migrate.backfill_daily_stats(db_engine) is None
+            assert migrate.backfill_daily_stats(db_engine, force=True)["corrected"] == 0
+        finally:
+            db_engine.dispose()
+
+    def test_stats_endpoints_use_real_data(self):
+        """Global, filtered and daily stats reflect the host's bookings"""
+        property_id, user_id, headers = self._property()
+        db = server.SessionLocal()
+        try:
+            self._booking(db, property_id, user_id)
+            self._booking(db, property_id, user_id, status="cancelled")
+            db.commit()
+        finally:
+            db.close()
+
+        stats = client.get("/api/stats/global", headers=headers).json()
+        assert stats["total_bookings"] == 2
+        assert stats["cancelled_bookings"] == 1
+        assert stats["total_revenue"] == 400
+        assert stats["chart_data"]["bookings"][-1] == 2
+        assert len(stats["chart_data"]["months"]) == 7
+
+        filtered = client.post("/api/stats/booking/filter", json={"property_id": "andere"}, headers=headers).json()
+        assert filtered["total_bookings"] == 0
+        assert filtered["filters_applied"] == {"property_id": "andere"}
+
+        daily = client.get("/api/admin/daily-stats", headers=headers).json()
+        assert len(daily["daily_stats"]) == 30
+        assert daily["daily_stats"][-1]["bookings"] == 2
+        assert daily["summary"]["total_revenue"] == 400
+
+
+class TestOccupancy:
+    """Test the vectorized occupancy engine"""
+
+    def test_grid_clips_and_merges_overlaps(self):
+        """Nights are split at month boundaries and overlaps count once"""
+        from occupancy import OccupancyGrid
+        from months import month_range
+        months = month_range(datetime(2026, 1, 1).date(), 2)
+        grid = OccupancyGrid(["a", "b"], months, [
+            ("a", datetime(2025, 12, 30), datetime(2026, 1, 3)),
+            ("a", datetime(2026, 1, 2), datetime(2026, 1, 5)),
+            ("b", datetime(2026, 1, 30), datetime(2026, 2, 2)),
+            ("c", datetime(2026, 1, 1), datetime(2026, 1, 9)),
+        ])
+        assert grid.nights_per_month().tolist() == [[4, 0], [2, 1]]
+        assert grid.days_in_month.tolist() == [31, 28]
+        assert grid.bitmap(0)[:6] == "111100"
+
+    def test_endpoint_breakdown_and_bitmap(self):
+        """One bookings query serves totals, per-property rows and bitmaps"""
+        now = datetime.now(timezone.utc)
+        headers = _host_with_bookings([now, now])
+        response = client.get("/api/analytics/occupancy?months=24&breakdown=true&daily=true", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["occupancy"]) == 24
+        assert data["occupancy"][-1]["month"] == now.strftime("%Y-%m")
+        assert len(data["properties"]) == 2
+        assert sum(m["occupied_nights"] for p in data["properties"] for m in p["occupancy"]) == \
+            sum(m["occupied_nights"] for m in data["occupancy"])
+        assert all(len(bitmap) == data["daily"]["days"] for bitmap in data["daily"]["bitmaps"].values())
+
+    def test_start_month_and_validation(self):
+        """Arbitrary ranges are supported and invalid input is rejected"""
+        headers = _host_with_bookings([])
+        response = client.get("/api/analytics/occupancy?start_month=2025-11&months=3", headers=headers)
+        assert [m["month"] for m in response.json()["occupancy"]] == ["2025-11", "2025-12", "2026-01"]
+        assert client.get("/api/analytics/occupancy?months=0", headers=headers).status_code == 400
+        assert client.get("/api/analytics/occupancy?start_month=11/2025", headers=headers).status_code == 400
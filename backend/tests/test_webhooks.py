@@ -0,0 +1,204 @@
+"""
+Welcome Link Webhook Outbox Tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import asyncio
+import json
+import sys
+import os
+import uuid
+import httpx
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+from server import app
+from database import MailOutbox, WebhookDelivery
+from webhook_outbox import WebhookDispatcher, sign_payload
+
+client = TestClient(app)
+
+
+def _auth_headers():
+    db = server.SessionLocal()
+    try:
+        user = server.DBUser(
+            id=str(uuid.uuid4()),
+            email=f"hooks-{uuid.uuid4().hex[:8]}@example.com",
+            password_hash="x",
+            name="Webhook Test",
+        )
+        db.add(user)
+        db.commit()
+        return {"Authorization": f"Bearer {server.create_token(user.id, user.email)}"}
+    finally:
+        db.close()
+
+
+def _create_webhook(headers):
+    response = client.post("/api/webhooks", json={
+        "url": "https://hooks.example.com/booking",
+        "events": ["booking.created"],
+        "secret": "geheim"
+    }, headers=headers)
+    assert response.status_code == 200
+    return response.json()["webhook"]
+
+
+def _pending_deliveries(webhook_id):
+    db = server.SessionLocal()
+    try:
+        return db.query(WebhookDelivery).filter(WebhookDelivery.endpoint_id == webhook_id).all()
+    finally:
+        db.close()
+
+
+def _dispatch(handler, max_attempts=3):
+    async def run():
+        dispatcher = WebhookDispatcher(server.SessionLocal, max_attempts=max_attempts, backoff_seconds=0,
+                                       transport=httpx.MockTransport(handler))
+        for _ in range(max_attempts):
+            await dispatcher.run_pending()
+        await dispatcher.stop()
+        return dispatcher
+    return asyncio.run(run())
+
+
+class TestWebhookEndpoints:
+    """Test persisted webhook endpoints"""
+
+    def test_webhooks_are_persisted(self):
+        """Created webhooks are listed from the database"""
+        headers = _auth_headers()
+        webhook = _create_webhook(headers)
+        response = client.get("/api/webhooks", headers=headers)
+        assert response.status_code == 200
+        assert [w["id"] for w in response.json()["webhooks"]] == [webhook["id"]]
+
+    def test_booking_writes_outbox_entry(self):
+        """Creating a booking enqueues a delivery instead of calling out"""
+        headers = _auth_headers()
+        webhook = _create_webhook(headers)
+        response = client.post("/api/bookings", json={"property_id": "p1", "guest_name": "Anna"}, headers=headers)
+        assert response.status_code == 200
+        deliveries = _pending_deliveries(webhook["id"])
+        assert len(deliveries) == 1
+        assert deliveries[0].status == "pending"
+        assert deliveries[0].event_type == "booking.created"
+
+    def test_booking_mail_commits_with_outbox_entry(self, monkeypatch):
+        """Confirmation mail and booking.created event are stored together or not at all"""
+        monkeypatch.setattr(server, "SMTP_CONFIGURED", True)
+        headers = _auth_headers()
+        webhook = _create_webhook(headers)
+        guest_email = f"gast-{uuid.uuid4().hex[:8]}@example.com"
+        booking = {"property_id": "p1", "guest_name": "Anna", "guest_email": guest_email}
+
+        def mails():
+            db = server.SessionLocal()
+            try:
+                return db.query(MailOutbox).filter(MailOutbox.to_email == guest_email).count()
+            finally:
+                db.close()
+
+        def broken_trigger(*args, **kwargs):
+            raise RuntimeError("Outbox nicht erreichbar")
+
+        monkeypatch.setattr(server, "trigger_webhooks", broken_trigger)
+        with pytest.raises(RuntimeError):
+            client.post("/api/bookings", json=booking, headers=headers)
+        assert mails() == 0
+        monkeypatch.undo()
+
+        monkeypatch.setattr(server, "SMTP_CONFIGURED", True)
+        assert client.post("/api/bookings", json=booking, headers=headers).status_code == 200
+        assert mails() == 1
+        assert len(_pending_deliveries(webhook["id"])) == 1
+
+
+@pytest.fixture
+def empty_outbox():
+    db = server.SessionLocal()
+    db.query(WebhookDelivery).delete()
+    db.commit()
+    db.close()
+
+
+@pytest.mark.usefixtures("empty_outbox")
+class TestWebhookDispatcher:
+    """Test asynchronous delivery"""
+
+    def test_delivery_is_signed(self):
+        """Deliveries carry an HMAC signature of the payload"""
+        headers = _auth_headers()
+        webhook = _create_webhook(headers)
+        client.post("/api/bookings", json={"property_id": "p1"}, headers=headers)
+        received = []
+
+        def handler(request):
+            received.append(request)
+            return httpx.Response(200)
+
+        _dispatch(handler)
+        assert len(received) == 1
+        body = received[0].content.decode()
+        assert received[0].headers["X-Webhook-Signature"] == sign_payload(body, "geheim")
+        assert json.loads(body)["event"] == "booking.created"
+        assert _pending_deliveries(webhook["id"])[0].status == "delivered"
+
+    def test_failing_endpoint_is_dead_lettered(self):
+        """Failed deliveries are retried and end in the dead state"""
+        headers = _auth_headers()
+        webhook = _create_webhook(headers)
+        client.post("/api/bookings", json={"property_id": "p1"}, headers=headers)
+
+        dispatcher = _dispatch(lambda request: httpx.Response(500), max_attempts=3)
+        delivery = _pending_deliveries(webhook["id"])[0]
+        assert delivery.status == "dead"
+        assert delivery.attempts == 3
+        assert delivery.last_status_code == 500
+        assert dispatcher.retried == 2
+
+    def test_slow_endpoint_does_not_block_others(self):
+        """Queued jobs of a slow endpoint hold no global slot; idle endpoint limits are dropped"""
+        headers = _auth_headers()
+        for name in ("slow", "fast"):
+            response = client.post("/api/webhooks", json={
+                "url": f"https://hooks.example.com/{name}", "events": ["booking.created"], "secret": "geheim"
+            }, headers=headers)
+            assert response.status_code == 200
+        for _ in range(3):
+            client.post("/api/bookings", json={"property_id": "p1"}, headers=headers)
+
+        async def run():
+            release = asyncio.Event()
+            fast = []
+
+            async def handler(request):
+                if request.url.path == "/slow":
+                    await release.wait()
+                else:
+                    fast.append(request)
+                return httpx.Response(200)
+
+            dispatcher = WebhookDispatcher(server.SessionLocal, per_endpoint_concurrency=1, max_concurrency=2,
+                                           poll_interval=0.05, transport=httpx.MockTransport(handler))
+            await dispatcher.start()
+            try:
+                for _ in range(200):
+                    if len(fast) == 3:
+                        break
+                    await asyncio.sleep(0.02)
+                assert len(fast) == 3
+                release.set()
+                for _ in range(200):
+                    if dispatcher.delivered == 6:
+                        break
+                    await asyncio.sleep(0.02)
+            finally:
+                await dispatcher.stop()
+            return dispatcher
+
+        dispatcher = asyncio.run(run())
+        assert dispatcher.delivered == 6
+        assert dispatcher.stats()["endpoints"] == 0
+
@@ -0,0 +1,78 @@
+"""
+Modul-Ladestrategie und Warm-up
+Schwere, nur von einzelnen Endpoints genutzte Module (qrcode/PIL, reportlab,
+numpy, psutil) werden nicht beim Boot importiert, sondern erst im Handler
+bzw. über optional_import(). Damit der erste QR-/PDF-Request nach einem
+Deploy nicht den Import zahlt, importiert und rendert der Warm-up-Thread
+nach dem Startup je einmal vor - abseits des Request-Pfads.
+"""
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_optional_modules = {}
+_optional_lock = threading.Lock()
+
+
+def optional_import(name: str):
+    """Optionales Modul beim ersten Zugriff importieren - None, wenn nicht installiert"""
+    if name not in _optional_modules:
+        with _optional_lock:
+            if name not in _optional_modules:
+                try:
+                    _optional_modules[name] = importlib.import_module(name)
+                except ImportError:
+                    logger.warning(f"⚠️ {name} nicht installiert - Funktion deaktiviert")
+                    _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+class Warmup:
+    """Führt Warm-up-Schritte einmalig in einem Hintergrund-Thread aus"""
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], object]]], delay_seconds: float = 0.0):
+        self.steps = steps
+        self.delay_seconds = delay_seconds
+        self.results = {}
+        self.finished = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starte Warm-up (idempotent)"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        # Erst warten, damit der Warm-up nicht mit den ersten Requests konkurriert
+        if self._stopping.wait(self.delay_seconds):
+            return
+        for name, step in self.steps:
+            if self._stopping.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                step()
+                status = "ok"
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up {name} fehlgeschlagen: {e}")
+                status = "failed"
+            self.results[name] = {"status": status, "ms": round((time.perf_counter() - started) * 1000, 1)}
+        self.finished.set()
+        logger.info(f"✓ Warm-up abgeschlossen: {self.results}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._thread is not None,
+            "finished": self.finished.is_set(),
+            "steps": dict(self.results),
+        }
@@ -0,0 +1,357 @@
+"""
+Webhook Outbox
+Events werden in derselben Transaktion wie die fachliche Änderung in die
+Tabelle webhook_outbox geschrieben (enqueue_event). Der WebhookDispatcher
+läuft als asyncio-Task im Event-Loop der App und stellt sie zu:
+
+- ein gemeinsamer httpx.AsyncClient (Connection-Pool)
+- Begrenzung gleichzeitiger Zustellungen pro Endpunkt und global; der Worker
+  füllt freie Slots laufend nach, ein langsamer Endpunkt blockiert die übrigen nicht
+- HMAC-SHA256-Signatur wie webhooks.send_webhook (X-Webhook-Signature)
+- exponentieller Backoff, nach WEBHOOK_MAX_ATTEMPTS Status 'dead'
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import WebhookEndpoint, WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def sign_payload(payload: str, secret: str) -> str:
+    """HMAC-SHA256 Signatur (hex) des Payloads"""
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def enqueue_event(db: Session, user_id: str, event_type: str, data: dict) -> int:
+    """Schreibe Outbox-Einträge für alle passenden Endpunkte (ohne Commit)"""
+    endpoints = db.query(WebhookEndpoint).filter(
+        WebhookEndpoint.user_id == user_id,
+        WebhookEndpoint.is_active == True
+    ).all()
+
+    queued = 0
+    for endpoint in endpoints:
+        if event_type not in json.loads(endpoint.events or '[]'):
+            continue
+        delivery_id = str(uuid.uuid4())
+        payload = json.dumps({
+            "id": delivery_id,
+            "event": event_type,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": data
+        })
+        db.add(WebhookDelivery(
+            id=delivery_id,
+            endpoint_id=endpoint.id,
+            event_type=event_type,
+            payload=payload,
+            status='pending',
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc),
+        ))
+        queued += 1
+    return queued
+
+
+class WebhookDispatcher:
+    """Asynchroner Zustell-Worker für die Webhook-Outbox"""
+
+    def __init__(self, session_factory: Callable[[], Session], max_attempts: int = 6,
+                 backoff_seconds: float = 10.0, per_endpoint_concurrency: int = 2,
+                 max_concurrency: int = 50, timeout: float = 10.0, poll_interval: float = 5.0,
+                 batch_size: int = 100, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.per_endpoint_concurrency = per_endpoint_concurrency
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.transport = transport
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.in_flight = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        # endpoint_id -> [Semaphore, laufende Zustellungen]; leere Einträge werden entfernt
+        self._endpoint_limits = {}
+        self._tasks = set()
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- Lifecycle ----------
+
+    def _ensure_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=min(self.max_concurrency, 20)),
+            )
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+            self._wakeup = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+
+    async def start(self):
+        """Starte den Dispatcher im laufenden Event-Loop"""
+        if self._task is not None:
+            return
+        self._ensure_client()
+        await asyncio.to_thread(self._recover_stale)
+        self._task = asyncio.create_task(self._run(), name="webhook-dispatcher")
+        logger.info("✓ Webhook-Dispatcher gestartet")
+
+    async def stop(self):
+        """Stoppe Dispatcher und schließe den HTTP-Client"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._tasks:
+            # Laufende Zustellungen abschließen lassen; Reste setzt _recover_stale zurück
+            await asyncio.wait(self._tasks, timeout=self.timeout)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def notify(self):
+        """Wecke den Dispatcher (thread-sicher, z.B. aus Sync-Handlern)"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self._dispatch()
+            except Exception as e:
+                logger.error(f"❌ Webhook-Dispatcher Fehler: {e}")
+                processed = 0
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # ---------- Delivery ----------
+
+    async def run_pending(self) -> int:
+        """Beanspruche einen Batch fälliger Zustellungen und warte auf alle (Tests, Cron)"""
+        self._ensure_client()
+        batch = await asyncio.to_thread(self._claim_batch, self.batch_size)
+        if batch:
+            await asyncio.gather(*(self._deliver(job, self._endpoint_slot(job["endpoint_id"])) for job in batch))
+        return len(batch)
+
+    async def _dispatch(self) -> int:
+        """Freie Slots nachfüllen, ohne auf den Rest eines Batches zu warten"""
+        self._ensure_client()
+        capacity = min(self.batch_size, self.max_concurrency - len(self._tasks))
+        if capacity <= 0:
+            return 0
+        busy = {endpoint_id: slot[1] for endpoint_id, slot in self._endpoint_limits.items()}
+        batch = await asyncio.to_thread(self._claim_batch, capacity, busy)
+        for job in batch:
+            task = asyncio.create_task(self._deliver(job, self._endpoint_slot(job["endpoint_id"])))
+            self._tasks.add(task)
+            task.add_done_callback(self._delivery_done)
+        return len(batch)
+
+    def _delivery_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Webhook-Zustellung fehlgeschlagen: {task.exception()}")
+        # Slot frei - Dispatcher beansprucht die nächste Zustellung
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _claim_batch(self, limit: int, busy: Optional[dict] = None) -> list:
+        """
+        Beanspruche bis zu limit fällige Zustellungen. Mit busy (laufende Zustellungen
+        pro Endpunkt) höchstens per_endpoint_concurrency pro Endpunkt.
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            query = db.query(WebhookDelivery, WebhookEndpoint).join(
+                WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id
+            ).filter(
+                WebhookDelivery.status == 'pending',
+                WebhookDelivery.next_attempt_at <= now
+            )
+            if busy is not None:
+                busy = dict(busy)
+                saturated = [endpoint_id for endpoint_id, count in busy.items() if count >= self.per_endpoint_concurrency]
+                if saturated:
+                    query = query.filter(WebhookDelivery.endpoint_id.notin_(saturated))
+            rows = query.order_by(WebhookDelivery.next_attempt_at).limit(limit).all()
+
+            jobs = []
+            for delivery, endpoint in rows:
+                if busy is not None:
+                    if busy.get(endpoint.id, 0) >= self.per_endpoint_concurrency:
+                        continue
+                    busy[endpoint.id] = busy.get(endpoint.id, 0) + 1
+                claimed = db.query(WebhookDelivery).filter(
+                    WebhookDelivery.id == delivery.id,
+                    WebhookDelivery.status == 'pending'
+                ).update({
+                    WebhookDelivery.status: 'delivering',
+                    WebhookDelivery.attempts: WebhookDelivery.attempts + 1,
+                    WebhookDelivery.next_attempt_at: now,
+                }, synchronize_session=False)
+                if claimed:
+                    jobs.append({
+                        "id": delivery.id,
+                        "endpoint_id": endpoint.id,
+                        "url": endpoint.url,
+                        "secret": endpoint.secret,
+                        "event_type": delivery.event_type,
+                        "payload": delivery.payload,
+                        "attempts": (delivery.attempts or 0) + 1,
+                    })
+            db.commit()
+            return jobs
+        finally:
+            db.close()
+
+    def _endpoint_slot(self, endpoint_id: str) -> asyncio.Semaphore:
+        """Semaphore des Endpunkts, zählt die Zustellung bis _release_endpoint"""
+        slot = self._endpoint_limits.get(endpoint_id)
+        if slot is None:
+            slot = self._endpoint_limits[endpoint_id] = [asyncio.Semaphore(self.per_endpoint_concurrency), 0]
+        slot[1] += 1
+        return slot[0]
+
+    def _release_endpoint(self, endpoint_id: str):
+        slot = self._endpoint_limits.get(endpoint_id)
+        if slot is not None:
+            slot[1] -= 1
+            if slot[1] <= 0:
+                del self._endpoint_limits[endpoint_id]
+
+    async def _deliver(self, job: dict, endpoint_limit: asyncio.Semaphore):
+        try:
+            await self._send(job, endpoint_limit)
+        finally:
+            self._release_endpoint(job["endpoint_id"])
+
+    async def _send(self, job: dict, endpoint_limit: asyncio.Semaphore):
+        status_code, error = None, None
+        # Erst der Endpunkt, dann global: wartende Jobs eines langsamen Endpunkts
+        # belegen keine globalen Slots
+        async with endpoint_limit, self._global_limit:
+            self.in_flight += 1
+            try:
+                response = await self._client.post(job["url"], content=job["payload"], headers={
+                    "Content-Type": "application/json",
+                    "X-Webhook-Signature": sign_payload(job["payload"], job["secret"]),
+                    "X-Webhook-Timestamp": datetime.now(timezone.utc).isoformat(),
+                    "X-Webhook-Event": job["event_type"],
+                    "X-Webhook-Id": job["id"],
+                })
+                status_code = response.status_code
+                if not 200 <= status_code < 300:
+                    error = f"HTTP {status_code}"
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            finally:
+                self.in_flight -= 1
+
+        await asyncio.to_thread(self._record_result, job, status_code, error)
+
+    def _record_result(self, job: dict, status_code: Optional[int], error: Optional[str]):
+        db = self.session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            delivery = db.query(WebhookDelivery).filter(WebhookDelivery.id == job["id"]).first()
+            endpoint = db.query(WebhookEndpoint).filter(WebhookEndpoint.id == job["endpoint_id"]).first()
+            if delivery is None:
+                return
+            delivery.last_status_code = status_code
+            if error is None:
+                delivery.status = 'delivered'
+                delivery.delivered_at = now
+                delivery.last_error = None
+                self.delivered += 1
+                if endpoint:
+                    endpoint.success_count = (endpoint.success_count or 0) + 1
+                    endpoint.last_triggered = now
+            elif job["attempts"] >= self.max_attempts:
+                delivery.status = 'dead'
+                delivery.last_error = error[:500]
+                self.dead += 1
+                if endpoint:
+                    endpoint.failure_count = (endpoint.failure_count or 0) + 1
+                logger.error(f"❌ Webhook {job['event_type']} an {job['url']} endgültig fehlgeschlagen: {error}")
+            else:
+                delay = min(self.backoff_seconds * (2 ** (job["attempts"] - 1)), MAX_BACKOFF_SECONDS)
+                delivery.status = 'pending'
+                delivery.last_error = error[:500]
+                delivery.next_attempt_at = now + timedelta(seconds=delay)
+                self.retried += 1
+                logger.warning(f"⚠️  Webhook an {job['url']} fehlgeschlagen (Versuch {job['attempts']}), neuer Versuch in {delay:.0f}s: {error}")
+            db.commit()
+        finally:
+            db.close()
+
+    def _recover_stale(self, older_than_minutes: int = 10):
+        """Setze hängengebliebene 'delivering'-Einträge zurück"""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+            db.query(WebhookDelivery).filter(
+                WebhookDelivery.status == 'delivering',
+                WebhookDelivery.next_attempt_at < cutoff
+            ).update({WebhookDelivery.status: 'pending'}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️  Webhook-Outbox Recovery fehlgeschlagen: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    # ---------- Metrics ----------
+
+    def stats(self, db: Optional[Session] = None) -> dict:
+        """Outbox-Tiefe (aus der DB) und Zähler dieses Prozesses"""
+        counts = {}
+        session = db or self.session_factory()
+        try:
+            counts = dict(session.query(WebhookDelivery.status, func.count(WebhookDelivery.id)).group_by(WebhookDelivery.status).all())
+        except Exception as e:
+            logger.warning(f"⚠️  Webhook-Outbox Statistik nicht verfügbar: {e}")
+        finally:
+            if db is None:
+                session.close()
+        return {
+            "running": self._task is not None,
+            "in_flight": self.in_flight,
+            "endpoints": len(self._endpoint_limits),
+            "pending": counts.get('pending', 0),
+            "delivering": counts.get('delivering', 0),
+            "dead": counts.get('dead', 0),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.dead,
+        }